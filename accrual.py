@@ -0,0 +1,65 @@
+"""Run the overdue and fine accrual job by hand or from cron.
+
+Usage:
+    python accrual.py [--as-of 2024-05-01] [--batch-size 5000]
+
+The database also runs AccrueFines daily through the accrue_fines_daily
+event when event_scheduler is on. Fines are stored as absolute amounts
+for the as-of date, so running the job twice changes nothing and one run
+after a gap catches up on every missed day.
+"""
+import argparse
+from datetime import date
+
+import mysql.connector
+
+from db import get_connection
+
+BATCH_SIZE = 5000
+
+
+def last_run(cursor):
+    cursor.execute("""
+        SELECT As_Of_Date, Loans_Updated, Finished_At
+        FROM FineAccrualRuns
+        WHERE Finished_At IS NOT NULL
+        ORDER BY Run_ID DESC
+        LIMIT 1
+    """)
+    return cursor.fetchone()
+
+
+def accrue_fines(conn, as_of=None, batch_size=BATCH_SIZE):
+    """Call AccrueFines and return its (Run_ID, As_Of_Date, Loans_Updated) row"""
+    cursor = conn.cursor()
+    try:
+        cursor.callproc('AccrueFines', (as_of, batch_size))
+        for result in cursor.stored_results():
+            return result.fetchone()
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mark overdue loans and accrue their fines")
+    parser.add_argument("--as-of", type=date.fromisoformat, help="accrue up to this date (default: today)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        previous = last_run(cursor)
+        cursor.close()
+        if previous:
+            print(f"Last run: as of {previous[0]}, {previous[1]} loans updated, finished {previous[2]}")
+        run_id, as_of, updated = accrue_fines(conn, args.as_of, args.batch_size)
+        print(f"Run {run_id}: accrued fines as of {as_of}, {updated} loans updated")
+    except mysql.connector.Error as error:
+        print(f"Error accruing fines: {error}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
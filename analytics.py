@@ -0,0 +1,59 @@
+"""Rebuild or print the circulation rollups behind the admin Analytics page.
+
+Usage:
+    python analytics.py [--rebuild] [--days 30]
+
+Triggers on MemberTransactions keep BookCirculation, CategoryCirculation
+and DailyCirculation current as loans are made, returned and fined.
+--rebuild recomputes them from MemberTransactions, which is needed after
+a bulk load or delete that bypassed the normal history (for example
+bench.generate_data --clean).
+"""
+import argparse
+
+import mysql.connector
+
+from db import get_connection
+import queries
+
+
+def rebuild(conn):
+    """Call RebuildCirculationRollups and return its (Books, Category_Rows, Daily_Rows) row"""
+    cursor = conn.cursor()
+    try:
+        cursor.callproc('RebuildCirculationRollups')
+        for result in cursor.stored_results():
+            return result.fetchone()
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or print the circulation rollups")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every rollup from MemberTransactions")
+    parser.add_argument("--days", type=int, default=30, help="days of daily circulation to print")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        if args.rebuild:
+            books, category_rows, daily_rows = rebuild(conn)
+            print(f"Rebuilt rollups: {books} books, {category_rows} category rows, {daily_rows} daily rows")
+
+        print(f"{'Category':<40} {'Loans':>9} {'Titles':>8} {'Borrowers':>10} {'On loan':>8} {'Overdue':>8}")
+        for row in queries.fetch_all(conn, "category_circulation", dictionary=True):
+            print(f"{row['Category_Name']:<40} {row['Loans']:>9} {row['Books_Borrowed']:>8} "
+                  f"{row['Unique_Borrowers']:>10} {row['Open_Loans']:>8} {row['Overdue']:>8}")
+        print(f"\nNever borrowed: {queries.fetch_one(conn, 'never_borrowed_count')[0]} titles")
+
+        print(f"\n{'Date':<12} {'Borrows':>8} {'Returns':>8} {'Fines':>10}")
+        for day, borrows, returns, fines in queries.fetch_all(conn, "daily_circulation", (args.days,)):
+            print(f"{day!s:<12} {borrows:>8} {returns:>8} {fines:>10}")
+    except mysql.connector.Error as error:
+        print(f"Error reading rollups: {error}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
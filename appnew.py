@@ -1,109 +1,131 @@
 import streamlit as st
 import mysql.connector
-from datetime import datetime, timedelta
-import hashlib
+import pandas as pd
+import json
+from collections import OrderedDict
 import re
+import time
 
-# Configuration and Constants
-DB_CONFIG = {
-    "host": "localhost",
-    "user": "root",
-    "password": "12345",
-    "database": "lib_mgmt"
-}
+from bulk_import import detect_format, import_books, import_members, member_statuses, open_upload
+from cache import catalog_cache
+from db import get_connection, get_read_connection, note_write, pool_metrics, routing_metrics
+import jobs
+from logins import last_login_writer, login_latency
+from metrics import METRICS_CONFIG, metrics, prometheus_text, query_timer, render_timer, start_exporter
+import queries
+from utils import fulltext_words, hash_password, validate_isbn, validate_email
+
+SEARCH_RESULT_LIMIT = 50
+PAGE_SIZES = [25, 50, 100, 200]
+RETURNS_BATCH_SIZE = 20
+ANALYTICS_DAYS = 30
+ANALYTICS_ROWS = 20
+MEMBER_LOOKUP_LIMIT = 20
+MEMBER_LOOKUP_MEMO_SIZE = 50  # recent lookups remembered per session
+JOBS_SHOWN = 20
+
+# Read-your-writes keys for replica routing: a write noted under a key keeps
+# that key's reads on the primary until the replicas have caught up
+CATALOG_READS = "catalog"
+MEMBER_LIST_READS = "members"
+
+def member_reads(member_id):
+    return ("member", member_id)
 
 # Utility Functions
-def get_database_connection():
+def get_database_connection(read_only=False, read_key=None):
+    """Check a connection out of the shared pool; conn.close() returns it.
+
+    read_only work may go to a replica that has caught up with read_key's writes.
+    """
     try:
-        return mysql.connector.connect(**DB_CONFIG)
+        if read_only:
+            return get_read_connection(read_key)
+        return get_connection()
     except mysql.connector.Error as error:
         st.error(f"Database Connection Error: {error}")
         return None
 
-def hash_password(password):
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def validate_isbn(isbn):
-    """Validate ISBN format"""
-    return bool(re.match(r'^\d{10}|\d{13}$', isbn))
-
-def validate_email(email):
-    """Validate email format"""
-    return bool(re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email))
+def build_fulltext_query(search_term):
+    """Turn free text into a BOOLEAN MODE query that requires every word as a prefix"""
+    return " ".join(f"+{word}*" for word in fulltext_words(search_term))
 
 # Authentication Functions
 def check_admin_login(username, password):
+    started = time.perf_counter()
+    success, result = False, None
     conn = get_database_connection()
     if not conn:
+        login_latency.record(time.perf_counter() - started, False)
         return False, None
     
     try:
-        cursor = conn.cursor(dictionary=True)
-        hashed_password = hash_password(password)
-        cursor.execute(
-            "SELECT Admin_ID, Username, Role FROM Administrators WHERE Username = %s AND Password = %s",
-            (username, hashed_password)
-        )
-        result = cursor.fetchone()
-        if result:
-            return True, result
-        return False, None
+        result = queries.fetch_one(conn, "admin_login", (username, hash_password(password)), dictionary=True)
+        success = result is not None
     except mysql.connector.Error as error:
         st.error(f"Login Error: {error}")
-        return False, None
     finally:
         conn.close()
+        login_latency.record(time.perf_counter() - started, success)
+
+    if not success:
+        return False, None
+    # Written in the background so the login never waits on it
+    last_login_writer.record("Administrators", result['Admin_ID'])
+    return True, result
 
 def check_member_login(username, password):
+    started = time.perf_counter()
+    success, result = False, None
     conn = get_database_connection()
     if not conn:
+        login_latency.record(time.perf_counter() - started, False)
         return False, None
     
     try:
-        cursor = conn.cursor(dictionary=True)
-        hashed_password = hash_password(password)
-        
-        print(f"Attempting login with Username: {username} and Hashed Password: {hashed_password}")  # Debug
-        
-        cursor.execute(
-            "SELECT Member_ID, Username, Status FROM Members WHERE Username = %s AND Password = %s",
-            (username, hashed_password)
-        )
-        result = cursor.fetchone()
-        
-        print(f"Login query result: {result}")  # Debug
-        
-        if result and result['Status'] == 'Active':
-            return True, result
-        return False, None
+        result = queries.fetch_one(conn, "member_login", (username, hash_password(password)), dictionary=True)
+        success = result is not None and result['Status'] == 'Active'
     except mysql.connector.Error as error:
         st.error(f"Login Error: {error}")
-        return False, None
     finally:
         conn.close()
+        login_latency.record(time.perf_counter() - started, success)
+
+    if not success:
+        return False, None
+    last_login_writer.record("Members", result['Member_ID'])
+    return True, result
 
 
 # Book Management Functions
-def fetch_books(search_term=None):
-    conn = get_database_connection()
+def fetch_books(search_term):
+    """Search results for a term; the whole catalog is only ever read a page at a time (fetch_books_page)"""
+    if not search_term:
+        return []
+    cache_key = catalog_cache.make_key(search_term)
+    books = catalog_cache.get(cache_key)
+    if books is not None:
+        return books
+    generation = catalog_cache.generation()
+
+    conn = get_database_connection(read_only=True, read_key=CATALOG_READS)
     if not conn:
         return []
     
     try:
-        cursor = conn.cursor(dictionary=True)
-        if search_term:
-            query = """
-                SELECT * FROM BookListView 
-                WHERE Title LIKE %s 
-                OR Author_Name LIKE %s 
-                OR Category_Name LIKE %s
-            """
-            search_pattern = f"%{search_term}%"
-            cursor.execute(query, (search_pattern, search_pattern, search_pattern))
+        fulltext_query = build_fulltext_query(search_term)
+        if fulltext_query:
+            # Ranked prefix search on the FULLTEXT index over title, author and category
+            books = queries.fetch_all(conn, "books_fulltext_search",
+                                      (fulltext_query, fulltext_query, SEARCH_RESULT_LIMIT), dictionary=True)
         else:
-            cursor.execute("SELECT * FROM BookListView")
-        return cursor.fetchall()
+            # Words too short for the full-text index still need an answer
+            search_pattern = f"%{search_term}%"
+            books = queries.fetch_all(conn, "books_like_search",
+                                      (search_pattern, search_pattern, search_pattern, SEARCH_RESULT_LIMIT),
+                                      dictionary=True)
+        catalog_cache.put(cache_key, books, generation)
+        return books
     except mysql.connector.Error as error:
         st.error(f"Error fetching books: {error}")
         return []
@@ -120,21 +142,16 @@ def add_book(admin_id, isbn, title, author, category):
         return False
     
     try:
-        cursor = conn.cursor()
-        
         # First, check if author exists, if not create
-        cursor.execute("SELECT Author_ID FROM Authors WHERE Author_Name = %s", (author,))
-        author_result = cursor.fetchone()
+        author_result = queries.fetch_one(conn, "author_id_by_name", (author,))
         
         if author_result:
             author_id = author_result[0]
         else:
-            cursor.execute("INSERT INTO Authors (Author_Name) VALUES (%s)", (author,))
-            author_id = cursor.lastrowid
+            author_id = queries.execute(conn, "author_insert", (author,)).lastrowid
         
         # Get category ID
-        cursor.execute("SELECT Category_ID FROM Categories WHERE Category_Name = %s", (category,))
-        category_result = cursor.fetchone()
+        category_result = queries.fetch_one(conn, "category_id_by_name", (category,))
         
         if not category_result:
             st.error("Invalid category")
@@ -143,12 +160,11 @@ def add_book(admin_id, isbn, title, author, category):
         category_id = category_result[0]
         
         # Insert the book
-        cursor.execute("""
-            INSERT INTO Books (ISBN, Title, Author_ID, Category_ID) 
-            VALUES (%s, %s, %s, %s)
-        """, (isbn, title, author_id, category_id))
+        queries.execute(conn, "book_insert", (isbn, title, author_id, category_id))
         
         conn.commit()
+        note_write(CATALOG_READS)
+        catalog_cache.invalidate_new_book(title, author, category)
         st.success("Book added successfully")
         return True
     except mysql.connector.Error as error:
@@ -157,6 +173,17 @@ def add_book(admin_id, isbn, title, author, category):
     finally:
         conn.close()
 
+def import_books_upload(uploaded_file, progress=None):
+    """Run the streaming bulk importer over an uploaded catalog file"""
+    try:
+        report = import_books(open_upload(uploaded_file), detect_format(uploaded_file.name), progress=progress)
+    except (mysql.connector.Error, ValueError) as error:
+        st.error(f"Error importing books: {error}")
+        return None
+    note_write(CATALOG_READS)
+    catalog_cache.clear()
+    return report
+
 def delete_book(admin_id, isbn):
     conn = get_database_connection()
     if not conn:
@@ -164,8 +191,11 @@ def delete_book(admin_id, isbn):
     
     try:
         cursor = conn.cursor()
-        cursor.execute("CALL DeleteBook(%s, %s)", (admin_id, isbn))
-        conn.commit()
+        with query_timer("DeleteBook"):
+            cursor.execute("CALL DeleteBook(%s, %s)", (admin_id, isbn))
+            conn.commit()
+        note_write(CATALOG_READS)
+        catalog_cache.invalidate_isbn(isbn)
         st.success("Book deleted successfully")
         return True
     
@@ -175,110 +205,113 @@ def delete_book(admin_id, isbn):
     finally:
         conn.close()
 
-def borrow_book(member_id, isbn):
+BORROW_MESSAGES = {
+    'OK': "borrowed successfully",
+    'MEMBER_INACTIVE': "Member account is not active",
+    'OVERDUE': "Cannot borrow new books while you have overdue items",
+    'NOT_FOUND': "Book not found",
+    'ALREADY_BORROWED': "You already have this book borrowed",
+    'UNAVAILABLE': "No copies are available right now"
+}
+
+def borrow_book(member_id, isbns):
+    """Borrow one ISBN or a cart of ISBNs in a single round trip.
+
+    Returns a dict of ISBN -> result code (see BORROW_MESSAGES; 'OK' on
+    success), or an empty dict if the call itself failed. An ISBN in the
+    cart twice is borrowed once: BorrowBook answers one row per cart entry,
+    so the duplicate would only collide with itself in the dict.
+    """
+    if isinstance(isbns, str):
+        isbns = [isbns]
+    isbns = list(dict.fromkeys(isbns))
+    if not isbns:
+        return {}
+    
     conn = get_database_connection()
     if not conn:
-        return False
+        return {}
     
     try:
-        cursor = conn.cursor()
-        
-        # Check if member has any overdue books
-        cursor.execute("""
-            SELECT COUNT(*) 
-            FROM MemberTransactions 
-            WHERE Member_ID = %s 
-            AND Status = 'Active' 
-            AND Due_Date < CURDATE()
-        """, (member_id,))
-        
-        overdue_count = cursor.fetchone()[0]
-        if overdue_count > 0:
-            st.error("Cannot borrow new books while you have overdue items")
-            return False
-            
-        # Check if member already has this book
-        cursor.execute("""
-            SELECT COUNT(*) 
-            FROM MemberTransactions 
-            WHERE Member_ID = %s 
-            AND ISBN = %s 
-            AND Status = 'Active'
-        """, (member_id, isbn))
-        
-        current_borrow = cursor.fetchone()[0]
-        if current_borrow > 0:
-            st.error("You already have this book borrowed")
-            return False
+        # BorrowBook checks, claims and commits in one call; there is nothing left to commit here
+        with query_timer("BorrowBook") as timer:
+            results = dict(queries.call(conn, 'BorrowBook', (member_id, json.dumps(list(isbns)))))
+            timer.rows = len(results)
         
-        # Call the BorrowBook stored procedure
-        cursor.callproc('BorrowBook', (member_id, isbn))
-        conn.commit()
-        st.success("Book borrowed successfully")
-        return True
+        note_write(CATALOG_READS, member_reads(member_id))
+        for isbn, code in results.items():
+            if code == 'OK':
+                catalog_cache.invalidate_isbn(isbn)
+                st.success(f"Book {isbn} {BORROW_MESSAGES['OK']}")
+            else:
+                st.error(f"Book {isbn}: {BORROW_MESSAGES.get(code, code)}")
+        return results
     except mysql.connector.Error as error:
-        st.error(f"Error borrowing book: {error}")
-        return False
+        st.error(f"Error borrowing book: {error.msg}")
+        return {}
     finally:
         conn.close()
-def return_book(member_id, isbn):
+
+def return_books(member_id, items):
+    """Close the active loans for items in one transaction.
+
+    With a member, items are ISBNs of that member's loans. member_id None is
+    the returns desk: items are scanned copy barcodes and each closes the
+    loan on that copy. Returns a list of (ISBN, Barcode, Member_ID, result
+    code, fine) straight from ReturnBook, or None if the call failed.
+    """
     conn = get_database_connection()
     if not conn:
-        return False
+        return None
     
     try:
-        cursor = conn.cursor()
+        # ReturnBook commits itself and hands back each fine, so there is no read-back query
+        with query_timer("ReturnBook") as timer:
+            results = queries.call(conn, 'ReturnBook', (member_id, json.dumps(list(items))))
+            timer.rows = len(results)
         
-        # Call the ReturnBook stored procedure
-        cursor.callproc('ReturnBook', (member_id, isbn))
-        conn.commit()
-        
-        # Fetch any fines after return
-        cursor.execute("""
-            SELECT Fine_Amount 
-            FROM MemberTransactions 
-            WHERE Member_ID = %s 
-            AND ISBN = %s 
-            AND Status = 'Completed'
-            ORDER BY Return_Date DESC 
-            LIMIT 1
-        """, (member_id, isbn))
-        
-        fine_result = cursor.fetchone()
-        if fine_result and fine_result[0] > 0:
-            st.warning(f"Book returned with a fine of ₹{fine_result[0]}. Please pay at the library counter.")
-        else:
-            st.success("Book returned successfully")
-        return True
+        # The returns desk closes other members' loans, so note each borrower
+        note_write(CATALOG_READS, *{member_reads(borrower) for _, _, borrower, _, _ in results if borrower is not None})
+        for isbn, _, _, code, _ in results:
+            if code == 'OK':
+                catalog_cache.invalidate_isbn(isbn)
+        return results
     except mysql.connector.Error as error:
-        st.error(f"Error returning book: {error}")
-        return False
+        st.error(f"Error returning book: {error.msg}")
+        return None
     finally:
         conn.close()
-def fetch_member_transactions(member_id):
-    conn = get_database_connection()
+
+DESK_RESULTS = {
+    'OK': "Returned",
+    'NOT_BORROWED': "No active loan",
+    'UNKNOWN_COPY': "Unknown barcode"
+}
+
+def return_book(member_id, isbn):
+    results = return_books(member_id, [isbn])
+    if not results:
+        return False
+    
+    _, _, _, code, fine = results[0]
+    if code != 'OK':
+        st.error("No active borrowing found for this book")
+        return False
+    if fine > 0:
+        st.warning(f"Book returned with a fine of ₹{fine}. Please pay at the library counter.")
+    else:
+        st.success("Book returned successfully")
+    return True
+
+def fetch_open_loans(member_id):
+    """A member's loans still out (Active or Overdue); the full history is paged by fetch_member_transactions_page"""
+    conn = get_database_connection(read_only=True, read_key=member_reads(member_id))
     if not conn:
         return []
     
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT 
-                mt.Transaction_ID,
-                b.Title,
-                mt.ISBN,
-                mt.Transaction_Type,
-                mt.Transaction_Date,
-                mt.Due_Date,
-                mt.Return_Date,
-                mt.Fine_Amount,
-                mt.Status
-            FROM MemberTransactions mt
-            JOIN Books b ON mt.ISBN = b.ISBN
-            WHERE mt.Member_ID = %s
-            ORDER BY mt.Transaction_Date DESC
-        """, (member_id,))
-        return cursor.fetchall()
+        # Open loans are never archived
+        return queries.fetch_all(conn, "member_open_transactions", (member_id,), dictionary=True)
     except mysql.connector.Error as error:
         st.error(f"Error fetching transactions: {error}")
         return []
@@ -295,29 +328,22 @@ def register_new_member(username, password, first_name, last_name, email):
         return False
     
     try:
-        cursor = conn.cursor()
-        
         # Check if username already exists
-        cursor.execute("SELECT COUNT(*) FROM Members WHERE Username = %s", (username,))
-        if cursor.fetchone()[0] > 0:
+        if queries.fetch_one(conn, "username_taken", (username,))[0] > 0:
             st.error("Username already exists")
             return False
             
         # Check if email already exists
-        cursor.execute("SELECT COUNT(*) FROM Members WHERE Email = %s", (email,))
-        if cursor.fetchone()[0] > 0:
+        if queries.fetch_one(conn, "email_taken", (email,))[0] > 0:
             st.error("Email already exists")
             return False
         
         # Insert new member
         hashed_password = hash_password(password)
-        cursor.execute("""
-            INSERT INTO Members 
-            (Username, Password, First_Name, Last_Name, Email, Status) 
-            VALUES (%s, %s, %s, %s, %s, 'Active')
-        """, (username, hashed_password, first_name, last_name, email))
+        queries.execute(conn, "member_insert", (username, hashed_password, first_name, last_name, email))
         
         conn.commit()
+        note_write(MEMBER_LIST_READS)
         st.success("Member registered successfully")
         return True
     except mysql.connector.Error as error:
@@ -326,33 +352,402 @@ def register_new_member(username, password, first_name, last_name, email):
     finally:
         conn.close()
 
-def fetch_all_members():
+def enrol_members_upload(uploaded_file, progress=None):
+    """Run batch enrolment over an uploaded roster file"""
+    try:
+        # Hash inline; a SHA-256 per row is cheap next to the inserts
+        report = import_members(open_upload(uploaded_file), detect_format(uploaded_file.name), workers=0,
+                                progress=progress)
+    except (mysql.connector.Error, ValueError) as error:
+        st.error(f"Error enrolling members: {error}")
+        return None
+    note_write(MEMBER_LIST_READS)
+    return report
+
+def like_prefix(term):
+    """Escape LIKE wildcards so term only ever matches as a literal prefix"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def lookup_members(term, limit=MEMBER_LOOKUP_LIMIT):
+    """Members whose ID equals term or whose username, first or last name starts with it"""
+    term = term.strip()
+    if not term:
+        return []
+    conn = get_database_connection(read_only=True, read_key=MEMBER_LIST_READS)
+    if not conn:
+        return []
+
+    try:
+        first, _, rest = term.partition(" ")
+        if rest.strip():
+            # "Jane Do" looks up first name Jane, last name starting with Do
+            return queries.fetch_all(conn, "member_lookup_full_name",
+                                     (first, like_prefix(rest.strip()), limit), dictionary=True)
+        member_id = int(term) if term.isdigit() else None
+        prefix = like_prefix(term)
+        return queries.fetch_all(conn, "member_lookup", (
+            member_id, prefix, limit, prefix, limit, prefix, limit, member_id, limit
+        ), dictionary=True)
+    except mysql.connector.Error as error:
+        st.error(f"Error looking up members: {error}")
+        return []
+    finally:
+        conn.close()
+
+def fetch_member_transaction_stats(member_id):
+    """Active borrows, total fines and overdue count, kept up to date by the summary triggers"""
+    conn = get_database_connection(read_only=True, read_key=member_reads(member_id))
+    if not conn:
+        return None
+    
+    try:
+        return queries.fetch_one(conn, "member_transaction_stats", (member_id,), dictionary=True) or {"Active_Borrows": 0, "Total_Fines": 0, "Overdue_Books": 0}
+    except mysql.connector.Error as error:
+        st.error(f"Error fetching transaction summary: {error}")
+        return None
+    finally:
+        conn.close()
+
+HOLD_MESSAGES = {
+    'OK': "You are in the queue",
+    'MEMBER_INACTIVE': "Member account is not active",
+    'NOT_FOUND': "Book not found",
+    'ALREADY_HELD': "You already hold this book",
+    'ALREADY_BORROWED': "You already have this book borrowed",
+    'AVAILABLE': "A copy is on the shelf; borrow it instead"
+}
+
+def place_hold(member_id, isbn):
+    """Join the hold queue for isbn; returns (result code, queue position), or (None, None) on failure"""
+    conn = get_database_connection()
+    if not conn:
+        return None, None
+    
+    try:
+        cursor = conn.cursor()
+        with query_timer("PlaceHold"):
+            cursor.callproc('PlaceHold', (member_id, isbn))
+            code, position = None, None
+            for result in cursor.stored_results():
+                code, position = result.fetchone()
+        
+        note_write(member_reads(member_id))
+        if code == 'OK':
+            st.success(f"{HOLD_MESSAGES['OK']} at position {position}")
+        else:
+            st.error(HOLD_MESSAGES.get(code, code))
+        return code, position
+    except mysql.connector.Error as error:
+        st.error(f"Error placing hold: {error.msg}")
+        return None, None
+    finally:
+        conn.close()
+
+def cancel_hold(member_id, isbn):
+    conn = get_database_connection()
+    if not conn:
+        return False
+    
+    try:
+        cursor = conn.cursor()
+        # A cancelled Ready hold passes its copy on, so the title may be back in stock
+        with query_timer("CancelHold"):
+            cursor.callproc('CancelHold', (member_id, isbn))
+            code = None
+            for result in cursor.stored_results():
+                code, = result.fetchone()
+        
+        note_write(CATALOG_READS, member_reads(member_id))
+        if code != 'OK':
+            st.error("No open hold found for this book")
+            return False
+        catalog_cache.invalidate_isbn(isbn)
+        st.success("Hold cancelled")
+        return True
+    except mysql.connector.Error as error:
+        st.error(f"Error cancelling hold: {error.msg}")
+        return False
+    finally:
+        conn.close()
+
+def fetch_member_holds(member_id):
+    """A member's Waiting and Ready holds, Ready first, with their queue positions"""
+    conn = get_database_connection(read_only=True, read_key=member_reads(member_id))
+    if not conn:
+        return []
+    
+    try:
+        return queries.fetch_all(conn, "member_holds", (member_id,), dictionary=True)
+    except mysql.connector.Error as error:
+        st.error(f"Error fetching holds: {error}")
+        return []
+    finally:
+        conn.close()
+
+# Analytics, read from the circulation rollups the triggers keep current
+def fetch_analytics(query_name, params=()):
+    """One rollup query as a DataFrame; None if the database is unreachable"""
+    conn = get_database_connection(read_only=True)
+    if not conn:
+        return None
+    
+    try:
+        return queries.fetch_frame(conn, query_name, params)
+    except mysql.connector.Error as error:
+        st.error(f"Error fetching analytics: {error}")
+        return None
+    finally:
+        conn.close()
+
+def fetch_never_borrowed_count():
+    conn = get_database_connection(read_only=True)
+    if not conn:
+        return None
+    
+    try:
+        return queries.fetch_one(conn, "never_borrowed_count")[0]
+    except mysql.connector.Error as error:
+        st.error(f"Error fetching analytics: {error}")
+        return None
+    finally:
+        conn.close()
+
+# Background Jobs
+JOB_LABELS = {
+    "delete_books": "Delete books",
+    "rebuild_rollups": "Rebuild analytics rollups",
+    "archive_transactions": "Archive old transactions",
+    "accrue_fines": "Accrue overdue fines",
+    "expire_holds": "Expire uncollected holds",
+    "audit_maintenance": "Audit log partition maintenance"
+}
+
+def invalidate_catalog():
+    note_write(CATALOG_READS)
+    catalog_cache.clear()
+
+# Deletes may stop part way, so the catalog is dropped however the job ended.
+# Expired holds put copies back on the shelf or pass them to the next holder.
+jobs.on_finish("delete_books", invalidate_catalog)
+jobs.on_finish("expire_holds", invalidate_catalog)
+
+def submit_job(admin_id, job_name, params=None):
+    """Queue a job for the executor threads; returns its Job_ID or None"""
+    try:
+        with query_timer("submit_job"):
+            job_id = jobs.submit(job_name, params, admin_id)
+        st.success(f"Queued job {job_id}")
+        return job_id
+    except (mysql.connector.Error, ValueError) as error:
+        st.error(f"Error queueing job: {error}")
+        return None
+
+def cancel_job(job_id):
+    try:
+        if jobs.cancel(job_id):
+            st.success(f"Cancel requested for job {job_id}")
+            return True
+        st.info(f"Job {job_id} has already finished")
+        return False
+    except mysql.connector.Error as error:
+        st.error(f"Error cancelling job: {error}")
+        return False
+
+def fetch_recent_jobs(limit=JOBS_SHOWN):
+    """Newest jobs, read from the primary so progress is never behind"""
     conn = get_database_connection()
     if not conn:
         return []
     
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT 
-                Member_ID, 
-                Username,
-                First_Name,
-                Last_Name, 
-                Email,
-                Status,
-                Created_At,
-                Last_Login
-            FROM Members
-            ORDER BY Created_At DESC
-        """)
-        return cursor.fetchall()
+        with query_timer("recent_jobs"):
+            return jobs.recent_jobs(conn, limit)
     except mysql.connector.Error as error:
-        st.error(f"Error fetching members: {error}")
+        st.error(f"Error fetching jobs: {error}")
         return []
     finally:
         conn.close()
+
+def parse_isbns(text):
+    """Valid ISBNs from free text separated by commas or whitespace, and the rejected tokens"""
+    tokens = [token for token in re.split(r'[\s,]+', text) if token]
+    valid = list(dict.fromkeys(token for token in tokens if validate_isbn(token)))
+    return valid, [token for token in tokens if not validate_isbn(token)]
+
+# Keyset Pagination
+def fetch_keyset_page(query_name, filters, params, keys, descending, error_label,
+                      cursor=None, direction="next", page_size=PAGE_SIZES[0], columnar=False,
+                      union_with=None, read_key=None):
+    """Fetch one page of the named select ordered by keys, a list of (column, result field).
+
+    cursor is the key of the last row of the current page when moving "next",
+    or of its first row when moving "prev". The returned "next"/"prev" keys are
+    None when there is nothing further in that direction. With columnar=True
+    the rows come back as a pandas DataFrame instead of a list of dicts.
+    union_with names a second select with the same columns and aliases (the
+    archive); each half is filtered and limited on its own index, then merged.
+    Pages are read from a replica when one has caught up with read_key's writes.
+    """
+    empty_page = {"rows": [], "next": None, "prev": None}
+    conn = get_database_connection(read_only=True, read_key=read_key)
+    if not conn:
+        return empty_page
+    
+    try:
+        backwards = direction == "prev"
+        # Walking backwards means scanning the index the other way round
+        scan_descending = descending != backwards
+        order = "DESC" if scan_descending else "ASC"
+        conditions = list(filters)
+        query_params = list(params)
+        if cursor is not None:
+            columns = ", ".join(column for column, _ in keys)
+            placeholders = ", ".join(["%s"] * len(keys))
+            conditions.append(f"({columns}) {'<' if scan_descending else '>'} ({placeholders})")
+            query_params.extend(cursor)
+        query_params.append(page_size + 1)
+        
+        def half(name):
+            query = queries.QUERIES[name]
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += " ORDER BY " + ", ".join(f"{column} {order}" for column, _ in keys)
+            return query + " LIMIT %s"
+        
+        query = half(query_name)
+        if union_with:
+            query = (f"({query}) UNION ALL ({half(union_with)})"
+                     f" ORDER BY {', '.join(f'{field} {order}' for _, field in keys)} LIMIT %s")
+            query_params = query_params * 2 + [page_size + 1]
+        
+        # One prepared statement per scan direction, first page or not
+        variant = queries.register(f"{query_name}:{order}:{'after' if cursor is not None else 'first'}", query)
+        columns, rows = queries.fetch_rows(conn, variant, query_params)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return empty_page
+        
+        # Cursor keys are read from the raw tuples so they stay plain Python values
+        positions = [columns.index(field) for _, field in keys]
+        def key_of(row):
+            return tuple(row[position] for position in positions)
+        
+        if columnar:
+            page_rows = queries.to_frame(columns, rows)
+        else:
+            page_rows = [dict(zip(columns, row)) for row in rows]
+        if backwards:
+            return {"rows": page_rows, "next": key_of(rows[-1]), "prev": key_of(rows[0]) if has_more else None}
+        return {
+            "rows": page_rows,
+            "next": key_of(rows[-1]) if has_more else None,
+            "prev": key_of(rows[0]) if cursor is not None else None
+        }
+    except mysql.connector.Error as error:
+        st.error(f"{error_label}: {error}")
+        return empty_page
+    finally:
+        conn.close()
+
+def fetch_books_page(cursor=None, direction="next", page_size=PAGE_SIZES[0]):
+    return fetch_keyset_page(
+        "books_page", [], [], [("ISBN", "ISBN")],
+        descending=False, error_label="Error fetching books",
+        cursor=cursor, direction=direction, page_size=page_size, read_key=CATALOG_READS
+    )
+
+def fetch_members_page(cursor=None, direction="next", page_size=PAGE_SIZES[0], columnar=False):
+    return fetch_keyset_page(
+        "members_page", [], [], [("Created_At", "Created_At"), ("Member_ID", "Member_ID")],
+        descending=True, error_label="Error fetching members",
+        cursor=cursor, direction=direction, page_size=page_size, columnar=columnar,
+        read_key=MEMBER_LIST_READS
+    )
+
+def fetch_member_transactions_page(member_id, cursor=None, direction="next", page_size=PAGE_SIZES[0],
+                                   columnar=False):
+    return fetch_keyset_page(
+        "member_transactions_page", ["mt.Member_ID = %s"], [member_id],
+        [("mt.Transaction_Date", "Transaction_Date"), ("mt.Transaction_ID", "Transaction_ID")],
+        descending=True, error_label="Error fetching transactions",
+        cursor=cursor, direction=direction, page_size=page_size, columnar=columnar,
+        union_with="member_transactions_archive_page", read_key=member_reads(member_id)
+    )
+
 # UI Components
+def paged(state_key, fetch_page, *args, **options):
+    """Render a page-size picker, fetch the current page and show Previous/Next buttons"""
+    page_size = st.selectbox("Rows per page", PAGE_SIZES, key=f"{state_key}_size")
+    cursor, direction = st.session_state.get(state_key, (None, "next"))
+    page = fetch_page(*args, cursor=cursor, direction=direction, page_size=page_size, **options)
+    if not len(page["rows"]) and cursor is not None:
+        # The rows under the cursor went away; start again from the top
+        st.session_state[state_key] = (None, "next")
+        page = fetch_page(*args, page_size=page_size, **options)
+    return page
+
+def transactions_frame(frame):
+    """Vectorized display types for a transactions page: real dates and numeric fines"""
+    return frame.assign(
+        Transaction_Date=pd.to_datetime(frame["Transaction_Date"]),
+        Due_Date=pd.to_datetime(frame["Due_Date"]),
+        Return_Date=pd.to_datetime(frame["Return_Date"]),
+        Fine_Amount=frame["Fine_Amount"].astype("float64")
+    )
+
+TRANSACTION_COLUMNS = {
+    "Transaction_ID": st.column_config.NumberColumn("Transaction ID"),
+    "Title": "Book Title",
+    "Transaction_Type": "Type",
+    "Transaction_Date": st.column_config.DateColumn("Issue Date", format="YYYY-MM-DD"),
+    "Due_Date": st.column_config.DateColumn("Due Date", format="YYYY-MM-DD"),
+    "Return_Date": st.column_config.DateColumn("Return Date", format="YYYY-MM-DD"),
+    "Fine_Amount": st.column_config.NumberColumn(
+        "Fine Amount",
+        format="₹%d"
+    ),
+    "Status": st.column_config.SelectboxColumn(
+        "Status",
+        options=["Active", "Overdue", "Completed"]
+    )
+}
+
+def cached_member_lookup(term):
+    """lookup_members memoized per session, so retyping a recent search skips the database"""
+    memo = st.session_state.setdefault('member_lookup_memo', OrderedDict())
+    key = " ".join(term.lower().split())
+    if key in memo:
+        memo.move_to_end(key)
+        return memo[key]
+    members = lookup_members(term)
+    memo[key] = members
+    while len(memo) > MEMBER_LOOKUP_MEMO_SIZE:
+        memo.popitem(last=False)
+    return members
+
+def page_controls(state_key, page):
+    col1, col2, _ = st.columns([1, 1, 4])
+    with col1:
+        if st.button("Previous", key=f"{state_key}_prev", disabled=page["prev"] is None):
+            st.session_state[state_key] = (page["prev"], "prev")
+            st.rerun()
+    with col2:
+        if st.button("Next", key=f"{state_key}_next", disabled=page["next"] is None):
+            st.session_state[state_key] = (page["next"], "next")
+            st.rerun()
+
+def book_choices(state_key):
+    """Books for a picker: search results when a term is typed, else one keyset page of the catalog"""
+    search = st.text_input("Search books by title or author", key=f"{state_key}_search")
+    if search:
+        return fetch_books(search)
+    page = paged(state_key, fetch_books_page)
+    page_controls(state_key, page)
+    return page["rows"]
+
 def login_page():
     st.title("Exam Centre Management System")
     
@@ -391,7 +786,8 @@ def admin_portal():
     
     menu = st.sidebar.selectbox(
         "Menu",
-        ["Add Book", "Delete Book", "View Books", "Register Member", "View Members", "View Member Transactions"]
+        ["Add Book", "Import Books", "Delete Book", "View Books", "Returns Desk", "Register Member",
+         "Enrol Members", "View Members", "View Member Transactions", "Analytics", "Jobs", "Diagnostics"]
     )
     
     if st.sidebar.button("Logout"):
@@ -399,6 +795,16 @@ def admin_portal():
             del st.session_state[key]
         st.rerun()
     
+    latency = login_latency.stats()
+    st.sidebar.caption(
+        f"Logins this process: {latency['logins']} "
+        f"(p50 {latency['p50_ms']:.1f} ms, p95 {latency['p95_ms']:.1f} ms)"
+    )
+    
+    with render_timer("admin", menu):
+        admin_page(menu)
+
+def admin_page(menu):
     if menu == "Add Book":
         st.header("Add New Book")
         with st.form("add_book_form"):
@@ -413,9 +819,28 @@ def admin_portal():
             if st.form_submit_button("Add Book"):
                 add_book(st.session_state['user_data']['Admin_ID'], isbn, title, author, category)
     
+    elif menu == "Import Books":
+        st.header("Import Books")
+        st.caption("CSV with ISBN, Title, Author and Category columns, a JSON array of the same, or JSON Lines")
+        uploaded_file = st.file_uploader("Catalog file", type=["csv", "json", "jsonl"])
+        if uploaded_file and st.button("Import"):
+            status = st.empty()
+            report = import_books_upload(uploaded_file,
+                                         progress=lambda done: status.text(f"{done} rows processed"))
+            if report:
+                status.empty()
+                st.success(f"Imported {report['inserted']} of {report['read']} rows "
+                           f"({report['rows_per_second']:.0f} rows/s)")
+                if report['rejected']:
+                    st.warning(f"{len(report['rejected'])} rows rejected")
+                    st.dataframe([
+                        {"Line": line_no, "ISBN": isbn, "Reason": reason}
+                        for line_no, isbn, reason in report['rejected']
+                    ])
+    
     elif menu == "Delete Book":
         st.header("Delete Book")
-        books = fetch_books()
+        books = book_choices("delete_books_page")
         if books:
             book_to_delete = st.selectbox(
                 "Select book to delete",
@@ -431,11 +856,57 @@ def admin_portal():
     elif menu == "View Books":
         st.header("Book Inventory")
         search = st.text_input("Search books by title or author")
-        books = fetch_books(search)
-        if books:
-            st.dataframe(books)
+        if search:
+            books = fetch_books(search)
+            if books:
+                st.dataframe(books)
+            else:
+                st.info("No books found")
         else:
-            st.info("No books found")
+            page = paged("admin_books_page", fetch_books_page)
+            if page["rows"]:
+                st.dataframe(page["rows"])
+                page_controls("admin_books_page", page)
+            else:
+                st.info("No books found")
+            
+    elif menu == "Returns Desk":
+        st.header("Returns Desk")
+        desk = st.session_state.setdefault('returns_desk', {"returns": [], "total_fines": 0})
+        with st.form("returns_desk_form", clear_on_submit=True):
+            scanned = st.text_area("Scan copy barcodes (one per line)")
+            submitted = st.form_submit_button("Process Returns")
+        
+        if submitted:
+            barcodes = scanned.split()
+            for start in range(0, len(barcodes), RETURNS_BATCH_SIZE):
+                results = return_books(None, barcodes[start:start + RETURNS_BATCH_SIZE])
+                for isbn, barcode, member_id, code, fine in results or []:
+                    if code == 'OK':
+                        desk["total_fines"] += fine
+                    desk["returns"].append({
+                        "Barcode": barcode,
+                        "ISBN": isbn,
+                        "Member ID": member_id,
+                        "Result": DESK_RESULTS.get(code, code),
+                        "Fine": fine
+                    })
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Books Returned", sum(1 for r in desk["returns"] if r["Result"] == "Returned"))
+        with col2:
+            st.metric("Fines This Session", f"₹{desk['total_fines']}")
+        if desk["returns"]:
+            st.dataframe(
+                desk["returns"][::-1],
+                column_config={
+                    "Fine": st.column_config.NumberColumn("Fine", format="₹%d")
+                }
+            )
+        if st.button("Start New Session"):
+            del st.session_state['returns_desk']
+            st.rerun()
             
     elif menu == "Register Member":
         st.header("Register New Member")
@@ -458,96 +929,271 @@ def admin_portal():
                 else:
                     register_new_member(username, password, first_name, last_name, email)
                     
+    elif menu == "Enrol Members":
+        st.header("Batch Enrolment")
+        st.caption("CSV with Username, Password, First_Name, Last_Name and Email columns, "
+                   "a JSON array of the same, or JSON Lines")
+        uploaded_file = st.file_uploader("Roster file", type=["csv", "json", "jsonl"])
+        if uploaded_file and st.button("Enrol"):
+            status = st.empty()
+            report = enrol_members_upload(uploaded_file,
+                                          progress=lambda done: status.text(f"{done} rows processed"))
+            if report:
+                status.empty()
+                st.success(f"Enrolled {report['inserted']} of {report['read']} candidates "
+                           f"({report['rows_per_second']:.0f} rows/s)")
+                if report['rejected']:
+                    st.warning(f"{len(report['rejected'])} rows rejected")
+                st.dataframe([
+                    {"Line": line_no, "Username": username, "Status": row_status, "Detail": detail}
+                    for line_no, username, row_status, detail in member_statuses(report)
+                ])
+                    
     elif menu == "View Members":
         st.header("Member List")
-        members = fetch_all_members()
-        if members:
-            # Convert the data to a format suitable for display
-            member_data = []
-            for member in members:
-                member_data.append({
-                    "Member ID": member['Member_ID'],
-                    "Username": member['Username'],
-                    "Name": f"{member['First_Name']} {member['Last_Name']}",
-                    "Email": member['Email'],
-                    "Status": member['Status'],
-                    "Joined": member['Created_At'].strftime("%Y-%m-%d")
-                })
+        page = paged("members_page", fetch_members_page, columnar=True)
+        members = page["rows"]
+        if len(members):
+            # Whole-column operations; no Python loop over the rows
+            member_data = pd.DataFrame({
+                "Member ID": members["Member_ID"],
+                "Username": members["Username"],
+                "Name": members["First_Name"] + " " + members["Last_Name"],
+                "Email": members["Email"],
+                "Status": members["Status"],
+                "Joined": pd.to_datetime(members["Created_At"])
+            })
             st.dataframe(
                 member_data,
+                hide_index=True,
                 column_config={
                     "Member ID": st.column_config.NumberColumn("Member ID"),
                     "Status": st.column_config.SelectboxColumn(
                         "Status",
                         options=["Active", "Suspended", "Expired"]
-                    )
+                    ),
+                    "Joined": st.column_config.DateColumn("Joined", format="YYYY-MM-DD")
                 }
             )
+            page_controls("members_page", page)
         else:
             st.info("No members found")
             
     elif menu == "View Member Transactions":
         st.header("Member Transactions")
         
-        # Fetch all members for the dropdown
-        members = fetch_all_members()
+        search = st.text_input("Find member", placeholder="Username, name or member ID")
+        members = cached_member_lookup(search) if search.strip() else []
         if members:
             selected_member = st.selectbox(
                 "Select Member",
                 options=members,
-                format_func=lambda x: f"{x['First_Name']} {x['Last_Name']} (ID: {x['Member_ID']})"
+                format_func=lambda x: f"{x['First_Name']} {x['Last_Name']} ({x['Username']}, ID: {x['Member_ID']})"
             )
+            if len(members) == MEMBER_LOOKUP_LIMIT:
+                st.caption(f"Showing the first {MEMBER_LOOKUP_LIMIT} matches; type more to narrow the search")
             
             if selected_member:
                 st.subheader(f"Transactions for {selected_member['First_Name']} {selected_member['Last_Name']}")
-                transactions = fetch_member_transactions(selected_member['Member_ID'])
+                page_key = f"member_transactions_page_{selected_member['Member_ID']}"
+                page = paged(page_key, fetch_member_transactions_page, selected_member['Member_ID'], columnar=True)
+                transactions = page["rows"]
                 
-                if transactions:
-                    # Convert dates to string format for better display
-                    for transaction in transactions:
-                        transaction['Transaction_Date'] = transaction['Transaction_Date'].strftime("%Y-%m-%d")
-                        transaction['Due_Date'] = transaction['Due_Date'].strftime("%Y-%m-%d")
-                        if transaction['Return_Date']:
-                            transaction['Return_Date'] = transaction['Return_Date'].strftime("%Y-%m-%d")
+                if len(transactions):
+                    st.dataframe(transactions_frame(transactions), hide_index=True,
+                                 column_config=TRANSACTION_COLUMNS)
+                    page_controls(page_key, page)
                     
-                    # Create a formatted dataframe
-                    st.dataframe(
-                        transactions,
-                        column_config={
-                            "Transaction_ID": st.column_config.NumberColumn("Transaction ID"),
-                            "Title": "Book Title",
-                            "Transaction_Type": "Type",
-                            "Transaction_Date": "Issue Date",
-                            "Due_Date": "Due Date",
-                            "Return_Date": "Return Date",
-                            "Fine_Amount": st.column_config.NumberColumn(
-                                "Fine Amount",
-                                format="₹%d"
-                            ),
-                            "Status": st.column_config.SelectboxColumn(
-                                "Status",
-                                options=["Active", "Completed"]
-                            )
-                        }
-                    )
-                    
-                    # Add some statistics
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        active_books = sum(1 for t in transactions if t['Status'] == 'Active')
-                        st.metric("Active Borrows", active_books)
-                    with col2:
-                        total_fines = sum(t['Fine_Amount'] for t in transactions)
-                        st.metric("Total Fines", f"₹{total_fines}")
-                    with col3:
-                        overdue_books = sum(1 for t in transactions 
-                                         if t['Status'] == 'Active' and 
-                                         datetime.strptime(t['Due_Date'], "%Y-%m-%d").date() < datetime.now().date())
-                        st.metric("Overdue Books", overdue_books)
+                    # Statistics cover the whole history, not just the page on screen
+                    stats = fetch_member_transaction_stats(selected_member['Member_ID'])
+                    if stats:
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            st.metric("Active Borrows", stats['Active_Borrows'])
+                        with col2:
+                            st.metric("Total Fines", f"₹{stats['Total_Fines']}")
+                        with col3:
+                            st.metric("Overdue Books", stats['Overdue_Books'])
                 else:
                     st.info("No transactions found for this member")
+        elif search.strip():
+            st.info("No members match that search")
+        else:
+            st.info("Type a username, name or member ID to find a member")
+    
+    elif menu == "Analytics":
+        st.header("Circulation Analytics")
+        
+        daily = fetch_analytics("daily_circulation", (ANALYTICS_DAYS,))
+        st.subheader(f"Last {ANALYTICS_DAYS} Days")
+        if daily is not None and len(daily):
+            daily = daily.astype({"Borrows": "int64", "Returns": "int64", "Fines_Collected": "float64"})
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Borrows", int(daily["Borrows"].sum()))
+            with col2:
+                st.metric("Returns", int(daily["Returns"].sum()))
+            with col3:
+                st.metric("Fines Collected", f"₹{daily['Fines_Collected'].sum():.0f}")
+            st.line_chart(daily.set_index("Circulation_Date")[["Borrows", "Returns"]])
+        else:
+            st.info("No circulation in this period")
+        
+        categories = fetch_analytics("category_circulation")
+        st.subheader("By Category")
+        if categories is not None and len(categories):
+            st.dataframe(categories, hide_index=True, column_config={
+                "Category_Name": "Category",
+                "Books_Borrowed": "Titles Borrowed",
+                "Unique_Borrowers": "Borrowers",
+                "Open_Loans": "On Loan",
+                "Fines_Total": st.column_config.NumberColumn("Fines", format="₹%.0f"),
+                "Average_Fine": st.column_config.NumberColumn("Average Fine", format="₹%.2f")
+            })
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Most Borrowed")
+            books = fetch_analytics("most_borrowed_books", (ANALYTICS_ROWS,))
+            if books is not None and len(books):
+                st.dataframe(books[["Title", "Times_Borrowed", "Currently_Borrowed"]], hide_index=True)
+        with col2:
+            never_count = fetch_never_borrowed_count()
+            st.subheader(f"Never Borrowed ({never_count if never_count is not None else '?'})")
+            books = fetch_analytics("never_borrowed_books", (ANALYTICS_ROWS,))
+            if books is not None and len(books):
+                st.dataframe(books[["Title", "Author_Name", "Category_Name"]], hide_index=True)
+        
+        st.subheader("Members with Overdue Books")
+        overdue = fetch_analytics("members_with_overdue_books", (ANALYTICS_ROWS,))
+        if overdue is not None and len(overdue):
+            st.dataframe(overdue, hide_index=True, column_config={
+                "Outstanding_Fines": st.column_config.NumberColumn("Outstanding Fines", format="₹%.0f")
+            })
         else:
-            st.info("No members found in the system")
+            st.info("No overdue books")
+        st.caption("Counters are maintained by triggers; run `python analytics.py --rebuild` after bulk changes")
+    
+    elif menu == "Jobs":
+        st.header("Background Jobs")
+        st.caption("Jobs run on executor threads, not in this page; refresh to see their progress")
+        admin_id = st.session_state['user_data']['Admin_ID']
+        
+        with st.form("submit_job_form"):
+            job_name = st.selectbox("Job", list(JOB_LABELS), format_func=JOB_LABELS.get)
+            isbn_text = st.text_area("ISBNs to delete (Delete books only)",
+                                     help="One per line or separated by commas")
+            if st.form_submit_button("Queue Job"):
+                params = {}
+                if job_name == "delete_books":
+                    isbns, rejected = parse_isbns(isbn_text)
+                    if rejected:
+                        st.warning(f"Ignoring {len(rejected)} invalid ISBNs: {', '.join(rejected[:10])}")
+                    params = {"isbns": isbns, "admin_id": admin_id}
+                if job_name != "delete_books" or params["isbns"]:
+                    submit_job(admin_id, job_name, params)
+                else:
+                    st.error("Enter at least one valid ISBN")
+        
+        recent = fetch_recent_jobs()
+        st.subheader("Recent Jobs")
+        if st.button("Refresh"):
+            st.rerun()
+        if recent:
+            st.dataframe([
+                {
+                    "Job": job['Job_ID'],
+                    "Type": JOB_LABELS.get(job['Job_Type'], job['Job_Type']),
+                    "Status": "Cancelling" if job['Status'] == 'Running' and job['Cancel_Requested']
+                              else job['Status'],
+                    "Progress": (job['Progress_Done'] / job['Progress_Total']
+                                 if job['Progress_Total'] else None),
+                    "Done": f"{job['Progress_Done']} / {job['Progress_Total'] if job['Progress_Total'] is not None else '?'}",
+                    "Message": job['Message'],
+                    "Queued": job['Created_At'],
+                    "Finished": job['Finished_At'],
+                    "Worker": job['Worker']
+                }
+                for job in recent
+            ], hide_index=True, column_config={
+                "Progress": st.column_config.ProgressColumn("Progress", min_value=0.0, max_value=1.0)
+            })
+            
+            open_jobs = [job['Job_ID'] for job in recent if job['Status'] in ('Queued', 'Running')]
+            if open_jobs:
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    job_to_cancel = st.selectbox("Job to cancel", open_jobs)
+                with col2:
+                    if st.button("Cancel Job"):
+                        cancel_job(job_to_cancel)
+        else:
+            st.info("No jobs yet")
+        st.caption(f"Executor: {jobs.job_executor.stats()}")
+    
+    elif menu == "Diagnostics":
+        st.header("Diagnostics")
+        st.caption("Timings since this server process started")
+        
+        query_stats = metrics.query_summary()
+        st.subheader("Hottest Queries")
+        if query_stats:
+            hottest = sorted(query_stats.items(), key=lambda item: item[1]['total_ms'], reverse=True)
+            st.dataframe([
+                {
+                    "Query": name,
+                    "Calls": stats['count'],
+                    "Total ms": round(stats['total_ms'], 1),
+                    "Avg ms": round(stats['avg_ms'], 2),
+                    "p95 ms": round(stats['p95_ms'], 2),
+                    "Max ms": round(stats['max_ms'], 2),
+                    "Rows": stats['rows'],
+                    "Errors": stats['errors']
+                }
+                for name, stats in hottest
+            ])
+        else:
+            st.info("No queries recorded yet")
+        
+        render_stats = metrics.render_summary()
+        st.subheader("Page Renders")
+        if render_stats:
+            st.dataframe([
+                {
+                    "Portal": portal,
+                    "Page": page_name,
+                    "Renders": stats['count'],
+                    "Avg ms": round(stats['avg_ms'], 1),
+                    "p95 ms": round(stats['p95_ms'], 1),
+                    "Max ms": round(stats['max_ms'], 1)
+                }
+                for (portal, page_name), stats in sorted(render_stats.items())
+            ])
+        
+        st.subheader("Slow Log")
+        st.caption(
+            f"Queries over {METRICS_CONFIG['slow_query_ms']} ms and renders over "
+            f"{METRICS_CONFIG['slow_render_ms']} ms, also written to {METRICS_CONFIG['slow_log_path']}"
+        )
+        slow = metrics.recent_slow()
+        if slow:
+            st.dataframe(slow)
+        else:
+            st.info("Nothing slow so far")
+        
+        st.subheader("Connection Pool and Cache")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.json(pool_metrics())
+        with col2:
+            st.json(catalog_cache.stats())
+        st.subheader("Read Routing")
+        st.json(routing_metrics())
+        
+        port = start_exporter()
+        if port:
+            st.caption(f"Prometheus endpoint: http://{METRICS_CONFIG['exporter_host']}:{port}/metrics")
+        st.download_button("Download metrics", prometheus_text(), file_name="lib_mgmt_metrics.prom")
             
 def member_portal():
     st.title("Exam Centre Member Portal")
@@ -555,7 +1201,7 @@ def member_portal():
     
     menu = st.sidebar.selectbox(
         "Menu",
-        ["View Books", "Borrow Book", "Return Book", "My Transactions"]
+        ["View Books", "Borrow Book", "Return Book", "My Holds", "My Transactions"]
     )
     
     if st.sidebar.button("Logout"):
@@ -563,34 +1209,66 @@ def member_portal():
             del st.session_state[key]
         st.rerun()
     
+    with render_timer("member", menu):
+        member_page(menu)
+
+def member_page(menu):
     if menu == "View Books":
         st.header("Available Books")
         search = st.text_input("Search books by title or author")
-        books = fetch_books(search)
-        if books:
-            st.dataframe(books)
+        if search:
+            books = fetch_books(search)
+            if books:
+                st.dataframe(books)
+            else:
+                st.info("No books found")
         else:
-            st.info("No books found")
+            page = paged("member_books_page", fetch_books_page)
+            if page["rows"]:
+                st.dataframe(page["rows"])
+                page_controls("member_books_page", page)
+            else:
+                st.info("No books found")
     
     elif menu == "Borrow Book":
         st.header("Borrow a Book")
-        available_books = [b for b in fetch_books() if b['Availability'] == 'In stock']
+        member_id = st.session_state['user_data']['Member_ID']
+        ready = [h for h in fetch_member_holds(member_id) if h['Status'] == 'Ready']
+        if ready:
+            st.subheader("Ready for pickup")
+            for hold in ready:
+                st.write(f"{hold['Title']} ({hold['ISBN']}), held until {hold['Expires_At']:%Y-%m-%d %H:%M}")
+            if st.button("Collect Held Books"):
+                borrow_book(member_id, [hold['ISBN'] for hold in ready])
+        
+        books = book_choices("borrow_books_page")
+        available_books = [b for b in books if b['Available_Copies'] > 0]
         if available_books:
-            book_to_borrow = st.selectbox(
-                "Select book to borrow",
+            cart = st.multiselect(
+                "Select books to borrow",
                 options=available_books,
-                format_func=lambda x: f"{x['Title']} ({x['ISBN']})"
+                format_func=lambda x: f"{x['Title']} ({x['ISBN']}, {x['Available_Copies']} of {x['Total_Copies']} available)"
             )
-            if st.button("Borrow Selected Book"):
-                borrow_book(st.session_state['user_data']['Member_ID'], 
-                          book_to_borrow['ISBN'])
+            if st.button("Borrow Selected Books", disabled=not cart):
+                borrow_book(member_id, [book['ISBN'] for book in cart])
         else:
             st.info("No books available for borrowing")
+        
+        # Titles with every copy out take a place in the queue instead of a retry
+        checked_out = [b for b in books if b['Available_Copies'] == 0]
+        if checked_out:
+            st.subheader("Place a hold")
+            wanted = st.selectbox(
+                "All copies are out",
+                options=checked_out,
+                format_func=lambda x: f"{x['Title']} ({x['ISBN']})"
+            )
+            if st.button("Place Hold"):
+                place_hold(member_id, wanted['ISBN'])
     
     elif menu == "Return Book":
         st.header("Return a Book")
-        transactions = fetch_member_transactions(st.session_state['user_data']['Member_ID'])
-        active_transactions = [t for t in transactions if t['Status'] == 'Active']
+        active_transactions = fetch_open_loans(st.session_state['user_data']['Member_ID'])
         
         if active_transactions:
            transaction_to_return = st.selectbox(
@@ -604,15 +1282,35 @@ def member_portal():
         else:
             st.info("No books to return")
     
+    elif menu == "My Holds":
+        st.header("My Holds")
+        holds = fetch_member_holds(st.session_state['user_data']['Member_ID'])
+        if holds:
+            st.dataframe(holds, hide_index=True)
+            hold_to_cancel = st.selectbox(
+                "Select hold to cancel",
+                options=holds,
+                format_func=lambda x: f"{x['Title']} ({x['Status']})"
+            )
+            if st.button("Cancel Hold"):
+                cancel_hold(st.session_state['user_data']['Member_ID'], hold_to_cancel['ISBN'])
+        else:
+            st.info("You have no holds")
+    
     elif menu == "My Transactions":
         st.header("My Transaction History")
-        transactions = fetch_member_transactions(st.session_state['user_data']['Member_ID'])
-        if transactions:
-            st.dataframe(transactions)
+        page = paged("my_transactions_page", fetch_member_transactions_page,
+                     st.session_state['user_data']['Member_ID'], columnar=True)
+        if len(page["rows"]):
+            st.dataframe(transactions_frame(page["rows"]), hide_index=True,
+                         column_config=TRANSACTION_COLUMNS)
+            page_controls("my_transactions_page", page)
         else:
             st.info("No transaction history found")
 
 def main():
+    start_exporter()
+    jobs.job_executor.start()
     if 'logged_in' not in st.session_state:
         st.session_state['logged_in'] = False
     
@@ -0,0 +1,86 @@
+"""Move old completed transactions out of MemberTransactions.
+
+Usage:
+    python archive.py [--older-than-days 365] [--batch-size 5000]
+
+Completed transactions returned more than --older-than-days ago are moved
+to MemberTransactionsArchive in short batches. The live table then keeps
+only open loans and recent history, which is all the borrow and return
+paths look at. Member history pages and TransactionDetailsView read both
+tables. Before moving rows, the yearly archive partitions are extended
+up to next year, so p_future never has to be split while it holds data.
+Run it nightly from cron.
+"""
+import argparse
+from datetime import date
+
+import mysql.connector
+
+from db import get_connection
+
+OLDER_THAN_DAYS = 365
+BATCH_SIZE = 5000
+ARCHIVE_TABLE = "MemberTransactionsArchive"
+
+
+def partition_years(cursor):
+    """Years that already have their own archive partition"""
+    cursor.execute("""
+        SELECT PARTITION_NAME FROM INFORMATION_SCHEMA.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (ARCHIVE_TABLE,))
+    return {int(name[1:]) for (name,) in cursor.fetchall() if name and name[1:].isdigit()}
+
+
+def ensure_partitions(conn, through_year):
+    """Split p_future so every year up to through_year has its own partition"""
+    cursor = conn.cursor()
+    try:
+        existing = partition_years(cursor)
+        start = max(existing) + 1 if existing else date.today().year
+        added = list(range(start, through_year + 1))
+        if added:
+            partitions = ", ".join(f"PARTITION p{year} VALUES LESS THAN ({year + 1})" for year in added)
+            cursor.execute(f"""
+                ALTER TABLE {ARCHIVE_TABLE} REORGANIZE PARTITION p_future INTO (
+                    {partitions}, PARTITION p_future VALUES LESS THAN MAXVALUE
+                )
+            """)
+        return added
+    finally:
+        cursor.close()
+
+
+def archive_transactions(conn, older_than_days=OLDER_THAN_DAYS, batch_size=BATCH_SIZE):
+    """Call ArchiveMemberTransactions and return its (Run_ID, Cutoff_Date, Rows_Moved) row"""
+    cursor = conn.cursor()
+    try:
+        cursor.callproc('ArchiveMemberTransactions', (older_than_days, batch_size))
+        for result in cursor.stored_results():
+            return result.fetchone()
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old completed member transactions")
+    parser.add_argument("--older-than-days", type=int, default=OLDER_THAN_DAYS,
+                        help="archive transactions returned more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        added = ensure_partitions(conn, date.today().year + 1)
+        if added:
+            print(f"Added archive partitions for {', '.join(map(str, added))}")
+        run_id, cutoff, moved = archive_transactions(conn, args.older_than_days, args.batch_size)
+        print(f"Run {run_id}: archived {moved} transactions returned before {cutoff}")
+    except mysql.connector.Error as error:
+        print(f"Error archiving transactions: {error}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
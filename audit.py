@@ -0,0 +1,194 @@
+"""Audit log maintenance and book history for BookStatusLog and AdminTransactions.
+
+Usage:
+    python audit.py maintain [--retention-months 13]
+    python audit.py history 9780133514223 [--from 2026-01-01] [--to 2026-06-30]
+
+Both tables are partitioned by month. maintain (run it daily from cron)
+adds partitions for the coming months, then takes every partition that
+ends before the retention cutoff, folds its rows into per-book daily
+totals in BookAuditDaily and drops it. Dropping a partition is instant,
+so retention never runs long DELETEs against the live log. Book history
+reads the detailed rows where they are still kept and the daily totals
+for older days.
+"""
+import argparse
+from datetime import date, timedelta
+
+import mysql.connector
+
+from db import get_connection
+import queries
+
+AUDIT_CONFIG = {
+    "retention_months": 13,   # months of detailed rows kept before compaction
+    "months_ahead": 3         # empty monthly partitions kept ahead of the calendar
+}
+
+# Table -> (date column, statement folding one partition into BookAuditDaily)
+AUDIT_TABLES = {
+    "BookStatusLog": ("Changed_At", """
+        INSERT INTO BookAuditDaily (ISBN, Audit_Date, Status_Changes, Checked_Out, Returned)
+        SELECT * FROM (
+            SELECT ISBN, DATE(Changed_At) AS Day, COUNT(*) AS Changes,
+                   SUM(New_Status = 'Checked out') AS Outs, SUM(New_Status = 'In stock') AS Ins
+            FROM BookStatusLog PARTITION ({partition})
+            GROUP BY ISBN, DATE(Changed_At)
+        ) t
+        ON DUPLICATE KEY UPDATE Status_Changes = Status_Changes + t.Changes,
+                                Checked_Out = Checked_Out + t.Outs,
+                                Returned = Returned + t.Ins
+    """),
+    "AdminTransactions": ("Transaction_Date", """
+        INSERT INTO BookAuditDaily (ISBN, Audit_Date, Admin_Checkouts, Admin_Returns)
+        SELECT * FROM (
+            SELECT ISBN, DATE(Transaction_Date) AS Day,
+                   SUM(Transaction_Type = 'Check out') AS Outs, SUM(Transaction_Type = 'Return') AS Ins
+            FROM AdminTransactions PARTITION ({partition})
+            GROUP BY ISBN, DATE(Transaction_Date)
+        ) t
+        ON DUPLICATE KEY UPDATE Admin_Checkouts = Admin_Checkouts + t.Outs,
+                                Admin_Returns = Admin_Returns + t.Ins
+    """),
+}
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partitions(cursor, table):
+    """(name, upper bound) for each partition in order; the bound is None for MAXVALUE"""
+    cursor.execute("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM INFORMATION_SCHEMA.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (table,))
+    result = []
+    for name, description in cursor.fetchall():
+        bound = None if description == "MAXVALUE" else date.fromisoformat(description.strip("'")[:10])
+        result.append((name, bound))
+    return result
+
+
+def ensure_partitions(conn, table, through):
+    """Split p_future so every month before through has its own partition"""
+    cursor = conn.cursor()
+    try:
+        bounds = [bound for _, bound in partitions(cursor, table) if bound]
+        start = max(bounds) if bounds else date.today().replace(day=1)
+        months = []
+        while start < through:
+            months.append(start)
+            start = add_months(start, 1)
+        if months:
+            definitions = ", ".join(
+                f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{add_months(month, 1)}')" for month in months
+            )
+            cursor.execute(f"""
+                ALTER TABLE {table} REORGANIZE PARTITION p_future INTO (
+                    {definitions}, PARTITION p_future VALUES LESS THAN (MAXVALUE)
+                )
+            """)
+        return months
+    finally:
+        cursor.close()
+
+
+def compact(conn, table, cutoff):
+    """Fold every partition ending on or before cutoff into BookAuditDaily and drop it"""
+    _, fold_sql = AUDIT_TABLES[table]
+    cursor = conn.cursor()
+    dropped = []
+    try:
+        expired = [name for name, bound in partitions(cursor, table) if bound and bound <= cutoff]
+        for name in expired:
+            cursor.execute("SELECT 1 FROM AuditCompactions WHERE Table_Name = %s AND Partition_Name = %s",
+                           (table, name))
+            if cursor.fetchone() is None:
+                # The totals and the bookkeeping row commit together, before the drop
+                cursor.execute(fold_sql.format(partition=name))
+                cursor.execute(f"SELECT COUNT(*) FROM {table} PARTITION ({name})")
+                rows = cursor.fetchone()[0]
+                cursor.execute("""
+                    INSERT INTO AuditCompactions (Table_Name, Partition_Name, Rows_Compacted)
+                    VALUES (%s, %s, %s)
+                """, (table, name, rows))
+                conn.commit()
+            cursor.execute(f"ALTER TABLE {table} DROP PARTITION {name}")
+            dropped.append(name)
+        return dropped
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def maintain(conn, retention_months=None):
+    """Add upcoming partitions and compact expired ones; returns {table: (added, dropped)}"""
+    retention_months = retention_months or AUDIT_CONFIG["retention_months"]
+    this_month = date.today().replace(day=1)
+    through = add_months(this_month, AUDIT_CONFIG["months_ahead"] + 1)
+    cutoff = add_months(this_month, -retention_months)
+    return {
+        table: (ensure_partitions(conn, table, through), compact(conn, table, cutoff))
+        for table in AUDIT_TABLES
+    }
+
+
+def book_history(conn, isbn, start, end):
+    """Audit history for isbn from start to end inclusive (dates).
+
+    Returns {"events": [...], "daily": [...]}: the detailed status changes and
+    admin transactions still kept, oldest first, and the daily totals for the
+    days that have been compacted.
+    """
+    until = end + timedelta(days=1)
+    events = [
+        {"At": row["Changed_At"], "Event": f"{row['Old_Status']} -> {row['New_Status']}", "By": row["Changed_By"]}
+        for row in queries.fetch_all(conn, "book_status_log", (isbn, start, until), dictionary=True)
+    ]
+    events += [
+        {"At": row["Transaction_Date"], "Event": f"Admin {row['Transaction_Type'].lower()}",
+         "By": f"admin {row['Admin_ID']}"}
+        for row in queries.fetch_all(conn, "book_admin_transactions", (isbn, start, until), dictionary=True)
+    ]
+    events.sort(key=lambda event: event["At"])
+    daily = queries.fetch_all(conn, "book_audit_daily", (isbn, start, until), dictionary=True)
+    return {"events": events, "daily": daily}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit log maintenance and book history")
+    commands = parser.add_subparsers(dest="command", required=True)
+    maintain_parser = commands.add_parser("maintain", help="add partitions and compact expired months")
+    maintain_parser.add_argument("--retention-months", type=int, default=AUDIT_CONFIG["retention_months"])
+    history_parser = commands.add_parser("history", help="print the audit history of one book")
+    history_parser.add_argument("isbn")
+    history_parser.add_argument("--from", dest="start", type=date.fromisoformat,
+                                default=date.today() - timedelta(days=365))
+    history_parser.add_argument("--to", dest="end", type=date.fromisoformat, default=date.today())
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        if args.command == "maintain":
+            for table, (added, dropped) in maintain(conn, args.retention_months).items():
+                print(f"{table}: {len(added)} partitions added, compacted {', '.join(dropped) or 'nothing'}")
+        else:
+            history = book_history(conn, args.isbn, args.start, args.end)
+            for day in history["daily"]:
+                print(f"{day['Audit_Date']}  {day['Status_Changes']} status changes, "
+                      f"{day['Admin_Checkouts']} admin checkouts, {day['Admin_Returns']} admin returns (compacted)")
+            for event in history["events"]:
+                print(f"{event['At']:%Y-%m-%d %H:%M:%S}  {event['Event']}  ({event['By']})")
+    except mysql.connector.Error as error:
+        print(f"Error reading audit log: {error}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
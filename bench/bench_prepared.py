@@ -0,0 +1,107 @@
+"""Time each named query as plain text and as a cached prepared statement.
+
+Every statement in queries.QUERIES that only reads is run --repeat times
+through a plain cursor (parsed by the server on every call) and --repeat
+times through queries.fetch_all on a pooled connection (prepared once,
+then parameters only). Parameters are sampled from the configured lib_mgmt
+database.
+
+Run from the repository root:
+
+    python -m bench.bench_prepared --repeat 2000
+"""
+import argparse
+import json
+import statistics
+import time
+
+import queries
+from appnew import SEARCH_RESULT_LIMIT, build_fulltext_query
+from db import get_connection
+
+
+def sample_params(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT ISBN, Title FROM Books ORDER BY ISBN LIMIT 1")
+    isbn, title = cursor.fetchone()
+    cursor.execute("SELECT Member_ID, Username, Email FROM Members ORDER BY Member_ID LIMIT 1")
+    member_id, username, email = cursor.fetchone()
+    cursor.execute("SELECT Author_Name FROM Authors LIMIT 1")
+    author = cursor.fetchone()[0]
+    cursor.execute("SELECT Category_Name FROM Categories LIMIT 1")
+    category = cursor.fetchone()[0]
+    cursor.close()
+
+    fulltext = build_fulltext_query(title) or "+book*"
+    pattern = f"%{title.split()[0]}%"
+    return {
+        "admin_login": ("admin", "x"),
+        "member_login": (username, "x"),
+        "books_fulltext_search": (fulltext, fulltext, SEARCH_RESULT_LIMIT),
+        "books_like_search": (pattern, pattern, pattern, SEARCH_RESULT_LIMIT),
+        "author_id_by_name": (author,),
+        "category_id_by_name": (category,),
+        "book_loan_check": (isbn,),
+        "username_taken": (username,),
+        "email_taken": (email,),
+        "member_loan_check": (member_id,),
+        "member_open_transactions": (member_id,),
+        "member_transaction_stats": (member_id,),
+    }
+
+
+def time_text(conn, sql, params, repeat):
+    cursor = conn.cursor()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings.append(time.perf_counter() - started)
+    cursor.close()
+    return statistics.median(timings) * 1e6
+
+
+def time_prepared(conn, name, params, repeat):
+    queries.fetch_all(conn, name, params)  # prepare outside the timed loop
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        queries.fetch_all(conn, name, params)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    results = []
+    try:
+        params_by_name = sample_params(conn)
+        print(f"{'Query':<28} {'text us':>9} {'prepared us':>12} {'saved':>7}")
+        for name, params in params_by_name.items():
+            text_us = time_text(conn, queries.QUERIES[name], params, args.repeat)
+            prepared_us = time_prepared(conn, name, params, args.repeat)
+            saved = (text_us - prepared_us) / text_us if text_us else 0.0
+            print(f"{name:<28} {text_us:>9.1f} {prepared_us:>12.1f} {saved:>6.0%}")
+            results.append({
+                "query": name,
+                "text_us": round(text_us, 2),
+                "prepared_us": round(prepared_us, 2),
+                "saved": round(saved, 4)
+            })
+        conn.rollback()
+    finally:
+        conn.close()
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
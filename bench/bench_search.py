@@ -0,0 +1,166 @@
+"""Compare the old leading-wildcard LIKE search with the FULLTEXT search path.
+
+Synthetic books (ISBNs starting with 99) are added to the configured lib_mgmt
+database in steps, both queries are timed at every step, and the synthetic
+rows are removed again unless --keep is given. Both queries return at most
+SEARCH_RESULT_LIMIT rows, like the app's FULLTEXT search and its LIKE
+fallback, so the timings compare index use rather than result size.
+
+Run from the repository root:
+
+    python -m bench.bench_search --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from appnew import SEARCH_RESULT_LIMIT, build_fulltext_query
+from db import get_connection
+
+ISBN_PREFIX = "99"
+AUTHOR_PREFIX = "Bench Author"
+BATCH_SIZE = 5000
+
+WORDS = [
+    "algebra", "analysis", "applied", "calculus", "chemistry", "circuits", "classical",
+    "computing", "concepts", "database", "design", "discrete", "dynamics", "electric",
+    "elements", "engineering", "essentials", "fluid", "foundations", "fundamentals",
+    "geometry", "graphs", "handbook", "history", "inorganic", "introduction", "linear",
+    "logic", "machines", "mathematics", "mechanics", "methods", "modern", "networks",
+    "numbers", "numerical", "optics", "organic", "physics", "practical", "principles",
+    "probability", "programming", "quantum", "reactions", "relativity", "signals",
+    "software", "statistics", "structures", "systems", "theory", "thermal", "topology",
+    "vibration", "waves"
+]
+
+SEARCHES = ["calculus", "quantum mechanics", "prog", "Bench Author 0042", "fluid dynamics theory"]
+
+LIKE_QUERY = """
+    SELECT * FROM BookListView
+    WHERE Title LIKE %s
+    OR Author_Name LIKE %s
+    OR Category_Name LIKE %s
+    LIMIT %s
+"""
+
+FULLTEXT_QUERY = """
+    SELECT v.*
+    FROM Books b
+    JOIN BookListView v ON v.ISBN = b.ISBN
+    WHERE MATCH(b.Search_Text) AGAINST (%s IN BOOLEAN MODE)
+    ORDER BY MATCH(b.Search_Text) AGAINST (%s IN BOOLEAN MODE) DESC, v.Title
+    LIMIT %s
+"""
+
+
+def ensure_authors(cursor, count):
+    cursor.executemany(
+        "INSERT IGNORE INTO Authors (Author_Name) VALUES (%s)",
+        [(f"{AUTHOR_PREFIX} {n:04d}",) for n in range(count)]
+    )
+    cursor.execute("SELECT Author_ID FROM Authors WHERE Author_Name LIKE %s", (f"{AUTHOR_PREFIX} %",))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def synthetic_count(cursor):
+    cursor.execute("SELECT COUNT(*) FROM Books WHERE ISBN LIKE %s", (f"{ISBN_PREFIX}%",))
+    return cursor.fetchone()[0]
+
+
+def grow_catalog(conn, target, author_ids, category_ids, rng):
+    cursor = conn.cursor()
+    start = synthetic_count(cursor)
+    for first in range(start, target, BATCH_SIZE):
+        rows = []
+        for n in range(first, min(first + BATCH_SIZE, target)):
+            title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))).title()
+            rows.append((f"{ISBN_PREFIX}{n:011d}", title, rng.choice(author_ids), rng.choice(category_ids)))
+        cursor.executemany(
+            "INSERT INTO Books (ISBN, Title, Author_ID, Category_ID) VALUES (%s, %s, %s, %s)",
+            rows
+        )
+        conn.commit()
+    cursor.close()
+
+
+def time_query(conn, query, params, repeat):
+    cursor = conn.cursor(dictionary=True)
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(query, params)
+        rows = len(cursor.fetchall())
+        timings.append((time.perf_counter() - started) * 1000)
+    cursor.close()
+    return statistics.median(timings), rows
+
+
+def cleanup(conn):
+    cursor = conn.cursor()
+    while True:
+        cursor.execute("DELETE FROM Books WHERE ISBN LIKE %s LIMIT %s", (f"{ISBN_PREFIX}%", BATCH_SIZE))
+        conn.commit()
+        if cursor.rowcount < BATCH_SIZE:
+            break
+    cursor.execute("DELETE FROM Authors WHERE Author_Name LIKE %s", (f"{AUTHOR_PREFIX} %",))
+    conn.commit()
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--authors", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--keep", action="store_true", help="leave the synthetic books in place")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    conn = get_connection()
+    results = []
+    try:
+        cursor = conn.cursor()
+        author_ids = ensure_authors(cursor, args.authors)
+        cursor.execute("SELECT Category_ID FROM Categories")
+        category_ids = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+        cursor.close()
+
+        print(f"{'Books':>9} {'Search':<24} {'LIKE ms':>9} {'rows':>7} {'FULLTEXT ms':>12} {'rows':>5}")
+        for size in sorted(args.sizes):
+            grow_catalog(conn, size, author_ids, category_ids, rng)
+            for term in SEARCHES:
+                pattern = f"%{term}%"
+                like_ms, like_rows = time_query(
+                    conn, LIKE_QUERY, (pattern, pattern, pattern, SEARCH_RESULT_LIMIT), args.repeat
+                )
+                fulltext = build_fulltext_query(term)
+                ft_ms, ft_rows = time_query(
+                    conn, FULLTEXT_QUERY, (fulltext, fulltext, SEARCH_RESULT_LIMIT), args.repeat
+                )
+                print(f"{size:>9} {term:<24} {like_ms:>9.2f} {like_rows:>7} {ft_ms:>12.2f} {ft_rows:>5}")
+                results.append({
+                    "books": size,
+                    "search": term,
+                    "like_ms": round(like_ms, 3),
+                    "like_rows": like_rows,
+                    "fulltext_ms": round(ft_ms, 3),
+                    "fulltext_rows": ft_rows
+                })
+    finally:
+        if not args.keep:
+            cleanup(conn)
+        conn.close()
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""EXPLAIN every MemberTransactions hot query and fail if any of them full-scans.
+
+The statements mirror what borrow_book, BorrowBook's copy claim, the
+before_borrow_check trigger, ReturnBook (member and desk), DeleteBook,
+AccrueFines, fetch_open_loans and fetch_member_transactions_page run. With
+--seed N, N synthetic transactions are inserted first so the optimizer sees
+a realistic table; they are rolled back when the check finishes.
+
+Run from the repository root:
+
+    python -m bench.explain_check --seed 20000
+
+Exits with status 1 if any query regresses to a full table or index scan.
+tests/test_explain.py runs the same checks under pytest.
+"""
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+
+from db import get_connection
+from queries import MEMBER_TRANSACTIONS_SELECT
+
+# name, statement, parameter names, tables to check, expected index
+HOT_QUERIES = [
+    (
+        "borrow_book overdue probe (not yet accrued)",
+        """
+        SELECT COUNT(*) FROM MemberTransactions
+        WHERE Member_ID = %s AND Status = 'Active' AND Due_Date < CURDATE()
+        """,
+        ("member_id",), {"MemberTransactions"}, "idx_mt_member_status_due"
+    ),
+    (
+        "before_borrow_check",
+        """
+        SELECT COUNT(*) FROM MemberTransactions
+        WHERE Member_ID = %s AND Status IN ('Active', 'Overdue') AND Due_Date < CURDATE()
+        """,
+        ("member_id",), {"MemberTransactions"}, "idx_mt_member_status_due"
+    ),
+    (
+        "borrow_book already-borrowed check",
+        """
+        SELECT COUNT(*) FROM MemberTransactions
+        WHERE Member_ID = %s AND ISBN = %s AND Status IN ('Active', 'Overdue')
+        """,
+        ("member_id", "isbn"), {"MemberTransactions"}, "idx_mt_member_isbn_status"
+    ),
+    (
+        "BorrowBook free copy claim",
+        """
+        SELECT Copy_ID FROM Copies
+        WHERE ISBN = %s AND Status = 'Available'
+        ORDER BY Copy_ID
+        LIMIT 1
+        """,
+        ("isbn",), {"Copies"}, "idx_copies_isbn_status"
+    ),
+    (
+        "ReturnBook active transaction lookup",
+        """
+        SELECT Transaction_ID, Due_Date FROM MemberTransactions
+        WHERE Member_ID = %s AND ISBN = %s AND Status IN ('Active', 'Overdue')
+        LIMIT 1
+        """,
+        ("member_id", "isbn"), {"MemberTransactions"}, "idx_mt_member_isbn_status"
+    ),
+    (
+        "ReturnBook desk loan on a scanned copy",
+        """
+        SELECT Transaction_ID, Member_ID, Due_Date FROM MemberTransactions
+        WHERE Copy_ID = %s AND Status IN ('Active', 'Overdue')
+        ORDER BY Transaction_ID
+        LIMIT 1
+        """,
+        ("copy_id",), {"MemberTransactions"}, "idx_mt_copy_status"
+    ),
+    (
+        "DeleteBook active transaction check",
+        """
+        SELECT COUNT(*) FROM MemberTransactions
+        WHERE ISBN = %s AND Status IN ('Active', 'Overdue')
+        """,
+        ("isbn",), {"MemberTransactions"}, "idx_mt_isbn_status"
+    ),
+    (
+        "DeleteBook admin history check",
+        """
+        SELECT 1 FROM AdminTransactions WHERE ISBN = %s LIMIT 1
+        """,
+        ("isbn",), {"AdminTransactions"}, "idx_at_isbn_date"
+    ),
+    (
+        "AccrueFines batch",
+        """
+        SELECT Transaction_ID FROM MemberTransactions
+        WHERE Status IN ('Active', 'Overdue') AND Due_Date < %s
+        AND NOT (Status = 'Overdue' AND Fine_Amount = DATEDIFF(%s, Due_Date) * 10)
+        LIMIT 5000
+        """,
+        ("now", "now"), {"MemberTransactions"}, "idx_mt_status_due"
+    ),
+    (
+        "fetch_open_loans",
+        MEMBER_TRANSACTIONS_SELECT + """
+        WHERE mt.Member_ID = %s AND mt.Status IN (%s, %s)
+        ORDER BY mt.Transaction_Date DESC
+        """,
+        ("member_id", "active", "overdue"), {"mt"}, None
+    ),
+    (
+        "fetch_member_transactions_page",
+        MEMBER_TRANSACTIONS_SELECT + """
+        WHERE mt.Member_ID = %s AND (mt.Transaction_Date, mt.Transaction_ID) < (%s, %s)
+        ORDER BY mt.Transaction_Date DESC, mt.Transaction_ID DESC
+        LIMIT 26
+        """,
+        ("member_id", "now", "max_id"), {"mt"}, "idx_mt_member_date"
+    ),
+    (
+        "audit book_history (status log)",
+        """
+        SELECT Changed_At, Old_Status, New_Status, Changed_By
+        FROM BookStatusLog
+        WHERE ISBN = %s AND Changed_At >= %s AND Changed_At < %s
+        ORDER BY Changed_At, Log_ID
+        """,
+        ("isbn", "year_ago", "now"), {"BookStatusLog"}, "idx_bsl_isbn_changed"
+    ),
+    (
+        "lookup_members (last name prefix)",
+        """
+        SELECT Member_ID, Username, First_Name, Last_Name, Status
+        FROM Members WHERE Last_Name LIKE %s ORDER BY Last_Name LIMIT 20
+        """,
+        ("last_name_prefix",), {"Members"}, "idx_members_last"
+    ),
+    (
+        "lookup_members (full name)",
+        """
+        SELECT Member_ID, Username, First_Name, Last_Name, Status
+        FROM Members WHERE First_Name = %s AND Last_Name LIKE %s
+        ORDER BY Last_Name, Username LIMIT 20
+        """,
+        ("first_name", "last_name_prefix"), {"Members"}, "idx_members_first_last"
+    ),
+]
+
+FULL_SCAN_TYPES = {"ALL", "index"}
+
+
+def seed_transactions(conn, count, rng):
+    """Insert synthetic history inside the open transaction; the caller rolls it back"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT Member_ID FROM Members ORDER BY Member_ID LIMIT 50")
+    member_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT ISBN FROM Books ORDER BY ISBN LIMIT 200")
+    isbns = [row[0] for row in cursor.fetchall()]
+    if not member_ids or not isbns:
+        raise SystemExit("Seeding needs at least one member and one book")
+
+    today = date.today()
+    rows = []
+    for _ in range(count):
+        borrowed = today - timedelta(days=rng.randint(0, 720))
+        due = borrowed + timedelta(days=14)
+        if rng.random() < 0.1:
+            # A few loans still out, never past due so before_borrow_check stays quiet
+            rows.append((rng.choice(member_ids), rng.choice(isbns), borrowed,
+                         today + timedelta(days=rng.randint(1, 14)), None, 0, "Active"))
+        else:
+            returned = borrowed + timedelta(days=rng.randint(1, 30))
+            fine = max(0, (returned - due).days) * 10
+            rows.append((rng.choice(member_ids), rng.choice(isbns), borrowed, due, returned, fine, "Completed"))
+    cursor.executemany("""
+        INSERT INTO MemberTransactions
+        (Member_ID, ISBN, Transaction_Type, Transaction_Date, Due_Date, Return_Date, Fine_Amount, Status)
+        VALUES (%s, %s, 'Borrow', %s, %s, %s, %s, %s)
+    """, rows)
+    cursor.close()
+
+
+def sample_params(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT Member_ID, ISBN FROM MemberTransactions
+        GROUP BY Member_ID, ISBN
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+    """)
+    row = cursor.fetchone()
+    cursor.execute("SELECT COALESCE(MAX(Transaction_ID), 0) FROM MemberTransactions")
+    max_id = cursor.fetchone()[0]
+    cursor.execute("SELECT COALESCE(MIN(Copy_ID), 0) FROM Copies")
+    copy_id = cursor.fetchone()[0]
+    cursor.execute("SELECT First_Name, Last_Name FROM Members WHERE Member_ID = %s", (row[0] if row else None,))
+    name = cursor.fetchone() or ("", "")
+    cursor.close()
+    if row is None:
+        raise SystemExit("MemberTransactions is empty; run with --seed N")
+    return {"member_id": row[0], "isbn": row[1], "active": "Active", "overdue": "Overdue", "now": date.today(), "max_id": max_id, "copy_id": copy_id,
+            "year_ago": date.today() - timedelta(days=365),
+            "first_name": name[0], "last_name_prefix": name[1][:3] + "%"}
+
+
+def check_query(conn, name, statement, param_names, tables, expected_key, params):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("EXPLAIN " + statement, tuple(params[p] for p in param_names))
+    plan = cursor.fetchall()
+    cursor.close()
+
+    problems = []
+    chosen = []
+    for step in plan:
+        if step["table"] not in tables:
+            continue
+        chosen.append(step["key"])
+        if step["type"] in FULL_SCAN_TYPES or step["key"] is None:
+            problems.append(f"{step['table']} scanned with type={step['type']} key={step['key']}")
+        elif expected_key and step["key"] != expected_key:
+            problems.append(f"{step['table']} uses {step['key']}, expected {expected_key}")
+    if not chosen:
+        problems.append(f"no plan step found for {', '.join(sorted(tables))}")
+    return problems, chosen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0,
+                        help="insert this many synthetic transactions first (rolled back afterwards)")
+    parser.add_argument("--strict", action="store_true",
+                        help="also fail when a query uses an index other than the expected one")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    failures = 0
+    try:
+        if args.seed:
+            seed_transactions(conn, args.seed, random.Random(7))
+        params = sample_params(conn)
+        for name, statement, param_names, tables, expected_key in HOT_QUERIES:
+            problems, chosen = check_query(
+                conn, name, statement, param_names, tables,
+                expected_key if args.strict else None, params
+            )
+            if problems:
+                failures += 1
+                print(f"FAIL  {name}: {'; '.join(problems)}")
+            else:
+                print(f"ok    {name}: {', '.join(str(key) for key in chosen)}")
+    finally:
+        conn.rollback()
+        conn.close()
+
+    if failures:
+        print(f"\n{failures} hot quer{'y' if failures == 1 else 'ies'} failed the plan check")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
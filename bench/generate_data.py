@@ -0,0 +1,302 @@
+"""Fill the configured lib_mgmt database with production-sized synthetic data.
+
+Generated rows are marked so they can be told apart from real ones and
+removed again with --clean:
+
+* authors are named "Generated Author NNNNN";
+* books have ISBNs starting with 96;
+* members have usernames starting with gen_ and the password "generated".
+
+Transactions only touch generated books and members. Borrowing follows a
+skewed popularity curve, so a few titles and members are far busier than
+the rest. Most loans come back on time, some come back late with a fine,
+and a small share is still out; part of that share is past due. After
+loading, MemberBorrowingSummary is rebuilt for the generated members,
+AccrueFines marks the overdue loans and the circulation rollups are
+recomputed (also after --clean).
+
+Run from the repository root:
+
+    python -m bench.generate_data --books 1000000 --members 200000 --transactions 20000000
+    python -m bench.generate_data --clean
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import analytics
+from db import get_connection
+from utils import hash_password
+
+ISBN_PREFIX = "96"
+MEMBER_PREFIX = "gen_"
+AUTHOR_PREFIX = "Generated Author"
+PASSWORD = "generated"
+BATCH_SIZE = 10000
+LOAN_DAYS = 14
+FINE_PER_DAY = 10
+
+WORDS = [
+    "advanced", "algebra", "analysis", "applied", "calculus", "chemistry", "circuits", "classical",
+    "computing", "concepts", "control", "database", "design", "discrete", "dynamics", "electric",
+    "elements", "engineering", "essentials", "fluid", "foundations", "fundamentals", "geometry",
+    "graphs", "handbook", "heat", "history", "introduction", "linear", "logic", "machines",
+    "materials", "mathematics", "mechanics", "methods", "modern", "networks", "numerical", "optics",
+    "organic", "physics", "practical", "principles", "probability", "programming", "quantum",
+    "relativity", "signals", "software", "statistics", "structures", "systems", "theory",
+    "thermodynamics", "topology", "transfer", "vibration", "waves"
+]
+FIRST_NAMES = ["Aarav", "Diya", "Ishaan", "Kavya", "Rohan", "Sara", "Vikram", "Anaya", "Arjun", "Meera",
+               "Neha", "Rahul", "Priya", "Karan", "Zoya", "Aditya", "Tara", "Nikhil", "Riya", "Dev"]
+LAST_NAMES = ["Sharma", "Patel", "Iyer", "Reddy", "Gupta", "Nair", "Khan", "Das", "Joshi", "Mehta",
+              "Rao", "Singh", "Kulkarni", "Menon", "Bose", "Pillai", "Chopra", "Verma", "Shah", "Sen"]
+
+
+def skewed_index(rng, size, skew):
+    """Pick 0..size-1 with low indexes far more likely (skew 1 is uniform)"""
+    return int(size * rng.random() ** skew)
+
+
+def insert_batches(conn, sql, rows, progress_label):
+    cursor = conn.cursor()
+    batch = []
+    written = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            conn.commit()
+            written += len(batch)
+            batch = []
+            print(f"\r{progress_label}: {written}", end="", flush=True)
+    if batch:
+        cursor.executemany(sql, batch)
+        conn.commit()
+        written += len(batch)
+    print(f"\r{progress_label}: {written}")
+    cursor.close()
+    return written
+
+
+def generate_authors(conn, count):
+    insert_batches(
+        conn, "INSERT IGNORE INTO Authors (Author_Name) VALUES (%s)",
+        ((f"{AUTHOR_PREFIX} {n:05d}",) for n in range(count)), "authors"
+    )
+    cursor = conn.cursor()
+    cursor.execute("SELECT Author_ID FROM Authors WHERE Author_Name LIKE %s", (f"{AUTHOR_PREFIX} %",))
+    author_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT Category_ID FROM Categories")
+    category_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return author_ids, category_ids
+
+
+def generate_books(conn, count, author_ids, category_ids, rng):
+    def rows():
+        for n in range(count):
+            title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))).title()
+            yield (f"{ISBN_PREFIX}{n:011d}", title,
+                   author_ids[skewed_index(rng, len(author_ids), 2)], rng.choice(category_ids))
+
+    insert_batches(
+        conn, "INSERT IGNORE INTO Books (ISBN, Title, Author_ID, Category_ID) VALUES (%s, %s, %s, %s)",
+        rows(), "books"
+    )
+    return [f"{ISBN_PREFIX}{n:011d}" for n in range(count)]
+
+
+def generate_members(conn, count, days, rng):
+    password = hash_password(PASSWORD)
+    now = datetime.now()
+
+    def rows():
+        for n in range(count):
+            username = f"{MEMBER_PREFIX}{n:07d}"
+            status = "Active" if rng.random() < 0.95 else rng.choice(["Suspended", "Expired"])
+            created = now - timedelta(seconds=rng.randint(0, days * 86400))
+            yield (username, password, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+                   f"{username}@generated.invalid", status, created)
+
+    insert_batches(
+        conn,
+        "INSERT IGNORE INTO Members (Username, Password, First_Name, Last_Name, Email, Status, Created_At) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        rows(), "members"
+    )
+    cursor = conn.cursor()
+    cursor.execute("SELECT Member_ID FROM Members WHERE Username LIKE %s ORDER BY Member_ID",
+                   (f"{MEMBER_PREFIX}%",))
+    member_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return member_ids
+
+
+def generate_transactions(conn, count, member_ids, isbns, days, open_ratio, overdue_ratio, rng):
+    """Closed history first, then open loans, so before_borrow_check never sees an overdue loan early"""
+    today = date.today()
+    sql = (
+        "INSERT INTO MemberTransactions "
+        "(Member_ID, ISBN, Transaction_Type, Transaction_Date, Due_Date, Return_Date, Fine_Amount, Status) "
+        "VALUES (%s, %s, 'Borrow', %s, %s, %s, %s, %s)"
+    )
+    open_count = min(int(count * open_ratio), len(isbns), len(member_ids))
+    closed_count = count - open_count
+
+    def closed_rows():
+        for _ in range(closed_count):
+            borrowed = today - timedelta(days=rng.randint(LOAN_DAYS + 1, days))
+            due = borrowed + timedelta(days=LOAN_DAYS)
+            roll = rng.random()
+            if roll < 0.80:
+                returned = borrowed + timedelta(days=rng.randint(1, LOAN_DAYS))
+            elif roll < 0.95:
+                returned = due + timedelta(days=rng.randint(1, 30))
+            else:
+                returned = due + timedelta(days=rng.randint(31, 120))
+            returned = min(returned, today)
+            fine = max(0, (returned - due).days) * FINE_PER_DAY
+            yield (member_ids[skewed_index(rng, len(member_ids), 1.5)],
+                   isbns[skewed_index(rng, len(isbns), 3)],
+                   borrowed, due, returned, fine, "Completed")
+
+    insert_batches(conn, sql, closed_rows(), "closed transactions")
+
+    # One open loan per book and per member keeps the copy counters and the borrow rules consistent
+    open_isbns = rng.sample(isbns, open_count)
+    open_members = rng.sample(member_ids, open_count)
+
+    def open_rows():
+        for isbn, member_id in zip(open_isbns, open_members):
+            if rng.random() < overdue_ratio:
+                borrowed = today - timedelta(days=rng.randint(LOAN_DAYS + 1, LOAN_DAYS + 90))
+            else:
+                borrowed = today - timedelta(days=rng.randint(0, LOAN_DAYS - 1))
+            yield (member_id, isbn, borrowed, borrowed + timedelta(days=LOAN_DAYS), None, 0, "Active")
+
+    insert_batches(conn, sql, open_rows(), "open loans")
+
+    # Generated titles have one copy each, so an open loan holds that copy
+    cursor = conn.cursor()
+    for start in range(0, len(open_isbns), BATCH_SIZE):
+        part = open_isbns[start:start + BATCH_SIZE]
+        placeholders = ", ".join(["%s"] * len(part))
+        cursor.execute(f"""
+            UPDATE Copies c
+            JOIN Books b ON b.ISBN = c.ISBN
+            SET c.Status = 'On loan', b.Available_Copies = b.Available_Copies - 1
+            WHERE c.ISBN IN ({placeholders}) AND c.Status = 'Available'
+        """, part)
+        cursor.execute(f"""
+            UPDATE MemberTransactions mt
+            JOIN Copies c ON c.ISBN = mt.ISBN
+            SET mt.Copy_ID = c.Copy_ID
+            WHERE mt.ISBN IN ({placeholders}) AND mt.Status = 'Active'
+        """, part)
+        conn.commit()
+    cursor.close()
+
+
+def rebuild_summaries(conn):
+    """after_transaction_insert counts every generated row as a current loan, so recompute"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE MemberBorrowingSummary s
+        JOIN Members m ON m.Member_ID = s.Member_ID
+        LEFT JOIN (
+            SELECT Member_ID,
+                COUNT(*) AS Total_Books_Borrowed,
+                SUM(Status IN ('Active', 'Overdue')) AS Currently_Borrowed,
+                SUM(CASE WHEN Status = 'Completed' THEN Fine_Amount ELSE 0 END) AS Total_Fines_Paid,
+                MAX(Transaction_Date) AS Last_Borrowed_Date
+            FROM MemberTransactions
+            WHERE Transaction_Type = 'Borrow'
+            GROUP BY Member_ID
+        ) t ON t.Member_ID = s.Member_ID
+        SET s.Total_Books_Borrowed = COALESCE(t.Total_Books_Borrowed, 0),
+            s.Currently_Borrowed = COALESCE(t.Currently_Borrowed, 0),
+            s.Total_Fines_Paid = COALESCE(t.Total_Fines_Paid, 0),
+            s.Overdue_Count = 0,
+            s.Outstanding_Fines = 0,
+            s.Last_Borrowed_Date = t.Last_Borrowed_Date
+        WHERE m.Username LIKE %s
+    """, (f"{MEMBER_PREFIX}%",))
+    conn.commit()
+    cursor.callproc('AccrueFines', (None, None))
+    for result in cursor.stored_results():
+        run_id, as_of, updated = result.fetchone()
+        print(f"AccrueFines run {run_id}: {updated} loans marked overdue as of {as_of}")
+    cursor.close()
+
+
+def delete_in_batches(conn, sql, params):
+    cursor = conn.cursor()
+    deleted = 0
+    while True:
+        cursor.execute(sql + " LIMIT %s", params + (BATCH_SIZE,))
+        conn.commit()
+        deleted += cursor.rowcount
+        if cursor.rowcount < BATCH_SIZE:
+            break
+    cursor.close()
+    return deleted
+
+
+def clean(conn):
+    isbn_pattern = (f"{ISBN_PREFIX}%",)
+    member_pattern = (f"{MEMBER_PREFIX}%",)
+    print("transactions:", delete_in_batches(conn, "DELETE FROM MemberTransactions WHERE ISBN LIKE %s",
+                                             isbn_pattern))
+    print("archived transactions:", delete_in_batches(
+        conn, "DELETE FROM MemberTransactionsArchive WHERE ISBN LIKE %s", isbn_pattern))
+    print("status log:", delete_in_batches(conn, "DELETE FROM BookStatusLog WHERE ISBN LIKE %s", isbn_pattern))
+    print("books:", delete_in_batches(conn, "DELETE FROM Books WHERE ISBN LIKE %s", isbn_pattern))
+    cursor = conn.cursor()
+    cursor.execute("""
+        DELETE s FROM MemberBorrowingSummary s
+        JOIN Members m ON m.Member_ID = s.Member_ID
+        WHERE m.Username LIKE %s
+    """, member_pattern)
+    conn.commit()
+    cursor.close()
+    print("members:", delete_in_batches(conn, "DELETE FROM Members WHERE Username LIKE %s", member_pattern))
+    print("authors:", delete_in_batches(conn, "DELETE FROM Authors WHERE Author_Name LIKE %s",
+                                        (f"{AUTHOR_PREFIX} %",)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--members", type=int, default=20000)
+    parser.add_argument("--transactions", type=int, default=2000000)
+    parser.add_argument("--authors", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=730, help="how far back the borrowing history goes")
+    parser.add_argument("--open-ratio", type=float, default=0.02, help="share of transactions still out")
+    parser.add_argument("--overdue-ratio", type=float, default=0.3, help="share of open loans past due")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--clean", action="store_true", help="remove all generated rows and exit")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    started = time.monotonic()
+    try:
+        if args.clean:
+            clean(conn)
+        else:
+            rng = random.Random(args.seed)
+            author_ids, category_ids = generate_authors(conn, args.authors)
+            isbns = generate_books(conn, args.books, author_ids, category_ids, rng)
+            member_ids = generate_members(conn, args.members, args.days, rng)
+            generate_transactions(conn, args.transactions, member_ids, isbns, args.days,
+                                  args.open_ratio, args.overdue_ratio, rng)
+            rebuild_summaries(conn)
+        books, category_rows, daily_rows = analytics.rebuild(conn)
+        print(f"circulation rollups rebuilt: {books} books, {category_rows} category rows, {daily_rows} daily rows")
+    finally:
+        conn.close()
+    print(f"done in {time.monotonic() - started:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
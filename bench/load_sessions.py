@@ -0,0 +1,344 @@
+"""Simulate many concurrent portal sessions through the functions appnew.py uses.
+
+Every member session logs in and then loops over a weighted mix of
+catalog search, borrow_book, return_books and transaction history views,
+with a random think time between clicks. Admin sessions log in and page
+through books and members, look up member transactions and run the
+returns desk. All sessions share one process and one connection pool,
+just as they would inside a single Streamlit server.
+
+appnew reports failures through st.error. While the load runs, its st is
+replaced with a sink that records each message against the operation in
+progress. That is how deadlocks, lock wait timeouts and pool timeouts
+are counted. Synthetic members (load_NNNN, password "load") are created
+for the run and removed afterwards unless --keep is given. Their loans
+are returned first.
+
+Run from the repository root:
+
+    python -m bench.load_sessions --members 200 --admins 5 --seconds 120 --think 0.5
+"""
+import argparse
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import appnew
+from cache import catalog_cache
+from db import POOL_CONFIG, get_connection, pool_metrics
+from logins import login_latency
+from utils import hash_password
+
+MEMBER_PREFIX = "load_"
+PASSWORD = "load"
+
+MEMBER_MIX = [
+    ("search", 40),
+    ("my_loans", 15),
+    ("my_transactions_page", 10),
+    ("borrow", 20),
+    ("return", 15),
+]
+ADMIN_MIX = [
+    ("books_page", 30),
+    ("members_page", 30),
+    ("member_transactions", 20),
+    ("returns_desk", 20),
+]
+
+ERROR_KINDS = [
+    ("deadlock", re.compile(r"deadlock|1213", re.I)),
+    ("lock_wait_timeout", re.compile(r"lock wait timeout|1205", re.I)),
+    ("pool_timeout", re.compile(r"no database connection available", re.I)),
+]
+
+
+class MessageSink:
+    """Stands in for streamlit inside appnew and keeps each thread's st.error messages"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def take_errors(self):
+        errors = getattr(self._local, "errors", [])
+        self._local.errors = []
+        return errors
+
+    def error(self, message, *args, **kwargs):
+        if not hasattr(self._local, "errors"):
+            self._local.errors = []
+        self._local.errors.append(str(message))
+
+    def success(self, *args, **kwargs):
+        pass
+
+    warning = info = success
+
+
+def classify(message):
+    for kind, pattern in ERROR_KINDS:
+        if pattern.search(message):
+            return kind
+    return "other"
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+        self.rejected = Counter()
+
+    def record(self, operation, seconds, errors, rejected=0):
+        with self.lock:
+            self.latencies[operation].append(seconds)
+            for message in errors:
+                self.errors[operation][classify(message)] += 1
+            self.rejected[operation] += rejected
+
+
+def timed(sink, stats, operation, function, *args):
+    sink.take_errors()
+    started = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - started
+    stats.record(operation, elapsed, sink.take_errors())
+    return result
+
+
+def setup(count):
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        password = hash_password(PASSWORD)
+        cursor.executemany("""
+            INSERT IGNORE INTO Members (Username, Password, First_Name, Last_Name, Email, Status)
+            VALUES (%s, %s, 'Load', 'Test', %s, 'Active')
+        """, [(f"{MEMBER_PREFIX}{n:05d}", password, f"{MEMBER_PREFIX}{n:05d}@load.invalid")
+              for n in range(count)])
+        conn.commit()
+        cursor.execute("SELECT Member_ID FROM Members WHERE Username LIKE %s", (f"{MEMBER_PREFIX}%",))
+        member_ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    finally:
+        conn.close()
+    return member_ids
+
+
+def hot_books(count):
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT ISBN, Title FROM Books WHERE Availability = 'In stock' LIMIT %s", (count,))
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    words = sorted({word for _, title in rows for word in re.findall(r"\w{4,}", title.lower())})
+    return [isbn for isbn, _ in rows], words or ["book"]
+
+
+def copy_barcodes(isbns):
+    """Barcodes of every copy of isbns, for the returns desk to scan"""
+    if not isbns:
+        return []
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT Barcode FROM Copies WHERE ISBN IN ({', '.join(['%s'] * len(isbns))})",
+                       tuple(isbns))
+        barcodes = [barcode for (barcode,) in cursor.fetchall()]
+        cursor.close()
+    finally:
+        conn.close()
+    return barcodes
+
+
+def cleanup():
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        pattern = (f"{MEMBER_PREFIX}%",)
+        cursor.execute("""
+            DELETE mt FROM MemberTransactions mt
+            JOIN Members m ON m.Member_ID = mt.Member_ID
+            WHERE m.Username LIKE %s
+        """, pattern)
+        cursor.execute("""
+            DELETE s FROM MemberBorrowingSummary s
+            JOIN Members m ON m.Member_ID = s.Member_ID
+            WHERE m.Username LIKE %s
+        """, pattern)
+        cursor.execute("DELETE FROM Members WHERE Username LIKE %s", pattern)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def pick(rng, mix):
+    return rng.choices([name for name, _ in mix], weights=[weight for _, weight in mix])[0]
+
+
+def think(rng, mean):
+    if mean > 0:
+        time.sleep(rng.expovariate(1 / mean))
+
+
+def member_session(number, isbns, words, deadline, think_time, sink, stats, leftovers, seed):
+    rng = random.Random(seed)
+    username = f"{MEMBER_PREFIX}{number:05d}"
+    success, user = timed(sink, stats, "login", appnew.check_member_login, username, PASSWORD)
+    if not success:
+        return
+    member_id = user['Member_ID']
+    loans = set()
+    while time.monotonic() < deadline:
+        think(rng, think_time)
+        action = pick(rng, MEMBER_MIX)
+        if action == "search":
+            # Search misses the cache often enough to keep the database involved
+            if rng.random() < 0.5:
+                catalog_cache.clear()
+            timed(sink, stats, "search", appnew.fetch_books, " ".join(rng.sample(words, min(2, len(words)))))
+        elif action == "my_loans":
+            timed(sink, stats, "fetch_open_loans", appnew.fetch_open_loans, member_id)
+        elif action == "my_transactions_page":
+            timed(sink, stats, "fetch_member_transactions_page", appnew.fetch_member_transactions_page, member_id)
+        elif action == "borrow":
+            cart = rng.sample(isbns, min(rng.randint(1, 3), len(isbns)))
+            sink.take_errors()
+            started = time.perf_counter()
+            results = appnew.borrow_book(member_id, cart)
+            elapsed = time.perf_counter() - started
+            # borrow_book reports each refused ISBN through st.error as "Book <isbn>: ..."
+            errors = [message for message in sink.take_errors() if not message.startswith("Book ")]
+            stats.record("borrow_book", elapsed, errors,
+                         rejected=sum(code != 'OK' for code in results.values()))
+            loans.update(isbn for isbn, code in results.items() if code == 'OK')
+        elif action == "return" and loans:
+            isbn = rng.choice(sorted(loans))
+            sink.take_errors()
+            started = time.perf_counter()
+            results = appnew.return_books(member_id, [isbn]) or []
+            elapsed = time.perf_counter() - started
+            # NOT_BORROWED when the returns desk got to the book first
+            stats.record("return_book", elapsed, sink.take_errors(),
+                         rejected=sum(code != 'OK' for _, _, _, code, _ in results))
+            loans.discard(isbn)
+    leftovers.append((member_id, loans))
+
+
+def admin_session(username, password, barcodes, member_ids, deadline, think_time, sink, stats, seed):
+    rng = random.Random(seed)
+    success, _ = timed(sink, stats, "admin_login", appnew.check_admin_login, username, password)
+    if not success:
+        return
+    while time.monotonic() < deadline:
+        think(rng, think_time)
+        action = pick(rng, ADMIN_MIX)
+        if action == "books_page":
+            timed(sink, stats, "fetch_books_page", appnew.fetch_books_page)
+        elif action == "members_page":
+            timed(sink, stats, "fetch_members_page", appnew.fetch_members_page)
+        elif action == "member_transactions":
+            timed(sink, stats, "fetch_member_transactions_page", appnew.fetch_member_transactions_page,
+                  rng.choice(member_ids))
+        elif action == "returns_desk":
+            batch = rng.sample(barcodes, min(appnew.RETURNS_BATCH_SIZE, len(barcodes)))
+            sink.take_errors()
+            started = time.perf_counter()
+            results = appnew.return_books(None, batch) or []
+            elapsed = time.perf_counter() - started
+            stats.record("returns_desk", elapsed, sink.take_errors(),
+                         rejected=sum(code != 'OK' for _, _, _, code, _ in results))
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[int((len(sorted_values) - 1) * fraction)]
+
+
+def print_report(stats, elapsed):
+    print(f"\n{'Operation':<32} {'ops':>7} {'ops/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>7} {'err %':>6} {'rejected':>8}")
+    failed = 0
+    for operation in sorted(stats.latencies):
+        values = sorted(stats.latencies[operation])
+        errors = sum(stats.errors[operation].values())
+        failed += errors
+        print(f"{operation:<32} {len(values):>7} {len(values) / elapsed:>7.1f} "
+              f"{percentile(values, 0.5) * 1000:>8.1f} {percentile(values, 0.95) * 1000:>8.1f} "
+              f"{percentile(values, 0.99) * 1000:>8.1f} {errors:>7} {errors / len(values):>6.1%} "
+              f"{stats.rejected[operation]:>8}")
+        if errors:
+            print("    " + ", ".join(f"{kind}={count}" for kind, count in stats.errors[operation].most_common()))
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=100, help="concurrent member sessions")
+    parser.add_argument("--admins", type=int, default=2, help="concurrent admin sessions")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time between clicks (0 = none)")
+    parser.add_argument("--books", type=int, default=200, help="in-stock titles the sessions borrow from")
+    parser.add_argument("--pool-size", type=int, help="override POOL_CONFIG['size'] for this run")
+    parser.add_argument("--admin-user", default="admin")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--keep", action="store_true", help="leave the synthetic members in place")
+    args = parser.parse_args()
+
+    if args.pool_size:
+        POOL_CONFIG["size"] = args.pool_size
+    member_ids = setup(args.members)
+    isbns, words = hot_books(args.books)
+    if not isbns:
+        sys.exit("No books in stock to borrow")
+    barcodes = copy_barcodes(isbns)
+
+    sink = MessageSink()
+    appnew.st = sink
+    stats = Stats()
+    leftovers = []
+    deadline = time.monotonic() + args.seconds
+    threads = [
+        threading.Thread(target=member_session,
+                         args=(n, isbns, words, deadline, args.think, sink, stats, leftovers, n))
+        for n in range(args.members)
+    ]
+    threads += [
+        threading.Thread(target=admin_session,
+                         args=(args.admin_user, args.admin_password, barcodes, member_ids, deadline,
+                               args.think, sink, stats, 100000 + n))
+        for n in range(args.admins)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    for member_id, loans in leftovers:
+        if loans:
+            appnew.return_books(member_id, sorted(loans))
+
+    print(f"{args.members} member and {args.admins} admin sessions for {elapsed:.0f}s")
+    failed = print_report(stats, elapsed)
+    pool = pool_metrics()
+    logins = login_latency.stats()
+    print(f"\npool: size {pool['size']}, {pool['checkouts']} checkouts, {pool['timeouts']} timeouts, "
+          f"{pool['wait_seconds']:.1f}s spent waiting for a connection")
+    print(f"logins: p50 {logins['p50_ms']:.1f} ms, p95 {logins['p95_ms']:.1f} ms, {logins['failures']} failed")
+    total = sum(len(values) for values in stats.latencies.values())
+    print(f"overall: {total / elapsed:.1f} ops/s, error rate {failed / total if total else 0:.2%}")
+
+    if not args.keep:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
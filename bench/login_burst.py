@@ -0,0 +1,103 @@
+"""Simulate the exam-start login rush against the real login path.
+
+Synthetic candidates (burst_NNNN, password "burst") are enrolled, then
+--threads workers log them in as fast as they can through
+check_member_login. Per-login latency percentiles are printed, followed by
+how many Last_Login timestamps the background writer flushed and in how
+many batches. The synthetic members are removed unless --keep is given.
+
+Run from the repository root:
+
+    python -m bench.login_burst --members 2000 --threads 32
+"""
+import argparse
+import threading
+import time
+
+from appnew import check_member_login
+from db import get_connection, pool_metrics
+from logins import last_login_writer, login_latency
+from utils import hash_password
+
+MEMBER_PREFIX = "burst_"
+PASSWORD = "burst"
+
+
+def setup(count):
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        password = hash_password(PASSWORD)
+        cursor.executemany("""
+            INSERT IGNORE INTO Members (Username, Password, First_Name, Last_Name, Email, Status)
+            VALUES (%s, %s, 'Burst', 'Test', %s, 'Active')
+        """, [(f"{MEMBER_PREFIX}{n:05d}", password, f"{MEMBER_PREFIX}{n:05d}@burst.invalid")
+              for n in range(count)])
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    return [f"{MEMBER_PREFIX}{n:05d}" for n in range(count)]
+
+
+def cleanup():
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            DELETE s FROM MemberBorrowingSummary s
+            JOIN Members m ON m.Member_ID = s.Member_ID
+            WHERE m.Username LIKE %s
+        """, (f"{MEMBER_PREFIX}%",))
+        cursor.execute("DELETE FROM Members WHERE Username LIKE %s", (f"{MEMBER_PREFIX}%",))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def worker(usernames, failures):
+    for username in usernames:
+        success, _ = check_member_login(username, PASSWORD)
+        if not success:
+            failures.append(username)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--keep", action="store_true", help="leave the synthetic members in place")
+    args = parser.parse_args()
+
+    usernames = setup(args.members)
+    failures = []
+    threads = [
+        threading.Thread(target=worker, args=(usernames[n::args.threads], failures))
+        for n in range(args.threads)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    last_login_writer.flush()
+
+    latency = login_latency.stats()
+    writer = last_login_writer.stats()
+    pool = pool_metrics()
+    print(f"{latency['logins']} logins from {args.threads} threads in {elapsed:.1f}s "
+          f"({latency['logins'] / elapsed:.0f} logins/s), {len(failures)} failed")
+    print(f"latency ms: p50 {latency['p50_ms']:.1f}  p95 {latency['p95_ms']:.1f}  "
+          f"p99 {latency['p99_ms']:.1f}  max {latency['max_ms']:.1f}")
+    print(f"Last_Login: {writer['written']} written in {writer['flushes']} flushes, "
+          f"{writer['pending']} pending, {writer['errors']} failed flushes")
+    print(f"pool: {pool['created']} connections opened, {pool['timeouts']} checkout timeouts")
+
+    if not args.keep:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Check read/write splitting against a primary and one or more replicas.
+
+The replicas given with --replica are added to REPLICA_CONFIGS for this
+run. Listing reads are timed first, then a synthetic member (routing_check)
+borrows and returns one in-stock title, reading their open loans straight
+after each write to prove read-your-writes holds. The routing counters and
+each replica's measured lag are printed at the end.
+
+Two local MySQL instances with the second replicating from the first are
+enough. Run from the repository root:
+
+    python -m bench.routing_check --replica 127.0.0.1:3307 --reads 200
+
+Exits with status 1 if a read right after a write missed that write.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import appnew
+import db
+from bench.load_sessions import MessageSink
+from cache import catalog_cache
+from utils import hash_password
+
+USERNAME = "routing_check"
+
+
+def replica_config(value):
+    host, _, port = value.rpartition(":")
+    return {"host": host, "port": int(port)} if host else {"host": value}
+
+
+def setup():
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT IGNORE INTO Members (Username, Password, First_Name, Last_Name, Email, Status)
+            VALUES (%s, %s, 'Routing', 'Check', 'routing_check@check.invalid', 'Active')
+        """, (USERNAME, hash_password(USERNAME)))
+        conn.commit()
+        cursor.execute("SELECT Member_ID FROM Members WHERE Username = %s", (USERNAME,))
+        member_id = cursor.fetchone()[0]
+        cursor.execute("SELECT ISBN FROM Books WHERE Available_Copies > 0 ORDER BY ISBN LIMIT 1")
+        row = cursor.fetchone()
+        cursor.close()
+    finally:
+        conn.close()
+    return member_id, row[0] if row else None
+
+
+def cleanup(member_id):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM MemberTransactions WHERE Member_ID = %s", (member_id,))
+        cursor.execute("DELETE FROM MemberBorrowingSummary WHERE Member_ID = %s", (member_id,))
+        cursor.execute("DELETE FROM Members WHERE Member_ID = %s", (member_id,))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def time_reads(label, function, args, count):
+    timings = []
+    for _ in range(count):
+        catalog_cache.clear()
+        started = time.perf_counter()
+        function(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    print(f"{label:<40} median {statistics.median(timings):>8.2f} ms  "
+          f"p95 {timings[int((len(timings) - 1) * 0.95)]:>8.2f} ms")
+
+
+def open_isbns(member_id):
+    return {loan['ISBN'] for loan in appnew.fetch_open_loans(member_id)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--replica", action="append", type=replica_config, default=[],
+                        help="replica as host:port; repeat for several")
+    parser.add_argument("--reads", type=int, default=100, help="reads per listing function")
+    parser.add_argument("--max-lag", type=float, help="override ROUTING_CONFIG['max_lag_seconds']")
+    parser.add_argument("--sticky", type=float, help="override ROUTING_CONFIG['sticky_seconds']")
+    args = parser.parse_args()
+
+    db.REPLICA_CONFIGS.extend(args.replica)
+    if args.max_lag is not None:
+        db.ROUTING_CONFIG["max_lag_seconds"] = args.max_lag
+    if args.sticky is not None:
+        db.ROUTING_CONFIG["sticky_seconds"] = args.sticky
+    sink = MessageSink()
+    appnew.st = sink
+
+    member_id, isbn = setup()
+    if isbn is None:
+        sys.exit("No book with a free copy to borrow")
+    misses = []
+    try:
+        time_reads("fetch_books('calculus')", appnew.fetch_books, ("calculus",), args.reads)
+        time_reads("fetch_books_page()", appnew.fetch_books_page, (), args.reads)
+        time_reads("fetch_members_page()", appnew.fetch_members_page, (), args.reads)
+        time_reads("fetch_member_transactions_page()", appnew.fetch_member_transactions_page, (member_id,),
+                   args.reads)
+
+        if appnew.borrow_book(member_id, [isbn]).get(isbn) != 'OK':
+            sys.exit(f"Could not borrow {isbn}: {sink.take_errors()}")
+        if isbn not in open_isbns(member_id):
+            misses.append(f"loan of {isbn} not visible right after the borrow")
+        appnew.return_books(member_id, [isbn])
+        if isbn in open_isbns(member_id):
+            misses.append(f"loan of {isbn} still open right after the return")
+    finally:
+        cleanup(member_id)
+
+    print()
+    for name, value in db.routing_metrics().items():
+        print(f"{name:<28} {value}")
+    if misses:
+        print("\nFAIL: " + "; ".join(misses))
+        sys.exit(1)
+    print("\nok: reads after a write saw the write")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Time every appnew.py data function and the project.sql reporting queries.
+
+Each benchmark runs --repeat times after one warm-up call, with the
+catalog cache cleared before every fetch_books call so the database is
+always measured. The results are written as JSON together with the git
+revision and the table sizes. Passing --compare with an earlier results
+file prints the change per benchmark and exits with status 1 if any
+median got slower by more than --threshold.
+
+Load production-sized data first with bench.generate_data, then run from
+the repository root:
+
+    python -m bench.run_suite --output results/today.json --compare results/last.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import appnew
+from cache import catalog_cache
+from db import get_connection, get_read_connection
+
+PROJECT_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "project.sql")
+TABLES = ["Books", "Authors", "Members", "MemberTransactions", "MemberTransactionsArchive", "BookStatusLog",
+          "AdminTransactions"]
+
+
+def report_queries(path=PROJECT_SQL):
+    """The stand-alone SELECT statements in project.sql, named by the comment above each"""
+    statements = []
+    delimiter = ";"
+    comment = None
+    buffer = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            stripped = line.strip()
+            if stripped.upper().startswith("DELIMITER"):
+                delimiter = stripped.split()[1]
+                buffer = []
+                continue
+            if not buffer and stripped.startswith("--"):
+                comment = stripped.lstrip("- ").strip()
+                continue
+            if not buffer and not stripped:
+                continue
+            buffer.append(line)
+            if stripped.endswith(delimiter):
+                sql = "".join(buffer).strip()[:-len(delimiter)]
+                if delimiter == ";" and sql.lstrip().upper().startswith("SELECT"):
+                    statements.append((comment or f"report {len(statements) + 1}", sql))
+                buffer = []
+                comment = None
+    return statements
+
+
+def sample_params():
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT Member_ID FROM MemberBorrowingSummary
+            ORDER BY Total_Books_Borrowed DESC
+            LIMIT 1
+        """)
+        row = cursor.fetchone()
+        member_id = row[0] if row else None
+        cursor.execute("SELECT Username FROM Members WHERE Member_ID = %s", (member_id,))
+        row = cursor.fetchone()
+        username = row[0] if row else "nobody"
+        cursor.execute("SELECT ISBN FROM Books ORDER BY ISBN LIMIT 1")
+        isbn = cursor.fetchone()[0]
+        counts = {}
+        for table in TABLES:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = cursor.fetchone()[0]
+        cursor.close()
+    finally:
+        conn.close()
+    return member_id, username, isbn, counts
+
+
+def uncached_fetch_books(search_term):
+    catalog_cache.clear()
+    return appnew.fetch_books(search_term)
+
+
+def second_page(fetch_page, *args):
+    first = fetch_page(*args)
+    return fetch_page(*args, cursor=first["next"]) if first["next"] is not None else first
+
+
+def columnar_page(fetch_page, *args):
+    return fetch_page(*args, page_size=appnew.PAGE_SIZES[-1], columnar=True)
+
+
+def run_sql(sql):
+    # Reports are read-only, so they go wherever the read router sends them
+    conn = get_read_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql)
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def benchmarks(member_id, username, isbn):
+    yield "fetch_books('calculus')", uncached_fetch_books, ("calculus",)
+    yield "fetch_books('quantum mechanics')", uncached_fetch_books, ("quantum mechanics",)
+    yield "fetch_books('ab') like fallback", uncached_fetch_books, ("ab",)
+    yield "fetch_books_page()", appnew.fetch_books_page, ()
+    yield "fetch_books_page() second page", second_page, (appnew.fetch_books_page,)
+    yield "fetch_members_page()", appnew.fetch_members_page, ()
+    yield "fetch_members_page() second page", second_page, (appnew.fetch_members_page,)
+    yield "fetch_members_page(columnar)", columnar_page, (appnew.fetch_members_page,)
+    yield "lookup_members(username prefix)", appnew.lookup_members, (username[:4],)
+    yield "lookup_members('gen')", appnew.lookup_members, ("gen",)
+    yield "lookup_members(member id)", appnew.lookup_members, (str(member_id or 0),)
+    yield "fetch_open_loans()", appnew.fetch_open_loans, (member_id,)
+    yield "fetch_member_transactions_page()", appnew.fetch_member_transactions_page, (member_id,)
+    yield ("fetch_member_transactions_page(columnar)", columnar_page,
+           (appnew.fetch_member_transactions_page, member_id))
+    yield ("fetch_member_transactions_page() second page", second_page,
+           (appnew.fetch_member_transactions_page, member_id))
+    yield "fetch_member_transaction_stats()", appnew.fetch_member_transaction_stats, (member_id,)
+    yield "fetch_member_holds()", appnew.fetch_member_holds, (member_id,)
+    yield "check_member_login()", appnew.check_member_login, (username, "generated")
+    yield "TransactionDetailsView (member)", run_sql, (
+        f"SELECT * FROM TransactionDetailsView WHERE Member_ID = {int(member_id or 0)}",)
+    yield "GetBookAvailabilityDetails()", run_sql, (f"SELECT GetBookAvailabilityDetails('{isbn}')",)
+    yield "analytics: category_circulation", appnew.fetch_analytics, ("category_circulation",)
+    yield "analytics: daily_circulation", appnew.fetch_analytics, ("daily_circulation", (appnew.ANALYTICS_DAYS,))
+    yield "analytics: most_borrowed_books", appnew.fetch_analytics, ("most_borrowed_books", (appnew.ANALYTICS_ROWS,))
+    yield "analytics: never_borrowed_books", appnew.fetch_analytics, ("never_borrowed_books", (appnew.ANALYTICS_ROWS,))
+    yield "CalculateTotalFines()", run_sql, (f"SELECT CalculateTotalFines({int(member_id or 0)})",)
+    for name, sql in report_queries():
+        yield f"report: {name}", run_sql, (sql,)
+
+
+def time_call(function, args, repeat):
+    function(*args)  # warm-up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int((len(timings) - 1) * 0.95)], 3),
+        "min_ms": round(timings[0], 3),
+        "runs": repeat
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(PROJECT_SQL)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as handle:
+        baseline = {b["name"]: b for b in json.load(handle)["benchmarks"]}
+    regressions = 0
+    print(f"\nCompared with {baseline_path}:")
+    for bench in results["benchmarks"]:
+        before = baseline.get(bench["name"])
+        if before is None:
+            print(f"  new       {bench['name']}")
+            continue
+        change = (bench["median_ms"] - before["median_ms"]) / before["median_ms"] if before["median_ms"] else 0.0
+        flag = "SLOWER" if change > threshold else "ok"
+        regressions += flag == "SLOWER"
+        print(f"  {flag:<9} {bench['name']}: {before['median_ms']:.2f} -> {bench['median_ms']:.2f} ms "
+              f"({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="fail --compare when a median is this much slower (0.2 = 20%%)")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this text")
+    args = parser.parse_args()
+
+    member_id, username, isbn, counts = sample_params()
+    results = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "table_rows": counts,
+        "benchmarks": []
+    }
+    for name, function, call_args in benchmarks(member_id, username, isbn):
+        if args.only and args.only not in name:
+            continue
+        timing = time_call(function, call_args, args.repeat)
+        results["benchmarks"].append({"name": name, **timing})
+        print(f"{name:<52} median {timing['median_ms']:>9.2f} ms  p95 {timing['p95_ms']:>9.2f} ms")
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w") as handle:
+        json.dump(results, handle, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
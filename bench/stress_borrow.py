@@ -0,0 +1,228 @@
+"""Hammer BorrowBook from many threads and prove no copy is ever checked out twice.
+
+Synthetic members (stress_NNNN) and a small set of hot synthetic books
+(ISBNs starting with 98, --copies copies each) are created, then every
+worker thread loops: borrow a random cart of hot ISBNs for a random
+member, and return what it got straight away so the titles keep being
+fought over. A checker thread keeps looking for a copy with more than one
+Active transaction or a title with more loans than copies. At the end the
+Books counters are also compared with the Copies rows and the open loans.
+Everything synthetic is removed at the end unless --keep is given.
+
+Run from the repository root:
+
+    python -m bench.stress_borrow --threads 32 --seconds 30 --copies 3
+
+Exits with status 1 if a double checkout or an inconsistency is seen.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+
+import mysql.connector
+
+from db import DB_CONFIG, ConnectionPool
+from queries import call
+
+ISBN_PREFIX = "98"
+MEMBER_PREFIX = "stress_"
+DEADLOCK = 1213
+LOCK_WAIT_TIMEOUT = 1205
+
+DOUBLE_CHECKOUT_QUERY = """
+    SELECT mt.ISBN, COUNT(*) AS Active_Loans, COUNT(DISTINCT mt.Copy_ID) AS Copies_Lent, b.Total_Copies
+    FROM MemberTransactions mt
+    JOIN Books b ON b.ISBN = mt.ISBN
+    WHERE mt.ISBN LIKE %s AND mt.Status IN ('Active', 'Overdue')
+    GROUP BY mt.ISBN, b.Total_Copies
+    HAVING COUNT(*) > COUNT(DISTINCT mt.Copy_ID) OR COUNT(*) > b.Total_Copies
+"""
+
+COUNTER_MISMATCH_QUERY = """
+    SELECT b.ISBN, b.Available_Copies, b.Total_Copies, b.Availability,
+           (SELECT COUNT(*) FROM Copies c WHERE c.ISBN = b.ISBN AND c.Status = 'Available') AS Free_Copies,
+           (SELECT COUNT(*) FROM MemberTransactions mt
+            WHERE mt.ISBN = b.ISBN AND mt.Status IN ('Active', 'Overdue')) AS Active_Loans,
+           (SELECT COUNT(*) FROM Copies c WHERE c.ISBN = b.ISBN AND c.Status = 'On hold') AS Held_Copies
+    FROM Books b
+    WHERE b.ISBN LIKE %s
+    HAVING Available_Copies <> Free_Copies
+        OR Available_Copies <> Total_Copies - Active_Loans - Held_Copies
+        OR (Availability = 'In stock') <> (Available_Copies > 0)
+"""
+
+
+def setup(conn, members, books, copies):
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT IGNORE INTO Members (Username, Password, First_Name, Last_Name, Email, Status)
+        VALUES (%s, 'x', 'Stress', 'Test', %s, 'Active')
+    """, [(f"{MEMBER_PREFIX}{n:04d}", f"{MEMBER_PREFIX}{n:04d}@stress.invalid") for n in range(members)])
+    cursor.execute("SELECT MIN(Author_ID) FROM Authors")
+    author_id = cursor.fetchone()[0]
+    cursor.execute("SELECT MIN(Category_ID) FROM Categories")
+    category_id = cursor.fetchone()[0]
+    cursor.executemany("""
+        INSERT IGNORE INTO Books (ISBN, Title, Author_ID, Category_ID, Total_Copies)
+        VALUES (%s, %s, %s, %s, %s)
+    """, [(f"{ISBN_PREFIX}{n:011d}", f"Stress Title {n}", author_id, category_id, copies)
+          for n in range(books)])
+    conn.commit()
+    cursor.execute("SELECT Member_ID FROM Members WHERE Username LIKE %s", (f"{MEMBER_PREFIX}%",))
+    member_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT ISBN FROM Books WHERE ISBN LIKE %s", (f"{ISBN_PREFIX}%",))
+    isbns = [row[0] for row in cursor.fetchall()]
+    conn.commit()
+    cursor.close()
+    return member_ids, isbns
+
+
+def cleanup(conn):
+    cursor = conn.cursor()
+    pattern = f"{ISBN_PREFIX}%"
+    cursor.execute("DELETE FROM BookStatusLog WHERE ISBN LIKE %s", (pattern,))
+    cursor.execute("DELETE FROM MemberTransactions WHERE ISBN LIKE %s", (pattern,))
+    cursor.execute("DELETE FROM Books WHERE ISBN LIKE %s", (pattern,))
+    cursor.execute("""
+        DELETE s FROM MemberBorrowingSummary s
+        JOIN Members m ON m.Member_ID = s.Member_ID
+        WHERE m.Username LIKE %s
+    """, (f"{MEMBER_PREFIX}%",))
+    cursor.execute("DELETE FROM Members WHERE Username LIKE %s", (f"{MEMBER_PREFIX}%",))
+    conn.commit()
+    cursor.close()
+
+
+def give_back(conn, member_id, isbn):
+    """Return a loan straight away so the copy goes back into the fight"""
+    call(conn, 'ReturnBook', (member_id, json.dumps([isbn])))
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.codes = Counter()
+        self.errors = Counter()
+        self.latencies = []
+        self.calls = 0
+
+    def record(self, seconds, codes=None, error=None):
+        with self.lock:
+            self.calls += 1
+            self.latencies.append(seconds)
+            if codes:
+                self.codes.update(codes)
+            if error is not None:
+                self.errors[error] += 1
+
+
+def worker(pool, member_ids, isbns, max_cart, deadline, stats, seed):
+    rng = random.Random(seed)
+    conn = pool.acquire()
+    try:
+        while time.monotonic() < deadline:
+            member_id = rng.choice(member_ids)
+            cart = rng.sample(isbns, rng.randint(1, max_cart))
+            started = time.perf_counter()
+            try:
+                results = dict(call(conn, 'BorrowBook', (member_id, json.dumps(cart))))
+                stats.record(time.perf_counter() - started, codes=results.values())
+                for isbn, code in results.items():
+                    if code == 'OK':
+                        give_back(conn, member_id, isbn)
+            except mysql.connector.Error as error:
+                conn.rollback()
+                label = {DEADLOCK: "deadlock", LOCK_WAIT_TIMEOUT: "lock wait timeout"}.get(error.errno, str(error.errno))
+                stats.record(time.perf_counter() - started, error=label)
+    finally:
+        conn.close()
+
+
+def checker(pool, deadline, violations):
+    conn = pool.acquire()
+    try:
+        cursor = conn.cursor()
+        while time.monotonic() < deadline:
+            cursor.execute(DOUBLE_CHECKOUT_QUERY, (f"{ISBN_PREFIX}%",))
+            for isbn, loans, lent, total in cursor.fetchall():
+                violations.append(f"{isbn} has {loans} active loans on {lent} of {total} copies")
+            conn.commit()
+            time.sleep(0.05)
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--books", type=int, default=5, help="size of the hot set everyone fights over")
+    parser.add_argument("--copies", type=int, default=1, help="copies of each hot title")
+    parser.add_argument("--max-cart", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="leave the synthetic rows in place")
+    args = parser.parse_args()
+
+    pool = ConnectionPool(DB_CONFIG, size=args.threads + 2, checkout_timeout=30)
+    conn = pool.acquire()
+    member_ids, isbns = setup(conn, args.members, args.books, args.copies)
+    conn.close()
+
+    stats = Stats()
+    violations = []
+    deadline = time.monotonic() + args.seconds
+    threads = [threading.Thread(target=checker, args=(pool, deadline, violations))]
+    threads += [
+        threading.Thread(target=worker, args=(pool, member_ids, isbns, min(args.max_cart, len(isbns)),
+                                              deadline, stats, seed))
+        for seed in range(args.threads)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    conn = pool.acquire()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(DOUBLE_CHECKOUT_QUERY, (f"{ISBN_PREFIX}%",))
+        violations += [f"{isbn} has {loans} active loans on {lent} of {total} copies"
+                       for isbn, loans, lent, total in cursor.fetchall()]
+        cursor.execute(COUNTER_MISMATCH_QUERY, (f"{ISBN_PREFIX}%",))
+        violations += [f"{isbn} counts {available} of {total} available ('{availability}') "
+                       f"with {free} free copies and {loans} active loans"
+                       for isbn, available, total, availability, free, loans, _ in cursor.fetchall()]
+        conn.commit()
+        cursor.close()
+        if not args.keep:
+            cleanup(conn)
+    finally:
+        conn.close()
+        pool.close_all()
+
+    latencies = sorted(stats.latencies) or [0.0]
+    print(f"{stats.calls} BorrowBook calls from {args.threads} threads in {elapsed:.1f}s "
+          f"({stats.calls / elapsed:.0f} calls/s)")
+    print(f"latency ms: p50 {statistics.median(latencies) * 1000:.1f}  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}")
+    print("result codes: " + ", ".join(f"{code}={count}" for code, count in stats.codes.most_common()))
+    if stats.errors:
+        print("errors: " + ", ".join(f"{label}={count}" for label, count in stats.errors.most_common()))
+    if violations:
+        print(f"\nFAIL: {len(violations)} consistency violations")
+        for violation in sorted(set(violations))[:20]:
+            print(f"  {violation}")
+        sys.exit(1)
+    print("\nok: no copy was ever checked out twice and the counters match the copies")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,507 @@
+"""Bulk loading of catalog files into lib_mgmt.
+
+Usage:
+    python bulk_import.py books catalog.csv [--chunk-size 1000] [--rejects rejects.csv]
+    python bulk_import.py members roster.csv [--workers 0] [--report status.csv]
+
+Books files have ISBN, Title, Author and Category columns; member rosters
+have Username, Password, First_Name, Last_Name and Email. Either can be
+CSV, a JSON array of objects with the same keys, or JSON Lines. Rows are
+read as a stream and written in chunked transactions, so the file never
+has to fit in memory.
+"""
+import argparse
+import csv
+import io
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import mysql.connector
+
+from db import get_connection
+from utils import hash_password, validate_email, validate_isbn
+
+CHUNK_SIZE = 1000
+BOOK_FIELDS = ("ISBN", "Title", "Author", "Category")
+BOOK_LENGTHS = {"Title": 255, "Author": 100}  # Books.Title, Authors.Author_Name
+MEMBER_FIELDS = ("Username", "Password", "First_Name", "Last_Name", "Email")
+MEMBER_LENGTHS = {"Username": 50, "First_Name": 50, "Last_Name": 50, "Email": 100}  # Members columns
+
+
+# Reading
+def iter_json_array(handle, read_size=65536):
+    """Yield the objects of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = handle.read(read_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array")
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            more = handle.read(read_size)
+            if not more:
+                raise
+            buffer += more
+            continue
+        yield item
+        buffer = buffer[end:]
+        if len(buffer) < read_size:
+            buffer += handle.read(read_size)
+
+
+def iter_records(handle, file_format):
+    """Yield (line number, record dict) pairs from a CSV, JSON or JSON Lines stream"""
+    if file_format == "csv":
+        reader = csv.DictReader(handle)
+        for record in reader:
+            yield reader.line_num, record
+    elif file_format == "jsonl":
+        for line_no, line in enumerate(handle, start=1):
+            if line.strip():
+                yield line_no, json.loads(line)
+    elif file_format == "json":
+        for item_no, record in enumerate(iter_json_array(handle), start=1):
+            yield item_no, record
+    else:
+        raise ValueError(f"Unsupported format: {file_format}")
+
+
+def detect_format(filename):
+    name = filename.lower()
+    if name.endswith(".jsonl") or name.endswith(".ndjson"):
+        return "jsonl"
+    if name.endswith(".json"):
+        return "json"
+    return "csv"
+
+
+def normalise(record, fields):
+    """Map header names case-insensitively onto the expected fields and trim values"""
+    lookup = {str(key).strip().lower(): value for key, value in record.items()}
+    return {field: str(lookup.get(field.lower()) or "").strip() for field in fields}
+
+
+def too_long(record, lengths):
+    """The first field longer than its column allows, or None"""
+    for field, length in lengths.items():
+        if len(record[field]) > length:
+            return field
+    return None
+
+
+def chunked(records, size):
+    chunk = []
+    for item in records:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def open_upload(uploaded_file):
+    """Text stream over a Streamlit upload, for the admin import pages"""
+    return io.TextIOWrapper(uploaded_file, encoding="utf-8-sig", newline="")
+
+
+def in_clause(values):
+    return ", ".join(["%s"] * len(values))
+
+
+# Books
+def resolve_authors(cursor, names, author_ids):
+    """Fill author_ids with IDs for names, creating missing authors in one statement.
+
+    author_ids is keyed by lower-cased name, since Author_Name compares
+    case-insensitively in MySQL.
+    """
+    missing = [name for name in names if name.lower() not in author_ids]
+    if not missing:
+        return
+    cursor.execute(
+        f"SELECT Author_ID, Author_Name FROM Authors WHERE Author_Name IN ({in_clause(missing)})",
+        missing
+    )
+    for author_id, name in cursor.fetchall():
+        author_ids[name.lower()] = author_id
+
+    new_names = [name for name in missing if name.lower() not in author_ids]
+    if not new_names:
+        return
+    cursor.execute(
+        f"INSERT IGNORE INTO Authors (Author_Name) VALUES {', '.join(['(%s)'] * len(new_names))}",
+        new_names
+    )
+    cursor.execute(
+        f"SELECT Author_ID, Author_Name FROM Authors WHERE Author_Name IN ({in_clause(new_names)})",
+        new_names
+    )
+    for author_id, name in cursor.fetchall():
+        author_ids[name.lower()] = author_id
+
+    # Names the collation folds together differently from Python (accents, etc.)
+    for name in new_names:
+        if name.lower() not in author_ids:
+            cursor.execute("SELECT Author_ID FROM Authors WHERE Author_Name = %s", (name,))
+            author_ids[name.lower()] = cursor.fetchone()[0]
+
+
+def insert_books(cursor, books, category_ids, author_ids):
+    resolve_authors(cursor, sorted({book["Author"] for book in books}), author_ids)
+    # executemany folds these into a single multi-row INSERT
+    cursor.executemany(
+        "INSERT INTO Books (ISBN, Title, Author_ID, Category_ID) VALUES (%s, %s, %s, %s)",
+        [(book["ISBN"], book["Title"], author_ids[book["Author"].lower()],
+          category_ids[book["Category"].lower()])
+         for book in books]
+    )
+
+
+def forget_authors(books, author_ids):
+    # Authors created in a rolled back transaction are gone again
+    for book in books:
+        author_ids.pop(book["Author"].lower(), None)
+
+
+def import_book_chunk(conn, chunk, category_ids, author_ids, rejects):
+    """Validate and insert one chunk in a single transaction; returns rows inserted.
+
+    If the chunk INSERT fails, its rows are retried one at a time so only
+    the offending rows are rejected.
+    """
+    candidates = []
+    seen = set()
+    for line_no, book in chunk:
+        isbn = book["ISBN"]
+        long_field = too_long(book, BOOK_LENGTHS)
+        if not validate_isbn(isbn):
+            rejects.append((line_no, isbn, "Invalid ISBN format"))
+        elif not book["Title"]:
+            rejects.append((line_no, isbn, "Missing title"))
+        elif not book["Author"]:
+            rejects.append((line_no, isbn, "Missing author"))
+        elif long_field:
+            rejects.append((line_no, isbn, f"{long_field} longer than {BOOK_LENGTHS[long_field]} characters"))
+        elif book["Category"].lower() not in category_ids:
+            rejects.append((line_no, isbn, f"Invalid category '{book['Category']}'"))
+        elif isbn in seen:
+            rejects.append((line_no, isbn, "Duplicate ISBN in file"))
+        else:
+            seen.add(isbn)
+            candidates.append((line_no, book))
+    if not candidates:
+        return 0
+
+    cursor = conn.cursor()
+    existing = set()
+    rows = []
+    try:
+        isbns = [book["ISBN"] for _, book in candidates]
+        cursor.execute(f"SELECT ISBN FROM Books WHERE ISBN IN ({in_clause(isbns)})", isbns)
+        existing = {row[0] for row in cursor.fetchall()}
+        for line_no, book in candidates:
+            if book["ISBN"] in existing:
+                rejects.append((line_no, book["ISBN"], "ISBN already in catalog"))
+            else:
+                rows.append((line_no, book))
+        if not rows:
+            conn.rollback()
+            return 0
+
+        books = [book for _, book in rows]
+        try:
+            insert_books(cursor, books, category_ids, author_ids)
+            conn.commit()
+            return len(rows)
+        except mysql.connector.Error:
+            conn.rollback()
+            forget_authors(books, author_ids)
+
+        inserted = 0
+        for line_no, book in rows:
+            try:
+                insert_books(cursor, [book], category_ids, author_ids)
+                conn.commit()
+                inserted += 1
+            except mysql.connector.Error as error:
+                conn.rollback()
+                forget_authors([book], author_ids)
+                rejects.append((line_no, book["ISBN"], f"Insert failed: {error.msg}"))
+        return inserted
+    except mysql.connector.Error as error:
+        conn.rollback()
+        forget_authors([book for _, book in rows], author_ids)
+        for line_no, book in candidates:
+            if book["ISBN"] not in existing:
+                rejects.append((line_no, book["ISBN"], f"Chunk failed: {error}"))
+        return 0
+    finally:
+        cursor.close()
+
+
+def import_books(handle, file_format="csv", chunk_size=CHUNK_SIZE, progress=None):
+    """Stream books from handle into the catalog.
+
+    Returns a report dict with the inserted count, the rejected rows as
+    (line, ISBN, reason) tuples, and the throughput. progress, if given, is
+    called with the number of rows read after each chunk.
+    """
+    started = time.perf_counter()
+    report = {"read": 0, "inserted": 0, "rejected": [], "seconds": 0.0, "rows_per_second": 0.0}
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT Category_Name, Category_ID FROM Categories")
+        category_ids = {name.lower(): category_id for name, category_id in cursor.fetchall()}
+        cursor.close()
+        conn.commit()
+
+        author_ids = {}
+        records = ((line_no, normalise(record, BOOK_FIELDS))
+                   for line_no, record in iter_records(handle, file_format))
+        for chunk in chunked(records, chunk_size):
+            report["read"] += len(chunk)
+            report["inserted"] += import_book_chunk(conn, chunk, category_ids, author_ids, report["rejected"])
+            if progress:
+                progress(report["read"])
+    finally:
+        conn.close()
+
+    report["seconds"] = time.perf_counter() - started
+    if report["seconds"] > 0:
+        report["rows_per_second"] = report["read"] / report["seconds"]
+    return report
+
+
+# Members
+def hash_passwords(passwords):
+    """Hash one chunk of passwords"""
+    return [hash_password(password) for password in passwords]
+
+
+def check_member_rows(chunk, seen_usernames, seen_emails, rejects):
+    """Per-row checks plus duplicates within the file; returns the rows still in play"""
+    candidates = []
+    for line_no, member, hashed in chunk:
+        username = member["Username"]
+        long_field = too_long(member, MEMBER_LENGTHS)
+        if not all(member[field] for field in MEMBER_FIELDS):
+            rejects.append((line_no, username, "Missing required field"))
+        elif long_field:
+            rejects.append((line_no, username, f"{long_field} longer than {MEMBER_LENGTHS[long_field]} characters"))
+        elif not validate_email(member["Email"]):
+            rejects.append((line_no, username, "Invalid email format"))
+        elif username.lower() in seen_usernames:
+            rejects.append((line_no, username, "Duplicate username in file"))
+        elif member["Email"].lower() in seen_emails:
+            rejects.append((line_no, username, "Duplicate email in file"))
+        else:
+            seen_usernames.add(username.lower())
+            seen_emails.add(member["Email"].lower())
+            candidates.append((line_no, member, hashed))
+    return candidates
+
+
+def insert_members(cursor, rows):
+    # A multi-row INSERT still fires after_member_insert once per row
+    cursor.executemany("""
+        INSERT INTO Members 
+        (Username, Password, First_Name, Last_Name, Email, Status) 
+        VALUES (%s, %s, %s, %s, %s, 'Active')
+    """, [(member["Username"], hashed, member["First_Name"], member["Last_Name"], member["Email"])
+          for _, member, hashed in rows])
+
+
+def import_member_chunk(conn, candidates, enrolled, rejects):
+    """Check one chunk against Members in a single query and insert the rest"""
+    if not candidates:
+        return 0
+    cursor = conn.cursor()
+    try:
+        usernames = [member["Username"] for _, member, _ in candidates]
+        emails = [member["Email"] for _, member, _ in candidates]
+        cursor.execute(f"""
+            SELECT Username, Email FROM Members
+            WHERE Username IN ({in_clause(usernames)}) OR Email IN ({in_clause(emails)})
+        """, usernames + emails)
+        taken_usernames = set()
+        taken_emails = set()
+        for username, email in cursor.fetchall():
+            taken_usernames.add(username.lower())
+            taken_emails.add(email.lower())
+
+        rows = []
+        for line_no, member, hashed in candidates:
+            if member["Username"].lower() in taken_usernames:
+                rejects.append((line_no, member["Username"], "Username already exists"))
+            elif member["Email"].lower() in taken_emails:
+                rejects.append((line_no, member["Username"], "Email already exists"))
+            else:
+                rows.append((line_no, member, hashed))
+        if not rows:
+            conn.rollback()
+            return 0
+
+        try:
+            insert_members(cursor, rows)
+            conn.commit()
+            inserted = rows
+        except mysql.connector.Error:
+            # A clashing member registered since the check, or a row the database refuses;
+            # isolate the offenders
+            conn.rollback()
+            inserted = []
+            for row in rows:
+                try:
+                    insert_members(cursor, [row])
+                    conn.commit()
+                    inserted.append(row)
+                except mysql.connector.IntegrityError as error:
+                    conn.rollback()
+                    rejects.append((row[0], row[1]["Username"], f"Already exists: {error.msg}"))
+                except mysql.connector.Error as error:
+                    conn.rollback()
+                    rejects.append((row[0], row[1]["Username"], f"Insert failed: {error.msg}"))
+
+        if inserted:
+            names = [member["Username"] for _, member, _ in inserted]
+            cursor.execute(
+                f"SELECT Username, Member_ID FROM Members WHERE Username IN ({in_clause(names)})",
+                names
+            )
+            member_ids = {username.lower(): member_id for username, member_id in cursor.fetchall()}
+            conn.commit()
+            for line_no, member, _ in inserted:
+                enrolled.append((line_no, member["Username"], member_ids.get(member["Username"].lower())))
+        return len(inserted)
+    except mysql.connector.Error as error:
+        conn.rollback()
+        for line_no, member, _ in candidates:
+            rejects.append((line_no, member["Username"], f"Chunk failed: {error}"))
+        return 0
+    finally:
+        cursor.close()
+
+
+def import_members(handle, file_format="csv", chunk_size=CHUNK_SIZE, workers=0, progress=None):
+    """Stream a roster into Members.
+
+    Passwords are hashed in the calling thread by default; a SHA-256 takes
+    microseconds, far less than the chunk insert. With workers > 0 threads
+    hash the next chunks while this one waits on the database. That only
+    overlaps hashing with the writes: hashlib keeps the GIL for inputs this
+    short, so the hashing itself never runs in parallel. The report has the
+    same shape as import_books plus an "enrolled" list of (line, username,
+    Member_ID).
+    """
+    started = time.perf_counter()
+    report = {"read": 0, "inserted": 0, "rejected": [], "enrolled": [], "seconds": 0.0, "rows_per_second": 0.0}
+    seen_usernames = set()
+    seen_emails = set()
+
+    def process(chunk, hashed_passwords):
+        rows = [(line_no, member, hashed) for (line_no, member), hashed in zip(chunk, hashed_passwords)]
+        candidates = check_member_rows(rows, seen_usernames, seen_emails, report["rejected"])
+        report["read"] += len(chunk)
+        report["inserted"] += import_member_chunk(conn, candidates, report["enrolled"], report["rejected"])
+        if progress:
+            progress(report["read"])
+
+    conn = get_connection()
+    pool = ThreadPoolExecutor(max_workers=workers) if workers else None
+    try:
+        records = ((line_no, normalise(record, MEMBER_FIELDS))
+                   for line_no, record in iter_records(handle, file_format))
+        pending = deque()
+        for chunk in chunked(records, chunk_size):
+            passwords = [member["Password"] for _, member in chunk]
+            if pool is None:
+                process(chunk, hash_passwords(passwords))
+                continue
+            pending.append((chunk, pool.submit(hash_passwords, passwords)))
+            if len(pending) > workers:
+                done_chunk, future = pending.popleft()
+                process(done_chunk, future.result())
+        while pending:
+            done_chunk, future = pending.popleft()
+            process(done_chunk, future.result())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        conn.close()
+
+    report["seconds"] = time.perf_counter() - started
+    if report["seconds"] > 0:
+        report["rows_per_second"] = report["read"] / report["seconds"]
+    return report
+
+
+def member_statuses(report):
+    """Every roster row in file order as (line, username, status, detail)"""
+    rows = [(line_no, username, "Enrolled", f"Member_ID {member_id}")
+            for line_no, username, member_id in report["enrolled"]]
+    rows += [(line_no, username, "Rejected", reason) for line_no, username, reason in report["rejected"]]
+    return sorted(rows, key=lambda row: row[0])
+
+
+# Command line
+def write_rejects(path, rejects):
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["Line", "Key", "Reason"])
+        writer.writerows(rejects)
+
+
+def print_report(report, rejects_path=None):
+    print(f"Read {report['read']} rows, inserted {report['inserted']}, "
+          f"rejected {len(report['rejected'])} in {report['seconds']:.1f}s "
+          f"({report['rows_per_second']:.0f} rows/s)")
+    if rejects_path:
+        write_rejects(rejects_path, report["rejected"])
+        print(f"Rejected rows written to {rejects_path}")
+    else:
+        for line_no, key, reason in report["rejected"][:50]:
+            print(f"  line {line_no}: {key} - {reason}")
+        if len(report["rejected"]) > 50:
+            print(f"  ... {len(report['rejected']) - 50} more (use --rejects to save them all)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import into the Exam Centre database")
+    parser.add_argument("kind", choices=["books", "members"])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "json", "jsonl"])
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="members: threads hashing ahead of the inserts (default 0: hash inline)")
+    parser.add_argument("--rejects", help="write rejected rows to this CSV file")
+    parser.add_argument("--report", help="members: write the status of every row to this CSV file")
+    args = parser.parse_args()
+
+    file_format = args.format or detect_format(args.path)
+    show_progress = lambda done: print(f"\r{done} rows", end="", flush=True)
+    with open(args.path, newline="", encoding="utf-8-sig") as handle:
+        if args.kind == "books":
+            report = import_books(handle, file_format, args.chunk_size, progress=show_progress)
+        else:
+            report = import_members(handle, file_format, args.chunk_size, args.workers, progress=show_progress)
+    print()
+    print_report(report, args.rejects)
+    if args.report and args.kind == "members":
+        with open(args.report, "w", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(["Line", "Username", "Status", "Detail"])
+            writer.writerows(member_statuses(report))
+        print(f"Per-row status written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+
+from utils import fulltext_words
+
+CATALOG_CACHE_CONFIG = {
+    "ttl": 60,            # seconds a cached listing stays valid
+    "max_entries": 256    # least recently used listings are evicted past this
+}
+
+
+class CatalogCache:
+    """In-process cache of BookListView listings keyed by search term.
+
+    Every cached listing remembers which ISBNs it contains, so a write to one
+    book only drops the listings that actually show it.
+    """
+
+    def __init__(self, ttl=60, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (expires_at, rows)
+        self._by_isbn = {}              # isbn -> set of keys
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def make_key(search_term):
+        # BookListView is searched with case-insensitive LIKE, so normalise the same way
+        return (search_term or "").lower()
+
+    def generation(self):
+        """Token to pass back to put() so a load racing a write is not cached"""
+        with self._lock:
+            return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            expires_at, rows = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return list(rows)
+
+    def put(self, key, rows, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, list(rows))
+            for row in rows:
+                self._by_isbn.setdefault(row["ISBN"], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._stats["evictions"] += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for row in entry[1]:
+            keys = self._by_isbn.get(row["ISBN"])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_isbn[row["ISBN"]]
+
+    def invalidate_isbn(self, isbn):
+        """Drop every listing that contains this ISBN (delete, borrow, return)"""
+        with self._lock:
+            self._generation += 1
+            for key in list(self._by_isbn.get(isbn, ())):
+                self._drop(key)
+                self._stats["invalidations"] += 1
+
+    def invalidate_new_book(self, title, author, category):
+        """Drop the listings a newly added book would now appear in"""
+        haystack = " ".join(value.lower() for value in (title, author, category) if value)
+        with self._lock:
+            self._generation += 1
+            for key in list(self._entries):
+                if self._would_list(key, haystack):
+                    self._drop(key)
+                    self._stats["invalidations"] += 1
+
+    @staticmethod
+    def _would_list(key, haystack):
+        # Full-text searches only require the words build_fulltext_query keeps, each as a
+        # prefix; a key with none of them is answered by the LIKE fallback on the whole term
+        words = fulltext_words(key)
+        if words:
+            return all(word in haystack for word in words)
+        return key in haystack
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_isbn.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+catalog_cache = CatalogCache(**CATALOG_CACHE_CONFIG)
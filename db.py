@@ -0,0 +1,343 @@
+import itertools
+import queue
+import threading
+import time
+
+import mysql.connector
+
+# Configuration and Constants
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "12345",
+    "database": "lib_mgmt"
+}
+
+POOL_CONFIG = {
+    "size": 10,                    # maximum open connections per process
+    "checkout_timeout": 5,         # seconds to wait for a free connection
+    "health_check_interval": 30    # ping connections idle longer than this (seconds)
+}
+
+# Read replicas for get_read_connection; each entry overrides DB_CONFIG,
+# e.g. {"host": "replica1"} or {"host": "127.0.0.1", "port": 3307}
+REPLICA_CONFIGS = []
+
+ROUTING_CONFIG = {
+    "max_lag_seconds": 5,          # replicas further behind than this are skipped
+    "sticky_seconds": 2,           # reads for a key stay on the primary at least this long after its write
+    "lag_check_interval": 1        # seconds between replication lag probes of one replica
+}
+
+
+class PoolTimeoutError(mysql.connector.Error):
+    """Raised when no pooled connection becomes free within the checkout timeout"""
+
+
+class PooledConnection:
+    """Wraps a pooled connection so that close() hands it back to the pool"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise mysql.connector.Error("Connection has already been returned to the pool")
+        return getattr(self._conn, name)
+
+    @property
+    def statement_cache(self):
+        """Prepared cursors for this connection; they live as long as the underlying connection"""
+        if self._conn is None:
+            raise mysql.connector.Error("Connection has already been returned to the pool")
+        return self._pool.statement_cache(self._conn)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe pool of MySQL connections shared by the whole process"""
+
+    def __init__(self, db_config, size=10, checkout_timeout=5, health_check_interval=30):
+        self.db_config = db_config
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        self._statements = {}           # id(connection) -> {statement name: prepared cursor}
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "wait_seconds": 0.0
+        }
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self.db_config)
+        with self._lock:
+            self._stats["created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        self._statements.pop(id(conn), None)
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+        with self._lock:
+            self._open -= 1
+            self._stats["discarded"] += 1
+
+    def statement_cache(self, conn):
+        return self._statements.setdefault(id(conn), {})
+
+    def _is_healthy(self, conn, idle_since):
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def _reserve_slot(self):
+        with self._lock:
+            if self._open < self.size:
+                self._open += 1
+                return True
+        return False
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        while True:
+            try:
+                conn, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                if self._reserve_slot():
+                    try:
+                        conn = self._connect()
+                    except mysql.connector.Error:
+                        with self._lock:
+                            self._open -= 1
+                        raise
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    with self._lock:
+                        self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available within {self.checkout_timeout}s "
+                        f"(pool size {self.size})"
+                    )
+                # Wake up periodically in case a discarded connection freed a slot
+                try:
+                    conn, idle_since = self._idle.get(timeout=min(remaining, 0.5))
+                except queue.Empty:
+                    continue
+            if self._is_healthy(conn, idle_since):
+                break
+            self._discard(conn)
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["wait_seconds"] += time.monotonic() - started
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        # Never hand unread results or a half-finished transaction to the next caller
+        try:
+            conn.consume_results()
+            if conn.in_transaction:
+                conn.rollback()
+        except mysql.connector.Error:
+            self._discard(conn)
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open"] = self._open
+        stats["idle"] = self._idle.qsize()
+        stats["in_use"] = stats["open"] - stats["idle"]
+        stats["size"] = self.size
+        return stats
+
+    def close_all(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+class ReadRouter:
+    """Sends read-only work to a replica that has caught up, and the rest to the primary.
+
+    Callers name what a read depends on with a key (a member, the catalog).
+    note_write(key) after a commit keeps that key's reads on the primary until
+    every candidate replica must have replayed the write: at least
+    sticky_seconds, and longer than the replica's measured lag.
+    """
+
+    def __init__(self, primary, replicas, max_lag_seconds=5, sticky_seconds=2, lag_check_interval=1):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag = max_lag_seconds
+        self.sticky = sticky_seconds
+        self.lag_check_interval = lag_check_interval
+        self._lags = [None] * len(replicas)
+        self._checked = [0.0] * len(replicas)
+        self._writes = {}               # key -> time.monotonic() of its last write
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._stats = {
+            "primary_reads": 0,
+            "replica_reads": 0,
+            "sticky_reads": 0,          # primary reads because the key was written recently
+            "lag_fallbacks": 0,         # primary reads because every replica was too far behind
+            "error_fallbacks": 0        # primary reads because no replica connection could be had
+        }
+
+    def note_write(self, *keys):
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                self._writes[key] = now
+            if len(self._writes) > 10000:
+                # Nothing older than this can still be sticky
+                horizon = now - max(self.sticky, self.max_lag + self.lag_check_interval)
+                self._writes = {key: at for key, at in self._writes.items() if at > horizon}
+
+    def _lag(self, index):
+        """Seconds the replica is behind, probed at most once per lag_check_interval; None if unknown"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked[index] < self.lag_check_interval:
+                return self._lags[index]
+            # Claim the probe so other threads keep using the last value meanwhile
+            self._checked[index] = now
+        lag = None
+        try:
+            conn = self.replicas[index].acquire()
+            try:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute("SHOW REPLICA STATUS")
+                row = cursor.fetchone()
+                cursor.close()
+            finally:
+                conn.close()
+            # A server that is not replicating is a standalone read copy with nothing to catch up on;
+            # a stopped replica reports NULL and is skipped
+            lag = 0 if row is None else row["Seconds_Behind_Source"]
+        except mysql.connector.Error:
+            pass
+        with self._lock:
+            self._lags[index] = lag
+        return lag
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def acquire(self, key=None):
+        if not self.replicas:
+            self._count("primary_reads")
+            return self.primary.acquire()
+        with self._lock:
+            written = self._writes.get(key) if key is not None else None
+        since_write = time.monotonic() - written if written is not None else None
+        reason = "lag_fallbacks"
+        start = next(self._turn)
+        for offset in range(len(self.replicas)):
+            index = (start + offset) % len(self.replicas)
+            lag = self._lag(index)
+            if lag is None or lag > self.max_lag:
+                continue
+            if since_write is not None and since_write < max(self.sticky, lag + self.lag_check_interval):
+                reason = "sticky_reads"
+                continue
+            try:
+                conn = self.replicas[index].acquire()
+            except mysql.connector.Error:
+                reason = "error_fallbacks"
+                continue
+            self._count("replica_reads")
+            return conn
+        self._count(reason)
+        self._count("primary_reads")
+        return self.primary.acquire()
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+            lags = list(self._lags)
+        stats["replicas"] = len(self.replicas)
+        for index, lag in enumerate(lags):
+            stats[f"replica{index}_lag_seconds"] = lag if lag is not None else -1
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_router = None
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_CONFIG, **POOL_CONFIG)
+    return _pool
+
+
+def get_connection():
+    """Check a connection out of the pool; close() returns it"""
+    return get_pool().acquire()
+
+
+def pool_metrics():
+    return get_pool().metrics()
+
+
+def get_router():
+    """Return the process-wide read router over the primary pool and one pool per replica"""
+    global _router
+    if _router is None:
+        primary = get_pool()
+        with _pool_lock:
+            if _router is None:
+                replicas = [ConnectionPool({**DB_CONFIG, **config}, **POOL_CONFIG) for config in REPLICA_CONFIGS]
+                _router = ReadRouter(primary, replicas, **ROUTING_CONFIG)
+    return _router
+
+
+def get_read_connection(key=None):
+    """Check out a connection for read-only work; a replica when one is caught up for key"""
+    return get_router().acquire(key)
+
+
+def note_write(*keys):
+    """Record a committed write so reads for these keys see it (read-your-writes)"""
+    get_router().note_write(*keys)
+
+
+def routing_metrics():
+    return get_router().metrics()
@@ -0,0 +1,66 @@
+"""Expire uncollected holds by hand or from cron.
+
+Usage:
+    python holds.py [--batch-size 500]
+
+A returned copy is set aside for the next Waiting hold on its title and
+the holder has until Expires_At to collect it. ExpireHolds closes the
+holds that ran out, in short batches, and passes each copy on to the
+next holder or back to the shelf. The database also runs it hourly
+through the expire_holds_hourly event when event_scheduler is on.
+
+Availability changes made here or by the event are not seen by the
+portal's catalog cache, which keeps showing them for up to its TTL
+(CATALOG_CACHE_CONFIG["ttl"]). Queue the expire_holds job from the admin
+Jobs page instead when the catalog must update at once.
+"""
+import argparse
+
+import mysql.connector
+
+from db import get_connection
+
+BATCH_SIZE = 500
+
+
+def open_holds(cursor):
+    cursor.execute("""
+        SELECT Status, COUNT(*) FROM Holds
+        WHERE Status IN ('Waiting', 'Ready')
+        GROUP BY Status
+    """)
+    return dict(cursor.fetchall())
+
+
+def expire_holds(conn, batch_size=BATCH_SIZE):
+    """Call ExpireHolds and return the number of holds it expired"""
+    cursor = conn.cursor()
+    try:
+        cursor.callproc('ExpireHolds', (batch_size,))
+        for result in cursor.stored_results():
+            return result.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expire holds that were not collected in time")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        expired = expire_holds(conn, args.batch_size)
+        cursor = conn.cursor()
+        counts = open_holds(cursor)
+        cursor.close()
+        print(f"Expired {expired} holds; {counts.get('Waiting', 0)} waiting, "
+              f"{counts.get('Ready', 0)} ready for pickup")
+    except mysql.connector.Error as error:
+        print(f"Error expiring holds: {error}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,16 @@
 import mysql.connector
+import json
 from datetime import datetime
 
+from db import get_connection
+from metrics import query_timer
+import queries
+
+RETURNS_BATCH_SIZE = 20
+
 def connect_to_database():
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="12345",
-            database="lib_mgmt"
-        )
-        return connection
+        return get_connection()
     except mysql.connector.Error as error:
         print(f"Error connecting to database: {error}")
         return None
@@ -26,21 +27,16 @@ def add_book():
         return
     
     try:
-        cursor = conn.cursor()
-        
         # Check if author exists
-        cursor.execute("SELECT Author_ID FROM Authors WHERE Author_Name = %s", (author,))
-        author_result = cursor.fetchone()
+        author_result = queries.fetch_one(conn, "author_id_by_name", (author,))
         
         if author_result:
             author_id = author_result[0]
         else:
-            cursor.execute("INSERT INTO Authors (Author_Name) VALUES (%s)", (author,))
-            author_id = cursor.lastrowid
+            author_id = queries.execute(conn, "author_insert", (author,)).lastrowid
         
         # Get category ID
-        cursor.execute("SELECT Category_ID FROM Categories WHERE Category_Name = %s", (category,))
-        category_result = cursor.fetchone()
+        category_result = queries.fetch_one(conn, "category_id_by_name", (category,))
         
         if not category_result:
             print("Invalid category!")
@@ -49,10 +45,7 @@ def add_book():
         category_id = category_result[0]
         
         # Insert book
-        cursor.execute("""
-            INSERT INTO Books (ISBN, Title, Author_ID, Category_ID) 
-            VALUES (%s, %s, %s, %s)
-        """, (isbn, title, author_id, category_id))
+        queries.execute(conn, "book_insert", (isbn, title, author_id, category_id))
         
         conn.commit()
         print("Book added successfully!")
@@ -74,20 +67,13 @@ def add_member():
         return
     
     try:
-        cursor = conn.cursor()
-        
         # Check if username exists
-        cursor.execute("SELECT COUNT(*) FROM Members WHERE Username = %s", (username,))
-        if cursor.fetchone()[0] > 0:
+        if queries.fetch_one(conn, "username_taken", (username,))[0] > 0:
             print("Username already exists!")
             return
         
         # Insert member
-        cursor.execute("""
-            INSERT INTO Members 
-            (Username, Password, First_Name, Last_Name, Email, Status) 
-            VALUES (%s, %s, %s, %s, %s, 'Active')
-        """, (username, password, first_name, last_name, email))
+        queries.execute(conn, "member_insert", (username, password, first_name, last_name, email))
         
         conn.commit()
         print("Member added successfully!")
@@ -103,38 +89,20 @@ def view_books():
         return
     
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT 
-                b.ISBN,
-                b.Title,
-                a.Author_Name,
-                c.Category_Name,
-                CASE 
-                    WHEN EXISTS (
-                        SELECT 1 FROM MemberTransactions mt 
-                        WHERE mt.ISBN = b.ISBN AND mt.Status = 'Active'
-                    ) THEN 'Borrowed'
-                    ELSE 'Available'
-                END as Status
-            FROM Books b
-            JOIN Authors a ON b.Author_ID = a.Author_ID
-            JOIN Categories c ON b.Category_ID = c.Category_ID
-        """)
-        
-        books = cursor.fetchall()
+        books = queries.fetch_all(conn, "books_with_loan_status", dictionary=True)
         if not books:
             print("No books found!")
             return
             
         print("\nBook List:")
-        print("-" * 80)
-        print(f"{'ISBN':<15} {'Title':<25} {'Author':<20} {'Category':<15} {'Status':<10}")
-        print("-" * 80)
+        print("-" * 88)
+        print(f"{'ISBN':<15} {'Title':<25} {'Author':<20} {'Category':<15} {'Status':<10} {'Copies':<7}")
+        print("-" * 88)
         
         for book in books:
+            copies = f"{book['Available_Copies']}/{book['Total_Copies']}"
             print(f"{book['ISBN']:<15} {book['Title'][:24]:<25} {book['Author_Name'][:19]:<20} "
-                  f"{book['Category_Name'][:14]:<15} {book['Status']:<10}")
+                  f"{book['Category_Name'][:14]:<15} {book['Status']:<10} {copies:<7}")
     except mysql.connector.Error as error:
         print(f"Error viewing books: {error}")
     finally:
@@ -149,34 +117,20 @@ def delete_book():
         return
     
     try:
-        cursor = conn.cursor()
-        
-        # Check if book exists and is not borrowed
-        cursor.execute("""
-            SELECT b.Title, 
-                   EXISTS (
-                       SELECT 1 FROM MemberTransactions mt 
-                       WHERE mt.ISBN = b.ISBN AND mt.Status = 'Active'
-                   ) as is_borrowed
-            FROM Books b
-            WHERE b.ISBN = %s
-        """, (isbn,))
-        
-        result = cursor.fetchone()
+        result = queries.fetch_one(conn, "book_loan_check", (isbn,))
         if not result:
             print("Book not found!")
             return
-            
-        if result[1]:  # is_borrowed
-            print("Cannot delete book - currently borrowed!")
-            return
-            
-        # Delete book
-        cursor.execute("DELETE FROM Books WHERE ISBN = %s", (isbn,))
-        conn.commit()
+        
+        # DeleteBook refuses books on loan or with archived or admin history, which have no foreign keys
+        cursor = conn.cursor()
+        with query_timer("DeleteBook"):
+            cursor.execute("CALL DeleteBook(%s, %s)", (None, isbn))
+            conn.commit()
+        cursor.close()
         print(f"Book '{result[0]}' deleted successfully!")
     except mysql.connector.Error as error:
-        print(f"Error deleting book: {error}")
+        print(f"Error deleting book: {error.msg}")
     finally:
         conn.close()
 
@@ -187,22 +141,7 @@ def view_members():
         return
     
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT 
-                Member_ID,
-                Username,
-                First_Name,
-                Last_Name,
-                Email,
-                Status,
-                (SELECT COUNT(*) FROM MemberTransactions 
-                 WHERE Member_ID = m.Member_ID AND Status = 'Active') as Active_Borrows
-            FROM Members m
-            ORDER BY Member_ID
-        """)
-        
-        members = cursor.fetchall()
+        members = queries.fetch_all(conn, "members_with_active_borrows", dictionary=True)
         if not members:
             print("No members found!")
             return
@@ -234,19 +173,8 @@ def delete_member():
         return
     
     try:
-        cursor = conn.cursor()
-        
         # Check if member exists and has no active borrows
-        cursor.execute("""
-            SELECT 
-                CONCAT(First_Name, ' ', Last_Name) as full_name,
-                (SELECT COUNT(*) FROM MemberTransactions 
-                 WHERE Member_ID = m.Member_ID AND Status = 'Active') as active_borrows
-            FROM Members m
-            WHERE Member_ID = %s
-        """, (member_id,))
-        
-        result = cursor.fetchone()
+        result = queries.fetch_one(conn, "member_loan_check", (member_id,))
         if not result:
             print("Member not found!")
             return
@@ -256,7 +184,7 @@ def delete_member():
             return
             
         # Delete member
-        cursor.execute("DELETE FROM Members WHERE Member_ID = %s", (member_id,))
+        queries.execute(conn, "member_delete", (member_id,))
         conn.commit()
         print(f"Member '{result[0]}' deleted successfully!")
     except mysql.connector.Error as error:
@@ -264,6 +192,50 @@ def delete_member():
     finally:
         conn.close()
 
+def process_returns(conn, barcodes, session):
+    with query_timer("ReturnBook") as timer:
+        results = queries.call(conn, 'ReturnBook', (None, json.dumps(barcodes)))
+        timer.rows = len(results)
+    for isbn, barcode, member_id, code, fine in results:
+        if code == 'OK':
+            session['count'] += 1
+            session['fines'] += fine
+            print(f"  {barcode} ({isbn}): returned by member {member_id}, fine ₹{fine}")
+        elif code == 'UNKNOWN_COPY':
+            print(f"  {barcode}: no copy has this barcode")
+        else:
+            print(f"  {barcode} ({isbn}): no active loan found")
+    print(f"  Session: {session['count']} returned, ₹{session['fines']} in fines")
+
+def returns_desk():
+    print("\n=== Returns Desk ===")
+    print(f"Scan copy barcodes one per line. Returns are processed every {RETURNS_BATCH_SIZE} scans")
+    print("or on an empty line. Enter 'q' to finish.")
+    
+    conn = connect_to_database()
+    if not conn:
+        return
+    
+    session = {'count': 0, 'fines': 0}
+    pending = []
+    try:
+        while True:
+            barcode = input("> ").strip()
+            if barcode.lower() == 'q':
+                break
+            if barcode:
+                pending.append(barcode)
+            if pending and (not barcode or len(pending) >= RETURNS_BATCH_SIZE):
+                process_returns(conn, pending, session)
+                pending = []
+        if pending:
+            process_returns(conn, pending, session)
+        print(f"\nDesk closed: {session['count']} books returned, ₹{session['fines']} in fines")
+    except mysql.connector.Error as error:
+        print(f"Error processing returns: {error}")
+    finally:
+        conn.close()
+
 def main():
     while True:
         print("\n=== Exam Centre Management System ===")
@@ -273,9 +245,10 @@ def main():
         print("4. View Members")
         print("5. Delete Book")
         print("6. Delete Member")
-        print("7. Exit")
+        print("7. Returns Desk")
+        print("8. Exit")
         
-        choice = input("\nEnter your choice (1-7): ")
+        choice = input("\nEnter your choice (1-8): ")
         
         if choice == '1':
             add_book()
@@ -290,6 +263,8 @@ def main():
         elif choice == '6':
             delete_member()
         elif choice == '7':
+            returns_desk()
+        elif choice == '8':
             print("\nThank you for using the Exam Centre  Management System!")
             break
         else:
@@ -0,0 +1,536 @@
+"""Run long admin operations in the background instead of inside a page render.
+
+Usage:
+    python jobs.py worker [--workers 2]
+    python jobs.py list [--limit 20]
+    python jobs.py cancel JOB_ID
+
+The admin Jobs page only inserts a row into Jobs and reads the recent rows
+back. Executor threads, either in the Streamlit process or in a separate
+`jobs.py worker`, claim Queued jobs with FOR UPDATE SKIP LOCKED, so any
+number of them can share the queue. A job reports progress through its
+JobContext; each report also refreshes the heartbeat and picks up a
+cancel request, which stops the job before its next step. Running jobs
+whose heartbeat is older than stale_after seconds are marked Failed; each
+claim carries its own token, so a run that was reaped can no longer
+report progress or overwrite that outcome.
+"""
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import date
+
+import mysql.connector
+
+import accrual
+import analytics
+import archive
+import audit
+from db import get_connection
+import holds
+
+JOBS_CONFIG = {
+    "workers": 2,               # executor threads per process
+    "poll_interval": 1.0,       # seconds between looks at the queue when it is empty
+    "progress_interval": 1.0,   # minimum seconds between progress writes from one job
+    "stale_after": 600          # Running jobs without a heartbeat this long are failed; keep it
+                                # above the longest single step (one procedure call) of any job
+}
+
+RECENT_JOBS = 50
+REAP_INTERVAL = 60  # seconds between checks for stale Running jobs
+FINISH_ATTEMPTS = 3  # tries at recording how a job ended before counting it as lost
+MESSAGE_LENGTH = 500  # Jobs.Message
+
+# Job type -> function(ctx, **params) returning a JSON-serialisable result
+JOB_TYPES = {}
+# Job type -> callables run after a job of that type ends, however it ended. Every
+# process with a started executor watches Jobs.Finished_At and runs its own hooks,
+# so a job run by a separate `jobs.py worker` still reaches the portal's caches.
+FINISH_HOOKS = {}
+
+
+def job_type(name):
+    def register(function):
+        JOB_TYPES[name] = function
+        return function
+    return register
+
+
+def on_finish(name, hook):
+    FINISH_HOOKS.setdefault(name, []).append(hook)
+
+
+class JobCancelled(Exception):
+    """Raised from JobContext.progress once the job has been asked to stop, or is no longer this run's"""
+
+
+class JobContext:
+    """What a running job sees: its parameters, a work connection and progress reporting"""
+
+    def __init__(self, job_id, token, conn, progress_interval=1.0):
+        self.job_id = job_id
+        self.token = token
+        self.conn = conn
+        self.progress_interval = progress_interval
+        self.done = 0
+        self.total = None
+        self.message = None
+        self._reported_at = 0.0
+
+    def progress(self, done, total=None, message=None, force=False):
+        """Record progress; writes at most once per progress_interval and raises JobCancelled when asked to stop"""
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message
+        now = time.monotonic()
+        if not force and now - self._reported_at < self.progress_interval:
+            return
+        self._reported_at = now
+        # Progress goes through its own short transaction so it never mixes with the job's work
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE Jobs
+                SET Progress_Done = %s, Progress_Total = %s, Message = %s, Heartbeat_At = NOW()
+                WHERE Job_ID = %s AND Status = 'Running' AND Claim_Token = %s
+            """, (self.done, self.total, truncate(self.message), self.job_id, self.token))
+            cursor.execute("""
+                SELECT Cancel_Requested, Status = 'Running' AND Claim_Token = %s
+                FROM Jobs WHERE Job_ID = %s
+            """, (self.token, self.job_id))
+            row = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        # A reaped job is no longer ours, so stop as if cancelled
+        if not row or row[0] or not row[1]:
+            raise JobCancelled()
+
+
+def truncate(message):
+    return message[:MESSAGE_LENGTH] if message else message
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def submit(job_type_name, params=None, admin_id=None):
+    """Queue a job and return its Job_ID"""
+    if job_type_name not in JOB_TYPES:
+        raise ValueError(f"Unknown job type: {job_type_name}")
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO Jobs (Job_Type, Params, Submitted_By) VALUES (%s, %s, %s)",
+            (job_type_name, json.dumps(params or {}), admin_id)
+        )
+        job_id = cursor.lastrowid
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    job_executor.wake()
+    return job_id
+
+
+def cancel(job_id):
+    """Cancel a Queued job outright or ask a Running one to stop; returns False if it had already finished"""
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        # Finished_At is assigned before Status, so it still sees the old Status
+        cursor.execute("""
+            UPDATE Jobs
+            SET Cancel_Requested = TRUE,
+                Finished_At = IF(Status = 'Queued', NOW(), Finished_At),
+                Status = IF(Status = 'Queued', 'Cancelled', Status)
+            WHERE Job_ID = %s AND Status IN ('Queued', 'Running')
+        """, (job_id,))
+        changed = cursor.rowcount > 0
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    return changed
+
+
+def recent_jobs(conn, limit=RECENT_JOBS):
+    """The newest jobs as dicts, without their Params and Result payloads"""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT Job_ID, Job_Type, Status, Progress_Done, Progress_Total, Message,
+                   Cancel_Requested, Submitted_By, Worker, Created_At, Started_At,
+                   Heartbeat_At, Finished_At
+            FROM Jobs
+            ORDER BY Job_ID DESC
+            LIMIT %s
+        """, (limit,))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def job_result(conn, job_id):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT Result FROM Jobs WHERE Job_ID = %s", (job_id,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return json.loads(row[0]) if row and row[0] else None
+
+
+class JobExecutor:
+    """A small pool of threads that claim and run Queued jobs.
+
+    Threads start on first use, like the Last_Login writer, so importing
+    this module from a CLI costs nothing.
+    """
+
+    def __init__(self, workers=2, poll_interval=1.0, progress_interval=1.0, stale_after=600):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.progress_interval = progress_interval
+        self.stale_after = stale_after
+        self.name = worker_name()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._reaped_at = 0.0
+        self._watching = threading.Lock()
+        self._finished_since = None     # database time the finished-job watch has read up to
+        self._finished_seen = set()     # jobs already handled that finished at exactly that time
+        self._stats = {"claimed": 0, "succeeded": 0, "failed": 0, "cancelled": 0, "reaped": 0, "lost": 0,
+                       "running": 0}
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"job-executor-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.watch_finished()
+                if self.reap_stale() or self.run_next():
+                    continue
+            except mysql.connector.Error:
+                pass  # database unavailable; try again after the poll interval
+            except Exception:
+                # Anything else is a bug, but it must not end the thread: nothing restarts it
+                traceback.print_exc()
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def claim(self):
+        """Mark the oldest Queued job Running for this executor; returns (job_id, token, type, params) or None.
+
+        The token is fresh for every claim, so only this run can later
+        report progress on the row or record how it ended. params is still
+        the raw JSON, decoded by _execute so bad Params fail just that job.
+        """
+        token = uuid.uuid4().hex
+        conn = get_connection()
+        try:
+            conn.start_transaction()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT Job_ID, Job_Type, Params FROM Jobs
+                WHERE Status = 'Queued'
+                ORDER BY Job_ID
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            """)
+            row = cursor.fetchone()
+            if row:
+                cursor.execute("""
+                    UPDATE Jobs
+                    SET Status = 'Running', Worker = %s, Claim_Token = %s, Started_At = NOW(), Heartbeat_At = NOW()
+                    WHERE Job_ID = %s
+                """, (self.name, token, row[0]))
+            conn.commit()
+            cursor.close()
+        except mysql.connector.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job_id, name, params = row
+        return job_id, token, name, params
+
+    def run_next(self):
+        """Claim and run one job; returns False when the queue was empty"""
+        claimed = self.claim()
+        if claimed is None:
+            return False
+        job_id, token, name, params = claimed
+        with self._lock:
+            self._stats["claimed"] += 1
+            self._stats["running"] += 1
+        try:
+            status, message, result = self._execute(job_id, token, name, params)
+        finally:
+            with self._lock:
+                self._stats["running"] -= 1
+        recorded = False
+        for attempt in range(FINISH_ATTEMPTS):
+            try:
+                recorded = self._finish(job_id, token, status, message, result)
+                break
+            except mysql.connector.Error:
+                # Left Running, a job that succeeded would be reaped as failed
+                traceback.print_exc()
+                if attempt + 1 < FINISH_ATTEMPTS:
+                    time.sleep(self.poll_interval)
+        with self._lock:
+            self._stats[status.lower() if recorded else "lost"] += 1
+        return True
+
+    def _finish(self, job_id, token, status, message, result):
+        """Record how a job ended; returns False if this run no longer holds the claim"""
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            # Only the run holding the claim may finish the job; the reaper may have failed it meanwhile
+            cursor.execute("""
+                UPDATE Jobs
+                SET Status = %s, Message = %s, Result = %s, Finished_At = NOW(), Heartbeat_At = NOW()
+                WHERE Job_ID = %s AND Status = 'Running' AND Claim_Token = %s
+            """, (status, truncate(message), json.dumps(result, default=str) if result is not None else None,
+                  job_id, token))
+            recorded = cursor.rowcount > 0
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        return recorded
+
+    def watch_finished(self):
+        """Run FINISH_HOOKS for jobs that ended since the last look, whichever process ran them"""
+        if not FINISH_HOOKS or not self._watching.acquire(blocking=False):
+            return 0
+        try:
+            names = list(FINISH_HOOKS)
+            conn = get_connection()
+            try:
+                cursor = conn.cursor()
+                if self._finished_since is None:
+                    # Start from now: earlier jobs ended before this process cached anything
+                    cursor.execute("SELECT NOW()")
+                    self._finished_since = cursor.fetchone()[0]
+                    rows = []
+                else:
+                    cursor.execute(f"""
+                        SELECT Job_ID, Job_Type, Finished_At FROM Jobs
+                        WHERE Finished_At >= %s AND Job_Type IN ({', '.join(['%s'] * len(names))})
+                    """, (self._finished_since, *names))
+                    rows = cursor.fetchall()
+                cursor.close()
+            finally:
+                conn.close()
+
+            fresh = [(job_id, name) for job_id, name, _ in rows if job_id not in self._finished_seen]
+            if rows:
+                # Finished_At has whole seconds, so the last second is read again next time
+                latest = max(finished for _, _, finished in rows)
+                self._finished_seen = {job_id for job_id, _, finished in rows if finished == latest}
+                self._finished_since = latest
+            for name in {name for _, name in fresh}:
+                for hook in FINISH_HOOKS[name]:
+                    # One failing hook must not keep the others from running
+                    try:
+                        hook()
+                    except Exception:
+                        traceback.print_exc()
+            return len(fresh)
+        finally:
+            self._watching.release()
+
+    def _execute(self, job_id, token, name, params):
+        function = JOB_TYPES.get(name)
+        if function is None:
+            return "Failed", f"Unknown job type: {name}", None
+        conn = get_connection()
+        ctx = JobContext(job_id, token, conn, self.progress_interval)
+        try:
+            result = function(ctx, **json.loads(params or "{}"))
+            return "Succeeded", ctx.message, result
+        except JobCancelled:
+            return "Cancelled", f"Cancelled after {ctx.done} of {ctx.total or '?'}", None
+        except Exception as error:
+            traceback.print_exc()
+            return "Failed", f"{type(error).__name__}: {error}", None
+        finally:
+            try:
+                conn.rollback()
+            except mysql.connector.Error:
+                pass
+            conn.close()
+
+    def reap_stale(self):
+        """Fail Running jobs whose executor stopped reporting; returns the number reaped"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._reaped_at < REAP_INTERVAL:
+                return 0
+            self._reaped_at = now
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE Jobs
+                SET Status = 'Failed', Finished_At = NOW(),
+                    Message = CONCAT('Worker ', COALESCE(Worker, '?'), ' stopped responding')
+                WHERE Status = 'Running' AND Heartbeat_At < NOW() - INTERVAL %s SECOND
+            """, (self.stale_after,))
+            reaped = cursor.rowcount
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        if reaped:
+            with self._lock:
+                self._stats["reaped"] += reaped
+        return reaped
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["threads"] = len(self._threads)
+        return stats
+
+
+# Job types
+
+@job_type("delete_books")
+def delete_books_job(ctx, isbns, admin_id=None):
+    """DeleteBook for each ISBN, committing one at a time; books that cannot be deleted are reported"""
+    cursor = ctx.conn.cursor()
+    deleted, skipped = [], []
+    try:
+        for done, isbn in enumerate(isbns):
+            ctx.progress(done, len(isbns), f"Deleting {isbn}")
+            try:
+                cursor.execute("CALL DeleteBook(%s, %s)", (admin_id, isbn))
+                ctx.conn.commit()
+                deleted.append(isbn)
+            except mysql.connector.Error as error:
+                ctx.conn.rollback()
+                skipped.append([isbn, error.msg])
+    finally:
+        cursor.close()
+    ctx.progress(len(isbns), len(isbns), f"Deleted {len(deleted)}, skipped {len(skipped)}", force=True)
+    return {"deleted": deleted, "skipped": skipped}
+
+
+@job_type("rebuild_rollups")
+def rebuild_rollups_job(ctx):
+    ctx.progress(0, 1, "Rebuilding circulation rollups", force=True)
+    books, category_rows, daily_rows = analytics.rebuild(ctx.conn)
+    ctx.progress(1, 1, f"Rebuilt {books} books, {category_rows} category rows, {daily_rows} daily rows", force=True)
+    return {"books": books, "category_rows": category_rows, "daily_rows": daily_rows}
+
+
+@job_type("archive_transactions")
+def archive_transactions_job(ctx, older_than_days=None, batch_size=None):
+    ctx.progress(0, 2, "Extending archive partitions", force=True)
+    added = archive.ensure_partitions(ctx.conn, date.today().year + 1)
+    ctx.progress(1, 2, "Archiving transactions", force=True)
+    run_id, cutoff, moved = archive.archive_transactions(
+        ctx.conn, older_than_days or archive.OLDER_THAN_DAYS, batch_size or archive.BATCH_SIZE
+    )
+    ctx.progress(2, 2, f"Run {run_id}: archived {moved} transactions returned before {cutoff}", force=True)
+    return {"run_id": run_id, "cutoff": cutoff, "moved": moved, "partitions_added": added}
+
+
+@job_type("accrue_fines")
+def accrue_fines_job(ctx):
+    ctx.progress(0, 1, "Accruing fines", force=True)
+    run_id, as_of, updated = accrual.accrue_fines(ctx.conn)
+    ctx.progress(1, 1, f"Run {run_id}: {updated} loans updated as of {as_of}", force=True)
+    return {"run_id": run_id, "as_of": as_of, "loans_updated": updated}
+
+
+@job_type("expire_holds")
+def expire_holds_job(ctx):
+    ctx.progress(0, 1, "Expiring holds", force=True)
+    expired = holds.expire_holds(ctx.conn)
+    ctx.progress(1, 1, f"Expired {expired} holds", force=True)
+    return {"expired": expired}
+
+
+@job_type("audit_maintenance")
+def audit_maintenance_job(ctx):
+    ctx.progress(0, 1, "Maintaining audit partitions", force=True)
+    changes = audit.maintain(ctx.conn)
+    ctx.progress(1, 1, "Audit partitions maintained", force=True)
+    return changes
+
+
+job_executor = JobExecutor(JOBS_CONFIG["workers"], JOBS_CONFIG["poll_interval"],
+                           JOBS_CONFIG["progress_interval"], JOBS_CONFIG["stale_after"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run or inspect background admin jobs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker = commands.add_parser("worker", help="run queued jobs until interrupted")
+    worker.add_argument("--workers", type=int, default=JOBS_CONFIG["workers"])
+    listing = commands.add_parser("list", help="print the most recent jobs")
+    listing.add_argument("--limit", type=int, default=20)
+    cancelling = commands.add_parser("cancel", help="cancel a queued or running job")
+    cancelling.add_argument("job_id", type=int)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "worker":
+            job_executor.workers = args.workers
+            job_executor.start()
+            print(f"{job_executor.name}: {args.workers} workers waiting for jobs (Ctrl+C to stop)")
+            while True:
+                time.sleep(60)
+                print(job_executor.stats())
+        elif args.command == "list":
+            conn = get_connection()
+            try:
+                for job in recent_jobs(conn, args.limit):
+                    total = job['Progress_Total'] if job['Progress_Total'] is not None else '?'
+                    print(f"{job['Job_ID']:>6} {job['Job_Type']:<22} {job['Status']:<10} "
+                          f"{job['Progress_Done']}/{total}  {job['Message'] or ''}")
+            finally:
+                conn.close()
+        elif args.command == "cancel":
+            if cancel(args.job_id):
+                print(f"Cancel requested for job {args.job_id}")
+            else:
+                print(f"Job {args.job_id} is not queued or running")
+    except mysql.connector.Error as error:
+        print(f"Error: {error}")
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
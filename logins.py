@@ -0,0 +1,139 @@
+import atexit
+import threading
+from collections import deque
+from datetime import datetime
+
+import mysql.connector
+
+from db import get_connection
+
+LOGIN_CONFIG = {
+    "flush_interval": 2.0,    # seconds between Last_Login flushes
+    "max_pending": 1000,      # flush early once this many logins are waiting
+    "latency_window": 2000    # recent logins kept for the latency percentiles
+}
+
+# Table -> primary key of the accounts that carry a Last_Login column
+LOGIN_TABLES = {"Members": "Member_ID", "Administrators": "Admin_ID"}
+FLUSH_BATCH_SIZE = 500
+
+
+class LastLoginWriter:
+    """Buffers Last_Login timestamps and writes them from a background thread.
+
+    A login only records the timestamp in memory; repeated logins by the
+    same account collapse into one entry, and each flush is a single
+    UPDATE per table and batch.
+    """
+
+    def __init__(self, flush_interval=2.0, max_pending=1000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}              # (table, account id) -> login time
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stats = {"recorded": 0, "written": 0, "flushes": 0, "errors": 0}
+
+    def record(self, table, account_id, when=None):
+        with self._lock:
+            self._pending[(table, account_id)] = when or datetime.now()
+            self._stats["recorded"] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="last-login-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+            if len(self._pending) >= self.max_pending:
+                self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every pending timestamp; returns the number of accounts updated"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+
+        by_table = {}
+        for (table, account_id), when in batch.items():
+            by_table.setdefault(table, []).append((account_id, when))
+        try:
+            conn = get_connection()
+        except mysql.connector.Error:
+            self._requeue(batch)
+            return 0
+        try:
+            cursor = conn.cursor()
+            for table, rows in by_table.items():
+                key = LOGIN_TABLES[table]
+                for start in range(0, len(rows), FLUSH_BATCH_SIZE):
+                    part = rows[start:start + FLUSH_BATCH_SIZE]
+                    cases = " ".join(["WHEN %s THEN %s"] * len(part))
+                    placeholders = ", ".join(["%s"] * len(part))
+                    params = [value for row in part for value in row]
+                    params += [account_id for account_id, _ in part]
+                    cursor.execute(
+                        f"UPDATE {table} SET Last_Login = CASE {key} {cases} END "
+                        f"WHERE {key} IN ({placeholders})",
+                        params
+                    )
+            conn.commit()
+            cursor.close()
+        except mysql.connector.Error:
+            conn.rollback()
+            self._requeue(batch)
+            return 0
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._stats["written"] += len(batch)
+            self._stats["flushes"] += 1
+        return len(batch)
+
+    def _requeue(self, batch):
+        # Keep the failed timestamps for the next flush unless a newer login replaced them
+        with self._lock:
+            self._stats["errors"] += 1
+            for key, when in batch.items():
+                self._pending.setdefault(key, when)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        return stats
+
+
+class LoginLatency:
+    """Rolling record of how long login checks take"""
+
+    def __init__(self, window=2000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._counts = {"logins": 0, "failures": 0}
+
+    def record(self, seconds, success):
+        with self._lock:
+            self._samples.append(seconds)
+            self._counts["logins"] += 1
+            if not success:
+                self._counts["failures"] += 1
+
+    def stats(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            stats = dict(self._counts)
+        for name, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            stats[name] = samples[int((len(samples) - 1) * fraction)] * 1000 if samples else 0.0
+        stats["max_ms"] = samples[-1] * 1000 if samples else 0.0
+        return stats
+
+
+last_login_writer = LastLoginWriter(LOGIN_CONFIG["flush_interval"], LOGIN_CONFIG["max_pending"])
+login_latency = LoginLatency(LOGIN_CONFIG["latency_window"])
@@ -0,0 +1,244 @@
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cache import catalog_cache
+from db import pool_metrics, routing_metrics
+from logins import last_login_writer, login_latency
+
+METRICS_CONFIG = {
+    "slow_query_ms": 200,                # queries slower than this go to the slow-query log
+    "slow_render_ms": 1000,              # so do page renders slower than this
+    "slow_log_path": "slow_queries.log",
+    "exporter_host": "127.0.0.1",
+    "exporter_port": 9464,               # Prometheus text endpoint; None to disable
+    "recent_slow_entries": 100           # slow entries kept in memory for the diagnostics page
+}
+
+# Upper bounds in seconds, as in a Prometheus histogram
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Timing:
+    """Count, total, max and a bucketed histogram for one query or page"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, seconds, rows, error):
+        self.count += 1
+        self.errors += error
+        self.rows += rows or 0
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given quantile"""
+        target = self.count * fraction
+        seen = 0
+        for bound, count in zip(BUCKETS + (self.max,), self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_ms": self.total * 1000,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p95_ms": self.quantile(0.95) * 1000,
+            "max_ms": self.max * 1000
+        }
+
+
+class Metrics:
+    """Process-wide query and page-render timings plus the slow-query log"""
+
+    def __init__(self, slow_query_ms=200, slow_render_ms=1000, slow_log_path=None, recent_slow_entries=100):
+        self.slow_query = slow_query_ms / 1000
+        self.slow_render = slow_render_ms / 1000
+        self._queries = {}
+        self._renders = {}
+        self._recent_slow = deque(maxlen=recent_slow_entries)
+        self._lock = threading.Lock()
+        self._slow_log = logging.getLogger("lib_mgmt.slow")
+        if slow_log_path and not self._slow_log.handlers:
+            handler = logging.FileHandler(slow_log_path)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self._slow_log.addHandler(handler)
+            self._slow_log.setLevel(logging.INFO)
+            self._slow_log.propagate = False
+
+    def _record(self, table, key, seconds, rows, error, threshold, kind):
+        label = key if isinstance(key, str) else " / ".join(key)
+        with self._lock:
+            timing = table.get(key)
+            if timing is None:
+                timing = table[key] = Timing()
+            timing.add(seconds, rows, error)
+            if seconds >= threshold:
+                entry = {"at": time.strftime("%Y-%m-%d %H:%M:%S"), "kind": kind, "name": label,
+                         "ms": seconds * 1000, "rows": rows, "error": bool(error)}
+                self._recent_slow.append(entry)
+        if seconds >= threshold:
+            self._slow_log.info(f"slow {kind} {label} {seconds * 1000:.1f}ms rows={rows} error={bool(error)}")
+
+    def record_query(self, name, seconds, rows=0, error=False):
+        self._record(self._queries, name, seconds, rows, error, self.slow_query, "query")
+
+    def record_render(self, portal, page, seconds, error=False):
+        self._record(self._renders, (portal, page), seconds, 0, error, self.slow_render, "render")
+
+    def query_summary(self):
+        with self._lock:
+            return {name: timing.summary() for name, timing in self._queries.items()}
+
+    def render_summary(self):
+        with self._lock:
+            return {key: timing.summary() for key, timing in self._renders.items()}
+
+    def recent_slow(self):
+        with self._lock:
+            return list(reversed(self._recent_slow))
+
+    def prometheus(self):
+        """The query and render histograms in Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            series = [
+                ("lib_query_duration_seconds", "Time spent in each named query",
+                 [({"query": name}, timing) for name, timing in self._queries.items()]),
+                ("lib_page_render_seconds", "Time spent rendering each portal page",
+                 [({"portal": portal, "page": page}, timing) for (portal, page), timing in self._renders.items()])
+            ]
+            for metric, help_text, entries in series:
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, timing in entries:
+                    base = ",".join(f'{key}="{escape(value)}"' for key, value in labels.items())
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, timing.buckets):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{base},le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{base},le="+Inf"}} {timing.count}')
+                    lines.append(f"{metric}_sum{{{base}}} {timing.total:.6f}")
+                    lines.append(f"{metric}_count{{{base}}} {timing.count}")
+            for metric, help_text, field in (("lib_query_rows_total", "Rows returned or changed", "rows"),
+                                             ("lib_query_errors_total", "Queries that raised", "errors")):
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                for name, timing in self._queries.items():
+                    lines.append(f'{metric}{{query="{escape(name)}"}} {getattr(timing, field)}')
+        return lines
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def gauges(prefix, values, help_text):
+    """Render a dict of numbers as Prometheus gauges named prefix_key"""
+    lines = []
+    for key, value in values.items():
+        if isinstance(value, (int, float)):
+            lines.append(f"# HELP {prefix}_{key} {help_text}")
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {value}")
+    return lines
+
+
+metrics = Metrics(
+    METRICS_CONFIG["slow_query_ms"],
+    METRICS_CONFIG["slow_render_ms"],
+    METRICS_CONFIG["slow_log_path"],
+    METRICS_CONFIG["recent_slow_entries"]
+)
+
+
+class QueryTimer:
+    rows = 0
+
+
+@contextmanager
+def query_timer(name):
+    """Time a query; set .rows on the yielded timer to record the row count"""
+    timer = QueryTimer()
+    started = time.perf_counter()
+    try:
+        yield timer
+    except Exception:
+        metrics.record_query(name, time.perf_counter() - started, timer.rows, error=True)
+        raise
+    metrics.record_query(name, time.perf_counter() - started, timer.rows)
+
+
+@contextmanager
+def render_timer(portal, page):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        # st.rerun() leaves by exception too, and that render still counts
+        metrics.record_render(portal, page, time.perf_counter() - started)
+
+
+def prometheus_text():
+    """Everything the process knows about itself, ready for a Prometheus scrape"""
+    lines = metrics.prometheus()
+    lines += gauges("lib_pool", pool_metrics(), "Connection pool state")
+    lines += gauges("lib_routing", routing_metrics(), "Read routing between primary and replicas")
+    lines += gauges("lib_catalog_cache", catalog_cache.stats(), "Catalog cache state")
+    lines += gauges("lib_login", login_latency.stats(), "Login latency over recent logins")
+    lines += gauges("lib_last_login_writer", last_login_writer.stats(), "Write-behind Last_Login state")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def start_exporter(host=None, port=None):
+    """Serve /metrics once per process; returns the bound port, or None if disabled or taken"""
+    global _exporter
+    host = host or METRICS_CONFIG["exporter_host"]
+    port = port if port is not None else METRICS_CONFIG["exporter_port"]
+    if port is None:
+        return None
+    with _exporter_lock:
+        if _exporter is None:
+            try:
+                _exporter = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                # Another process already serves this port
+                return None
+            threading.Thread(target=_exporter.serve_forever, name="metrics-exporter", daemon=True).start()
+    return _exporter.server_address[1]
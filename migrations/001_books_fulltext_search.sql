@@ -0,0 +1,65 @@
+-- Full-text catalog search for an existing lib_mgmt database.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+ALTER TABLE Books
+    ADD COLUMN Search_Text VARCHAR(500) NOT NULL DEFAULT '';
+
+-- Backfill before the index is built so it is populated in one pass
+UPDATE Books b
+JOIN Authors a ON b.Author_ID = a.Author_ID
+JOIN Categories c ON b.Category_ID = c.Category_ID
+SET b.Search_Text = CONCAT_WS(' ', b.Title, a.Author_Name, c.Category_Name);
+
+ALTER TABLE Books
+    ADD FULLTEXT INDEX ft_books_search (Search_Text);
+
+DELIMITER //
+CREATE TRIGGER before_book_insert_search
+BEFORE INSERT ON Books
+FOR EACH ROW
+BEGIN
+    SET NEW.Search_Text = CONCAT_WS(' ',
+        NEW.Title,
+        (SELECT Author_Name FROM Authors WHERE Author_ID = NEW.Author_ID),
+        (SELECT Category_Name FROM Categories WHERE Category_ID = NEW.Category_ID));
+END;//
+
+CREATE TRIGGER before_book_update_search
+BEFORE UPDATE ON Books
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Title <=> OLD.Title
+            AND NEW.Author_ID <=> OLD.Author_ID
+            AND NEW.Category_ID <=> OLD.Category_ID) THEN
+        SET NEW.Search_Text = CONCAT_WS(' ',
+            NEW.Title,
+            (SELECT Author_Name FROM Authors WHERE Author_ID = NEW.Author_ID),
+            (SELECT Category_Name FROM Categories WHERE Category_ID = NEW.Category_ID));
+    END IF;
+END;//
+
+CREATE TRIGGER after_author_rename_search
+AFTER UPDATE ON Authors
+FOR EACH ROW
+BEGIN
+    IF NEW.Author_Name <> OLD.Author_Name THEN
+        UPDATE Books b
+        JOIN Categories c ON b.Category_ID = c.Category_ID
+        SET b.Search_Text = CONCAT_WS(' ', b.Title, NEW.Author_Name, c.Category_Name)
+        WHERE b.Author_ID = NEW.Author_ID;
+    END IF;
+END;//
+
+CREATE TRIGGER after_category_rename_search
+AFTER UPDATE ON Categories
+FOR EACH ROW
+BEGIN
+    IF NEW.Category_Name <> OLD.Category_Name THEN
+        UPDATE Books b
+        JOIN Authors a ON b.Author_ID = a.Author_ID
+        SET b.Search_Text = CONCAT_WS(' ', b.Title, a.Author_Name, NEW.Category_Name)
+        WHERE b.Category_ID = NEW.Category_ID;
+    END IF;
+END;//
+DELIMITER ;
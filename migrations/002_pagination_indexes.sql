@@ -0,0 +1,9 @@
+-- Indexes backing keyset pagination of the member list and member histories.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+ALTER TABLE Members
+    ADD INDEX idx_members_created (Created_At, Member_ID);
+
+ALTER TABLE MemberTransactions
+    ADD INDEX idx_mt_member_date (Member_ID, Transaction_Date, Transaction_ID);
@@ -0,0 +1,11 @@
+-- Composite indexes for the MemberTransactions hot paths.
+-- project.sql already contains these changes for fresh installs.
+-- Check the result with: python -m bench.explain_check --seed 20000
+USE lib_mgmt;
+
+ALTER TABLE MemberTransactions
+    ADD INDEX idx_mt_member_status_due (Member_ID, Status, Due_Date),
+    ADD INDEX idx_mt_member_isbn_status (Member_ID, ISBN, Status),
+    ADD INDEX idx_mt_isbn_status (ISBN, Status);
+
+ANALYZE TABLE MemberTransactions;
@@ -0,0 +1,112 @@
+-- Cart checkout: BorrowBook takes a JSON array of ISBNs and returns one row per ISBN.
+-- project.sql already contains this change for fresh installs.
+USE lib_mgmt;
+
+DROP PROCEDURE IF EXISTS BorrowBook;
+
+-- Procedure to borrow a book, or a whole cart of books in one transaction.
+-- p_isbns is a JSON array of ISBNs; a bare ISBN is accepted as a cart of one.
+-- Returns one row per ISBN with the outcome.
+DELIMITER //
+CREATE PROCEDURE BorrowBook(
+    IN p_member_id INT,
+    IN p_isbns TEXT
+)
+BEGIN
+    DECLARE v_member_active BOOLEAN;
+    DECLARE v_overdue_count INT;
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_availability VARCHAR(20);
+    DECLARE v_result VARCHAR(100);
+    DECLARE v_results JSON DEFAULT JSON_ARRAY();
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE cart CURSOR FOR
+        SELECT j.ISBN
+        FROM JSON_TABLE(p_isbns, '$[*]' COLUMNS (
+            Position FOR ORDINALITY,
+            ISBN VARCHAR(13) PATH '$'
+        )) j
+        ORDER BY j.Position;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    -- Check if member is active
+    SELECT MAX(Status = 'Active') INTO v_member_active
+    FROM Members
+    WHERE Member_ID = p_member_id;
+
+    IF NOT COALESCE(v_member_active, FALSE) THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Member account is not active';
+    END IF;
+
+    -- One overdue check for the whole cart
+    SELECT COUNT(*) INTO v_overdue_count
+    FROM MemberTransactions
+    WHERE Member_ID = p_member_id
+    AND Status = 'Active'
+    AND Due_Date < CURDATE();
+
+    IF v_overdue_count > 0 THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot borrow new books while having overdue books';
+    END IF;
+
+    IF NOT (JSON_VALID(p_isbns) AND JSON_TYPE(p_isbns) = 'ARRAY') THEN
+        SET p_isbns = JSON_ARRAY(p_isbns);
+    END IF;
+
+    START TRANSACTION;
+
+    OPEN cart;
+    cart_loop: LOOP
+        FETCH cart INTO v_isbn;
+        IF v_done THEN
+            LEAVE cart_loop;
+        END IF;
+
+        -- Lock the book row so two desks cannot both see it in stock
+        SELECT MAX(Availability) INTO v_availability
+        FROM Books
+        WHERE ISBN = v_isbn
+        FOR UPDATE;
+
+        IF v_availability IS NULL THEN
+            SET v_result = 'Book not found';
+        ELSEIF EXISTS (
+            SELECT 1 FROM MemberTransactions
+            WHERE Member_ID = p_member_id AND ISBN = v_isbn AND Status = 'Active'
+        ) THEN
+            SET v_result = 'You already have this book borrowed';
+        ELSEIF v_availability <> 'In stock' THEN
+            SET v_result = 'Book is not available for borrowing';
+        ELSE
+            -- Update book status
+            UPDATE Books 
+            SET Availability = 'Checked out'
+            WHERE ISBN = v_isbn;
+
+            -- Create transaction record
+            INSERT INTO MemberTransactions (Member_ID, ISBN, Transaction_Type, Due_Date, Status)
+            VALUES (p_member_id, v_isbn, 'Borrow', DATE_ADD(CURRENT_DATE, INTERVAL 14 DAY), 'Active');
+
+            SET v_result = 'Borrowed';
+        END IF;
+
+        SET v_results = JSON_ARRAY_APPEND(v_results, '$', JSON_OBJECT('ISBN', v_isbn, 'Result', v_result));
+    END LOOP;
+    CLOSE cart;
+
+    COMMIT;
+
+    SELECT r.ISBN, r.Result
+    FROM JSON_TABLE(v_results, '$[*]' COLUMNS (
+        ISBN VARCHAR(13) PATH '$.ISBN',
+        Result VARCHAR(100) PATH '$.Result'
+    )) r;
+END //
+DELIMITER ;
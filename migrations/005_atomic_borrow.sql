@@ -0,0 +1,138 @@
+-- Single round-trip borrow: conditional UPDATE on Books, result codes instead of
+-- SQLSTATE 45000, and no repeated overdue scan in before_borrow_check.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+DROP PROCEDURE IF EXISTS BorrowBook;
+DROP TRIGGER IF EXISTS before_borrow_check;
+
+-- Procedure to borrow a book, or a whole cart of books in one transaction.
+-- p_isbns is a JSON array of ISBNs; a bare ISBN is accepted as a cart of one.
+-- Returns one row per ISBN with a result code instead of raising an error:
+--   OK, MEMBER_INACTIVE, OVERDUE, NOT_FOUND, ALREADY_BORROWED, UNAVAILABLE
+DELIMITER //
+CREATE PROCEDURE BorrowBook(
+    IN p_member_id INT,
+    IN p_isbns TEXT
+)
+BEGIN
+    DECLARE v_member_active BOOLEAN;
+    DECLARE v_cart_code VARCHAR(20) DEFAULT NULL;
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_code VARCHAR(20);
+    DECLARE v_results JSON DEFAULT JSON_ARRAY();
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE cart CURSOR FOR
+        SELECT j.ISBN
+        FROM JSON_TABLE(p_isbns, '$[*]' COLUMNS (
+            Position FOR ORDINALITY,
+            ISBN VARCHAR(13) PATH '$'
+        )) j
+        ORDER BY j.Position;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @borrow_checked_member = NULL;
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF NOT (JSON_VALID(p_isbns) AND JSON_TYPE(p_isbns) = 'ARRAY') THEN
+        SET p_isbns = JSON_ARRAY(p_isbns);
+    END IF;
+
+    START TRANSACTION;
+
+    -- Check if member is active; the shared lock keeps the status stable until commit
+    SELECT MAX(Status = 'Active') INTO v_member_active
+    FROM Members
+    WHERE Member_ID = p_member_id
+    FOR SHARE;
+
+    IF NOT COALESCE(v_member_active, FALSE) THEN
+        SET v_cart_code = 'MEMBER_INACTIVE';
+    ELSEIF EXISTS (
+        SELECT 1 FROM MemberTransactions
+        WHERE Member_ID = p_member_id
+        AND Status = 'Active'
+        AND Due_Date < CURDATE()
+    ) THEN
+        -- One overdue check for the whole cart
+        SET v_cart_code = 'OVERDUE';
+    END IF;
+
+    -- Tell before_borrow_check this member has already been checked
+    SET @borrow_checked_member = p_member_id;
+
+    OPEN cart;
+    cart_loop: LOOP
+        FETCH cart INTO v_isbn;
+        IF v_done THEN
+            LEAVE cart_loop;
+        END IF;
+
+        IF v_cart_code IS NOT NULL THEN
+            SET v_code = v_cart_code;
+        ELSE
+            -- Claim the book only if it is still in stock; the row lock taken here
+            -- means two desks can never both check out the same ISBN
+            UPDATE Books 
+            SET Availability = 'Checked out'
+            WHERE ISBN = v_isbn
+            AND Availability = 'In stock';
+
+            IF ROW_COUNT() = 1 THEN
+                INSERT INTO MemberTransactions (Member_ID, ISBN, Transaction_Type, Due_Date, Status)
+                VALUES (p_member_id, v_isbn, 'Borrow', DATE_ADD(CURRENT_DATE, INTERVAL 14 DAY), 'Active');
+                SET v_code = 'OK';
+            -- The remaining branches only run on the failure path
+            ELSEIF NOT EXISTS (SELECT 1 FROM Books WHERE ISBN = v_isbn) THEN
+                SET v_code = 'NOT_FOUND';
+            ELSEIF EXISTS (
+                SELECT 1 FROM MemberTransactions
+                WHERE Member_ID = p_member_id AND ISBN = v_isbn AND Status = 'Active'
+            ) THEN
+                SET v_code = 'ALREADY_BORROWED';
+            ELSE
+                SET v_code = 'UNAVAILABLE';
+            END IF;
+        END IF;
+
+        SET v_results = JSON_ARRAY_APPEND(v_results, '$', JSON_OBJECT('ISBN', v_isbn, 'Code', v_code));
+    END LOOP;
+    CLOSE cart;
+
+    SET @borrow_checked_member = NULL;
+    COMMIT;
+
+    SELECT r.ISBN, r.Result_Code
+    FROM JSON_TABLE(v_results, '$[*]' COLUMNS (
+        ISBN VARCHAR(13) PATH '$.ISBN',
+        Result_Code VARCHAR(20) PATH '$.Code'
+    )) r;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER before_borrow_check
+BEFORE INSERT ON MemberTransactions
+FOR EACH ROW
+BEGIN
+    DECLARE overdue_count INT;
+    
+    -- BorrowBook has already done this check for the member in the same transaction
+    IF NEW.Transaction_Type = 'Borrow' AND NOT (@borrow_checked_member <=> NEW.Member_ID) THEN
+        SELECT COUNT(*) INTO overdue_count
+        FROM MemberTransactions
+        WHERE Member_ID = NEW.Member_ID
+        AND Status = 'Active'
+        AND Due_Date < CURDATE();
+        
+        IF overdue_count > 0 THEN
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Cannot borrow new books while having overdue books';
+        END IF;
+    END IF;
+END;//
+
+DELIMITER ;
@@ -0,0 +1,143 @@
+-- Returns desk: the admin and member ReturnBook procedures no longer share a name,
+-- and ReturnBook takes a batch of ISBNs and returns each fine directly.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+-- On existing databases only the first (admin) ReturnBook was ever created
+DROP PROCEDURE IF EXISTS ReturnBook;
+DROP PROCEDURE IF EXISTS AdminReturnBook;
+
+-- Create procedure to return a book (Admin)
+-- Named apart from the member ReturnBook below; both used to be called ReturnBook
+DELIMITER //
+CREATE PROCEDURE AdminReturnBook(
+    IN p_admin_id INT,
+    IN p_isbn VARCHAR(13)
+)
+BEGIN
+    DECLARE v_book_checked_out BOOLEAN;
+
+    -- Check if book is checked out
+    SELECT Availability = 'Checked out' INTO v_book_checked_out
+    FROM Books 
+    WHERE ISBN = p_isbn;
+
+    IF NOT v_book_checked_out THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Book is already in stock';
+    END IF;
+
+    START TRANSACTION;
+
+    -- Update book status
+    UPDATE Books 
+    SET Availability = 'In stock'
+    WHERE ISBN = p_isbn;
+
+    -- Record admin transaction
+    INSERT INTO AdminTransactions (ISBN, Admin_ID, Transaction_Type)
+    VALUES (p_isbn, p_admin_id, 'Return');
+
+    COMMIT;
+END //
+DELIMITER ;
+
+-- Procedure to return books, one or a batch in one transaction.
+-- p_isbns is a JSON array of ISBNs; a bare ISBN is accepted as a batch of one.
+-- With p_member_id NULL (the returns desk) each ISBN closes whichever loan is active.
+-- Returns one row per ISBN with the borrower, a result code (OK, NOT_BORROWED)
+-- and the fine charged, so callers never need to read the fine back.
+DELIMITER //
+CREATE PROCEDURE ReturnBook(
+    IN p_member_id INT,
+    IN p_isbns TEXT
+)
+BEGIN
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_transaction_id INT;
+    DECLARE v_member_id INT;
+    DECLARE v_due_date DATE;
+    DECLARE v_fine_amount DECIMAL(10, 2);
+    DECLARE v_results JSON DEFAULT JSON_ARRAY();
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE scans CURSOR FOR
+        SELECT j.ISBN
+        FROM JSON_TABLE(p_isbns, '$[*]' COLUMNS (
+            Position FOR ORDINALITY,
+            ISBN VARCHAR(13) PATH '$'
+        )) j
+        ORDER BY j.Position;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF NOT (JSON_VALID(p_isbns) AND JSON_TYPE(p_isbns) = 'ARRAY') THEN
+        SET p_isbns = JSON_ARRAY(p_isbns);
+    END IF;
+
+    START TRANSACTION;
+
+    OPEN scans;
+    scan_loop: LOOP
+        FETCH scans INTO v_isbn;
+        IF v_done THEN
+            LEAVE scan_loop;
+        END IF;
+
+        -- Get active transaction
+        SET v_transaction_id = NULL;
+        SELECT Transaction_ID, Member_ID, Due_Date
+        INTO v_transaction_id, v_member_id, v_due_date
+        FROM MemberTransactions
+        WHERE ISBN = v_isbn
+        AND Status = 'Active'
+        AND (p_member_id IS NULL OR Member_ID = p_member_id)
+        ORDER BY Transaction_ID
+        LIMIT 1
+        FOR UPDATE;
+        -- A miss above raises NOT FOUND, which must not end the scan loop
+        SET v_done = FALSE;
+
+        IF v_transaction_id IS NULL THEN
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', v_isbn, 'Member', p_member_id, 'Code', 'NOT_BORROWED', 'Fine', 0));
+        ELSE
+            -- Calculate fine if overdue (₹10 per day)
+            IF CURRENT_DATE > v_due_date THEN
+                SET v_fine_amount = DATEDIFF(CURRENT_DATE, v_due_date) * 10;
+            ELSE
+                SET v_fine_amount = 0;
+            END IF;
+
+            -- Update book status
+            UPDATE Books 
+            SET Availability = 'In stock'
+            WHERE ISBN = v_isbn;
+
+            -- Update transaction record
+            UPDATE MemberTransactions
+            SET Return_Date = CURRENT_DATE,
+                Fine_Amount = v_fine_amount,
+                Status = 'Completed'
+            WHERE Transaction_ID = v_transaction_id;
+
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', v_isbn, 'Member', v_member_id, 'Code', 'OK', 'Fine', v_fine_amount));
+        END IF;
+    END LOOP;
+    CLOSE scans;
+
+    COMMIT;
+
+    SELECT r.ISBN, r.Member_ID, r.Result_Code, r.Fine_Amount
+    FROM JSON_TABLE(v_results, '$[*]' COLUMNS (
+        ISBN VARCHAR(13) PATH '$.ISBN',
+        Member_ID INT PATH '$.Member',
+        Result_Code VARCHAR(20) PATH '$.Code',
+        Fine_Amount DECIMAL(10, 2) PATH '$.Fine'
+    )) r;
+END //
+DELIMITER ;
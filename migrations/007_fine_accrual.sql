@@ -0,0 +1,422 @@
+-- Fine accrual: loans past due are marked Overdue and carry their fine so far,
+-- kept current by the AccrueFines job, and the member summary tracks overdue
+-- loans and outstanding fines incrementally.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+ALTER TABLE MemberTransactions
+    ADD INDEX idx_mt_status_due (Status, Due_Date);
+
+ALTER TABLE MemberBorrowingSummary
+    ADD COLUMN Overdue_Count INT DEFAULT 0 AFTER Total_Fines_Paid,
+    ADD COLUMN Outstanding_Fines DECIMAL(10, 2) DEFAULT 0.00 AFTER Overdue_Count;
+
+-- Members created before after_member_insert existed have no summary row
+INSERT IGNORE INTO MemberBorrowingSummary (Member_ID)
+SELECT Member_ID FROM Members;
+
+UPDATE MemberBorrowingSummary s
+LEFT JOIN (
+    SELECT Member_ID,
+        COUNT(*) AS Total_Books_Borrowed,
+        SUM(Status = 'Active') AS Currently_Borrowed,
+        SUM(CASE WHEN Status = 'Completed' THEN Fine_Amount ELSE 0 END) AS Total_Fines_Paid,
+        MAX(Transaction_Date) AS Last_Borrowed_Date
+    FROM MemberTransactions
+    WHERE Transaction_Type = 'Borrow'
+    GROUP BY Member_ID
+) t ON t.Member_ID = s.Member_ID
+SET s.Total_Books_Borrowed = COALESCE(t.Total_Books_Borrowed, 0),
+    s.Currently_Borrowed = COALESCE(t.Currently_Borrowed, 0),
+    s.Total_Fines_Paid = COALESCE(t.Total_Fines_Paid, 0),
+    s.Last_Borrowed_Date = t.Last_Borrowed_Date;
+
+DROP TRIGGER IF EXISTS after_transaction_update;
+DROP TRIGGER IF EXISTS before_borrow_check;
+DROP PROCEDURE IF EXISTS BorrowBook;
+DROP PROCEDURE IF EXISTS ReturnBook;
+DROP PROCEDURE IF EXISTS DeleteBook;
+DROP FUNCTION IF EXISTS GetBookAvailabilityDetails;
+
+DELIMITER //
+CREATE TRIGGER after_transaction_update
+AFTER UPDATE ON MemberTransactions
+FOR EACH ROW
+BEGIN
+    IF NEW.Status = 'Completed' AND OLD.Status IN ('Active', 'Overdue') THEN
+        UPDATE MemberBorrowingSummary
+        SET Currently_Borrowed = Currently_Borrowed - 1,
+            Total_Fines_Paid = Total_Fines_Paid + NEW.Fine_Amount,
+            Overdue_Count = Overdue_Count - (OLD.Status = 'Overdue'),
+            Outstanding_Fines = Outstanding_Fines - OLD.Fine_Amount
+        WHERE Member_ID = NEW.Member_ID;
+    ELSEIF NEW.Status IN ('Active', 'Overdue') AND OLD.Status IN ('Active', 'Overdue')
+        AND (NEW.Status <> OLD.Status OR NEW.Fine_Amount <> OLD.Fine_Amount) THEN
+        -- Fine accrual on a loan that is still out
+        UPDATE MemberBorrowingSummary
+        SET Overdue_Count = Overdue_Count + (NEW.Status = 'Overdue') - (OLD.Status = 'Overdue'),
+            Outstanding_Fines = Outstanding_Fines + NEW.Fine_Amount - OLD.Fine_Amount
+        WHERE Member_ID = NEW.Member_ID;
+    END IF;
+END;//
+
+CREATE TRIGGER before_borrow_check
+BEFORE INSERT ON MemberTransactions
+FOR EACH ROW
+BEGIN
+    DECLARE overdue_count INT;
+    
+    -- BorrowBook has already done this check for the member in the same transaction
+    IF NEW.Transaction_Type = 'Borrow' AND NOT (@borrow_checked_member <=> NEW.Member_ID) THEN
+        SELECT COUNT(*) INTO overdue_count
+        FROM MemberTransactions
+        WHERE Member_ID = NEW.Member_ID
+        AND Status IN ('Active', 'Overdue')
+        AND Due_Date < CURDATE();
+        
+        IF overdue_count > 0 THEN
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Cannot borrow new books while having overdue books';
+        END IF;
+    END IF;
+END;//
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE BorrowBook(
+    IN p_member_id INT,
+    IN p_isbns TEXT
+)
+BEGIN
+    DECLARE v_member_active BOOLEAN;
+    DECLARE v_cart_code VARCHAR(20) DEFAULT NULL;
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_code VARCHAR(20);
+    DECLARE v_results JSON DEFAULT JSON_ARRAY();
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE cart CURSOR FOR
+        SELECT j.ISBN
+        FROM JSON_TABLE(p_isbns, '$[*]' COLUMNS (
+            Position FOR ORDINALITY,
+            ISBN VARCHAR(13) PATH '$'
+        )) j
+        ORDER BY j.Position;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @borrow_checked_member = NULL;
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF NOT (JSON_VALID(p_isbns) AND JSON_TYPE(p_isbns) = 'ARRAY') THEN
+        SET p_isbns = JSON_ARRAY(p_isbns);
+    END IF;
+
+    START TRANSACTION;
+
+    -- Check if member is active; the shared lock keeps the status stable until commit
+    SELECT MAX(Status = 'Active') INTO v_member_active
+    FROM Members
+    WHERE Member_ID = p_member_id
+    FOR SHARE;
+
+    IF NOT COALESCE(v_member_active, FALSE) THEN
+        SET v_cart_code = 'MEMBER_INACTIVE';
+    ELSEIF COALESCE((
+        SELECT Overdue_Count FROM MemberBorrowingSummary WHERE Member_ID = p_member_id
+    ), 0) > 0 OR EXISTS (
+        -- Loans that fell due since the last AccrueFines run
+        SELECT 1 FROM MemberTransactions
+        WHERE Member_ID = p_member_id
+        AND Status = 'Active'
+        AND Due_Date < CURDATE()
+    ) THEN
+        -- One overdue check for the whole cart
+        SET v_cart_code = 'OVERDUE';
+    END IF;
+
+    -- Tell before_borrow_check this member has already been checked
+    SET @borrow_checked_member = p_member_id;
+
+    OPEN cart;
+    cart_loop: LOOP
+        FETCH cart INTO v_isbn;
+        IF v_done THEN
+            LEAVE cart_loop;
+        END IF;
+
+        IF v_cart_code IS NOT NULL THEN
+            SET v_code = v_cart_code;
+        ELSE
+            -- Claim the book only if it is still in stock; the row lock taken here
+            -- means two desks can never both check out the same ISBN
+            UPDATE Books 
+            SET Availability = 'Checked out'
+            WHERE ISBN = v_isbn
+            AND Availability = 'In stock';
+
+            IF ROW_COUNT() = 1 THEN
+                INSERT INTO MemberTransactions (Member_ID, ISBN, Transaction_Type, Due_Date, Status)
+                VALUES (p_member_id, v_isbn, 'Borrow', DATE_ADD(CURRENT_DATE, INTERVAL 14 DAY), 'Active');
+                SET v_code = 'OK';
+            -- The remaining branches only run on the failure path
+            ELSEIF NOT EXISTS (SELECT 1 FROM Books WHERE ISBN = v_isbn) THEN
+                SET v_code = 'NOT_FOUND';
+            ELSEIF EXISTS (
+                SELECT 1 FROM MemberTransactions
+                WHERE Member_ID = p_member_id AND ISBN = v_isbn AND Status IN ('Active', 'Overdue')
+            ) THEN
+                SET v_code = 'ALREADY_BORROWED';
+            ELSE
+                SET v_code = 'UNAVAILABLE';
+            END IF;
+        END IF;
+
+        SET v_results = JSON_ARRAY_APPEND(v_results, '$', JSON_OBJECT('ISBN', v_isbn, 'Code', v_code));
+    END LOOP;
+    CLOSE cart;
+
+    SET @borrow_checked_member = NULL;
+    COMMIT;
+
+    SELECT r.ISBN, r.Result_Code
+    FROM JSON_TABLE(v_results, '$[*]' COLUMNS (
+        ISBN VARCHAR(13) PATH '$.ISBN',
+        Result_Code VARCHAR(20) PATH '$.Code'
+    )) r;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE ReturnBook(
+    IN p_member_id INT,
+    IN p_isbns TEXT
+)
+BEGIN
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_transaction_id INT;
+    DECLARE v_member_id INT;
+    DECLARE v_due_date DATE;
+    DECLARE v_fine_amount DECIMAL(10, 2);
+    DECLARE v_results JSON DEFAULT JSON_ARRAY();
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE scans CURSOR FOR
+        SELECT j.ISBN
+        FROM JSON_TABLE(p_isbns, '$[*]' COLUMNS (
+            Position FOR ORDINALITY,
+            ISBN VARCHAR(13) PATH '$'
+        )) j
+        ORDER BY j.Position;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF NOT (JSON_VALID(p_isbns) AND JSON_TYPE(p_isbns) = 'ARRAY') THEN
+        SET p_isbns = JSON_ARRAY(p_isbns);
+    END IF;
+
+    START TRANSACTION;
+
+    OPEN scans;
+    scan_loop: LOOP
+        FETCH scans INTO v_isbn;
+        IF v_done THEN
+            LEAVE scan_loop;
+        END IF;
+
+        -- Get active transaction
+        SET v_transaction_id = NULL;
+        SELECT Transaction_ID, Member_ID, Due_Date
+        INTO v_transaction_id, v_member_id, v_due_date
+        FROM MemberTransactions
+        WHERE ISBN = v_isbn
+        AND Status IN ('Active', 'Overdue')
+        AND (p_member_id IS NULL OR Member_ID = p_member_id)
+        ORDER BY Transaction_ID
+        LIMIT 1
+        FOR UPDATE;
+        -- A miss above raises NOT FOUND, which must not end the scan loop
+        SET v_done = FALSE;
+
+        IF v_transaction_id IS NULL THEN
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', v_isbn, 'Member', p_member_id, 'Code', 'NOT_BORROWED', 'Fine', 0));
+        ELSE
+            -- Calculate fine if overdue (₹10 per day)
+            IF CURRENT_DATE > v_due_date THEN
+                SET v_fine_amount = DATEDIFF(CURRENT_DATE, v_due_date) * 10;
+            ELSE
+                SET v_fine_amount = 0;
+            END IF;
+
+            -- Update book status
+            UPDATE Books 
+            SET Availability = 'In stock'
+            WHERE ISBN = v_isbn;
+
+            -- Update transaction record
+            UPDATE MemberTransactions
+            SET Return_Date = CURRENT_DATE,
+                Fine_Amount = v_fine_amount,
+                Status = 'Completed'
+            WHERE Transaction_ID = v_transaction_id;
+
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', v_isbn, 'Member', v_member_id, 'Code', 'OK', 'Fine', v_fine_amount));
+        END IF;
+    END LOOP;
+    CLOSE scans;
+
+    COMMIT;
+
+    SELECT r.ISBN, r.Member_ID, r.Result_Code, r.Fine_Amount
+    FROM JSON_TABLE(v_results, '$[*]' COLUMNS (
+        ISBN VARCHAR(13) PATH '$.ISBN',
+        Member_ID INT PATH '$.Member',
+        Result_Code VARCHAR(20) PATH '$.Code',
+        Fine_Amount DECIMAL(10, 2) PATH '$.Fine'
+    )) r;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE DeleteBook(
+    IN p_admin_id INT,
+    IN p_isbn VARCHAR(13)
+)
+BEGIN
+    DECLARE v_book_exists INT;
+    DECLARE v_active_transactions INT;
+    
+    -- Check if book exists
+    SELECT COUNT(*) INTO v_book_exists
+    FROM Books
+    WHERE ISBN = p_isbn;
+    
+    -- Check if book has any active transactions
+    SELECT COUNT(*) INTO v_active_transactions
+    FROM MemberTransactions
+    WHERE ISBN = p_isbn AND Status IN ('Active', 'Overdue');
+    
+    -- Only proceed if book exists and has no active transactions
+    IF v_book_exists = 0 THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Book does not exist';
+    ELSEIF v_active_transactions > 0 THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot delete book with active transactions';
+    ELSE
+        -- Delete the book
+        DELETE FROM Books WHERE ISBN = p_isbn;
+    END IF;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE FUNCTION GetBookAvailabilityDetails(p_isbn VARCHAR(13)) 
+RETURNS VARCHAR(100)
+DETERMINISTIC
+BEGIN
+    DECLARE status VARCHAR(100);
+    DECLARE due_date DATE;
+    
+    SELECT 
+        CASE 
+            WHEN b.Availability = 'In stock' THEN 'Available'
+            ELSE CONCAT('Checked out until ', DATE_FORMAT(mt.Due_Date, '%Y-%m-%d'))
+        END INTO status
+    FROM Books b
+    LEFT JOIN MemberTransactions mt ON b.ISBN = mt.ISBN 
+        AND mt.Status IN ('Active', 'Overdue')
+    WHERE b.ISBN = p_isbn
+    LIMIT 1;
+    
+    RETURN COALESCE(status, 'Book not found');
+END //
+DELIMITER ;
+
+CREATE OR REPLACE VIEW TransactionDetailsView AS
+SELECT 
+    mt.Transaction_ID,
+    m.Member_ID,
+    m.Username as Member_Name,
+    b.ISBN,
+    b.Title as Book_Title,
+    a.Author_Name,
+    mt.Transaction_Type,
+    mt.Transaction_Date,
+    mt.Due_Date,
+    mt.Return_Date,
+    mt.Fine_Amount,
+    mt.Status,
+    mt.Fine_Amount as Current_Fine -- accrued daily by AccrueFines on open loans
+FROM MemberTransactions mt
+JOIN Members m ON mt.Member_ID = m.Member_ID
+JOIN Books b ON mt.ISBN = b.ISBN
+JOIN Authors a ON b.Author_ID = a.Author_ID;
+
+-- Fine accrual: one job marks loans past due as Overdue and stores the fine so far,
+-- so reads never recompute DATEDIFF per row. Fines are absolute for the as-of date,
+-- so rerunning a day is a no-op and a late run catches up on any it missed.
+CREATE TABLE FineAccrualRuns (
+    Run_ID INT PRIMARY KEY AUTO_INCREMENT,
+    As_Of_Date DATE NOT NULL,
+    Loans_Updated INT DEFAULT 0,
+    Started_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Finished_At TIMESTAMP NULL,
+    INDEX idx_accrual_as_of (As_Of_Date)
+);
+
+DELIMITER //
+CREATE PROCEDURE AccrueFines(
+    IN p_as_of DATE,
+    IN p_batch_size INT
+)
+BEGIN
+    DECLARE v_run_id INT;
+    DECLARE v_batch INT;
+    DECLARE v_updated INT DEFAULT 0;
+
+    SET p_as_of = COALESCE(p_as_of, CURDATE());
+    SET p_batch_size = COALESCE(p_batch_size, 5000);
+
+    INSERT INTO FineAccrualRuns (As_Of_Date) VALUES (p_as_of);
+    SET v_run_id = LAST_INSERT_ID();
+    COMMIT;
+
+    -- Small batches keep row locks short next to BorrowBook and ReturnBook
+    REPEAT
+        START TRANSACTION;
+        UPDATE MemberTransactions
+        SET Status = 'Overdue',
+            Fine_Amount = DATEDIFF(p_as_of, Due_Date) * 10
+        WHERE Status IN ('Active', 'Overdue')
+        AND Due_Date < p_as_of
+        AND NOT (Status = 'Overdue' AND Fine_Amount = DATEDIFF(p_as_of, Due_Date) * 10)
+        LIMIT p_batch_size;
+        SET v_batch = ROW_COUNT();
+        SET v_updated = v_updated + v_batch;
+        COMMIT;
+    UNTIL v_batch < p_batch_size END REPEAT;
+
+    UPDATE FineAccrualRuns
+    SET Loans_Updated = v_updated, Finished_At = CURRENT_TIMESTAMP
+    WHERE Run_ID = v_run_id;
+    COMMIT;
+
+    SELECT v_run_id AS Run_ID, p_as_of AS As_Of_Date, v_updated AS Loans_Updated;
+END;//
+DELIMITER ;
+
+-- Needs event_scheduler=ON; accrual.py runs the same job by hand or from cron
+CREATE EVENT IF NOT EXISTS accrue_fines_daily
+ON SCHEDULE EVERY 1 DAY
+STARTS CURRENT_DATE + INTERVAL 1 DAY + INTERVAL 5 MINUTE
+DO CALL AccrueFines(CURRENT_DATE, 5000);
+
+-- Bring every open loan up to date now; the triggers fill in the summary columns
+CALL AccrueFines(CURDATE(), 5000);
@@ -0,0 +1,8 @@
+-- Indexes backing the typeahead member lookup on the admin transactions page.
+-- Username is already covered by its UNIQUE index and Member_ID by the primary key.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+ALTER TABLE Members
+    ADD INDEX idx_members_first_last (First_Name, Last_Name),
+    ADD INDEX idx_members_last (Last_Name);
@@ -0,0 +1,241 @@
+-- Circulation rollups: per-book, per-category and per-day counters kept by triggers,
+-- read by the rewritten reports in project.sql and the admin Analytics page.
+-- The final CALL backfills them from the existing MemberTransactions.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+ALTER TABLE MemberBorrowingSummary
+    ADD INDEX idx_summary_overdue (Overdue_Count);
+CREATE TABLE BookCirculation (
+    ISBN VARCHAR(13) PRIMARY KEY,
+    Times_Borrowed INT NOT NULL DEFAULT 0,
+    Currently_Borrowed INT NOT NULL DEFAULT 0,
+    Overdue_Count INT NOT NULL DEFAULT 0,
+    Fines_Total DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
+    Last_Borrowed_At TIMESTAMP NULL,
+    INDEX idx_bc_times_borrowed (Times_Borrowed, ISBN), -- never-borrowed and most-borrowed titles
+    FOREIGN KEY (ISBN) REFERENCES Books(ISBN) ON DELETE CASCADE
+);
+
+CREATE TABLE CategoryCirculation (
+    Category_ID INT NOT NULL,
+    Slot TINYINT NOT NULL,
+    Loans INT NOT NULL DEFAULT 0,
+    Books_Borrowed INT NOT NULL DEFAULT 0, -- titles borrowed at least once
+    Unique_Borrowers INT NOT NULL DEFAULT 0,
+    Open_Loans INT NOT NULL DEFAULT 0,
+    Overdue_Count INT NOT NULL DEFAULT 0,
+    Fined_Loans INT NOT NULL DEFAULT 0,
+    Fines_Total DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (Category_ID, Slot),
+    FOREIGN KEY (Category_ID) REFERENCES Categories(Category_ID) ON DELETE CASCADE
+);
+
+-- Who has ever borrowed from a category, so Unique_Borrowers only counts first borrows
+CREATE TABLE CategoryBorrowers (
+    Category_ID INT NOT NULL,
+    Member_ID INT NOT NULL,
+    PRIMARY KEY (Category_ID, Member_ID)
+);
+
+CREATE TABLE DailyCirculation (
+    Circulation_Date DATE NOT NULL,
+    Slot TINYINT NOT NULL,
+    Borrows INT NOT NULL DEFAULT 0,
+    Returns INT NOT NULL DEFAULT 0,
+    Fines_Collected DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (Circulation_Date, Slot)
+);
+
+DELIMITER //
+CREATE TRIGGER after_book_insert_circulation
+AFTER INSERT ON Books
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO BookCirculation (ISBN) VALUES (NEW.ISBN);
+END;//
+
+CREATE TRIGGER after_transaction_insert_rollup
+AFTER INSERT ON MemberTransactions
+FOR EACH ROW
+BEGIN
+    DECLARE v_category_id INT;
+    DECLARE v_slot TINYINT DEFAULT NEW.Member_ID MOD 16;
+    DECLARE v_first_borrow BOOLEAN;
+    DECLARE v_new_borrower INT DEFAULT 0;
+    DECLARE v_open BOOLEAN DEFAULT NEW.Status <> 'Completed';
+
+    IF NEW.Transaction_Type = 'Borrow' THEN
+        SET v_category_id = (SELECT Category_ID FROM Books WHERE ISBN = NEW.ISBN);
+        SET v_first_borrow = COALESCE((SELECT Times_Borrowed FROM BookCirculation WHERE ISBN = NEW.ISBN), 0) = 0;
+
+        INSERT INTO BookCirculation (ISBN, Times_Borrowed, Currently_Borrowed, Overdue_Count, Fines_Total, Last_Borrowed_At)
+        VALUES (NEW.ISBN, 1, v_open, NEW.Status = 'Overdue', NEW.Fine_Amount, NEW.Transaction_Date)
+        ON DUPLICATE KEY UPDATE
+            Times_Borrowed = Times_Borrowed + 1,
+            Currently_Borrowed = Currently_Borrowed + v_open,
+            Overdue_Count = Overdue_Count + (NEW.Status = 'Overdue'),
+            Fines_Total = Fines_Total + NEW.Fine_Amount,
+            Last_Borrowed_At = GREATEST(COALESCE(Last_Borrowed_At, NEW.Transaction_Date), NEW.Transaction_Date);
+
+        IF v_category_id IS NOT NULL THEN
+            INSERT IGNORE INTO CategoryBorrowers (Category_ID, Member_ID) VALUES (v_category_id, NEW.Member_ID);
+            SET v_new_borrower = ROW_COUNT();
+
+            INSERT INTO CategoryCirculation
+                (Category_ID, Slot, Loans, Books_Borrowed, Unique_Borrowers, Open_Loans, Overdue_Count, Fined_Loans, Fines_Total)
+            VALUES (v_category_id, v_slot, 1, v_first_borrow, v_new_borrower, v_open,
+                    NEW.Status = 'Overdue', NEW.Fine_Amount > 0, NEW.Fine_Amount)
+            ON DUPLICATE KEY UPDATE
+                Loans = Loans + 1,
+                Books_Borrowed = Books_Borrowed + v_first_borrow,
+                Unique_Borrowers = Unique_Borrowers + v_new_borrower,
+                Open_Loans = Open_Loans + v_open,
+                Overdue_Count = Overdue_Count + (NEW.Status = 'Overdue'),
+                Fined_Loans = Fined_Loans + (NEW.Fine_Amount > 0),
+                Fines_Total = Fines_Total + NEW.Fine_Amount;
+        END IF;
+
+        INSERT INTO DailyCirculation (Circulation_Date, Slot, Borrows)
+        VALUES (DATE(NEW.Transaction_Date), v_slot, 1)
+        ON DUPLICATE KEY UPDATE Borrows = Borrows + 1;
+
+        -- Loaded history can arrive already returned
+        IF NOT v_open AND NEW.Return_Date IS NOT NULL THEN
+            INSERT INTO DailyCirculation (Circulation_Date, Slot, Returns, Fines_Collected)
+            VALUES (NEW.Return_Date, v_slot, 1, NEW.Fine_Amount)
+            ON DUPLICATE KEY UPDATE Returns = Returns + 1, Fines_Collected = Fines_Collected + NEW.Fine_Amount;
+        END IF;
+    END IF;
+END;//
+
+-- Returns and fine accrual
+CREATE TRIGGER after_transaction_update_rollup
+AFTER UPDATE ON MemberTransactions
+FOR EACH ROW
+BEGIN
+    DECLARE v_category_id INT;
+    DECLARE v_slot TINYINT DEFAULT NEW.Member_ID MOD 16;
+    DECLARE v_open_delta INT DEFAULT (NEW.Status <> 'Completed') - (OLD.Status <> 'Completed');
+    DECLARE v_overdue_delta INT DEFAULT (NEW.Status = 'Overdue') - (OLD.Status = 'Overdue');
+    DECLARE v_fined_delta INT DEFAULT (NEW.Fine_Amount > 0) - (OLD.Fine_Amount > 0);
+    DECLARE v_fine_delta DECIMAL(12, 2) DEFAULT NEW.Fine_Amount - OLD.Fine_Amount;
+
+    IF NEW.Transaction_Type = 'Borrow'
+        AND (v_open_delta <> 0 OR v_overdue_delta <> 0 OR v_fine_delta <> 0) THEN
+        UPDATE BookCirculation
+        SET Currently_Borrowed = Currently_Borrowed + v_open_delta,
+            Overdue_Count = Overdue_Count + v_overdue_delta,
+            Fines_Total = Fines_Total + v_fine_delta
+        WHERE ISBN = NEW.ISBN;
+
+        SET v_category_id = (SELECT Category_ID FROM Books WHERE ISBN = NEW.ISBN);
+        IF v_category_id IS NOT NULL THEN
+            UPDATE CategoryCirculation
+            SET Open_Loans = Open_Loans + v_open_delta,
+                Overdue_Count = Overdue_Count + v_overdue_delta,
+                Fined_Loans = Fined_Loans + v_fined_delta,
+                Fines_Total = Fines_Total + v_fine_delta
+            WHERE Category_ID = v_category_id AND Slot = v_slot;
+        END IF;
+
+        IF v_open_delta < 0 THEN
+            INSERT INTO DailyCirculation (Circulation_Date, Slot, Returns, Fines_Collected)
+            VALUES (COALESCE(NEW.Return_Date, CURRENT_DATE), v_slot, 1, NEW.Fine_Amount)
+            ON DUPLICATE KEY UPDATE Returns = Returns + 1, Fines_Collected = Fines_Collected + NEW.Fine_Amount;
+        END IF;
+    END IF;
+END;//
+
+-- Recompute every rollup from MemberTransactions, for backfills and after bulk deletes.
+-- Runs as one transaction, so borrows and returns wait for it; run it off-peak.
+CREATE PROCEDURE RebuildCirculationRollups()
+BEGIN
+    START TRANSACTION;
+    DELETE FROM BookCirculation;
+    DELETE FROM CategoryCirculation;
+    DELETE FROM CategoryBorrowers;
+    DELETE FROM DailyCirculation;
+
+    INSERT INTO BookCirculation (ISBN, Times_Borrowed, Currently_Borrowed, Overdue_Count, Fines_Total, Last_Borrowed_At)
+    SELECT b.ISBN,
+           COALESCE(t.Times_Borrowed, 0),
+           COALESCE(t.Currently_Borrowed, 0),
+           COALESCE(t.Overdue_Count, 0),
+           COALESCE(t.Fines_Total, 0),
+           t.Last_Borrowed_At
+    FROM Books b
+    LEFT JOIN (
+        SELECT ISBN,
+            COUNT(*) AS Times_Borrowed,
+            SUM(Status <> 'Completed') AS Currently_Borrowed,
+            SUM(Status = 'Overdue') AS Overdue_Count,
+            SUM(Fine_Amount) AS Fines_Total,
+            MAX(Transaction_Date) AS Last_Borrowed_At
+        FROM MemberTransactions
+        WHERE Transaction_Type = 'Borrow'
+        GROUP BY ISBN
+    ) t ON t.ISBN = b.ISBN;
+
+    INSERT INTO CategoryBorrowers (Category_ID, Member_ID)
+    SELECT DISTINCT b.Category_ID, mt.Member_ID
+    FROM MemberTransactions mt
+    JOIN Books b ON b.ISBN = mt.ISBN
+    WHERE mt.Transaction_Type = 'Borrow' AND b.Category_ID IS NOT NULL;
+
+    INSERT INTO CategoryCirculation (Category_ID, Slot, Loans, Open_Loans, Overdue_Count, Fined_Loans, Fines_Total)
+    SELECT b.Category_ID,
+           mt.Member_ID MOD 16,
+           COUNT(*),
+           SUM(mt.Status <> 'Completed'),
+           SUM(mt.Status = 'Overdue'),
+           SUM(mt.Fine_Amount > 0),
+           SUM(mt.Fine_Amount)
+    FROM MemberTransactions mt
+    JOIN Books b ON b.ISBN = mt.ISBN
+    WHERE mt.Transaction_Type = 'Borrow' AND b.Category_ID IS NOT NULL
+    GROUP BY b.Category_ID, mt.Member_ID MOD 16;
+
+    -- Every borrower has a loan in its own slot, so those rows already exist
+    UPDATE CategoryCirculation cc
+    JOIN (
+        SELECT Category_ID, Member_ID MOD 16 AS Slot, COUNT(*) AS Borrowers
+        FROM CategoryBorrowers
+        GROUP BY Category_ID, Member_ID MOD 16
+    ) t ON t.Category_ID = cc.Category_ID AND t.Slot = cc.Slot
+    SET cc.Unique_Borrowers = t.Borrowers;
+
+    INSERT INTO CategoryCirculation (Category_ID, Slot, Books_Borrowed)
+    SELECT * FROM (
+        SELECT b.Category_ID, 0 AS Slot, COUNT(*) AS Titles
+        FROM BookCirculation bc
+        JOIN Books b ON b.ISBN = bc.ISBN
+        WHERE bc.Times_Borrowed > 0 AND b.Category_ID IS NOT NULL
+        GROUP BY b.Category_ID
+    ) t
+    ON DUPLICATE KEY UPDATE Books_Borrowed = t.Titles;
+
+    INSERT INTO DailyCirculation (Circulation_Date, Slot, Borrows)
+    SELECT DATE(Transaction_Date), Member_ID MOD 16, COUNT(*)
+    FROM MemberTransactions
+    WHERE Transaction_Type = 'Borrow'
+    GROUP BY DATE(Transaction_Date), Member_ID MOD 16;
+
+    INSERT INTO DailyCirculation (Circulation_Date, Slot, Returns, Fines_Collected)
+    SELECT * FROM (
+        SELECT Return_Date, Member_ID MOD 16 AS Slot, COUNT(*) AS Returned, SUM(Fine_Amount) AS Fines
+        FROM MemberTransactions
+        WHERE Transaction_Type = 'Borrow' AND Status = 'Completed' AND Return_Date IS NOT NULL
+        GROUP BY Return_Date, Member_ID MOD 16
+    ) t
+    ON DUPLICATE KEY UPDATE Returns = t.Returned, Fines_Collected = t.Fines;
+    COMMIT;
+
+    SELECT (SELECT COUNT(*) FROM BookCirculation) AS Books,
+           (SELECT COUNT(*) FROM CategoryCirculation) AS Category_Rows,
+           (SELECT COUNT(*) FROM DailyCirculation) AS Daily_Rows;
+END;//
+DELIMITER ;
+
+-- Backfill from the existing history
+CALL RebuildCirculationRollups();
@@ -0,0 +1,301 @@
+-- Archival of old completed transactions into a year-partitioned history table.
+-- Member history, TransactionDetailsView, CalculateTotalFines and the rollup
+-- rebuild read both tables; DeleteBook also refuses books with archived history.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+-- Completed transactions older than the retention age, moved out of MemberTransactions
+-- by ArchiveMemberTransactions so the live table and its indexes stay small.
+-- Partitioned by year (so Transaction_Date is a DATETIME and part of the key);
+-- archive.py splits p_future as new years arrive. Partitioned tables cannot have
+-- foreign keys, so DeleteBook checks this table itself.
+CREATE TABLE MemberTransactionsArchive (
+    Transaction_ID INT NOT NULL,
+    Member_ID INT NOT NULL,
+    ISBN VARCHAR(13) NOT NULL,
+    Transaction_Type ENUM('Borrow', 'Return') NOT NULL,
+    Transaction_Date DATETIME NOT NULL,
+    Due_Date DATE,
+    Return_Date DATE,
+    Fine_Amount DECIMAL(10, 2) DEFAULT 0.00,
+    Status ENUM('Active', 'Completed', 'Overdue') DEFAULT 'Completed',
+    Archived_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (Transaction_ID, Transaction_Date),
+    INDEX idx_mta_member_date (Member_ID, Transaction_Date, Transaction_ID), -- member history pages
+    INDEX idx_mta_isbn (ISBN) -- DeleteBook history check
+)
+PARTITION BY RANGE (YEAR(Transaction_Date)) (
+    PARTITION p2023 VALUES LESS THAN (2024),
+    PARTITION p2024 VALUES LESS THAN (2025),
+    PARTITION p2025 VALUES LESS THAN (2026),
+    PARTITION p2026 VALUES LESS THAN (2027),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+-- Every transaction, live or archived, for the occasional full-history read
+CREATE OR REPLACE VIEW MemberTransactionHistory AS
+SELECT Transaction_ID, Member_ID, ISBN, Transaction_Type, Transaction_Date,
+       Due_Date, Return_Date, Fine_Amount, Status
+FROM MemberTransactions
+UNION ALL
+SELECT Transaction_ID, Member_ID, ISBN, Transaction_Type, Transaction_Date,
+       Due_Date, Return_Date, Fine_Amount, Status
+FROM MemberTransactionsArchive;
+
+CREATE OR REPLACE VIEW TransactionDetailsView AS
+SELECT 
+    mt.Transaction_ID,
+    m.Member_ID,
+    m.Username as Member_Name,
+    b.ISBN,
+    b.Title as Book_Title,
+    a.Author_Name,
+    mt.Transaction_Type,
+    mt.Transaction_Date,
+    mt.Due_Date,
+    mt.Return_Date,
+    mt.Fine_Amount,
+    mt.Status,
+    mt.Fine_Amount as Current_Fine -- accrued daily by AccrueFines on open loans
+FROM MemberTransactions mt
+JOIN Members m ON mt.Member_ID = m.Member_ID
+JOIN Books b ON mt.ISBN = b.ISBN
+JOIN Authors a ON b.Author_ID = a.Author_ID
+UNION ALL
+-- Archived history; filters on the view are pushed into both branches (MySQL 8.0.29+)
+SELECT 
+    mt.Transaction_ID,
+    m.Member_ID,
+    m.Username as Member_Name,
+    b.ISBN,
+    b.Title as Book_Title,
+    a.Author_Name,
+    mt.Transaction_Type,
+    mt.Transaction_Date,
+    mt.Due_Date,
+    mt.Return_Date,
+    mt.Fine_Amount,
+    mt.Status,
+    mt.Fine_Amount as Current_Fine
+FROM MemberTransactionsArchive mt
+JOIN Members m ON mt.Member_ID = m.Member_ID
+JOIN Books b ON mt.ISBN = b.ISBN
+JOIN Authors a ON b.Author_ID = a.Author_ID;
+
+DROP PROCEDURE IF EXISTS DeleteBook;
+DROP FUNCTION IF EXISTS CalculateTotalFines;
+DROP PROCEDURE IF EXISTS RebuildCirculationRollups;
+
+DELIMITER //
+CREATE PROCEDURE DeleteBook(
+    IN p_admin_id INT,
+    IN p_isbn VARCHAR(13)
+)
+BEGIN
+    DECLARE v_book_exists INT;
+    DECLARE v_active_transactions INT;
+    DECLARE v_archived_history INT;
+    
+    -- Check if book exists
+    SELECT COUNT(*) INTO v_book_exists
+    FROM Books
+    WHERE ISBN = p_isbn;
+    
+    -- Check if book has any active transactions
+    SELECT COUNT(*) INTO v_active_transactions
+    FROM MemberTransactions
+    WHERE ISBN = p_isbn AND Status IN ('Active', 'Overdue');
+    
+    -- Live history is protected by its foreign key; archived history has none
+    SELECT EXISTS (SELECT 1 FROM MemberTransactionsArchive WHERE ISBN = p_isbn)
+    INTO v_archived_history;
+    
+    -- Only proceed if book exists and has no active transactions
+    IF v_book_exists = 0 THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Book does not exist';
+    ELSEIF v_active_transactions > 0 THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot delete book with active transactions';
+    ELSEIF v_archived_history THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot delete book with archived transaction history';
+    ELSE
+        -- Delete the book
+        DELETE FROM Books WHERE ISBN = p_isbn;
+    END IF;
+END //
+
+CREATE FUNCTION CalculateTotalFines(p_member_id INT) 
+RETURNS DECIMAL(10,2)
+DETERMINISTIC
+BEGIN
+    DECLARE total_fines DECIMAL(10,2);
+    
+    SELECT COALESCE((SELECT SUM(Fine_Amount) FROM MemberTransactions WHERE Member_ID = p_member_id), 0)
+         + COALESCE((SELECT SUM(Fine_Amount) FROM MemberTransactionsArchive WHERE Member_ID = p_member_id), 0)
+    INTO total_fines;
+    
+    RETURN COALESCE(total_fines, 0.00);
+END //
+
+-- Recompute every rollup from the live and archived history, for backfills and after bulk deletes.
+-- Runs as one transaction, so borrows and returns wait for it; run it off-peak.
+CREATE PROCEDURE RebuildCirculationRollups()
+BEGIN
+    START TRANSACTION;
+    DELETE FROM BookCirculation;
+    DELETE FROM CategoryCirculation;
+    DELETE FROM CategoryBorrowers;
+    DELETE FROM DailyCirculation;
+
+    INSERT INTO BookCirculation (ISBN, Times_Borrowed, Currently_Borrowed, Overdue_Count, Fines_Total, Last_Borrowed_At)
+    SELECT b.ISBN,
+           COALESCE(t.Times_Borrowed, 0),
+           COALESCE(t.Currently_Borrowed, 0),
+           COALESCE(t.Overdue_Count, 0),
+           COALESCE(t.Fines_Total, 0),
+           t.Last_Borrowed_At
+    FROM Books b
+    LEFT JOIN (
+        SELECT ISBN,
+            COUNT(*) AS Times_Borrowed,
+            SUM(Status <> 'Completed') AS Currently_Borrowed,
+            SUM(Status = 'Overdue') AS Overdue_Count,
+            SUM(Fine_Amount) AS Fines_Total,
+            MAX(Transaction_Date) AS Last_Borrowed_At
+        FROM MemberTransactionHistory
+        WHERE Transaction_Type = 'Borrow'
+        GROUP BY ISBN
+    ) t ON t.ISBN = b.ISBN;
+
+    INSERT INTO CategoryBorrowers (Category_ID, Member_ID)
+    SELECT DISTINCT b.Category_ID, mt.Member_ID
+    FROM MemberTransactionHistory mt
+    JOIN Books b ON b.ISBN = mt.ISBN
+    WHERE mt.Transaction_Type = 'Borrow' AND b.Category_ID IS NOT NULL;
+
+    INSERT INTO CategoryCirculation (Category_ID, Slot, Loans, Open_Loans, Overdue_Count, Fined_Loans, Fines_Total)
+    SELECT b.Category_ID,
+           mt.Member_ID MOD 16,
+           COUNT(*),
+           SUM(mt.Status <> 'Completed'),
+           SUM(mt.Status = 'Overdue'),
+           SUM(mt.Fine_Amount > 0),
+           SUM(mt.Fine_Amount)
+    FROM MemberTransactionHistory mt
+    JOIN Books b ON b.ISBN = mt.ISBN
+    WHERE mt.Transaction_Type = 'Borrow' AND b.Category_ID IS NOT NULL
+    GROUP BY b.Category_ID, mt.Member_ID MOD 16;
+
+    -- Every borrower has a loan in its own slot, so those rows already exist
+    UPDATE CategoryCirculation cc
+    JOIN (
+        SELECT Category_ID, Member_ID MOD 16 AS Slot, COUNT(*) AS Borrowers
+        FROM CategoryBorrowers
+        GROUP BY Category_ID, Member_ID MOD 16
+    ) t ON t.Category_ID = cc.Category_ID AND t.Slot = cc.Slot
+    SET cc.Unique_Borrowers = t.Borrowers;
+
+    INSERT INTO CategoryCirculation (Category_ID, Slot, Books_Borrowed)
+    SELECT * FROM (
+        SELECT b.Category_ID, 0 AS Slot, COUNT(*) AS Titles
+        FROM BookCirculation bc
+        JOIN Books b ON b.ISBN = bc.ISBN
+        WHERE bc.Times_Borrowed > 0 AND b.Category_ID IS NOT NULL
+        GROUP BY b.Category_ID
+    ) t
+    ON DUPLICATE KEY UPDATE Books_Borrowed = t.Titles;
+
+    INSERT INTO DailyCirculation (Circulation_Date, Slot, Borrows)
+    SELECT DATE(Transaction_Date), Member_ID MOD 16, COUNT(*)
+    FROM MemberTransactionHistory
+    WHERE Transaction_Type = 'Borrow'
+    GROUP BY DATE(Transaction_Date), Member_ID MOD 16;
+
+    INSERT INTO DailyCirculation (Circulation_Date, Slot, Returns, Fines_Collected)
+    SELECT * FROM (
+        SELECT Return_Date, Member_ID MOD 16 AS Slot, COUNT(*) AS Returned, SUM(Fine_Amount) AS Fines
+        FROM MemberTransactionHistory
+        WHERE Transaction_Type = 'Borrow' AND Status = 'Completed' AND Return_Date IS NOT NULL
+        GROUP BY Return_Date, Member_ID MOD 16
+    ) t
+    ON DUPLICATE KEY UPDATE Returns = t.Returned, Fines_Collected = t.Fines;
+    COMMIT;
+
+    SELECT (SELECT COUNT(*) FROM BookCirculation) AS Books,
+           (SELECT COUNT(*) FROM CategoryCirculation) AS Category_Rows,
+           (SELECT COUNT(*) FROM DailyCirculation) AS Daily_Rows;
+END;//
+DELIMITER ;
+
+-- Archival: Completed transactions returned more than p_older_than_days ago move to
+-- MemberTransactionsArchive. The live table is walked in primary-key ranges of
+-- p_batch_size rows, each copied and deleted in its own short transaction.
+-- archive.py runs it (nightly from cron) after making sure the year partitions exist.
+CREATE TABLE ArchiveRuns (
+    Run_ID INT PRIMARY KEY AUTO_INCREMENT,
+    Cutoff_Date DATE NOT NULL,
+    Rows_Moved INT DEFAULT 0,
+    Started_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Finished_At TIMESTAMP NULL
+);
+
+DELIMITER //
+CREATE PROCEDURE ArchiveMemberTransactions(
+    IN p_older_than_days INT,
+    IN p_batch_size INT
+)
+BEGIN
+    DECLARE v_run_id INT;
+    DECLARE v_cutoff DATE;
+    DECLARE v_last_id INT DEFAULT 0;
+    DECLARE v_upper INT;
+    DECLARE v_moved INT DEFAULT 0;
+
+    SET p_older_than_days = COALESCE(p_older_than_days, 365);
+    SET p_batch_size = COALESCE(p_batch_size, 5000);
+    SET v_cutoff = CURRENT_DATE - INTERVAL p_older_than_days DAY;
+
+    INSERT INTO ArchiveRuns (Cutoff_Date) VALUES (v_cutoff);
+    SET v_run_id = LAST_INSERT_ID();
+    COMMIT;
+
+    REPEAT
+        SET v_upper = (
+            SELECT MAX(Transaction_ID) FROM (
+                SELECT Transaction_ID FROM MemberTransactions
+                WHERE Transaction_ID > v_last_id
+                ORDER BY Transaction_ID
+                LIMIT p_batch_size
+            ) ids
+        );
+        IF v_upper IS NOT NULL THEN
+            START TRANSACTION;
+            INSERT INTO MemberTransactionsArchive
+                (Transaction_ID, Member_ID, ISBN, Transaction_Type, Transaction_Date,
+                 Due_Date, Return_Date, Fine_Amount, Status)
+            SELECT Transaction_ID, Member_ID, ISBN, Transaction_Type, Transaction_Date,
+                   Due_Date, Return_Date, Fine_Amount, Status
+            FROM MemberTransactions
+            WHERE Transaction_ID > v_last_id AND Transaction_ID <= v_upper
+            AND Status = 'Completed' AND Return_Date < v_cutoff;
+
+            -- No delete triggers: the summary and rollup counters keep the history
+            DELETE FROM MemberTransactions
+            WHERE Transaction_ID > v_last_id AND Transaction_ID <= v_upper
+            AND Status = 'Completed' AND Return_Date < v_cutoff;
+            SET v_moved = v_moved + ROW_COUNT();
+            COMMIT;
+            SET v_last_id = v_upper;
+        END IF;
+    UNTIL v_upper IS NULL END REPEAT;
+
+    UPDATE ArchiveRuns
+    SET Rows_Moved = v_moved, Finished_At = CURRENT_TIMESTAMP
+    WHERE Run_ID = v_run_id;
+    COMMIT;
+
+    SELECT v_run_id AS Run_ID, v_cutoff AS Cutoff_Date, v_moved AS Rows_Moved;
+END;//
+DELIMITER ;
@@ -0,0 +1,67 @@
+-- Audit log: BookStatusLog and AdminTransactions become monthly-partitioned tables
+-- with (ISBN, date) indexes, and BookAuditDaily holds the per-book daily totals
+-- that audit.py compacts expired months into. Partitioned tables cannot carry
+-- foreign keys, so those are dropped; ALTER ... PARTITION BY copies each table once.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+ALTER TABLE BookStatusLog DROP FOREIGN KEY BookStatusLog_ibfk_1;
+UPDATE BookStatusLog SET Changed_At = CURRENT_TIMESTAMP WHERE Changed_At IS NULL;
+ALTER TABLE BookStatusLog
+    DROP INDEX ISBN,
+    MODIFY Log_ID BIGINT NOT NULL AUTO_INCREMENT,
+    MODIFY ISBN VARCHAR(13) NOT NULL,
+    MODIFY Old_Status ENUM('In stock', 'Checked out'),
+    MODIFY New_Status ENUM('In stock', 'Checked out'),
+    MODIFY Changed_At DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (Log_ID, Changed_At),
+    ADD INDEX idx_bsl_isbn_changed (ISBN, Changed_At);
+ALTER TABLE BookStatusLog
+PARTITION BY RANGE COLUMNS (Changed_At) (
+    PARTITION p_start VALUES LESS THAN ('2026-10-01'),
+    PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+    PARTITION p202612 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
+
+ALTER TABLE AdminTransactions
+    DROP FOREIGN KEY AdminTransactions_ibfk_1,
+    DROP FOREIGN KEY AdminTransactions_ibfk_2;
+UPDATE AdminTransactions SET Transaction_Date = CURRENT_TIMESTAMP WHERE Transaction_Date IS NULL;
+ALTER TABLE AdminTransactions
+    DROP INDEX ISBN,
+    DROP INDEX Admin_ID,
+    MODIFY Transaction_Date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (Transaction_ID, Transaction_Date),
+    ADD INDEX idx_at_isbn_date (ISBN, Transaction_Date),
+    ADD INDEX idx_at_admin_date (Admin_ID, Transaction_Date);
+ALTER TABLE AdminTransactions
+PARTITION BY RANGE COLUMNS (Transaction_Date) (
+    PARTITION p_start VALUES LESS THAN ('2026-10-01'),
+    PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+    PARTITION p202612 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
+
+CREATE TABLE BookAuditDaily (
+    ISBN VARCHAR(13) NOT NULL,
+    Audit_Date DATE NOT NULL,
+    Status_Changes INT NOT NULL DEFAULT 0,
+    Checked_Out INT NOT NULL DEFAULT 0,
+    Returned INT NOT NULL DEFAULT 0,
+    Admin_Checkouts INT NOT NULL DEFAULT 0,
+    Admin_Returns INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (ISBN, Audit_Date)
+);
+
+CREATE TABLE AuditCompactions (
+    Table_Name VARCHAR(64) NOT NULL,
+    Partition_Name VARCHAR(64) NOT NULL,
+    Rows_Compacted INT NOT NULL DEFAULT 0,
+    Compacted_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (Table_Name, Partition_Name)
+);
@@ -0,0 +1,503 @@
+-- Multi-copy inventory: one Copies row per physical copy and counted availability
+-- on Books. Borrowing claims a free copy with FOR UPDATE SKIP LOCKED and the
+-- counters move in the same transaction; Availability now follows the counters.
+-- Existing titles get one copy each, on loan if the title was checked out.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+ALTER TABLE Books
+    ADD COLUMN Total_Copies INT NOT NULL DEFAULT 1 AFTER Availability,
+    ADD COLUMN Available_Copies INT NOT NULL DEFAULT 1 AFTER Total_Copies;
+
+-- One row per physical copy of a title. BorrowBook claims a free copy with
+-- SELECT ... FOR UPDATE SKIP LOCKED, so concurrent checkouts of the same title
+-- take different copies instead of queueing on each other.
+CREATE TABLE Copies (
+    Copy_ID INT PRIMARY KEY AUTO_INCREMENT,
+    ISBN VARCHAR(13) NOT NULL,
+    Barcode VARCHAR(32) NOT NULL UNIQUE,
+    Status ENUM('Available', 'On loan', 'Withdrawn') NOT NULL DEFAULT 'Available',
+    Added_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_copies_isbn_status (ISBN, Status, Copy_ID), -- first free copy of a title
+    FOREIGN KEY (ISBN) REFERENCES Books(ISBN) ON DELETE CASCADE
+);
+
+INSERT INTO Copies (ISBN, Barcode, Status)
+SELECT ISBN, CONCAT(ISBN, '-001'), IF(Availability = 'In stock', 'Available', 'On loan')
+FROM Books;
+
+UPDATE Books SET Available_Copies = (Availability = 'In stock');
+
+ALTER TABLE Books
+    ADD CONSTRAINT chk_books_copies CHECK (Available_Copies BETWEEN 0 AND Total_Copies);
+
+ALTER TABLE MemberTransactions
+    ADD COLUMN Copy_ID INT AFTER Status,
+    ADD FOREIGN KEY (Copy_ID) REFERENCES Copies(Copy_ID);
+
+-- Every title had one copy, so an open loan holds that copy
+UPDATE MemberTransactions mt
+JOIN Copies c ON c.ISBN = mt.ISBN
+SET mt.Copy_ID = c.Copy_ID
+WHERE mt.Status IN ('Active', 'Overdue');
+
+DELIMITER //
+-- New titles start with Total_Copies copies on the shelf (one unless given)
+CREATE TRIGGER before_book_insert_copies
+BEFORE INSERT ON Books
+FOR EACH ROW
+BEGIN
+    SET NEW.Available_Copies = NEW.Total_Copies;
+    SET NEW.Availability = IF(NEW.Total_Copies > 0, 'In stock', 'Checked out');
+END;//
+
+CREATE TRIGGER after_book_insert_copies
+AFTER INSERT ON Books
+FOR EACH ROW
+BEGIN
+    DECLARE v_copy INT DEFAULT 1;
+    WHILE v_copy <= NEW.Total_Copies DO
+        INSERT INTO Copies (ISBN, Barcode)
+        VALUES (NEW.ISBN, CONCAT(NEW.ISBN, '-', LPAD(v_copy, GREATEST(3, LENGTH(v_copy)), '0')));
+        SET v_copy = v_copy + 1;
+    END WHILE;
+END;//
+
+-- Availability follows the counters, so the old single-copy readers keep working
+CREATE TRIGGER before_book_update_copies
+BEFORE UPDATE ON Books
+FOR EACH ROW
+BEGIN
+    IF NEW.Available_Copies <> OLD.Available_Copies THEN
+        SET NEW.Availability = IF(NEW.Available_Copies > 0, 'In stock', 'Checked out');
+    END IF;
+END;//
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS CheckOutBook;
+DROP PROCEDURE IF EXISTS AdminReturnBook;
+DROP PROCEDURE IF EXISTS BorrowBook;
+DROP PROCEDURE IF EXISTS ReturnBook;
+DROP FUNCTION IF EXISTS GetBookAvailabilityDetails;
+
+DELIMITER //
+CREATE PROCEDURE CheckOutBook(
+    IN p_admin_id INT,
+    IN p_isbn VARCHAR(13)
+)
+BEGIN
+    DECLARE v_copy_id INT DEFAULT NULL;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    -- Take any free copy; copies another session is claiming are skipped, not waited on
+    SELECT Copy_ID INTO v_copy_id
+    FROM Copies
+    WHERE ISBN = p_isbn AND Status = 'Available'
+    ORDER BY Copy_ID
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED;
+
+    IF v_copy_id IS NULL THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Book is not available for checkout';
+    END IF;
+
+    UPDATE Copies SET Status = 'On loan' WHERE Copy_ID = v_copy_id;
+
+    UPDATE Books 
+    SET Available_Copies = Available_Copies - 1
+    WHERE ISBN = p_isbn;
+
+    -- Record admin transaction
+    INSERT INTO AdminTransactions (ISBN, Admin_ID, Transaction_Type)
+    VALUES (p_isbn, p_admin_id, 'Check out');
+
+    COMMIT;
+END //
+
+CREATE PROCEDURE AdminReturnBook(
+    IN p_admin_id INT,
+    IN p_isbn VARCHAR(13)
+)
+BEGIN
+    DECLARE v_copy_id INT DEFAULT NULL;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    -- Only copies the desk checked out; copies on a member loan come back through ReturnBook
+    SELECT c.Copy_ID INTO v_copy_id
+    FROM Copies c
+    WHERE c.ISBN = p_isbn
+    AND c.Status = 'On loan'
+    AND NOT EXISTS (
+        SELECT 1 FROM MemberTransactions mt
+        WHERE mt.Copy_ID = c.Copy_ID AND mt.Status IN ('Active', 'Overdue')
+    )
+    ORDER BY c.Copy_ID
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED;
+
+    IF v_copy_id IS NULL THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Book is already in stock';
+    END IF;
+
+    UPDATE Copies SET Status = 'Available' WHERE Copy_ID = v_copy_id;
+
+    UPDATE Books 
+    SET Available_Copies = Available_Copies + 1
+    WHERE ISBN = p_isbn;
+
+    -- Record admin transaction
+    INSERT INTO AdminTransactions (ISBN, Admin_ID, Transaction_Type)
+    VALUES (p_isbn, p_admin_id, 'Return');
+
+    COMMIT;
+END //
+
+-- Returns one row per ISBN with a result code instead of raising an error:
+--   OK, MEMBER_INACTIVE, OVERDUE, NOT_FOUND, ALREADY_BORROWED, UNAVAILABLE
+CREATE PROCEDURE BorrowBook(
+    IN p_member_id INT,
+    IN p_isbns TEXT
+)
+BEGIN
+    DECLARE v_member_active BOOLEAN;
+    DECLARE v_cart_code VARCHAR(20) DEFAULT NULL;
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_code VARCHAR(20);
+    DECLARE v_copy_id INT;
+    DECLARE v_claimed JSON DEFAULT JSON_ARRAY();
+    DECLARE v_results JSON DEFAULT JSON_ARRAY();
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE cart CURSOR FOR
+        SELECT j.ISBN
+        FROM JSON_TABLE(p_isbns, '$[*]' COLUMNS (
+            Position FOR ORDINALITY,
+            ISBN VARCHAR(13) PATH '$'
+        )) j
+        ORDER BY j.Position;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @borrow_checked_member = NULL;
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF NOT (JSON_VALID(p_isbns) AND JSON_TYPE(p_isbns) = 'ARRAY') THEN
+        SET p_isbns = JSON_ARRAY(p_isbns);
+    END IF;
+
+    START TRANSACTION;
+
+    -- Check if member is active. The exclusive lock keeps the status stable until commit
+    -- and makes two carts for the same member take turns, so the "already borrowed"
+    -- check below cannot race with another claim of the same title.
+    SELECT MAX(Status = 'Active') INTO v_member_active
+    FROM Members
+    WHERE Member_ID = p_member_id
+    FOR UPDATE;
+
+    IF NOT COALESCE(v_member_active, FALSE) THEN
+        SET v_cart_code = 'MEMBER_INACTIVE';
+    ELSEIF COALESCE((
+        SELECT Overdue_Count FROM MemberBorrowingSummary WHERE Member_ID = p_member_id
+    ), 0) > 0 OR EXISTS (
+        -- Loans that fell due since the last AccrueFines run
+        SELECT 1 FROM MemberTransactions
+        WHERE Member_ID = p_member_id
+        AND Status = 'Active'
+        AND Due_Date < CURDATE()
+    ) THEN
+        -- One overdue check for the whole cart
+        SET v_cart_code = 'OVERDUE';
+    END IF;
+
+    -- Tell before_borrow_check this member has already been checked
+    SET @borrow_checked_member = p_member_id;
+
+    OPEN cart;
+    cart_loop: LOOP
+        FETCH cart INTO v_isbn;
+        IF v_done THEN
+            LEAVE cart_loop;
+        END IF;
+
+        IF v_cart_code IS NOT NULL THEN
+            SET v_code = v_cart_code;
+        ELSEIF EXISTS (
+            SELECT 1 FROM MemberTransactions
+            WHERE Member_ID = p_member_id AND ISBN = v_isbn AND Status IN ('Active', 'Overdue')
+        ) THEN
+            -- Checked before claiming, since with several copies the title may still be in stock
+            SET v_code = 'ALREADY_BORROWED';
+        ELSE
+            -- Claim the first free copy through idx_copies_isbn_status. SKIP LOCKED
+            -- passes over copies other carts are claiming, so borrowers of the same
+            -- title each get a different copy instead of queueing on one row.
+            SET v_copy_id = NULL;
+            SELECT Copy_ID INTO v_copy_id
+            FROM Copies
+            WHERE ISBN = v_isbn AND Status = 'Available'
+            ORDER BY Copy_ID
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED;
+            -- A miss above raises NOT FOUND, which must not end the cart loop
+            SET v_done = FALSE;
+
+            IF v_copy_id IS NOT NULL THEN
+                UPDATE Copies SET Status = 'On loan' WHERE Copy_ID = v_copy_id;
+                INSERT INTO MemberTransactions (Member_ID, ISBN, Transaction_Type, Due_Date, Status, Copy_ID)
+                VALUES (p_member_id, v_isbn, 'Borrow', DATE_ADD(CURRENT_DATE, INTERVAL 14 DAY), 'Active', v_copy_id);
+                SET v_claimed = JSON_ARRAY_APPEND(v_claimed, '$', v_isbn);
+                SET v_code = 'OK';
+            -- The remaining branches only run on the failure path
+            ELSEIF NOT EXISTS (SELECT 1 FROM Books WHERE ISBN = v_isbn) THEN
+                SET v_code = 'NOT_FOUND';
+            ELSE
+                SET v_code = 'UNAVAILABLE';
+            END IF;
+        END IF;
+
+        SET v_results = JSON_ARRAY_APPEND(v_results, '$', JSON_OBJECT('ISBN', v_isbn, 'Code', v_code));
+    END LOOP;
+    CLOSE cart;
+
+    -- Counters last, in one statement, so the hot Books rows are locked only for
+    -- the moment before commit rather than for the whole cart
+    UPDATE Books b
+    JOIN (
+        SELECT j.ISBN, COUNT(*) AS Claimed
+        FROM JSON_TABLE(v_claimed, '$[*]' COLUMNS (ISBN VARCHAR(13) PATH '$')) j
+        GROUP BY j.ISBN
+    ) c ON c.ISBN = b.ISBN
+    SET b.Available_Copies = b.Available_Copies - c.Claimed;
+
+    SET @borrow_checked_member = NULL;
+    COMMIT;
+
+    SELECT r.ISBN, r.Result_Code
+    FROM JSON_TABLE(v_results, '$[*]' COLUMNS (
+        ISBN VARCHAR(13) PATH '$.ISBN',
+        Result_Code VARCHAR(20) PATH '$.Code'
+    )) r;
+END //
+
+-- Returns one row per ISBN with the borrower, a result code (OK, NOT_BORROWED)
+-- and the fine charged.
+CREATE PROCEDURE ReturnBook(
+    IN p_member_id INT,
+    IN p_isbns TEXT
+)
+BEGIN
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_transaction_id INT;
+    DECLARE v_member_id INT;
+    DECLARE v_due_date DATE;
+    DECLARE v_fine_amount DECIMAL(10, 2);
+    DECLARE v_copy_id INT;
+    DECLARE v_returned JSON DEFAULT JSON_ARRAY();
+    DECLARE v_results JSON DEFAULT JSON_ARRAY();
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE scans CURSOR FOR
+        SELECT j.ISBN
+        FROM JSON_TABLE(p_isbns, '$[*]' COLUMNS (
+            Position FOR ORDINALITY,
+            ISBN VARCHAR(13) PATH '$'
+        )) j
+        ORDER BY j.Position;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF NOT (JSON_VALID(p_isbns) AND JSON_TYPE(p_isbns) = 'ARRAY') THEN
+        SET p_isbns = JSON_ARRAY(p_isbns);
+    END IF;
+
+    START TRANSACTION;
+
+    OPEN scans;
+    scan_loop: LOOP
+        FETCH scans INTO v_isbn;
+        IF v_done THEN
+            LEAVE scan_loop;
+        END IF;
+
+        -- Get active transaction
+        SET v_transaction_id = NULL;
+        SET v_copy_id = NULL;
+        SELECT Transaction_ID, Member_ID, Due_Date, Copy_ID
+        INTO v_transaction_id, v_member_id, v_due_date, v_copy_id
+        FROM MemberTransactions
+        WHERE ISBN = v_isbn
+        AND Status IN ('Active', 'Overdue')
+        AND (p_member_id IS NULL OR Member_ID = p_member_id)
+        ORDER BY Transaction_ID
+        LIMIT 1
+        FOR UPDATE;
+        -- A miss above raises NOT FOUND, which must not end the scan loop
+        SET v_done = FALSE;
+
+        IF v_transaction_id IS NULL THEN
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', v_isbn, 'Member', p_member_id, 'Code', 'NOT_BORROWED', 'Fine', 0));
+        ELSE
+            -- Calculate fine if overdue (₹10 per day)
+            IF CURRENT_DATE > v_due_date THEN
+                SET v_fine_amount = DATEDIFF(CURRENT_DATE, v_due_date) * 10;
+            ELSE
+                SET v_fine_amount = 0;
+            END IF;
+
+            -- Loans made before copies were tracked have no Copy_ID; any copy on loan will do
+            IF v_copy_id IS NULL THEN
+                SELECT Copy_ID INTO v_copy_id
+                FROM Copies
+                WHERE ISBN = v_isbn AND Status = 'On loan'
+                ORDER BY Copy_ID
+                LIMIT 1
+                FOR UPDATE;
+                SET v_done = FALSE;
+            END IF;
+
+            UPDATE Copies SET Status = 'Available' WHERE Copy_ID = v_copy_id AND Status = 'On loan';
+            IF ROW_COUNT() = 1 THEN
+                SET v_returned = JSON_ARRAY_APPEND(v_returned, '$', v_isbn);
+            END IF;
+
+            -- Update transaction record
+            UPDATE MemberTransactions
+            SET Return_Date = CURRENT_DATE,
+                Fine_Amount = v_fine_amount,
+                Status = 'Completed'
+            WHERE Transaction_ID = v_transaction_id;
+
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', v_isbn, 'Member', v_member_id, 'Code', 'OK', 'Fine', v_fine_amount));
+        END IF;
+    END LOOP;
+    CLOSE scans;
+
+    UPDATE Books b
+    JOIN (
+        SELECT j.ISBN, COUNT(*) AS Returned
+        FROM JSON_TABLE(v_returned, '$[*]' COLUMNS (ISBN VARCHAR(13) PATH '$')) j
+        GROUP BY j.ISBN
+    ) r ON r.ISBN = b.ISBN
+    SET b.Available_Copies = b.Available_Copies + r.Returned;
+
+    COMMIT;
+
+    SELECT r.ISBN, r.Member_ID, r.Result_Code, r.Fine_Amount
+    FROM JSON_TABLE(v_results, '$[*]' COLUMNS (
+        ISBN VARCHAR(13) PATH '$.ISBN',
+        Member_ID INT PATH '$.Member',
+        Result_Code VARCHAR(20) PATH '$.Code',
+        Fine_Amount DECIMAL(10, 2) PATH '$.Fine'
+    )) r;
+END //
+
+-- Procedure to add copies of a title already in the catalog.
+-- Returns the new Total_Copies and Available_Copies.
+CREATE PROCEDURE AddCopies(
+    IN p_isbn VARCHAR(13),
+    IN p_count INT
+)
+BEGIN
+    DECLARE v_total INT DEFAULT NULL;
+    DECLARE v_copy INT;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF p_count IS NULL OR p_count < 1 THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Copy count must be at least 1';
+    END IF;
+
+    START TRANSACTION;
+
+    SELECT Total_Copies INTO v_total
+    FROM Books
+    WHERE ISBN = p_isbn
+    FOR UPDATE;
+
+    IF v_total IS NULL THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Book does not exist';
+    END IF;
+
+    -- Barcodes carry on from the highest copy number the title has had
+    SET v_copy = v_total + 1;
+    WHILE v_copy <= v_total + p_count DO
+        INSERT INTO Copies (ISBN, Barcode)
+        VALUES (p_isbn, CONCAT(p_isbn, '-', LPAD(v_copy, GREATEST(3, LENGTH(v_copy)), '0')));
+        SET v_copy = v_copy + 1;
+    END WHILE;
+
+    UPDATE Books
+    SET Total_Copies = Total_Copies + p_count,
+        Available_Copies = Available_Copies + p_count
+    WHERE ISBN = p_isbn;
+
+    COMMIT;
+
+    SELECT Total_Copies, Available_Copies FROM Books WHERE ISBN = p_isbn;
+END //
+
+CREATE FUNCTION GetBookAvailabilityDetails(p_isbn VARCHAR(13)) 
+RETURNS VARCHAR(100)
+DETERMINISTIC
+BEGIN
+    DECLARE status VARCHAR(100);
+    DECLARE due_date DATE;
+    
+    -- The counters answer the common case; loans are only read when every copy is out
+    SELECT 
+        CASE 
+            WHEN b.Available_Copies > 0 THEN
+                CONCAT('Available (', b.Available_Copies, ' of ', b.Total_Copies, ' copies)')
+            -- Copies the desk checked out have no due date
+            ELSE COALESCE(CONCAT('Checked out until ', DATE_FORMAT((
+                SELECT MIN(mt.Due_Date) FROM MemberTransactions mt
+                WHERE mt.ISBN = b.ISBN AND mt.Status IN ('Active', 'Overdue')
+            ), '%Y-%m-%d')), 'Checked out')
+        END INTO status
+    FROM Books b
+    WHERE b.ISBN = p_isbn;
+    
+    RETURN COALESCE(status, 'Book not found');
+END //
+DELIMITER ;
+
+CREATE OR REPLACE VIEW BookListView AS
+SELECT 
+    b.ISBN,
+    b.Title,
+    a.Author_Name,
+    c.Category_Name,
+    b.Availability,
+    b.Total_Copies,
+    b.Available_Copies,
+    b.Created_At,
+    b.Updated_At
+FROM Books b
+JOIN Authors a ON b.Author_ID = a.Author_ID
+JOIN Categories c ON b.Category_ID = c.Category_ID;
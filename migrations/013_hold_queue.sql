@@ -0,0 +1,674 @@
+-- Hold queues: members queue for a title with every copy out, and each returned
+-- copy goes to the next holder in the same transaction as the return.
+-- ExpireHolds (hourly event, or holds.py) passes uncollected copies on.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+ALTER TABLE Copies
+    MODIFY Status ENUM('Available', 'On loan', 'Withdrawn', 'On hold') NOT NULL DEFAULT 'Available';
+
+-- Hold queues: a FIFO queue of Waiting holds per title. A returned copy goes to the
+-- holder at Queue_Position 1 in the same transaction as the return (the hold turns
+-- Ready, the copy 'On hold') and stays set aside until Expires_At. Positions are
+-- stored and shifted when someone leaves the queue, so a holder reads theirs directly.
+-- HoldQueues has one row per title: its length, and the row lock that orders holds
+-- against returns of that title.
+CREATE TABLE HoldQueues (
+    ISBN VARCHAR(13) PRIMARY KEY,
+    Waiting INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (ISBN) REFERENCES Books(ISBN) ON DELETE CASCADE
+);
+
+INSERT INTO HoldQueues (ISBN)
+SELECT ISBN FROM Books;
+
+CREATE TABLE Holds (
+    Hold_ID INT PRIMARY KEY AUTO_INCREMENT,
+    ISBN VARCHAR(13) NOT NULL,
+    Member_ID INT NOT NULL,
+    Status ENUM('Waiting', 'Ready', 'Fulfilled', 'Cancelled', 'Expired') NOT NULL DEFAULT 'Waiting',
+    Queue_Position INT, -- 1 is next in line; only set while Waiting
+    Copy_ID INT, -- the copy set aside once Ready
+    Placed_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Ready_At DATETIME,
+    Expires_At DATETIME, -- pickup deadline once Ready
+    Closed_At DATETIME,
+    INDEX idx_holds_isbn_status_position (ISBN, Status, Queue_Position), -- next holder and queue shifts
+    INDEX idx_holds_member_isbn_status (Member_ID, ISBN, Status), -- a member's holds and pickup in BorrowBook
+    INDEX idx_holds_status_expires (Status, Expires_At), -- ExpireHolds sweep
+    FOREIGN KEY (ISBN) REFERENCES Books(ISBN) ON DELETE CASCADE,
+    FOREIGN KEY (Member_ID) REFERENCES Members(Member_ID) ON DELETE CASCADE,
+    FOREIGN KEY (Copy_ID) REFERENCES Copies(Copy_ID) ON DELETE SET NULL
+);
+
+DELIMITER //
+CREATE TRIGGER after_book_insert_holds
+AFTER INSERT ON Books
+FOR EACH ROW
+BEGIN
+    INSERT INTO HoldQueues (ISBN) VALUES (NEW.ISBN);
+END;//
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS AdminReturnBook;
+DROP PROCEDURE IF EXISTS BorrowBook;
+DROP PROCEDURE IF EXISTS ReturnBook;
+DROP PROCEDURE IF EXISTS AddCopies;
+
+DELIMITER //
+CREATE PROCEDURE AdminReturnBook(
+    IN p_admin_id INT,
+    IN p_isbn VARCHAR(13)
+)
+BEGIN
+    DECLARE v_copy_id INT DEFAULT NULL;
+    DECLARE v_hold_id INT;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    -- Only copies the desk checked out; copies on a member loan come back through ReturnBook
+    SELECT c.Copy_ID INTO v_copy_id
+    FROM Copies c
+    WHERE c.ISBN = p_isbn
+    AND c.Status = 'On loan'
+    AND NOT EXISTS (
+        SELECT 1 FROM MemberTransactions mt
+        WHERE mt.Copy_ID = c.Copy_ID AND mt.Status IN ('Active', 'Overdue')
+    )
+    ORDER BY c.Copy_ID
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED;
+
+    IF v_copy_id IS NULL THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Book is already in stock';
+    END IF;
+
+    -- Next holder first; the shelf only if nobody is waiting
+    CALL AllocateReturnedCopy(p_isbn, v_copy_id, v_hold_id);
+    IF v_hold_id IS NULL THEN
+        UPDATE Books 
+        SET Available_Copies = Available_Copies + 1
+        WHERE ISBN = p_isbn;
+    END IF;
+
+    -- Record admin transaction
+    INSERT INTO AdminTransactions (ISBN, Admin_ID, Transaction_Type)
+    VALUES (p_isbn, p_admin_id, 'Return');
+
+    COMMIT;
+END //
+
+-- Returns one row per ISBN with a result code instead of raising an error:
+--   OK, MEMBER_INACTIVE, OVERDUE, NOT_FOUND, ALREADY_BORROWED, UNAVAILABLE
+-- A copy set aside for one of the member's Ready holds is collected before any other.
+CREATE PROCEDURE BorrowBook(
+    IN p_member_id INT,
+    IN p_isbns TEXT
+)
+BEGIN
+    DECLARE v_member_active BOOLEAN;
+    DECLARE v_cart_code VARCHAR(20) DEFAULT NULL;
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_code VARCHAR(20);
+    DECLARE v_copy_id INT;
+    DECLARE v_hold_id INT;
+    DECLARE v_claimed JSON DEFAULT JSON_ARRAY();
+    DECLARE v_results JSON DEFAULT JSON_ARRAY();
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE cart CURSOR FOR
+        SELECT j.ISBN
+        FROM JSON_TABLE(p_isbns, '$[*]' COLUMNS (
+            Position FOR ORDINALITY,
+            ISBN VARCHAR(13) PATH '$'
+        )) j
+        ORDER BY j.Position;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @borrow_checked_member = NULL;
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF NOT (JSON_VALID(p_isbns) AND JSON_TYPE(p_isbns) = 'ARRAY') THEN
+        SET p_isbns = JSON_ARRAY(p_isbns);
+    END IF;
+
+    START TRANSACTION;
+
+    -- Check if member is active. The exclusive lock keeps the status stable until commit
+    -- and makes two carts for the same member take turns, so the "already borrowed"
+    -- check below cannot race with another claim of the same title.
+    SELECT MAX(Status = 'Active') INTO v_member_active
+    FROM Members
+    WHERE Member_ID = p_member_id
+    FOR UPDATE;
+
+    IF NOT COALESCE(v_member_active, FALSE) THEN
+        SET v_cart_code = 'MEMBER_INACTIVE';
+    ELSEIF COALESCE((
+        SELECT Overdue_Count FROM MemberBorrowingSummary WHERE Member_ID = p_member_id
+    ), 0) > 0 OR EXISTS (
+        -- Loans that fell due since the last AccrueFines run
+        SELECT 1 FROM MemberTransactions
+        WHERE Member_ID = p_member_id
+        AND Status = 'Active'
+        AND Due_Date < CURDATE()
+    ) THEN
+        -- One overdue check for the whole cart
+        SET v_cart_code = 'OVERDUE';
+    END IF;
+
+    -- Tell before_borrow_check this member has already been checked
+    SET @borrow_checked_member = p_member_id;
+
+    OPEN cart;
+    cart_loop: LOOP
+        FETCH cart INTO v_isbn;
+        IF v_done THEN
+            LEAVE cart_loop;
+        END IF;
+
+        IF v_cart_code IS NOT NULL THEN
+            SET v_code = v_cart_code;
+        ELSEIF EXISTS (
+            SELECT 1 FROM MemberTransactions
+            WHERE Member_ID = p_member_id AND ISBN = v_isbn AND Status IN ('Active', 'Overdue')
+        ) THEN
+            -- Checked before claiming, since with several copies the title may still be in stock
+            SET v_code = 'ALREADY_BORROWED';
+        ELSE
+            SET v_copy_id = NULL;
+            SET v_hold_id = NULL;
+            SELECT Hold_ID, Copy_ID INTO v_hold_id, v_copy_id
+            FROM Holds
+            WHERE Member_ID = p_member_id AND ISBN = v_isbn AND Status = 'Ready'
+            LIMIT 1
+            FOR UPDATE;
+
+            -- Otherwise claim the first free copy through idx_copies_isbn_status. SKIP LOCKED
+            -- passes over copies other carts are claiming, so borrowers of the same
+            -- title each get a different copy instead of queueing on one row.
+            IF v_copy_id IS NULL THEN
+                SELECT Copy_ID INTO v_copy_id
+                FROM Copies
+                WHERE ISBN = v_isbn AND Status = 'Available'
+                ORDER BY Copy_ID
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED;
+            END IF;
+            -- A miss above raises NOT FOUND, which must not end the cart loop
+            SET v_done = FALSE;
+
+            IF v_copy_id IS NOT NULL THEN
+                UPDATE Copies SET Status = 'On loan' WHERE Copy_ID = v_copy_id;
+                INSERT INTO MemberTransactions (Member_ID, ISBN, Transaction_Type, Due_Date, Status, Copy_ID)
+                VALUES (p_member_id, v_isbn, 'Borrow', DATE_ADD(CURRENT_DATE, INTERVAL 14 DAY), 'Active', v_copy_id);
+                IF v_hold_id IS NULL THEN
+                    SET v_claimed = JSON_ARRAY_APPEND(v_claimed, '$', v_isbn);
+                ELSE
+                    -- Held copies were never counted as available
+                    UPDATE Holds SET Status = 'Fulfilled', Closed_At = NOW() WHERE Hold_ID = v_hold_id;
+                END IF;
+                SET v_code = 'OK';
+            -- The remaining branches only run on the failure path
+            ELSEIF NOT EXISTS (SELECT 1 FROM Books WHERE ISBN = v_isbn) THEN
+                SET v_code = 'NOT_FOUND';
+            ELSE
+                SET v_code = 'UNAVAILABLE';
+            END IF;
+        END IF;
+
+        SET v_results = JSON_ARRAY_APPEND(v_results, '$', JSON_OBJECT('ISBN', v_isbn, 'Code', v_code));
+    END LOOP;
+    CLOSE cart;
+
+    -- Counters last, in one statement, so the hot Books rows are locked only for
+    -- the moment before commit rather than for the whole cart
+    UPDATE Books b
+    JOIN (
+        SELECT j.ISBN, COUNT(*) AS Claimed
+        FROM JSON_TABLE(v_claimed, '$[*]' COLUMNS (ISBN VARCHAR(13) PATH '$')) j
+        GROUP BY j.ISBN
+    ) c ON c.ISBN = b.ISBN
+    SET b.Available_Copies = b.Available_Copies - c.Claimed;
+
+    SET @borrow_checked_member = NULL;
+    COMMIT;
+
+    SELECT r.ISBN, r.Result_Code
+    FROM JSON_TABLE(v_results, '$[*]' COLUMNS (
+        ISBN VARCHAR(13) PATH '$.ISBN',
+        Result_Code VARCHAR(20) PATH '$.Code'
+    )) r;
+END //
+
+-- Returns one row per ISBN with the borrower, a result code (OK, NOT_BORROWED)
+-- and the fine charged. Each returned copy goes straight to the title's next
+-- Waiting hold, if any.
+CREATE PROCEDURE ReturnBook(
+    IN p_member_id INT,
+    IN p_isbns TEXT
+)
+BEGIN
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_transaction_id INT;
+    DECLARE v_member_id INT;
+    DECLARE v_due_date DATE;
+    DECLARE v_fine_amount DECIMAL(10, 2);
+    DECLARE v_copy_id INT;
+    DECLARE v_hold_id INT;
+    DECLARE v_returned JSON DEFAULT JSON_ARRAY();
+    DECLARE v_results JSON DEFAULT JSON_ARRAY();
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE scans CURSOR FOR
+        SELECT j.ISBN
+        FROM JSON_TABLE(p_isbns, '$[*]' COLUMNS (
+            Position FOR ORDINALITY,
+            ISBN VARCHAR(13) PATH '$'
+        )) j
+        ORDER BY j.Position;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF NOT (JSON_VALID(p_isbns) AND JSON_TYPE(p_isbns) = 'ARRAY') THEN
+        SET p_isbns = JSON_ARRAY(p_isbns);
+    END IF;
+
+    START TRANSACTION;
+
+    OPEN scans;
+    scan_loop: LOOP
+        FETCH scans INTO v_isbn;
+        IF v_done THEN
+            LEAVE scan_loop;
+        END IF;
+
+        -- Get active transaction
+        SET v_transaction_id = NULL;
+        SET v_copy_id = NULL;
+        SELECT Transaction_ID, Member_ID, Due_Date, Copy_ID
+        INTO v_transaction_id, v_member_id, v_due_date, v_copy_id
+        FROM MemberTransactions
+        WHERE ISBN = v_isbn
+        AND Status IN ('Active', 'Overdue')
+        AND (p_member_id IS NULL OR Member_ID = p_member_id)
+        ORDER BY Transaction_ID
+        LIMIT 1
+        FOR UPDATE;
+        -- A miss above raises NOT FOUND, which must not end the scan loop
+        SET v_done = FALSE;
+
+        IF v_transaction_id IS NULL THEN
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', v_isbn, 'Member', p_member_id, 'Code', 'NOT_BORROWED', 'Fine', 0));
+        ELSE
+            -- Calculate fine if overdue (₹10 per day)
+            IF CURRENT_DATE > v_due_date THEN
+                SET v_fine_amount = DATEDIFF(CURRENT_DATE, v_due_date) * 10;
+            ELSE
+                SET v_fine_amount = 0;
+            END IF;
+
+            -- Loans made before copies were tracked have no Copy_ID; any copy on loan will do
+            IF v_copy_id IS NULL THEN
+                SELECT Copy_ID INTO v_copy_id
+                FROM Copies
+                WHERE ISBN = v_isbn AND Status = 'On loan'
+                ORDER BY Copy_ID
+                LIMIT 1
+                FOR UPDATE;
+                SET v_done = FALSE;
+            END IF;
+
+            IF v_copy_id IS NOT NULL THEN
+                CALL AllocateReturnedCopy(v_isbn, v_copy_id, v_hold_id);
+                SET v_done = FALSE;
+                IF v_hold_id IS NULL THEN
+                    SET v_returned = JSON_ARRAY_APPEND(v_returned, '$', v_isbn);
+                END IF;
+            END IF;
+
+            -- Update transaction record
+            UPDATE MemberTransactions
+            SET Return_Date = CURRENT_DATE,
+                Fine_Amount = v_fine_amount,
+                Status = 'Completed'
+            WHERE Transaction_ID = v_transaction_id;
+
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', v_isbn, 'Member', v_member_id, 'Code', 'OK', 'Fine', v_fine_amount));
+        END IF;
+    END LOOP;
+    CLOSE scans;
+
+    UPDATE Books b
+    JOIN (
+        SELECT j.ISBN, COUNT(*) AS Returned
+        FROM JSON_TABLE(v_returned, '$[*]' COLUMNS (ISBN VARCHAR(13) PATH '$')) j
+        GROUP BY j.ISBN
+    ) r ON r.ISBN = b.ISBN
+    SET b.Available_Copies = b.Available_Copies + r.Returned;
+
+    COMMIT;
+
+    SELECT r.ISBN, r.Member_ID, r.Result_Code, r.Fine_Amount
+    FROM JSON_TABLE(v_results, '$[*]' COLUMNS (
+        ISBN VARCHAR(13) PATH '$.ISBN',
+        Member_ID INT PATH '$.Member',
+        Result_Code VARCHAR(20) PATH '$.Code',
+        Fine_Amount DECIMAL(10, 2) PATH '$.Fine'
+    )) r;
+END //
+
+-- Procedure to add copies of a title already in the catalog.
+-- Returns the new Total_Copies and Available_Copies.
+CREATE PROCEDURE AddCopies(
+    IN p_isbn VARCHAR(13),
+    IN p_count INT
+)
+BEGIN
+    DECLARE v_total INT DEFAULT NULL;
+    DECLARE v_copy INT;
+    DECLARE v_waiting INT;
+    DECLARE v_hold_id INT;
+    DECLARE v_shelved INT DEFAULT 0;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF p_count IS NULL OR p_count < 1 THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Copy count must be at least 1';
+    END IF;
+
+    START TRANSACTION;
+
+    -- Queue before Books, the order ReturnBook locks them in
+    SELECT Waiting INTO v_waiting FROM HoldQueues WHERE ISBN = p_isbn FOR UPDATE;
+
+    SELECT Total_Copies INTO v_total
+    FROM Books
+    WHERE ISBN = p_isbn
+    FOR UPDATE;
+
+    IF v_total IS NULL THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Book does not exist';
+    END IF;
+
+    -- Barcodes carry on from the highest copy number the title has had.
+    -- New copies serve waiting holds before they reach the shelf.
+    SET v_copy = v_total + 1;
+    WHILE v_copy <= v_total + p_count DO
+        INSERT INTO Copies (ISBN, Barcode)
+        VALUES (p_isbn, CONCAT(p_isbn, '-', LPAD(v_copy, GREATEST(3, LENGTH(v_copy)), '0')));
+        CALL AllocateReturnedCopy(p_isbn, LAST_INSERT_ID(), v_hold_id);
+        SET v_shelved = v_shelved + (v_hold_id IS NULL);
+        SET v_copy = v_copy + 1;
+    END WHILE;
+
+    UPDATE Books
+    SET Total_Copies = Total_Copies + p_count,
+        Available_Copies = Available_Copies + v_shelved
+    WHERE ISBN = p_isbn;
+
+    COMMIT;
+
+    SELECT Total_Copies, Available_Copies FROM Books WHERE ISBN = p_isbn;
+END //
+DELIMITER ;
+
+-- Hand a copy that just came back (or was added) to the title's next Waiting hold.
+-- Sets the copy 'On hold' and returns the hold in p_hold_id, or puts the copy on the
+-- shelf and returns NULL, in which case the caller adds it to Available_Copies.
+-- Runs inside the caller's transaction. Takes the HoldQueues lock first; PlaceHold
+-- takes it too, so a hold placed meanwhile either sees the copy or is served here.
+DELIMITER //
+CREATE PROCEDURE AllocateReturnedCopy(
+    IN p_isbn VARCHAR(13),
+    IN p_copy_id INT,
+    OUT p_hold_id INT
+)
+BEGIN
+    DECLARE v_waiting INT DEFAULT 0;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET p_hold_id = NULL;
+
+    SET p_hold_id = NULL;
+    SELECT Waiting INTO v_waiting FROM HoldQueues WHERE ISBN = p_isbn FOR UPDATE;
+
+    IF v_waiting > 0 THEN
+        SELECT Hold_ID INTO p_hold_id
+        FROM Holds
+        WHERE ISBN = p_isbn AND Status = 'Waiting' AND Queue_Position = 1
+        FOR UPDATE;
+    END IF;
+
+    IF p_hold_id IS NULL THEN
+        UPDATE Copies SET Status = 'Available' WHERE Copy_ID = p_copy_id;
+    ELSE
+        UPDATE Copies SET Status = 'On hold' WHERE Copy_ID = p_copy_id;
+        -- Members have three days to collect a held copy
+        UPDATE Holds
+        SET Status = 'Ready',
+            Queue_Position = NULL,
+            Copy_ID = p_copy_id,
+            Ready_At = NOW(),
+            Expires_At = NOW() + INTERVAL 3 DAY
+        WHERE Hold_ID = p_hold_id;
+        UPDATE Holds
+        SET Queue_Position = Queue_Position - 1
+        WHERE ISBN = p_isbn AND Status = 'Waiting';
+        UPDATE HoldQueues SET Waiting = Waiting - 1 WHERE ISBN = p_isbn;
+    END IF;
+END //
+
+-- Close an open hold as Cancelled or Expired. A Waiting hold leaves the queue and
+-- everyone behind moves up; a Ready hold passes its copy to the next holder or the
+-- shelf. p_released is FALSE if the hold was no longer open. The caller holds the
+-- title's HoldQueues lock and owns the transaction.
+CREATE PROCEDURE ReleaseHold(
+    IN p_hold_id INT,
+    IN p_status VARCHAR(20),
+    OUT p_released BOOLEAN
+)
+BEGIN
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_status VARCHAR(20) DEFAULT NULL;
+    DECLARE v_position INT;
+    DECLARE v_copy_id INT;
+    DECLARE v_next_hold INT;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_status = NULL;
+
+    SELECT ISBN, Status, Queue_Position, Copy_ID
+    INTO v_isbn, v_status, v_position, v_copy_id
+    FROM Holds
+    WHERE Hold_ID = p_hold_id AND Status IN ('Waiting', 'Ready')
+    FOR UPDATE;
+
+    SET p_released = v_status IS NOT NULL;
+    IF p_released THEN
+        UPDATE Holds
+        SET Status = p_status, Queue_Position = NULL, Closed_At = NOW()
+        WHERE Hold_ID = p_hold_id;
+    END IF;
+
+    IF v_status = 'Waiting' THEN
+        UPDATE Holds
+        SET Queue_Position = Queue_Position - 1
+        WHERE ISBN = v_isbn AND Status = 'Waiting' AND Queue_Position > v_position;
+        UPDATE HoldQueues SET Waiting = Waiting - 1 WHERE ISBN = v_isbn;
+    ELSEIF v_status = 'Ready' AND v_copy_id IS NOT NULL THEN
+        CALL AllocateReturnedCopy(v_isbn, v_copy_id, v_next_hold);
+        IF v_next_hold IS NULL THEN
+            UPDATE Books SET Available_Copies = Available_Copies + 1 WHERE ISBN = v_isbn;
+        END IF;
+    END IF;
+END //
+
+-- Procedure to join the hold queue for a title with no copy on the shelf.
+-- Returns one row: a result code (OK, MEMBER_INACTIVE, NOT_FOUND, ALREADY_HELD,
+-- ALREADY_BORROWED, AVAILABLE) and the member's place in the queue.
+CREATE PROCEDURE PlaceHold(
+    IN p_member_id INT,
+    IN p_isbn VARCHAR(13)
+)
+BEGIN
+    DECLARE v_member_active BOOLEAN;
+    DECLARE v_waiting INT DEFAULT NULL;
+    DECLARE v_available INT;
+    DECLARE v_position INT DEFAULT NULL;
+    DECLARE v_code VARCHAR(20);
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    -- The member lock BorrowBook takes, so a hold and a borrow of one title cannot cross
+    SELECT MAX(Status = 'Active') INTO v_member_active
+    FROM Members
+    WHERE Member_ID = p_member_id
+    FOR UPDATE;
+
+    SELECT Waiting INTO v_waiting FROM HoldQueues WHERE ISBN = p_isbn FOR UPDATE;
+    SELECT Available_Copies INTO v_available FROM Books WHERE ISBN = p_isbn FOR SHARE;
+
+    IF NOT COALESCE(v_member_active, FALSE) THEN
+        SET v_code = 'MEMBER_INACTIVE';
+    ELSEIF v_waiting IS NULL THEN
+        SET v_code = 'NOT_FOUND';
+    ELSEIF EXISTS (
+        SELECT 1 FROM Holds
+        WHERE Member_ID = p_member_id AND ISBN = p_isbn AND Status IN ('Waiting', 'Ready')
+    ) THEN
+        SET v_code = 'ALREADY_HELD';
+        SELECT Queue_Position INTO v_position
+        FROM Holds
+        WHERE Member_ID = p_member_id AND ISBN = p_isbn AND Status IN ('Waiting', 'Ready');
+    ELSEIF EXISTS (
+        SELECT 1 FROM MemberTransactions
+        WHERE Member_ID = p_member_id AND ISBN = p_isbn AND Status IN ('Active', 'Overdue')
+    ) THEN
+        SET v_code = 'ALREADY_BORROWED';
+    ELSEIF v_available > 0 THEN
+        SET v_code = 'AVAILABLE';
+    ELSE
+        SET v_position = v_waiting + 1;
+        INSERT INTO Holds (ISBN, Member_ID, Queue_Position) VALUES (p_isbn, p_member_id, v_position);
+        UPDATE HoldQueues SET Waiting = v_position WHERE ISBN = p_isbn;
+        SET v_code = 'OK';
+    END IF;
+
+    COMMIT;
+
+    SELECT v_code AS Result_Code, v_position AS Queue_Position;
+END //
+
+-- Procedure to cancel a member's open hold on a title.
+-- Returns one row with a result code: OK or NOT_HELD.
+CREATE PROCEDURE CancelHold(
+    IN p_member_id INT,
+    IN p_isbn VARCHAR(13)
+)
+BEGIN
+    DECLARE v_waiting INT;
+    DECLARE v_hold_id INT DEFAULT NULL;
+    DECLARE v_released BOOLEAN DEFAULT FALSE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    SELECT Waiting INTO v_waiting FROM HoldQueues WHERE ISBN = p_isbn FOR UPDATE;
+
+    SELECT Hold_ID INTO v_hold_id
+    FROM Holds
+    WHERE Member_ID = p_member_id AND ISBN = p_isbn AND Status IN ('Waiting', 'Ready')
+    LIMIT 1;
+
+    IF v_hold_id IS NOT NULL THEN
+        CALL ReleaseHold(v_hold_id, 'Cancelled', v_released);
+    END IF;
+
+    COMMIT;
+
+    SELECT IF(v_released, 'OK', 'NOT_HELD') AS Result_Code;
+END //
+
+-- Expire Ready holds whose pickup deadline has passed, in batches of p_batch_size,
+-- each its own short transaction. Every expired copy goes to the next holder or back
+-- on the shelf. Returns the number of holds expired.
+CREATE PROCEDURE ExpireHolds(
+    IN p_batch_size INT
+)
+BEGIN
+    DECLARE v_hold_id INT;
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_waiting INT;
+    DECLARE v_released BOOLEAN;
+    DECLARE v_batch INT;
+    DECLARE v_expired INT DEFAULT 0;
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE expired CURSOR FOR
+        SELECT Hold_ID, ISBN
+        FROM Holds
+        WHERE Status = 'Ready' AND Expires_At < NOW()
+        ORDER BY Expires_At
+        LIMIT p_batch_size;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    SET p_batch_size = COALESCE(p_batch_size, 500);
+
+    REPEAT
+        SET v_batch = 0;
+        SET v_done = FALSE;
+        START TRANSACTION;
+        OPEN expired;
+        sweep_loop: LOOP
+            FETCH expired INTO v_hold_id, v_isbn;
+            IF v_done THEN
+                LEAVE sweep_loop;
+            END IF;
+            SET v_batch = v_batch + 1;
+
+            -- Queue lock first, as everywhere else; ReleaseHold rechecks the hold is still open
+            SELECT Waiting INTO v_waiting FROM HoldQueues WHERE ISBN = v_isbn FOR UPDATE;
+            CALL ReleaseHold(v_hold_id, 'Expired', v_released);
+            SET v_done = FALSE;
+            SET v_expired = v_expired + v_released;
+        END LOOP;
+        CLOSE expired;
+        COMMIT;
+    UNTIL v_batch < p_batch_size END REPEAT;
+
+    SELECT v_expired AS Holds_Expired;
+END //
+DELIMITER ;
+
+-- Needs event_scheduler=ON; holds.py runs the same sweep by hand or from cron
+CREATE EVENT IF NOT EXISTS expire_holds_hourly
+ON SCHEDULE EVERY 1 HOUR
+DO CALL ExpireHolds(500);
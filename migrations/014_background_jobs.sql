@@ -0,0 +1,26 @@
+-- Background jobs table for the jobs.py executor and the admin Jobs page.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+-- Background jobs: long admin operations queued by the portal and run by jobs.py
+-- executors, in the Streamlit process or a separate worker. Executors claim
+-- Queued jobs with FOR UPDATE SKIP LOCKED, report progress and a heartbeat here,
+-- and stop at the next progress report once Cancel_Requested is set.
+CREATE TABLE Jobs (
+    Job_ID INT PRIMARY KEY AUTO_INCREMENT,
+    Job_Type VARCHAR(50) NOT NULL,
+    Params JSON,
+    Status ENUM('Queued', 'Running', 'Succeeded', 'Failed', 'Cancelled') NOT NULL DEFAULT 'Queued',
+    Progress_Done INT NOT NULL DEFAULT 0,
+    Progress_Total INT,
+    Message VARCHAR(500),
+    Result JSON,
+    Cancel_Requested BOOLEAN NOT NULL DEFAULT FALSE,
+    Submitted_By INT, -- Admin_ID
+    Worker VARCHAR(100), -- host:pid of the executor running it
+    Created_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Started_At DATETIME,
+    Heartbeat_At DATETIME,
+    Finished_At DATETIME,
+    INDEX idx_jobs_status (Status, Job_ID) -- next Queued job, and Running jobs gone stale
+);
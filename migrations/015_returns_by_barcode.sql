@@ -0,0 +1,201 @@
+-- The returns desk scans copy barcodes: with several copies of a title, an ISBN
+-- no longer says whose loan came back. ReturnBook with no member now closes the
+-- loan on the scanned copy and reports the barcode with each result. A loan
+-- recorded before copies were tracked only releases a copy no tracked loan holds.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+ALTER TABLE MemberTransactions
+    ADD INDEX idx_mt_copy_status (Copy_ID, Status);
+
+DROP PROCEDURE IF EXISTS ReturnBook;
+
+-- Procedure to return books, one or a batch in one transaction.
+-- With a member, p_items is a JSON array of ISBNs and each closes that member's loan.
+-- With p_member_id NULL (the returns desk), p_items holds the scanned copy barcodes and
+-- each closes the loan on exactly that copy, whoever holds it.
+-- A bare string is accepted as a batch of one.
+-- Returns one row per item with the ISBN, the copy's barcode, the borrower, a result
+-- code (OK, NOT_BORROWED, UNKNOWN_COPY) and the fine charged, so callers never need
+-- to read the fine back.
+-- Each returned copy goes straight to the title's next Waiting hold, if any.
+DELIMITER //
+CREATE PROCEDURE ReturnBook(
+    IN p_member_id INT,
+    IN p_items TEXT
+)
+BEGIN
+    DECLARE v_item VARCHAR(32);
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_barcode VARCHAR(32);
+    DECLARE v_transaction_id INT;
+    DECLARE v_member_id INT;
+    DECLARE v_due_date DATE;
+    DECLARE v_fine_amount DECIMAL(10, 2);
+    DECLARE v_copy_id INT;
+    DECLARE v_copy_status VARCHAR(20);
+    DECLARE v_hold_id INT;
+    DECLARE v_returned JSON DEFAULT JSON_ARRAY();
+    DECLARE v_results JSON DEFAULT JSON_ARRAY();
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE scans CURSOR FOR
+        SELECT j.Item
+        FROM JSON_TABLE(p_items, '$[*]' COLUMNS (
+            Position FOR ORDINALITY,
+            Item VARCHAR(32) PATH '$'
+        )) j
+        ORDER BY j.Position;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF NOT (JSON_VALID(p_items) AND JSON_TYPE(p_items) = 'ARRAY') THEN
+        SET p_items = JSON_ARRAY(p_items);
+    END IF;
+
+    START TRANSACTION;
+
+    OPEN scans;
+    scan_loop: LOOP
+        FETCH scans INTO v_item;
+        IF v_done THEN
+            LEAVE scan_loop;
+        END IF;
+
+        -- A SELECT INTO that misses leaves its variables alone, so clear them first
+        SET v_transaction_id = NULL;
+        SET v_member_id = p_member_id;
+        SET v_copy_id = NULL;
+        SET v_copy_status = NULL;
+        SET v_isbn = NULL;
+        SET v_barcode = NULL;
+
+        IF p_member_id IS NULL THEN
+            -- The desk scans a copy, so the loan closed is the one on that copy
+            SELECT Copy_ID, ISBN, Barcode, Status INTO v_copy_id, v_isbn, v_barcode, v_copy_status
+            FROM Copies
+            WHERE Barcode = v_item;
+            SET v_done = FALSE;
+
+            IF v_copy_id IS NOT NULL THEN
+                SELECT Transaction_ID, Member_ID, Due_Date
+                INTO v_transaction_id, v_member_id, v_due_date
+                FROM MemberTransactions
+                WHERE Copy_ID = v_copy_id
+                AND Status IN ('Active', 'Overdue')
+                ORDER BY Transaction_ID
+                LIMIT 1
+                FOR UPDATE;
+                SET v_done = FALSE;
+            END IF;
+
+            -- A copy out on a loan recorded before copies were tracked has no loan
+            -- pointing at it; it closes the oldest such loan on its title
+            IF v_transaction_id IS NULL AND v_copy_status = 'On loan' THEN
+                SELECT Transaction_ID, Member_ID, Due_Date
+                INTO v_transaction_id, v_member_id, v_due_date
+                FROM MemberTransactions
+                WHERE ISBN = v_isbn
+                AND Copy_ID IS NULL
+                AND Status IN ('Active', 'Overdue')
+                ORDER BY Transaction_ID
+                LIMIT 1
+                FOR UPDATE;
+                SET v_done = FALSE;
+            END IF;
+        ELSE
+            SET v_isbn = v_item;
+            SELECT Transaction_ID, Due_Date, Copy_ID
+            INTO v_transaction_id, v_due_date, v_copy_id
+            FROM MemberTransactions
+            WHERE ISBN = v_isbn
+            AND Member_ID = p_member_id
+            AND Status IN ('Active', 'Overdue')
+            ORDER BY Transaction_ID
+            LIMIT 1
+            FOR UPDATE;
+            -- A miss above raises NOT FOUND, which must not end the scan loop
+            SET v_done = FALSE;
+        END IF;
+
+        IF p_member_id IS NULL AND v_copy_id IS NULL THEN
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', NULL, 'Barcode', v_item, 'Member', NULL, 'Code', 'UNKNOWN_COPY', 'Fine', 0));
+        ELSEIF v_transaction_id IS NULL THEN
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', v_isbn, 'Barcode', v_barcode, 'Member', p_member_id,
+                            'Code', 'NOT_BORROWED', 'Fine', 0));
+        ELSE
+            -- Calculate fine if overdue (₹10 per day)
+            IF CURRENT_DATE > v_due_date THEN
+                SET v_fine_amount = DATEDIFF(CURRENT_DATE, v_due_date) * 10;
+            ELSE
+                SET v_fine_amount = 0;
+            END IF;
+
+            -- Loans made before copies were tracked have no Copy_ID. Any copy on loan
+            -- will do, as long as no tracked open loan holds it: releasing a copy
+            -- another member still has would let it be lent twice.
+            IF v_copy_id IS NULL THEN
+                SELECT c.Copy_ID INTO v_copy_id
+                FROM Copies c
+                WHERE c.ISBN = v_isbn
+                AND c.Status = 'On loan'
+                AND NOT EXISTS (
+                    SELECT 1 FROM MemberTransactions mt
+                    WHERE mt.Copy_ID = c.Copy_ID AND mt.Status IN ('Active', 'Overdue')
+                )
+                ORDER BY c.Copy_ID
+                LIMIT 1
+                FOR UPDATE;
+                SET v_done = FALSE;
+            END IF;
+
+            IF v_copy_id IS NOT NULL THEN
+                IF v_barcode IS NULL THEN
+                    SELECT Barcode INTO v_barcode FROM Copies WHERE Copy_ID = v_copy_id;
+                END IF;
+                CALL AllocateReturnedCopy(v_isbn, v_copy_id, v_hold_id);
+                SET v_done = FALSE;
+                IF v_hold_id IS NULL THEN
+                    SET v_returned = JSON_ARRAY_APPEND(v_returned, '$', v_isbn);
+                END IF;
+            END IF;
+
+            -- Update transaction record
+            UPDATE MemberTransactions
+            SET Return_Date = CURRENT_DATE,
+                Fine_Amount = v_fine_amount,
+                Status = 'Completed'
+            WHERE Transaction_ID = v_transaction_id;
+
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', v_isbn, 'Barcode', v_barcode, 'Member', v_member_id,
+                            'Code', 'OK', 'Fine', v_fine_amount));
+        END IF;
+    END LOOP;
+    CLOSE scans;
+
+    UPDATE Books b
+    JOIN (
+        SELECT j.ISBN, COUNT(*) AS Returned
+        FROM JSON_TABLE(v_returned, '$[*]' COLUMNS (ISBN VARCHAR(13) PATH '$')) j
+        GROUP BY j.ISBN
+    ) r ON r.ISBN = b.ISBN
+    SET b.Available_Copies = b.Available_Copies + r.Returned;
+
+    COMMIT;
+
+    SELECT r.ISBN, r.Barcode, r.Member_ID, r.Result_Code, r.Fine_Amount
+    FROM JSON_TABLE(v_results, '$[*]' COLUMNS (
+        ISBN VARCHAR(13) PATH '$.ISBN',
+        Barcode VARCHAR(32) PATH '$.Barcode',
+        Member_ID INT PATH '$.Member',
+        Result_Code VARCHAR(20) PATH '$.Code',
+        Fine_Amount DECIMAL(10, 2) PATH '$.Fine'
+    )) r;
+END //
+DELIMITER ;
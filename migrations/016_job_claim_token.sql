@@ -0,0 +1,8 @@
+-- Each claim of a job gets a fresh token. Progress reports and the final status
+-- only apply while the job is still Running under that token, so a run the
+-- reaper already failed cannot overwrite the outcome.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+ALTER TABLE Jobs
+    ADD COLUMN Claim_Token CHAR(32) AFTER Worker;
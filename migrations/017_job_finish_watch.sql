@@ -0,0 +1,7 @@
+-- Executors watch Jobs.Finished_At so every process, not just the one that ran
+-- a job, can drop caches the job made stale.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+ALTER TABLE Jobs
+    ADD INDEX idx_jobs_finished (Finished_At);
@@ -0,0 +1,66 @@
+-- AdminTransactions is partitioned, so it has no foreign keys to Books or
+-- Administrators. DeleteBook now refuses books with admin transaction history,
+-- and before_admin_delete refuses administrators with recorded transactions.
+-- project.sql already contains these changes for fresh installs.
+USE lib_mgmt;
+
+DROP PROCEDURE IF EXISTS DeleteBook;
+DROP TRIGGER IF EXISTS before_admin_delete;
+
+DELIMITER //
+CREATE TRIGGER before_admin_delete
+BEFORE DELETE ON Administrators
+FOR EACH ROW
+BEGIN
+    IF EXISTS (SELECT 1 FROM AdminTransactions WHERE Admin_ID = OLD.Admin_ID) THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot delete administrator with recorded transactions';
+    END IF;
+END //
+
+CREATE PROCEDURE DeleteBook(
+    IN p_admin_id INT,
+    IN p_isbn VARCHAR(13)
+)
+BEGIN
+    DECLARE v_book_exists INT;
+    DECLARE v_active_transactions INT;
+    DECLARE v_archived_history INT;
+    DECLARE v_admin_history INT;
+    
+    -- Check if book exists
+    SELECT COUNT(*) INTO v_book_exists
+    FROM Books
+    WHERE ISBN = p_isbn;
+    
+    -- Check if book has any active transactions
+    SELECT COUNT(*) INTO v_active_transactions
+    FROM MemberTransactions
+    WHERE ISBN = p_isbn AND Status IN ('Active', 'Overdue');
+    
+    -- Live history is protected by its foreign key; the archive and AdminTransactions
+    -- are partitioned and have none
+    SELECT EXISTS (SELECT 1 FROM MemberTransactionsArchive WHERE ISBN = p_isbn)
+    INTO v_archived_history;
+    SELECT EXISTS (SELECT 1 FROM AdminTransactions WHERE ISBN = p_isbn)
+    INTO v_admin_history;
+    
+    -- Only proceed if book exists and has no active transactions
+    IF v_book_exists = 0 THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Book does not exist';
+    ELSEIF v_active_transactions > 0 THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot delete book with active transactions';
+    ELSEIF v_archived_history THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot delete book with archived transaction history';
+    ELSEIF v_admin_history THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot delete book with admin transaction history';
+    ELSE
+        -- Delete the book
+        DELETE FROM Books WHERE ISBN = p_isbn;
+    END IF;
+END //
+DELIMITER ;
@@ -23,13 +23,31 @@ CREATE TABLE Books (
     Title VARCHAR(255) NOT NULL,
     Author_ID INT,
     Category_ID INT,
-    Availability ENUM('In stock', 'Checked out') NOT NULL DEFAULT 'In stock',
+    Availability ENUM('In stock', 'Checked out') NOT NULL DEFAULT 'In stock', -- 'In stock' while any copy is free
+    Total_Copies INT NOT NULL DEFAULT 1, -- copies in circulation, kept with the Copies table
+    Available_Copies INT NOT NULL DEFAULT 1, -- copies on the shelf right now
     Created_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     Updated_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    Search_Text VARCHAR(500) NOT NULL DEFAULT '', -- Title, author and category, kept by triggers
+    CONSTRAINT chk_books_copies CHECK (Available_Copies BETWEEN 0 AND Total_Copies),
+    FULLTEXT INDEX ft_books_search (Search_Text),
     FOREIGN KEY (Author_ID) REFERENCES Authors(Author_ID) ON DELETE RESTRICT,
     FOREIGN KEY (Category_ID) REFERENCES Categories(Category_ID) ON DELETE RESTRICT
 );
 
+-- One row per physical copy of a title. BorrowBook claims a free copy with
+-- SELECT ... FOR UPDATE SKIP LOCKED, so concurrent checkouts of the same title
+-- take different copies instead of queueing on each other.
+CREATE TABLE Copies (
+    Copy_ID INT PRIMARY KEY AUTO_INCREMENT,
+    ISBN VARCHAR(13) NOT NULL,
+    Barcode VARCHAR(32) NOT NULL UNIQUE,
+    Status ENUM('Available', 'On loan', 'Withdrawn', 'On hold') NOT NULL DEFAULT 'Available', -- 'On hold': set aside for a Ready hold
+    Added_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_copies_isbn_status (ISBN, Status, Copy_ID), -- first free copy of a title
+    FOREIGN KEY (ISBN) REFERENCES Books(ISBN) ON DELETE CASCADE
+);
+
 -- Create the Administrators table
 CREATE TABLE Administrators (
     Admin_ID INT PRIMARY KEY AUTO_INCREMENT,
@@ -53,7 +71,10 @@ CREATE TABLE Members (
     Email VARCHAR(100) NOT NULL UNIQUE,
     Status ENUM('Active', 'Suspended', 'Expired') NOT NULL DEFAULT 'Active',
     Created_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    Last_Login TIMESTAMP
+    Last_Login TIMESTAMP,
+    INDEX idx_members_created (Created_At, Member_ID), -- keyset pagination of the member list
+    INDEX idx_members_first_last (First_Name, Last_Name), -- member lookup by name prefix
+    INDEX idx_members_last (Last_Name)
 );
 
 -- Create the Transactions table for tracking member borrowings
@@ -67,22 +88,215 @@ CREATE TABLE MemberTransactions (
     Return_Date DATE,
     Fine_Amount DECIMAL(10, 2) DEFAULT 0.00,
     Status ENUM('Active', 'Completed', 'Overdue') DEFAULT 'Active',
+    Copy_ID INT, -- the copy on loan; NULL for loans recorded before copies were tracked
+    INDEX idx_mt_member_date (Member_ID, Transaction_Date, Transaction_ID), -- keyset pagination of a member's history
+    INDEX idx_mt_member_status_due (Member_ID, Status, Due_Date), -- overdue checks in borrow_book and before_borrow_check
+    INDEX idx_mt_member_isbn_status (Member_ID, ISBN, Status), -- "already borrowed" check and ReturnBook lookup
+    INDEX idx_mt_isbn_status (ISBN, Status), -- DeleteBook and per-title active loans
+    INDEX idx_mt_status_due (Status, Due_Date), -- open loans past due, for AccrueFines
+    INDEX idx_mt_copy_status (Copy_ID, Status), -- returns desk: the open loan on a scanned copy
     FOREIGN KEY (Member_ID) REFERENCES Members(Member_ID),
-    FOREIGN KEY (ISBN) REFERENCES Books(ISBN)
+    FOREIGN KEY (ISBN) REFERENCES Books(ISBN),
+    FOREIGN KEY (Copy_ID) REFERENCES Copies(Copy_ID)
+);
+
+-- Hold queues: a FIFO queue of Waiting holds per title. A returned copy goes to the
+-- holder at Queue_Position 1 in the same transaction as the return (the hold turns
+-- Ready, the copy 'On hold') and stays set aside until Expires_At. Positions are
+-- stored and shifted when someone leaves the queue, so a holder reads theirs directly.
+-- HoldQueues has one row per title: its length, and the row lock that orders holds
+-- against returns of that title.
+CREATE TABLE HoldQueues (
+    ISBN VARCHAR(13) PRIMARY KEY,
+    Waiting INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (ISBN) REFERENCES Books(ISBN) ON DELETE CASCADE
+);
+
+CREATE TABLE Holds (
+    Hold_ID INT PRIMARY KEY AUTO_INCREMENT,
+    ISBN VARCHAR(13) NOT NULL,
+    Member_ID INT NOT NULL,
+    Status ENUM('Waiting', 'Ready', 'Fulfilled', 'Cancelled', 'Expired') NOT NULL DEFAULT 'Waiting',
+    Queue_Position INT, -- 1 is next in line; only set while Waiting
+    Copy_ID INT, -- the copy set aside once Ready
+    Placed_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Ready_At DATETIME,
+    Expires_At DATETIME, -- pickup deadline once Ready
+    Closed_At DATETIME,
+    INDEX idx_holds_isbn_status_position (ISBN, Status, Queue_Position), -- next holder and queue shifts
+    INDEX idx_holds_member_isbn_status (Member_ID, ISBN, Status), -- a member's holds and pickup in BorrowBook
+    INDEX idx_holds_status_expires (Status, Expires_At), -- ExpireHolds sweep
+    FOREIGN KEY (ISBN) REFERENCES Books(ISBN) ON DELETE CASCADE,
+    FOREIGN KEY (Member_ID) REFERENCES Members(Member_ID) ON DELETE CASCADE,
+    FOREIGN KEY (Copy_ID) REFERENCES Copies(Copy_ID) ON DELETE SET NULL
+);
+
+DELIMITER //
+CREATE TRIGGER after_book_insert_holds
+AFTER INSERT ON Books
+FOR EACH ROW
+BEGIN
+    INSERT INTO HoldQueues (ISBN) VALUES (NEW.ISBN);
+END;//
+DELIMITER ;
+
+-- Completed transactions older than the retention age, moved out of MemberTransactions
+-- by ArchiveMemberTransactions so the live table and its indexes stay small.
+-- Partitioned by year (so Transaction_Date is a DATETIME and part of the key);
+-- archive.py splits p_future as new years arrive. Partitioned tables cannot have
+-- foreign keys, so DeleteBook checks this table itself.
+CREATE TABLE MemberTransactionsArchive (
+    Transaction_ID INT NOT NULL,
+    Member_ID INT NOT NULL,
+    ISBN VARCHAR(13) NOT NULL,
+    Transaction_Type ENUM('Borrow', 'Return') NOT NULL,
+    Transaction_Date DATETIME NOT NULL,
+    Due_Date DATE,
+    Return_Date DATE,
+    Fine_Amount DECIMAL(10, 2) DEFAULT 0.00,
+    Status ENUM('Active', 'Completed', 'Overdue') DEFAULT 'Completed',
+    Archived_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (Transaction_ID, Transaction_Date),
+    INDEX idx_mta_member_date (Member_ID, Transaction_Date, Transaction_ID), -- member history pages
+    INDEX idx_mta_isbn (ISBN) -- DeleteBook history check
+)
+PARTITION BY RANGE (YEAR(Transaction_Date)) (
+    PARTITION p2023 VALUES LESS THAN (2024),
+    PARTITION p2024 VALUES LESS THAN (2025),
+    PARTITION p2025 VALUES LESS THAN (2026),
+    PARTITION p2026 VALUES LESS THAN (2027),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
 );
 
+-- Every transaction, live or archived, for the occasional full-history read
+CREATE OR REPLACE VIEW MemberTransactionHistory AS
+SELECT Transaction_ID, Member_ID, ISBN, Transaction_Type, Transaction_Date,
+       Due_Date, Return_Date, Fine_Amount, Status
+FROM MemberTransactions
+UNION ALL
+SELECT Transaction_ID, Member_ID, ISBN, Transaction_Type, Transaction_Date,
+       Due_Date, Return_Date, Fine_Amount, Status
+FROM MemberTransactionsArchive;
+
 -- Create the Transactions table for admin operations
+-- Partitioned by month like BookStatusLog (see the audit log section below), so it
+-- carries no foreign keys and Transaction_Date is a DATETIME in the primary key.
+-- DeleteBook and before_admin_delete check it instead.
 CREATE TABLE AdminTransactions (
-    Transaction_ID INT PRIMARY KEY AUTO_INCREMENT,
+    Transaction_ID INT NOT NULL AUTO_INCREMENT,
     ISBN VARCHAR(13) NOT NULL,
     Admin_ID INT NOT NULL,
     Transaction_Type ENUM('Check out', 'Return') NOT NULL,
-    Transaction_Date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Transaction_Date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     Notes TEXT,
-    FOREIGN KEY (ISBN) REFERENCES Books(ISBN),
-    FOREIGN KEY (Admin_ID) REFERENCES Administrators(Admin_ID)
+    PRIMARY KEY (Transaction_ID, Transaction_Date),
+    INDEX idx_at_isbn_date (ISBN, Transaction_Date), -- book history queries
+    INDEX idx_at_admin_date (Admin_ID, Transaction_Date)
+)
+PARTITION BY RANGE COLUMNS (Transaction_Date) (
+    PARTITION p_start VALUES LESS THAN ('2026-10-01'),
+    PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+    PARTITION p202612 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
 );
 
+-- Stands in for AdminTransactions' missing foreign key to Administrators
+DELIMITER //
+CREATE TRIGGER before_admin_delete
+BEFORE DELETE ON Administrators
+FOR EACH ROW
+BEGIN
+    IF EXISTS (SELECT 1 FROM AdminTransactions WHERE Admin_ID = OLD.Admin_ID) THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot delete administrator with recorded transactions';
+    END IF;
+END //
+DELIMITER ;
+
+-- Triggers to keep Books.Search_Text in step with title, author and category
+DELIMITER //
+-- New titles start with Total_Copies copies on the shelf (one unless given)
+CREATE TRIGGER before_book_insert_copies
+BEFORE INSERT ON Books
+FOR EACH ROW
+BEGIN
+    SET NEW.Available_Copies = NEW.Total_Copies;
+    SET NEW.Availability = IF(NEW.Total_Copies > 0, 'In stock', 'Checked out');
+END;//
+
+CREATE TRIGGER after_book_insert_copies
+AFTER INSERT ON Books
+FOR EACH ROW
+BEGIN
+    DECLARE v_copy INT DEFAULT 1;
+    WHILE v_copy <= NEW.Total_Copies DO
+        INSERT INTO Copies (ISBN, Barcode)
+        VALUES (NEW.ISBN, CONCAT(NEW.ISBN, '-', LPAD(v_copy, GREATEST(3, LENGTH(v_copy)), '0')));
+        SET v_copy = v_copy + 1;
+    END WHILE;
+END;//
+
+-- Availability follows the counters, so the old single-copy readers keep working
+CREATE TRIGGER before_book_update_copies
+BEFORE UPDATE ON Books
+FOR EACH ROW
+BEGIN
+    IF NEW.Available_Copies <> OLD.Available_Copies THEN
+        SET NEW.Availability = IF(NEW.Available_Copies > 0, 'In stock', 'Checked out');
+    END IF;
+END;//
+
+CREATE TRIGGER before_book_insert_search
+BEFORE INSERT ON Books
+FOR EACH ROW
+BEGIN
+    SET NEW.Search_Text = CONCAT_WS(' ',
+        NEW.Title,
+        (SELECT Author_Name FROM Authors WHERE Author_ID = NEW.Author_ID),
+        (SELECT Category_Name FROM Categories WHERE Category_ID = NEW.Category_ID));
+END;//
+
+CREATE TRIGGER before_book_update_search
+BEFORE UPDATE ON Books
+FOR EACH ROW
+BEGIN
+    -- Availability changes on every borrow and return, so skip the lookups unless needed
+    IF NOT (NEW.Title <=> OLD.Title
+            AND NEW.Author_ID <=> OLD.Author_ID
+            AND NEW.Category_ID <=> OLD.Category_ID) THEN
+        SET NEW.Search_Text = CONCAT_WS(' ',
+            NEW.Title,
+            (SELECT Author_Name FROM Authors WHERE Author_ID = NEW.Author_ID),
+            (SELECT Category_Name FROM Categories WHERE Category_ID = NEW.Category_ID));
+    END IF;
+END;//
+
+CREATE TRIGGER after_author_rename_search
+AFTER UPDATE ON Authors
+FOR EACH ROW
+BEGIN
+    IF NEW.Author_Name <> OLD.Author_Name THEN
+        UPDATE Books b
+        JOIN Categories c ON b.Category_ID = c.Category_ID
+        SET b.Search_Text = CONCAT_WS(' ', b.Title, NEW.Author_Name, c.Category_Name)
+        WHERE b.Author_ID = NEW.Author_ID;
+    END IF;
+END;//
+
+CREATE TRIGGER after_category_rename_search
+AFTER UPDATE ON Categories
+FOR EACH ROW
+BEGIN
+    IF NEW.Category_Name <> OLD.Category_Name THEN
+        UPDATE Books b
+        JOIN Authors a ON b.Author_ID = a.Author_ID
+        SET b.Search_Text = CONCAT_WS(' ', b.Title, a.Author_Name, NEW.Category_Name)
+        WHERE b.Category_ID = NEW.Category_ID;
+    END IF;
+END;//
+DELIMITER ;
+
 -- Insert sample categories
 INSERT INTO Categories (Category_Name) VALUES
 ('Fiction'),
@@ -127,23 +341,32 @@ CREATE PROCEDURE CheckOutBook(
     IN p_isbn VARCHAR(13)
 )
 BEGIN
-    DECLARE v_book_available BOOLEAN;
+    DECLARE v_copy_id INT DEFAULT NULL;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
 
-    -- Check if book is available
-    SELECT Availability = 'In stock' INTO v_book_available
-    FROM Books 
-    WHERE ISBN = p_isbn;
+    START TRANSACTION;
+
+    -- Take any free copy; copies another session is claiming are skipped, not waited on
+    SELECT Copy_ID INTO v_copy_id
+    FROM Copies
+    WHERE ISBN = p_isbn AND Status = 'Available'
+    ORDER BY Copy_ID
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED;
 
-    IF NOT v_book_available THEN
+    IF v_copy_id IS NULL THEN
         SIGNAL SQLSTATE '45000'
         SET MESSAGE_TEXT = 'Book is not available for checkout';
     END IF;
 
-    START TRANSACTION;
+    UPDATE Copies SET Status = 'On loan' WHERE Copy_ID = v_copy_id;
 
-    -- Update book status
     UPDATE Books 
-    SET Availability = 'Checked out'
+    SET Available_Copies = Available_Copies - 1
     WHERE ISBN = p_isbn;
 
     -- Record admin transaction
@@ -155,30 +378,48 @@ END //
 DELIMITER ;
 
 -- Create procedure to return a book (Admin)
+-- Named apart from the member ReturnBook below; both used to be called ReturnBook
 DELIMITER //
-CREATE PROCEDURE ReturnBook(
+CREATE PROCEDURE AdminReturnBook(
     IN p_admin_id INT,
     IN p_isbn VARCHAR(13)
 )
 BEGIN
-    DECLARE v_book_checked_out BOOLEAN;
+    DECLARE v_copy_id INT DEFAULT NULL;
+    DECLARE v_hold_id INT;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
 
-    -- Check if book is checked out
-    SELECT Availability = 'Checked out' INTO v_book_checked_out
-    FROM Books 
-    WHERE ISBN = p_isbn;
+    START TRANSACTION;
 
-    IF NOT v_book_checked_out THEN
+    -- Only copies the desk checked out; copies on a member loan come back through ReturnBook
+    SELECT c.Copy_ID INTO v_copy_id
+    FROM Copies c
+    WHERE c.ISBN = p_isbn
+    AND c.Status = 'On loan'
+    AND NOT EXISTS (
+        SELECT 1 FROM MemberTransactions mt
+        WHERE mt.Copy_ID = c.Copy_ID AND mt.Status IN ('Active', 'Overdue')
+    )
+    ORDER BY c.Copy_ID
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED;
+
+    IF v_copy_id IS NULL THEN
         SIGNAL SQLSTATE '45000'
         SET MESSAGE_TEXT = 'Book is already in stock';
     END IF;
 
-    START TRANSACTION;
-
-    -- Update book status
-    UPDATE Books 
-    SET Availability = 'In stock'
-    WHERE ISBN = p_isbn;
+    -- Next holder first; the shelf only if nobody is waiting
+    CALL AllocateReturnedCopy(p_isbn, v_copy_id, v_hold_id);
+    IF v_hold_id IS NULL THEN
+        UPDATE Books 
+        SET Available_Copies = Available_Copies + 1
+        WHERE ISBN = p_isbn;
+    END IF;
 
     -- Record admin transaction
     INSERT INTO AdminTransactions (ISBN, Admin_ID, Transaction_Type)
@@ -188,100 +429,591 @@ BEGIN
 END //
 DELIMITER ;
 
--- Procedure to borrow a book
+-- Procedure to borrow a book, or a whole cart of books in one transaction.
+-- p_isbns is a JSON array of ISBNs; a bare ISBN is accepted as a cart of one.
+-- Returns one row per ISBN with a result code instead of raising an error:
+--   OK, MEMBER_INACTIVE, OVERDUE, NOT_FOUND, ALREADY_BORROWED, UNAVAILABLE
+-- A copy set aside for one of the member's Ready holds is collected before any other.
 DELIMITER //
 CREATE PROCEDURE BorrowBook(
     IN p_member_id INT,
-    IN p_isbn VARCHAR(13)
+    IN p_isbns TEXT
 )
 BEGIN
-    DECLARE v_book_available BOOLEAN;
     DECLARE v_member_active BOOLEAN;
-
-    -- Check if book is available
-    SELECT Availability = 'In stock' INTO v_book_available
-    FROM Books 
-    WHERE ISBN = p_isbn;
-
-    -- Check if member is active
-    SELECT Status = 'Active' INTO v_member_active
-    FROM Members
-    WHERE Member_ID = p_member_id;
-
-    IF NOT v_book_available THEN
-        SIGNAL SQLSTATE '45000'
-        SET MESSAGE_TEXT = 'Book is not available for borrowing';
-    END IF;
-
-    IF NOT v_member_active THEN
-        SIGNAL SQLSTATE '45000'
-        SET MESSAGE_TEXT = 'Member account is not active';
+    DECLARE v_cart_code VARCHAR(20) DEFAULT NULL;
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_code VARCHAR(20);
+    DECLARE v_copy_id INT;
+    DECLARE v_hold_id INT;
+    DECLARE v_claimed JSON DEFAULT JSON_ARRAY();
+    DECLARE v_results JSON DEFAULT JSON_ARRAY();
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE cart CURSOR FOR
+        SELECT j.ISBN
+        FROM JSON_TABLE(p_isbns, '$[*]' COLUMNS (
+            Position FOR ORDINALITY,
+            ISBN VARCHAR(13) PATH '$'
+        )) j
+        ORDER BY j.Position;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @borrow_checked_member = NULL;
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF NOT (JSON_VALID(p_isbns) AND JSON_TYPE(p_isbns) = 'ARRAY') THEN
+        SET p_isbns = JSON_ARRAY(p_isbns);
     END IF;
 
     START TRANSACTION;
 
-    -- Update book status
-    UPDATE Books 
-    SET Availability = 'Checked out'
-    WHERE ISBN = p_isbn;
-
-    -- Create transaction record
-    INSERT INTO MemberTransactions (Member_ID, ISBN, Transaction_Type, Due_Date, Status)
-    VALUES (p_member_id, p_isbn, 'Borrow', DATE_ADD(CURRENT_DATE, INTERVAL 14 DAY), 'Active');
+    -- Check if member is active. The exclusive lock keeps the status stable until commit
+    -- and makes two carts for the same member take turns, so the "already borrowed"
+    -- check below cannot race with another claim of the same title.
+    SELECT MAX(Status = 'Active') INTO v_member_active
+    FROM Members
+    WHERE Member_ID = p_member_id
+    FOR UPDATE;
+
+    IF NOT COALESCE(v_member_active, FALSE) THEN
+        SET v_cart_code = 'MEMBER_INACTIVE';
+    ELSEIF COALESCE((
+        SELECT Overdue_Count FROM MemberBorrowingSummary WHERE Member_ID = p_member_id
+    ), 0) > 0 OR EXISTS (
+        -- Loans that fell due since the last AccrueFines run
+        SELECT 1 FROM MemberTransactions
+        WHERE Member_ID = p_member_id
+        AND Status = 'Active'
+        AND Due_Date < CURDATE()
+    ) THEN
+        -- One overdue check for the whole cart
+        SET v_cart_code = 'OVERDUE';
+    END IF;
 
+    -- Tell before_borrow_check this member has already been checked
+    SET @borrow_checked_member = p_member_id;
+
+    OPEN cart;
+    cart_loop: LOOP
+        FETCH cart INTO v_isbn;
+        IF v_done THEN
+            LEAVE cart_loop;
+        END IF;
+
+        IF v_cart_code IS NOT NULL THEN
+            SET v_code = v_cart_code;
+        ELSEIF EXISTS (
+            SELECT 1 FROM MemberTransactions
+            WHERE Member_ID = p_member_id AND ISBN = v_isbn AND Status IN ('Active', 'Overdue')
+        ) THEN
+            -- Checked before claiming, since with several copies the title may still be in stock
+            SET v_code = 'ALREADY_BORROWED';
+        ELSE
+            SET v_copy_id = NULL;
+            SET v_hold_id = NULL;
+            SELECT Hold_ID, Copy_ID INTO v_hold_id, v_copy_id
+            FROM Holds
+            WHERE Member_ID = p_member_id AND ISBN = v_isbn AND Status = 'Ready'
+            LIMIT 1
+            FOR UPDATE;
+
+            -- Otherwise claim the first free copy through idx_copies_isbn_status. SKIP LOCKED
+            -- passes over copies other carts are claiming, so borrowers of the same
+            -- title each get a different copy instead of queueing on one row.
+            IF v_copy_id IS NULL THEN
+                SELECT Copy_ID INTO v_copy_id
+                FROM Copies
+                WHERE ISBN = v_isbn AND Status = 'Available'
+                ORDER BY Copy_ID
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED;
+            END IF;
+            -- A miss above raises NOT FOUND, which must not end the cart loop
+            SET v_done = FALSE;
+
+            IF v_copy_id IS NOT NULL THEN
+                UPDATE Copies SET Status = 'On loan' WHERE Copy_ID = v_copy_id;
+                INSERT INTO MemberTransactions (Member_ID, ISBN, Transaction_Type, Due_Date, Status, Copy_ID)
+                VALUES (p_member_id, v_isbn, 'Borrow', DATE_ADD(CURRENT_DATE, INTERVAL 14 DAY), 'Active', v_copy_id);
+                IF v_hold_id IS NULL THEN
+                    SET v_claimed = JSON_ARRAY_APPEND(v_claimed, '$', v_isbn);
+                ELSE
+                    -- Held copies were never counted as available
+                    UPDATE Holds SET Status = 'Fulfilled', Closed_At = NOW() WHERE Hold_ID = v_hold_id;
+                END IF;
+                SET v_code = 'OK';
+            -- The remaining branches only run on the failure path
+            ELSEIF NOT EXISTS (SELECT 1 FROM Books WHERE ISBN = v_isbn) THEN
+                SET v_code = 'NOT_FOUND';
+            ELSE
+                SET v_code = 'UNAVAILABLE';
+            END IF;
+        END IF;
+
+        SET v_results = JSON_ARRAY_APPEND(v_results, '$', JSON_OBJECT('ISBN', v_isbn, 'Code', v_code));
+    END LOOP;
+    CLOSE cart;
+
+    -- Counters last, in one statement, so the hot Books rows are locked only for
+    -- the moment before commit rather than for the whole cart
+    UPDATE Books b
+    JOIN (
+        SELECT j.ISBN, COUNT(*) AS Claimed
+        FROM JSON_TABLE(v_claimed, '$[*]' COLUMNS (ISBN VARCHAR(13) PATH '$')) j
+        GROUP BY j.ISBN
+    ) c ON c.ISBN = b.ISBN
+    SET b.Available_Copies = b.Available_Copies - c.Claimed;
+
+    SET @borrow_checked_member = NULL;
     COMMIT;
+
+    SELECT r.ISBN, r.Result_Code
+    FROM JSON_TABLE(v_results, '$[*]' COLUMNS (
+        ISBN VARCHAR(13) PATH '$.ISBN',
+        Result_Code VARCHAR(20) PATH '$.Code'
+    )) r;
 END //
 DELIMITER ;
 
--- Procedure to return a book
+-- Procedure to return books, one or a batch in one transaction.
+-- With a member, p_items is a JSON array of ISBNs and each closes that member's loan.
+-- With p_member_id NULL (the returns desk), p_items holds the scanned copy barcodes and
+-- each closes the loan on exactly that copy, whoever holds it.
+-- A bare string is accepted as a batch of one.
+-- Returns one row per item with the ISBN, the copy's barcode, the borrower, a result
+-- code (OK, NOT_BORROWED, UNKNOWN_COPY) and the fine charged, so callers never need
+-- to read the fine back.
+-- Each returned copy goes straight to the title's next Waiting hold, if any.
 DELIMITER //
 CREATE PROCEDURE ReturnBook(
     IN p_member_id INT,
-    IN p_isbn VARCHAR(13)
+    IN p_items TEXT
 )
 BEGIN
+    DECLARE v_item VARCHAR(32);
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_barcode VARCHAR(32);
     DECLARE v_transaction_id INT;
+    DECLARE v_member_id INT;
     DECLARE v_due_date DATE;
     DECLARE v_fine_amount DECIMAL(10, 2);
+    DECLARE v_copy_id INT;
+    DECLARE v_copy_status VARCHAR(20);
+    DECLARE v_hold_id INT;
+    DECLARE v_returned JSON DEFAULT JSON_ARRAY();
+    DECLARE v_results JSON DEFAULT JSON_ARRAY();
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE scans CURSOR FOR
+        SELECT j.Item
+        FROM JSON_TABLE(p_items, '$[*]' COLUMNS (
+            Position FOR ORDINALITY,
+            Item VARCHAR(32) PATH '$'
+        )) j
+        ORDER BY j.Position;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF NOT (JSON_VALID(p_items) AND JSON_TYPE(p_items) = 'ARRAY') THEN
+        SET p_items = JSON_ARRAY(p_items);
+    END IF;
 
-    -- Get active transaction
-    SELECT Transaction_ID, Due_Date INTO v_transaction_id, v_due_date
-    FROM MemberTransactions
-    WHERE Member_ID = p_member_id 
-    AND ISBN = p_isbn 
-    AND Status = 'Active'
-    LIMIT 1;
+    START TRANSACTION;
 
-    IF v_transaction_id IS NULL THEN
-        SIGNAL SQLSTATE '45000'
-        SET MESSAGE_TEXT = 'No active borrowing found for this book';
+    OPEN scans;
+    scan_loop: LOOP
+        FETCH scans INTO v_item;
+        IF v_done THEN
+            LEAVE scan_loop;
+        END IF;
+
+        -- A SELECT INTO that misses leaves its variables alone, so clear them first
+        SET v_transaction_id = NULL;
+        SET v_member_id = p_member_id;
+        SET v_copy_id = NULL;
+        SET v_copy_status = NULL;
+        SET v_isbn = NULL;
+        SET v_barcode = NULL;
+
+        IF p_member_id IS NULL THEN
+            -- The desk scans a copy, so the loan closed is the one on that copy
+            SELECT Copy_ID, ISBN, Barcode, Status INTO v_copy_id, v_isbn, v_barcode, v_copy_status
+            FROM Copies
+            WHERE Barcode = v_item;
+            SET v_done = FALSE;
+
+            IF v_copy_id IS NOT NULL THEN
+                SELECT Transaction_ID, Member_ID, Due_Date
+                INTO v_transaction_id, v_member_id, v_due_date
+                FROM MemberTransactions
+                WHERE Copy_ID = v_copy_id
+                AND Status IN ('Active', 'Overdue')
+                ORDER BY Transaction_ID
+                LIMIT 1
+                FOR UPDATE;
+                SET v_done = FALSE;
+            END IF;
+
+            -- A copy out on a loan recorded before copies were tracked has no loan
+            -- pointing at it; it closes the oldest such loan on its title
+            IF v_transaction_id IS NULL AND v_copy_status = 'On loan' THEN
+                SELECT Transaction_ID, Member_ID, Due_Date
+                INTO v_transaction_id, v_member_id, v_due_date
+                FROM MemberTransactions
+                WHERE ISBN = v_isbn
+                AND Copy_ID IS NULL
+                AND Status IN ('Active', 'Overdue')
+                ORDER BY Transaction_ID
+                LIMIT 1
+                FOR UPDATE;
+                SET v_done = FALSE;
+            END IF;
+        ELSE
+            SET v_isbn = v_item;
+            SELECT Transaction_ID, Due_Date, Copy_ID
+            INTO v_transaction_id, v_due_date, v_copy_id
+            FROM MemberTransactions
+            WHERE ISBN = v_isbn
+            AND Member_ID = p_member_id
+            AND Status IN ('Active', 'Overdue')
+            ORDER BY Transaction_ID
+            LIMIT 1
+            FOR UPDATE;
+            -- A miss above raises NOT FOUND, which must not end the scan loop
+            SET v_done = FALSE;
+        END IF;
+
+        IF p_member_id IS NULL AND v_copy_id IS NULL THEN
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', NULL, 'Barcode', v_item, 'Member', NULL, 'Code', 'UNKNOWN_COPY', 'Fine', 0));
+        ELSEIF v_transaction_id IS NULL THEN
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', v_isbn, 'Barcode', v_barcode, 'Member', p_member_id,
+                            'Code', 'NOT_BORROWED', 'Fine', 0));
+        ELSE
+            -- Calculate fine if overdue (₹10 per day)
+            IF CURRENT_DATE > v_due_date THEN
+                SET v_fine_amount = DATEDIFF(CURRENT_DATE, v_due_date) * 10;
+            ELSE
+                SET v_fine_amount = 0;
+            END IF;
+
+            -- Loans made before copies were tracked have no Copy_ID. Any copy on loan
+            -- will do, as long as no tracked open loan holds it: releasing a copy
+            -- another member still has would let it be lent twice.
+            IF v_copy_id IS NULL THEN
+                SELECT c.Copy_ID INTO v_copy_id
+                FROM Copies c
+                WHERE c.ISBN = v_isbn
+                AND c.Status = 'On loan'
+                AND NOT EXISTS (
+                    SELECT 1 FROM MemberTransactions mt
+                    WHERE mt.Copy_ID = c.Copy_ID AND mt.Status IN ('Active', 'Overdue')
+                )
+                ORDER BY c.Copy_ID
+                LIMIT 1
+                FOR UPDATE;
+                SET v_done = FALSE;
+            END IF;
+
+            IF v_copy_id IS NOT NULL THEN
+                IF v_barcode IS NULL THEN
+                    SELECT Barcode INTO v_barcode FROM Copies WHERE Copy_ID = v_copy_id;
+                END IF;
+                CALL AllocateReturnedCopy(v_isbn, v_copy_id, v_hold_id);
+                SET v_done = FALSE;
+                IF v_hold_id IS NULL THEN
+                    SET v_returned = JSON_ARRAY_APPEND(v_returned, '$', v_isbn);
+                END IF;
+            END IF;
+
+            -- Update transaction record
+            UPDATE MemberTransactions
+            SET Return_Date = CURRENT_DATE,
+                Fine_Amount = v_fine_amount,
+                Status = 'Completed'
+            WHERE Transaction_ID = v_transaction_id;
+
+            SET v_results = JSON_ARRAY_APPEND(v_results, '$',
+                JSON_OBJECT('ISBN', v_isbn, 'Barcode', v_barcode, 'Member', v_member_id,
+                            'Code', 'OK', 'Fine', v_fine_amount));
+        END IF;
+    END LOOP;
+    CLOSE scans;
+
+    UPDATE Books b
+    JOIN (
+        SELECT j.ISBN, COUNT(*) AS Returned
+        FROM JSON_TABLE(v_returned, '$[*]' COLUMNS (ISBN VARCHAR(13) PATH '$')) j
+        GROUP BY j.ISBN
+    ) r ON r.ISBN = b.ISBN
+    SET b.Available_Copies = b.Available_Copies + r.Returned;
+
+    COMMIT;
+
+    SELECT r.ISBN, r.Barcode, r.Member_ID, r.Result_Code, r.Fine_Amount
+    FROM JSON_TABLE(v_results, '$[*]' COLUMNS (
+        ISBN VARCHAR(13) PATH '$.ISBN',
+        Barcode VARCHAR(32) PATH '$.Barcode',
+        Member_ID INT PATH '$.Member',
+        Result_Code VARCHAR(20) PATH '$.Code',
+        Fine_Amount DECIMAL(10, 2) PATH '$.Fine'
+    )) r;
+END //
+DELIMITER ;
+
+
+-- Hand a copy that just came back (or was added) to the title's next Waiting hold.
+-- Sets the copy 'On hold' and returns the hold in p_hold_id, or puts the copy on the
+-- shelf and returns NULL, in which case the caller adds it to Available_Copies.
+-- Runs inside the caller's transaction. Takes the HoldQueues lock first; PlaceHold
+-- takes it too, so a hold placed meanwhile either sees the copy or is served here.
+DELIMITER //
+CREATE PROCEDURE AllocateReturnedCopy(
+    IN p_isbn VARCHAR(13),
+    IN p_copy_id INT,
+    OUT p_hold_id INT
+)
+BEGIN
+    DECLARE v_waiting INT DEFAULT 0;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET p_hold_id = NULL;
+
+    SET p_hold_id = NULL;
+    SELECT Waiting INTO v_waiting FROM HoldQueues WHERE ISBN = p_isbn FOR UPDATE;
+
+    IF v_waiting > 0 THEN
+        SELECT Hold_ID INTO p_hold_id
+        FROM Holds
+        WHERE ISBN = p_isbn AND Status = 'Waiting' AND Queue_Position = 1
+        FOR UPDATE;
     END IF;
 
-    -- Calculate fine if overdue (₹10 per day)
-    IF CURRENT_DATE > v_due_date THEN
-        SET v_fine_amount = DATEDIFF(CURRENT_DATE, v_due_date) * 10;
+    IF p_hold_id IS NULL THEN
+        UPDATE Copies SET Status = 'Available' WHERE Copy_ID = p_copy_id;
     ELSE
-        SET v_fine_amount = 0;
+        UPDATE Copies SET Status = 'On hold' WHERE Copy_ID = p_copy_id;
+        -- Members have three days to collect a held copy
+        UPDATE Holds
+        SET Status = 'Ready',
+            Queue_Position = NULL,
+            Copy_ID = p_copy_id,
+            Ready_At = NOW(),
+            Expires_At = NOW() + INTERVAL 3 DAY
+        WHERE Hold_ID = p_hold_id;
+        UPDATE Holds
+        SET Queue_Position = Queue_Position - 1
+        WHERE ISBN = p_isbn AND Status = 'Waiting';
+        UPDATE HoldQueues SET Waiting = Waiting - 1 WHERE ISBN = p_isbn;
+    END IF;
+END //
+
+-- Close an open hold as Cancelled or Expired. A Waiting hold leaves the queue and
+-- everyone behind moves up; a Ready hold passes its copy to the next holder or the
+-- shelf. p_released is FALSE if the hold was no longer open. The caller holds the
+-- title's HoldQueues lock and owns the transaction.
+CREATE PROCEDURE ReleaseHold(
+    IN p_hold_id INT,
+    IN p_status VARCHAR(20),
+    OUT p_released BOOLEAN
+)
+BEGIN
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_status VARCHAR(20) DEFAULT NULL;
+    DECLARE v_position INT;
+    DECLARE v_copy_id INT;
+    DECLARE v_next_hold INT;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_status = NULL;
+
+    SELECT ISBN, Status, Queue_Position, Copy_ID
+    INTO v_isbn, v_status, v_position, v_copy_id
+    FROM Holds
+    WHERE Hold_ID = p_hold_id AND Status IN ('Waiting', 'Ready')
+    FOR UPDATE;
+
+    SET p_released = v_status IS NOT NULL;
+    IF p_released THEN
+        UPDATE Holds
+        SET Status = p_status, Queue_Position = NULL, Closed_At = NOW()
+        WHERE Hold_ID = p_hold_id;
+    END IF;
+
+    IF v_status = 'Waiting' THEN
+        UPDATE Holds
+        SET Queue_Position = Queue_Position - 1
+        WHERE ISBN = v_isbn AND Status = 'Waiting' AND Queue_Position > v_position;
+        UPDATE HoldQueues SET Waiting = Waiting - 1 WHERE ISBN = v_isbn;
+    ELSEIF v_status = 'Ready' AND v_copy_id IS NOT NULL THEN
+        CALL AllocateReturnedCopy(v_isbn, v_copy_id, v_next_hold);
+        IF v_next_hold IS NULL THEN
+            UPDATE Books SET Available_Copies = Available_Copies + 1 WHERE ISBN = v_isbn;
+        END IF;
     END IF;
+END //
+
+-- Procedure to join the hold queue for a title with no copy on the shelf.
+-- Returns one row: a result code (OK, MEMBER_INACTIVE, NOT_FOUND, ALREADY_HELD,
+-- ALREADY_BORROWED, AVAILABLE) and the member's place in the queue.
+CREATE PROCEDURE PlaceHold(
+    IN p_member_id INT,
+    IN p_isbn VARCHAR(13)
+)
+BEGIN
+    DECLARE v_member_active BOOLEAN;
+    DECLARE v_waiting INT DEFAULT NULL;
+    DECLARE v_available INT;
+    DECLARE v_position INT DEFAULT NULL;
+    DECLARE v_code VARCHAR(20);
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
 
     START TRANSACTION;
 
-    -- Update book status
-    UPDATE Books 
-    SET Availability = 'In stock'
-    WHERE ISBN = p_isbn;
+    -- The member lock BorrowBook takes, so a hold and a borrow of one title cannot cross
+    SELECT MAX(Status = 'Active') INTO v_member_active
+    FROM Members
+    WHERE Member_ID = p_member_id
+    FOR UPDATE;
+
+    SELECT Waiting INTO v_waiting FROM HoldQueues WHERE ISBN = p_isbn FOR UPDATE;
+    SELECT Available_Copies INTO v_available FROM Books WHERE ISBN = p_isbn FOR SHARE;
+
+    IF NOT COALESCE(v_member_active, FALSE) THEN
+        SET v_code = 'MEMBER_INACTIVE';
+    ELSEIF v_waiting IS NULL THEN
+        SET v_code = 'NOT_FOUND';
+    ELSEIF EXISTS (
+        SELECT 1 FROM Holds
+        WHERE Member_ID = p_member_id AND ISBN = p_isbn AND Status IN ('Waiting', 'Ready')
+    ) THEN
+        SET v_code = 'ALREADY_HELD';
+        SELECT Queue_Position INTO v_position
+        FROM Holds
+        WHERE Member_ID = p_member_id AND ISBN = p_isbn AND Status IN ('Waiting', 'Ready');
+    ELSEIF EXISTS (
+        SELECT 1 FROM MemberTransactions
+        WHERE Member_ID = p_member_id AND ISBN = p_isbn AND Status IN ('Active', 'Overdue')
+    ) THEN
+        SET v_code = 'ALREADY_BORROWED';
+    ELSEIF v_available > 0 THEN
+        SET v_code = 'AVAILABLE';
+    ELSE
+        SET v_position = v_waiting + 1;
+        INSERT INTO Holds (ISBN, Member_ID, Queue_Position) VALUES (p_isbn, p_member_id, v_position);
+        UPDATE HoldQueues SET Waiting = v_position WHERE ISBN = p_isbn;
+        SET v_code = 'OK';
+    END IF;
+
+    COMMIT;
+
+    SELECT v_code AS Result_Code, v_position AS Queue_Position;
+END //
+
+-- Procedure to cancel a member's open hold on a title.
+-- Returns one row with a result code: OK or NOT_HELD.
+CREATE PROCEDURE CancelHold(
+    IN p_member_id INT,
+    IN p_isbn VARCHAR(13)
+)
+BEGIN
+    DECLARE v_waiting INT;
+    DECLARE v_hold_id INT DEFAULT NULL;
+    DECLARE v_released BOOLEAN DEFAULT FALSE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    SELECT Waiting INTO v_waiting FROM HoldQueues WHERE ISBN = p_isbn FOR UPDATE;
+
+    SELECT Hold_ID INTO v_hold_id
+    FROM Holds
+    WHERE Member_ID = p_member_id AND ISBN = p_isbn AND Status IN ('Waiting', 'Ready')
+    LIMIT 1;
 
-    -- Update transaction record
-    UPDATE MemberTransactions
-    SET Return_Date = CURRENT_DATE,
-        Fine_Amount = v_fine_amount,
-        Status = 'Completed'
-    WHERE Transaction_ID = v_transaction_id;
+    IF v_hold_id IS NOT NULL THEN
+        CALL ReleaseHold(v_hold_id, 'Cancelled', v_released);
+    END IF;
 
     COMMIT;
+
+    SELECT IF(v_released, 'OK', 'NOT_HELD') AS Result_Code;
+END //
+
+-- Expire Ready holds whose pickup deadline has passed, in batches of p_batch_size,
+-- each its own short transaction. Every expired copy goes to the next holder or back
+-- on the shelf. Returns the number of holds expired.
+CREATE PROCEDURE ExpireHolds(
+    IN p_batch_size INT
+)
+BEGIN
+    DECLARE v_hold_id INT;
+    DECLARE v_isbn VARCHAR(13);
+    DECLARE v_waiting INT;
+    DECLARE v_released BOOLEAN;
+    DECLARE v_batch INT;
+    DECLARE v_expired INT DEFAULT 0;
+    DECLARE v_done BOOLEAN DEFAULT FALSE;
+    DECLARE expired CURSOR FOR
+        SELECT Hold_ID, ISBN
+        FROM Holds
+        WHERE Status = 'Ready' AND Expires_At < NOW()
+        ORDER BY Expires_At
+        LIMIT p_batch_size;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = TRUE;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    SET p_batch_size = COALESCE(p_batch_size, 500);
+
+    REPEAT
+        SET v_batch = 0;
+        SET v_done = FALSE;
+        START TRANSACTION;
+        OPEN expired;
+        sweep_loop: LOOP
+            FETCH expired INTO v_hold_id, v_isbn;
+            IF v_done THEN
+                LEAVE sweep_loop;
+            END IF;
+            SET v_batch = v_batch + 1;
+
+            -- Queue lock first, as everywhere else; ReleaseHold rechecks the hold is still open
+            SELECT Waiting INTO v_waiting FROM HoldQueues WHERE ISBN = v_isbn FOR UPDATE;
+            CALL ReleaseHold(v_hold_id, 'Expired', v_released);
+            SET v_done = FALSE;
+            SET v_expired = v_expired + v_released;
+        END LOOP;
+        CLOSE expired;
+        COMMIT;
+    UNTIL v_batch < p_batch_size END REPEAT;
+
+    SELECT v_expired AS Holds_Expired;
 END //
 DELIMITER ;
 
+-- Needs event_scheduler=ON; holds.py runs the same sweep by hand or from cron.
+-- Neither path reaches the portal's in-process catalog cache, so listings there can
+-- show a title's old availability for up to the cache TTL (60 s) after an expiry.
+-- The expire_holds job on the admin Jobs page clears the cache when it finishes.
+CREATE EVENT IF NOT EXISTS expire_holds_hourly
+ON SCHEDULE EVERY 1 HOUR
+DO CALL ExpireHolds(500);
+
 
 CREATE OR REPLACE VIEW BookListView AS
 SELECT 
@@ -290,6 +1022,8 @@ SELECT
     a.Author_Name,
     c.Category_Name,
     b.Availability,
+    b.Total_Copies,
+    b.Available_Copies,
     b.Created_At,
     b.Updated_At
 FROM Books b
@@ -312,14 +1046,30 @@ SELECT
     mt.Return_Date,
     mt.Fine_Amount,
     mt.Status,
-    CASE 
-        WHEN mt.Status = 'Active' AND mt.Due_Date < CURDATE() 
-        THEN DATEDIFF(CURDATE(), mt.Due_Date) * 10 
-        ELSE mt.Fine_Amount 
-    END as Current_Fine
+    mt.Fine_Amount as Current_Fine -- accrued daily by AccrueFines on open loans
 FROM MemberTransactions mt
 JOIN Members m ON mt.Member_ID = m.Member_ID
 JOIN Books b ON mt.ISBN = b.ISBN
+JOIN Authors a ON b.Author_ID = a.Author_ID
+UNION ALL
+-- Archived history; filters on the view are pushed into both branches (MySQL 8.0.29+)
+SELECT 
+    mt.Transaction_ID,
+    m.Member_ID,
+    m.Username as Member_Name,
+    b.ISBN,
+    b.Title as Book_Title,
+    a.Author_Name,
+    mt.Transaction_Type,
+    mt.Transaction_Date,
+    mt.Due_Date,
+    mt.Return_Date,
+    mt.Fine_Amount,
+    mt.Status,
+    mt.Fine_Amount as Current_Fine
+FROM MemberTransactionsArchive mt
+JOIN Members m ON mt.Member_ID = m.Member_ID
+JOIN Books b ON mt.ISBN = b.ISBN
 JOIN Authors a ON b.Author_ID = a.Author_ID;
 
 INSERT INTO Members (Username, Password, First_Name, Last_Name, Email, Status) VALUES
@@ -561,6 +1311,8 @@ CREATE PROCEDURE DeleteBook(
 BEGIN
     DECLARE v_book_exists INT;
     DECLARE v_active_transactions INT;
+    DECLARE v_archived_history INT;
+    DECLARE v_admin_history INT;
     
     -- Check if book exists
     SELECT COUNT(*) INTO v_book_exists
@@ -570,7 +1322,14 @@ BEGIN
     -- Check if book has any active transactions
     SELECT COUNT(*) INTO v_active_transactions
     FROM MemberTransactions
-    WHERE ISBN = p_isbn AND Status = 'Active';
+    WHERE ISBN = p_isbn AND Status IN ('Active', 'Overdue');
+    
+    -- Live history is protected by its foreign key; the archive and AdminTransactions
+    -- are partitioned and have none
+    SELECT EXISTS (SELECT 1 FROM MemberTransactionsArchive WHERE ISBN = p_isbn)
+    INTO v_archived_history;
+    SELECT EXISTS (SELECT 1 FROM AdminTransactions WHERE ISBN = p_isbn)
+    INTO v_admin_history;
     
     -- Only proceed if book exists and has no active transactions
     IF v_book_exists = 0 THEN
@@ -579,6 +1338,12 @@ BEGIN
     ELSEIF v_active_transactions > 0 THEN
         SIGNAL SQLSTATE '45000'
         SET MESSAGE_TEXT = 'Cannot delete book with active transactions';
+    ELSEIF v_archived_history THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot delete book with archived transaction history';
+    ELSEIF v_admin_history THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot delete book with admin transaction history';
     ELSE
         -- Delete the book
         DELETE FROM Books WHERE ISBN = p_isbn;
@@ -587,12 +1352,76 @@ END //
 
 DELIMITER ;
 
+-- Procedure to add copies of a title already in the catalog.
+-- Returns the new Total_Copies and Available_Copies.
+DELIMITER //
+CREATE PROCEDURE AddCopies(
+    IN p_isbn VARCHAR(13),
+    IN p_count INT
+)
+BEGIN
+    DECLARE v_total INT DEFAULT NULL;
+    DECLARE v_copy INT;
+    DECLARE v_waiting INT;
+    DECLARE v_hold_id INT;
+    DECLARE v_shelved INT DEFAULT 0;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF p_count IS NULL OR p_count < 1 THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Copy count must be at least 1';
+    END IF;
+
+    START TRANSACTION;
+
+    -- Queue before Books, the order ReturnBook locks them in
+    SELECT Waiting INTO v_waiting FROM HoldQueues WHERE ISBN = p_isbn FOR UPDATE;
+
+    SELECT Total_Copies INTO v_total
+    FROM Books
+    WHERE ISBN = p_isbn
+    FOR UPDATE;
+
+    IF v_total IS NULL THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Book does not exist';
+    END IF;
+
+    -- Barcodes carry on from the highest copy number the title has had.
+    -- New copies serve waiting holds before they reach the shelf.
+    SET v_copy = v_total + 1;
+    WHILE v_copy <= v_total + p_count DO
+        INSERT INTO Copies (ISBN, Barcode)
+        VALUES (p_isbn, CONCAT(p_isbn, '-', LPAD(v_copy, GREATEST(3, LENGTH(v_copy)), '0')));
+        CALL AllocateReturnedCopy(p_isbn, LAST_INSERT_ID(), v_hold_id);
+        SET v_shelved = v_shelved + (v_hold_id IS NULL);
+        SET v_copy = v_copy + 1;
+    END WHILE;
+
+    UPDATE Books
+    SET Total_Copies = Total_Copies + p_count,
+        Available_Copies = Available_Copies + v_shelved
+    WHERE ISBN = p_isbn;
+
+    COMMIT;
+
+    SELECT Total_Copies, Available_Copies FROM Books WHERE ISBN = p_isbn;
+END //
+DELIMITER ;
+
 CREATE TABLE MemberBorrowingSummary (
     Member_ID INT PRIMARY KEY,
     Total_Books_Borrowed INT DEFAULT 0,
     Currently_Borrowed INT DEFAULT 0,
     Total_Fines_Paid DECIMAL(10, 2) DEFAULT 0.00,
+    Overdue_Count INT DEFAULT 0, -- open loans marked Overdue by AccrueFines
+    Outstanding_Fines DECIMAL(10, 2) DEFAULT 0.00, -- fines accrued so far on open loans
     Last_Borrowed_Date TIMESTAMP,
+    INDEX idx_summary_overdue (Overdue_Count), -- members with overdue books report
     FOREIGN KEY (Member_ID) REFERENCES Members(Member_ID)
 );
 
@@ -626,10 +1455,19 @@ CREATE TRIGGER after_transaction_update
 AFTER UPDATE ON MemberTransactions
 FOR EACH ROW
 BEGIN
-    IF NEW.Status = 'Completed' AND OLD.Status = 'Active' THEN
+    IF NEW.Status = 'Completed' AND OLD.Status IN ('Active', 'Overdue') THEN
         UPDATE MemberBorrowingSummary
         SET Currently_Borrowed = Currently_Borrowed - 1,
-            Total_Fines_Paid = Total_Fines_Paid + NEW.Fine_Amount
+            Total_Fines_Paid = Total_Fines_Paid + NEW.Fine_Amount,
+            Overdue_Count = Overdue_Count - (OLD.Status = 'Overdue'),
+            Outstanding_Fines = Outstanding_Fines - OLD.Fine_Amount
+        WHERE Member_ID = NEW.Member_ID;
+    ELSEIF NEW.Status IN ('Active', 'Overdue') AND OLD.Status IN ('Active', 'Overdue')
+        AND (NEW.Status <> OLD.Status OR NEW.Fine_Amount <> OLD.Fine_Amount) THEN
+        -- Fine accrual on a loan that is still out
+        UPDATE MemberBorrowingSummary
+        SET Overdue_Count = Overdue_Count + (NEW.Status = 'Overdue') - (OLD.Status = 'Overdue'),
+            Outstanding_Fines = Outstanding_Fines + NEW.Fine_Amount - OLD.Fine_Amount
         WHERE Member_ID = NEW.Member_ID;
     END IF;
 END;//
@@ -641,27 +1479,62 @@ FOR EACH ROW
 BEGIN
     DECLARE overdue_count INT;
     
-    SELECT COUNT(*) INTO overdue_count
-    FROM MemberTransactions
-    WHERE Member_ID = NEW.Member_ID
-    AND Status = 'Active'
-    AND Due_Date < CURDATE();
-    
-    IF overdue_count > 0 AND NEW.Transaction_Type = 'Borrow' THEN
-        SIGNAL SQLSTATE '45000'
-        SET MESSAGE_TEXT = 'Cannot borrow new books while having overdue books';
+    -- BorrowBook has already done this check for the member in the same transaction
+    IF NEW.Transaction_Type = 'Borrow' AND NOT (@borrow_checked_member <=> NEW.Member_ID) THEN
+        SELECT COUNT(*) INTO overdue_count
+        FROM MemberTransactions
+        WHERE Member_ID = NEW.Member_ID
+        AND Status IN ('Active', 'Overdue')
+        AND Due_Date < CURDATE();
+        
+        IF overdue_count > 0 THEN
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Cannot borrow new books while having overdue books';
+        END IF;
     END IF;
 END;//
 
+-- Audit log: one row per availability change, partitioned by month. audit.py keeps
+-- partitions ahead of the calendar and, past the retention period, compacts each
+-- month of BookStatusLog and AdminTransactions into BookAuditDaily and drops the
+-- partition, so old history costs one row per book per day and no long deletes.
 DELIMITER //
 CREATE TABLE BookStatusLog (
-    Log_ID INT PRIMARY KEY AUTO_INCREMENT,
-    ISBN VARCHAR(13),
-    Old_Status VARCHAR(20),
-    New_Status VARCHAR(20),
-    Changed_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Log_ID BIGINT NOT NULL AUTO_INCREMENT,
+    ISBN VARCHAR(13) NOT NULL,
+    Old_Status ENUM('In stock', 'Checked out'),
+    New_Status ENUM('In stock', 'Checked out'),
+    Changed_At DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     Changed_By VARCHAR(100),
-    FOREIGN KEY (ISBN) REFERENCES Books(ISBN)
+    PRIMARY KEY (Log_ID, Changed_At),
+    INDEX idx_bsl_isbn_changed (ISBN, Changed_At) -- history for a book over a date range
+)
+PARTITION BY RANGE COLUMNS (Changed_At) (
+    PARTITION p_start VALUES LESS THAN ('2026-10-01'),
+    PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+    PARTITION p202612 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);//
+
+CREATE TABLE BookAuditDaily (
+    ISBN VARCHAR(13) NOT NULL,
+    Audit_Date DATE NOT NULL,
+    Status_Changes INT NOT NULL DEFAULT 0,
+    Checked_Out INT NOT NULL DEFAULT 0,
+    Returned INT NOT NULL DEFAULT 0,
+    Admin_Checkouts INT NOT NULL DEFAULT 0,
+    Admin_Returns INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (ISBN, Audit_Date)
+);//
+
+-- Partitions already folded into BookAuditDaily, so a rerun after a failed drop never counts twice
+CREATE TABLE AuditCompactions (
+    Table_Name VARCHAR(64) NOT NULL,
+    Partition_Name VARCHAR(64) NOT NULL,
+    Rows_Compacted INT NOT NULL DEFAULT 0,
+    Compacted_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (Table_Name, Partition_Name)
 );//
 
 DELIMITER //
@@ -674,6 +1547,405 @@ BEGIN
         VALUES (NEW.ISBN, OLD.Availability, NEW.Availability, CURRENT_USER());
     END IF;
 END;//
+DELIMITER ;
+
+-- Members inserted above predate after_member_insert, so give them summary rows too
+INSERT IGNORE INTO MemberBorrowingSummary (Member_ID)
+SELECT Member_ID FROM Members;
+
+-- Fine accrual: one job marks loans past due as Overdue and stores the fine so far,
+-- so reads never recompute DATEDIFF per row. Fines are absolute for the as-of date,
+-- so rerunning a day is a no-op and a late run catches up on any it missed.
+CREATE TABLE FineAccrualRuns (
+    Run_ID INT PRIMARY KEY AUTO_INCREMENT,
+    As_Of_Date DATE NOT NULL,
+    Loans_Updated INT DEFAULT 0,
+    Started_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Finished_At TIMESTAMP NULL,
+    INDEX idx_accrual_as_of (As_Of_Date)
+);
+
+DELIMITER //
+CREATE PROCEDURE AccrueFines(
+    IN p_as_of DATE,
+    IN p_batch_size INT
+)
+BEGIN
+    DECLARE v_run_id INT;
+    DECLARE v_batch INT;
+    DECLARE v_updated INT DEFAULT 0;
+
+    SET p_as_of = COALESCE(p_as_of, CURDATE());
+    SET p_batch_size = COALESCE(p_batch_size, 5000);
+
+    INSERT INTO FineAccrualRuns (As_Of_Date) VALUES (p_as_of);
+    SET v_run_id = LAST_INSERT_ID();
+    COMMIT;
+
+    -- Small batches keep row locks short next to BorrowBook and ReturnBook
+    REPEAT
+        START TRANSACTION;
+        UPDATE MemberTransactions
+        SET Status = 'Overdue',
+            Fine_Amount = DATEDIFF(p_as_of, Due_Date) * 10
+        WHERE Status IN ('Active', 'Overdue')
+        AND Due_Date < p_as_of
+        AND NOT (Status = 'Overdue' AND Fine_Amount = DATEDIFF(p_as_of, Due_Date) * 10)
+        LIMIT p_batch_size;
+        SET v_batch = ROW_COUNT();
+        SET v_updated = v_updated + v_batch;
+        COMMIT;
+    UNTIL v_batch < p_batch_size END REPEAT;
+
+    UPDATE FineAccrualRuns
+    SET Loans_Updated = v_updated, Finished_At = CURRENT_TIMESTAMP
+    WHERE Run_ID = v_run_id;
+    COMMIT;
+
+    SELECT v_run_id AS Run_ID, p_as_of AS As_Of_Date, v_updated AS Loans_Updated;
+END;//
+DELIMITER ;
+
+-- Needs event_scheduler=ON; accrual.py runs the same job by hand or from cron
+CREATE EVENT IF NOT EXISTS accrue_fines_daily
+ON SCHEDULE EVERY 1 DAY
+STARTS CURRENT_DATE + INTERVAL 1 DAY + INTERVAL 5 MINUTE
+DO CALL AccrueFines(CURRENT_DATE, 5000);
+
+-- Circulation rollups: per-book, per-category and per-day counters kept up to date by
+-- triggers, so the reports and the admin Analytics page never scan MemberTransactions.
+-- Category and day rows are split into 16 slots by Member_ID so concurrent borrows do
+-- not queue on one hot counter row; readers add the slots up.
+-- RebuildCirculationRollups recomputes everything from MemberTransactions (analytics.py --rebuild).
+CREATE TABLE BookCirculation (
+    ISBN VARCHAR(13) PRIMARY KEY,
+    Times_Borrowed INT NOT NULL DEFAULT 0,
+    Currently_Borrowed INT NOT NULL DEFAULT 0,
+    Overdue_Count INT NOT NULL DEFAULT 0,
+    Fines_Total DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
+    Last_Borrowed_At TIMESTAMP NULL,
+    INDEX idx_bc_times_borrowed (Times_Borrowed, ISBN), -- never-borrowed and most-borrowed titles
+    FOREIGN KEY (ISBN) REFERENCES Books(ISBN) ON DELETE CASCADE
+);
+
+CREATE TABLE CategoryCirculation (
+    Category_ID INT NOT NULL,
+    Slot TINYINT NOT NULL,
+    Loans INT NOT NULL DEFAULT 0,
+    Books_Borrowed INT NOT NULL DEFAULT 0, -- titles borrowed at least once
+    Unique_Borrowers INT NOT NULL DEFAULT 0,
+    Open_Loans INT NOT NULL DEFAULT 0,
+    Overdue_Count INT NOT NULL DEFAULT 0,
+    Fined_Loans INT NOT NULL DEFAULT 0,
+    Fines_Total DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (Category_ID, Slot),
+    FOREIGN KEY (Category_ID) REFERENCES Categories(Category_ID) ON DELETE CASCADE
+);
+
+-- Who has ever borrowed from a category, so Unique_Borrowers only counts first borrows
+CREATE TABLE CategoryBorrowers (
+    Category_ID INT NOT NULL,
+    Member_ID INT NOT NULL,
+    PRIMARY KEY (Category_ID, Member_ID)
+);
+
+CREATE TABLE DailyCirculation (
+    Circulation_Date DATE NOT NULL,
+    Slot TINYINT NOT NULL,
+    Borrows INT NOT NULL DEFAULT 0,
+    Returns INT NOT NULL DEFAULT 0,
+    Fines_Collected DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (Circulation_Date, Slot)
+);
+
+DELIMITER //
+CREATE TRIGGER after_book_insert_circulation
+AFTER INSERT ON Books
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO BookCirculation (ISBN) VALUES (NEW.ISBN);
+END;//
+
+CREATE TRIGGER after_transaction_insert_rollup
+AFTER INSERT ON MemberTransactions
+FOR EACH ROW
+BEGIN
+    DECLARE v_category_id INT;
+    DECLARE v_slot TINYINT DEFAULT NEW.Member_ID MOD 16;
+    DECLARE v_first_borrow BOOLEAN;
+    DECLARE v_new_borrower INT DEFAULT 0;
+    DECLARE v_open BOOLEAN DEFAULT NEW.Status <> 'Completed';
+
+    IF NEW.Transaction_Type = 'Borrow' THEN
+        SET v_category_id = (SELECT Category_ID FROM Books WHERE ISBN = NEW.ISBN);
+        SET v_first_borrow = COALESCE((SELECT Times_Borrowed FROM BookCirculation WHERE ISBN = NEW.ISBN), 0) = 0;
+
+        INSERT INTO BookCirculation (ISBN, Times_Borrowed, Currently_Borrowed, Overdue_Count, Fines_Total, Last_Borrowed_At)
+        VALUES (NEW.ISBN, 1, v_open, NEW.Status = 'Overdue', NEW.Fine_Amount, NEW.Transaction_Date)
+        ON DUPLICATE KEY UPDATE
+            Times_Borrowed = Times_Borrowed + 1,
+            Currently_Borrowed = Currently_Borrowed + v_open,
+            Overdue_Count = Overdue_Count + (NEW.Status = 'Overdue'),
+            Fines_Total = Fines_Total + NEW.Fine_Amount,
+            Last_Borrowed_At = GREATEST(COALESCE(Last_Borrowed_At, NEW.Transaction_Date), NEW.Transaction_Date);
+
+        IF v_category_id IS NOT NULL THEN
+            INSERT IGNORE INTO CategoryBorrowers (Category_ID, Member_ID) VALUES (v_category_id, NEW.Member_ID);
+            SET v_new_borrower = ROW_COUNT();
+
+            INSERT INTO CategoryCirculation
+                (Category_ID, Slot, Loans, Books_Borrowed, Unique_Borrowers, Open_Loans, Overdue_Count, Fined_Loans, Fines_Total)
+            VALUES (v_category_id, v_slot, 1, v_first_borrow, v_new_borrower, v_open,
+                    NEW.Status = 'Overdue', NEW.Fine_Amount > 0, NEW.Fine_Amount)
+            ON DUPLICATE KEY UPDATE
+                Loans = Loans + 1,
+                Books_Borrowed = Books_Borrowed + v_first_borrow,
+                Unique_Borrowers = Unique_Borrowers + v_new_borrower,
+                Open_Loans = Open_Loans + v_open,
+                Overdue_Count = Overdue_Count + (NEW.Status = 'Overdue'),
+                Fined_Loans = Fined_Loans + (NEW.Fine_Amount > 0),
+                Fines_Total = Fines_Total + NEW.Fine_Amount;
+        END IF;
+
+        INSERT INTO DailyCirculation (Circulation_Date, Slot, Borrows)
+        VALUES (DATE(NEW.Transaction_Date), v_slot, 1)
+        ON DUPLICATE KEY UPDATE Borrows = Borrows + 1;
+
+        -- Loaded history can arrive already returned
+        IF NOT v_open AND NEW.Return_Date IS NOT NULL THEN
+            INSERT INTO DailyCirculation (Circulation_Date, Slot, Returns, Fines_Collected)
+            VALUES (NEW.Return_Date, v_slot, 1, NEW.Fine_Amount)
+            ON DUPLICATE KEY UPDATE Returns = Returns + 1, Fines_Collected = Fines_Collected + NEW.Fine_Amount;
+        END IF;
+    END IF;
+END;//
+
+-- Returns and fine accrual
+CREATE TRIGGER after_transaction_update_rollup
+AFTER UPDATE ON MemberTransactions
+FOR EACH ROW
+BEGIN
+    DECLARE v_category_id INT;
+    DECLARE v_slot TINYINT DEFAULT NEW.Member_ID MOD 16;
+    DECLARE v_open_delta INT DEFAULT (NEW.Status <> 'Completed') - (OLD.Status <> 'Completed');
+    DECLARE v_overdue_delta INT DEFAULT (NEW.Status = 'Overdue') - (OLD.Status = 'Overdue');
+    DECLARE v_fined_delta INT DEFAULT (NEW.Fine_Amount > 0) - (OLD.Fine_Amount > 0);
+    DECLARE v_fine_delta DECIMAL(12, 2) DEFAULT NEW.Fine_Amount - OLD.Fine_Amount;
+
+    IF NEW.Transaction_Type = 'Borrow'
+        AND (v_open_delta <> 0 OR v_overdue_delta <> 0 OR v_fine_delta <> 0) THEN
+        UPDATE BookCirculation
+        SET Currently_Borrowed = Currently_Borrowed + v_open_delta,
+            Overdue_Count = Overdue_Count + v_overdue_delta,
+            Fines_Total = Fines_Total + v_fine_delta
+        WHERE ISBN = NEW.ISBN;
+
+        SET v_category_id = (SELECT Category_ID FROM Books WHERE ISBN = NEW.ISBN);
+        IF v_category_id IS NOT NULL THEN
+            UPDATE CategoryCirculation
+            SET Open_Loans = Open_Loans + v_open_delta,
+                Overdue_Count = Overdue_Count + v_overdue_delta,
+                Fined_Loans = Fined_Loans + v_fined_delta,
+                Fines_Total = Fines_Total + v_fine_delta
+            WHERE Category_ID = v_category_id AND Slot = v_slot;
+        END IF;
+
+        IF v_open_delta < 0 THEN
+            INSERT INTO DailyCirculation (Circulation_Date, Slot, Returns, Fines_Collected)
+            VALUES (COALESCE(NEW.Return_Date, CURRENT_DATE), v_slot, 1, NEW.Fine_Amount)
+            ON DUPLICATE KEY UPDATE Returns = Returns + 1, Fines_Collected = Fines_Collected + NEW.Fine_Amount;
+        END IF;
+    END IF;
+END;//
+
+-- Recompute every rollup from the live and archived history, for backfills and after bulk deletes.
+-- Runs as one transaction, so borrows and returns wait for it; run it off-peak.
+CREATE PROCEDURE RebuildCirculationRollups()
+BEGIN
+    START TRANSACTION;
+    DELETE FROM BookCirculation;
+    DELETE FROM CategoryCirculation;
+    DELETE FROM CategoryBorrowers;
+    DELETE FROM DailyCirculation;
+
+    INSERT INTO BookCirculation (ISBN, Times_Borrowed, Currently_Borrowed, Overdue_Count, Fines_Total, Last_Borrowed_At)
+    SELECT b.ISBN,
+           COALESCE(t.Times_Borrowed, 0),
+           COALESCE(t.Currently_Borrowed, 0),
+           COALESCE(t.Overdue_Count, 0),
+           COALESCE(t.Fines_Total, 0),
+           t.Last_Borrowed_At
+    FROM Books b
+    LEFT JOIN (
+        SELECT ISBN,
+            COUNT(*) AS Times_Borrowed,
+            SUM(Status <> 'Completed') AS Currently_Borrowed,
+            SUM(Status = 'Overdue') AS Overdue_Count,
+            SUM(Fine_Amount) AS Fines_Total,
+            MAX(Transaction_Date) AS Last_Borrowed_At
+        FROM MemberTransactionHistory
+        WHERE Transaction_Type = 'Borrow'
+        GROUP BY ISBN
+    ) t ON t.ISBN = b.ISBN;
+
+    INSERT INTO CategoryBorrowers (Category_ID, Member_ID)
+    SELECT DISTINCT b.Category_ID, mt.Member_ID
+    FROM MemberTransactionHistory mt
+    JOIN Books b ON b.ISBN = mt.ISBN
+    WHERE mt.Transaction_Type = 'Borrow' AND b.Category_ID IS NOT NULL;
+
+    INSERT INTO CategoryCirculation (Category_ID, Slot, Loans, Open_Loans, Overdue_Count, Fined_Loans, Fines_Total)
+    SELECT b.Category_ID,
+           mt.Member_ID MOD 16,
+           COUNT(*),
+           SUM(mt.Status <> 'Completed'),
+           SUM(mt.Status = 'Overdue'),
+           SUM(mt.Fine_Amount > 0),
+           SUM(mt.Fine_Amount)
+    FROM MemberTransactionHistory mt
+    JOIN Books b ON b.ISBN = mt.ISBN
+    WHERE mt.Transaction_Type = 'Borrow' AND b.Category_ID IS NOT NULL
+    GROUP BY b.Category_ID, mt.Member_ID MOD 16;
+
+    -- Every borrower has a loan in its own slot, so those rows already exist
+    UPDATE CategoryCirculation cc
+    JOIN (
+        SELECT Category_ID, Member_ID MOD 16 AS Slot, COUNT(*) AS Borrowers
+        FROM CategoryBorrowers
+        GROUP BY Category_ID, Member_ID MOD 16
+    ) t ON t.Category_ID = cc.Category_ID AND t.Slot = cc.Slot
+    SET cc.Unique_Borrowers = t.Borrowers;
+
+    INSERT INTO CategoryCirculation (Category_ID, Slot, Books_Borrowed)
+    SELECT * FROM (
+        SELECT b.Category_ID, 0 AS Slot, COUNT(*) AS Titles
+        FROM BookCirculation bc
+        JOIN Books b ON b.ISBN = bc.ISBN
+        WHERE bc.Times_Borrowed > 0 AND b.Category_ID IS NOT NULL
+        GROUP BY b.Category_ID
+    ) t
+    ON DUPLICATE KEY UPDATE Books_Borrowed = t.Titles;
+
+    INSERT INTO DailyCirculation (Circulation_Date, Slot, Borrows)
+    SELECT DATE(Transaction_Date), Member_ID MOD 16, COUNT(*)
+    FROM MemberTransactionHistory
+    WHERE Transaction_Type = 'Borrow'
+    GROUP BY DATE(Transaction_Date), Member_ID MOD 16;
+
+    INSERT INTO DailyCirculation (Circulation_Date, Slot, Returns, Fines_Collected)
+    SELECT * FROM (
+        SELECT Return_Date, Member_ID MOD 16 AS Slot, COUNT(*) AS Returned, SUM(Fine_Amount) AS Fines
+        FROM MemberTransactionHistory
+        WHERE Transaction_Type = 'Borrow' AND Status = 'Completed' AND Return_Date IS NOT NULL
+        GROUP BY Return_Date, Member_ID MOD 16
+    ) t
+    ON DUPLICATE KEY UPDATE Returns = t.Returned, Fines_Collected = t.Fines;
+    COMMIT;
+
+    SELECT (SELECT COUNT(*) FROM BookCirculation) AS Books,
+           (SELECT COUNT(*) FROM CategoryCirculation) AS Category_Rows,
+           (SELECT COUNT(*) FROM DailyCirculation) AS Daily_Rows;
+END;//
+DELIMITER ;
+
+-- Books and transactions loaded above predate the triggers
+CALL RebuildCirculationRollups();
+
+-- Archival: Completed transactions returned more than p_older_than_days ago move to
+-- MemberTransactionsArchive. The live table is walked in primary-key ranges of
+-- p_batch_size rows, each copied and deleted in its own short transaction.
+-- archive.py runs it (nightly from cron) after making sure the year partitions exist.
+CREATE TABLE ArchiveRuns (
+    Run_ID INT PRIMARY KEY AUTO_INCREMENT,
+    Cutoff_Date DATE NOT NULL,
+    Rows_Moved INT DEFAULT 0,
+    Started_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Finished_At TIMESTAMP NULL
+);
+
+DELIMITER //
+CREATE PROCEDURE ArchiveMemberTransactions(
+    IN p_older_than_days INT,
+    IN p_batch_size INT
+)
+BEGIN
+    DECLARE v_run_id INT;
+    DECLARE v_cutoff DATE;
+    DECLARE v_last_id INT DEFAULT 0;
+    DECLARE v_upper INT;
+    DECLARE v_moved INT DEFAULT 0;
+
+    SET p_older_than_days = COALESCE(p_older_than_days, 365);
+    SET p_batch_size = COALESCE(p_batch_size, 5000);
+    SET v_cutoff = CURRENT_DATE - INTERVAL p_older_than_days DAY;
+
+    INSERT INTO ArchiveRuns (Cutoff_Date) VALUES (v_cutoff);
+    SET v_run_id = LAST_INSERT_ID();
+    COMMIT;
+
+    REPEAT
+        SET v_upper = (
+            SELECT MAX(Transaction_ID) FROM (
+                SELECT Transaction_ID FROM MemberTransactions
+                WHERE Transaction_ID > v_last_id
+                ORDER BY Transaction_ID
+                LIMIT p_batch_size
+            ) ids
+        );
+        IF v_upper IS NOT NULL THEN
+            START TRANSACTION;
+            INSERT INTO MemberTransactionsArchive
+                (Transaction_ID, Member_ID, ISBN, Transaction_Type, Transaction_Date,
+                 Due_Date, Return_Date, Fine_Amount, Status)
+            SELECT Transaction_ID, Member_ID, ISBN, Transaction_Type, Transaction_Date,
+                   Due_Date, Return_Date, Fine_Amount, Status
+            FROM MemberTransactions
+            WHERE Transaction_ID > v_last_id AND Transaction_ID <= v_upper
+            AND Status = 'Completed' AND Return_Date < v_cutoff;
+
+            -- No delete triggers: the summary and rollup counters keep the history
+            DELETE FROM MemberTransactions
+            WHERE Transaction_ID > v_last_id AND Transaction_ID <= v_upper
+            AND Status = 'Completed' AND Return_Date < v_cutoff;
+            SET v_moved = v_moved + ROW_COUNT();
+            COMMIT;
+            SET v_last_id = v_upper;
+        END IF;
+    UNTIL v_upper IS NULL END REPEAT;
+
+    UPDATE ArchiveRuns
+    SET Rows_Moved = v_moved, Finished_At = CURRENT_TIMESTAMP
+    WHERE Run_ID = v_run_id;
+    COMMIT;
+
+    SELECT v_run_id AS Run_ID, v_cutoff AS Cutoff_Date, v_moved AS Rows_Moved;
+END;//
+DELIMITER ;
+
+-- Background jobs: long admin operations queued by the portal and run by jobs.py
+-- executors, in the Streamlit process or a separate worker. Executors claim
+-- Queued jobs with FOR UPDATE SKIP LOCKED, report progress and a heartbeat here,
+-- and stop at the next progress report once Cancel_Requested is set.
+CREATE TABLE Jobs (
+    Job_ID INT PRIMARY KEY AUTO_INCREMENT,
+    Job_Type VARCHAR(50) NOT NULL,
+    Params JSON,
+    Status ENUM('Queued', 'Running', 'Succeeded', 'Failed', 'Cancelled') NOT NULL DEFAULT 'Queued',
+    Progress_Done INT NOT NULL DEFAULT 0,
+    Progress_Total INT,
+    Message VARCHAR(500),
+    Result JSON,
+    Cancel_Requested BOOLEAN NOT NULL DEFAULT FALSE,
+    Submitted_By INT, -- Admin_ID
+    Worker VARCHAR(100), -- host:pid of the executor running it
+    Claim_Token CHAR(32), -- fresh per claim; progress and the final status only land with it
+    Created_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Started_At DATETIME,
+    Heartbeat_At DATETIME,
+    Finished_At DATETIME,
+    INDEX idx_jobs_status (Status, Job_ID), -- next Queued job, and Running jobs gone stale
+    INDEX idx_jobs_finished (Finished_At) -- jobs that ended since an executor last looked
+);
 
 SET @mechanics_category_id = (SELECT Category_ID FROM Categories WHERE Category_Name = 'Mechanics and Mechanical');
 INSERT INTO Authors (Author_Name) VALUES
@@ -717,10 +1989,9 @@ DETERMINISTIC
 BEGIN
     DECLARE total_fines DECIMAL(10,2);
     
-    SELECT SUM(Fine_Amount)
-    INTO total_fines
-    FROM MemberTransactions
-    WHERE Member_ID = p_member_id;
+    SELECT COALESCE((SELECT SUM(Fine_Amount) FROM MemberTransactions WHERE Member_ID = p_member_id), 0)
+         + COALESCE((SELECT SUM(Fine_Amount) FROM MemberTransactionsArchive WHERE Member_ID = p_member_id), 0)
+    INTO total_fines;
     
     RETURN COALESCE(total_fines, 0.00);
 END //
@@ -736,16 +2007,19 @@ BEGIN
     DECLARE status VARCHAR(100);
     DECLARE due_date DATE;
     
+    -- The counters answer the common case; loans are only read when every copy is out
     SELECT 
         CASE 
-            WHEN b.Availability = 'In stock' THEN 'Available'
-            ELSE CONCAT('Checked out until ', DATE_FORMAT(mt.Due_Date, '%Y-%m-%d'))
+            WHEN b.Available_Copies > 0 THEN
+                CONCAT('Available (', b.Available_Copies, ' of ', b.Total_Copies, ' copies)')
+            -- Copies the desk checked out have no due date
+            ELSE COALESCE(CONCAT('Checked out until ', DATE_FORMAT((
+                SELECT MIN(mt.Due_Date) FROM MemberTransactions mt
+                WHERE mt.ISBN = b.ISBN AND mt.Status IN ('Active', 'Overdue')
+            ), '%Y-%m-%d')), 'Checked out')
         END INTO status
     FROM Books b
-    LEFT JOIN MemberTransactions mt ON b.ISBN = mt.ISBN 
-        AND mt.Status = 'Active'
-    WHERE b.ISBN = p_isbn
-    LIMIT 1;
+    WHERE b.ISBN = p_isbn;
     
     RETURN COALESCE(status, 'Book not found');
 END //
@@ -756,25 +2030,22 @@ SELECT b.ISBN,
        b.Title, 
        a.Author_Name,
        c.Category_Name
-FROM Books b
+FROM BookCirculation bc -- one row per title, so this is a range scan on idx_bc_times_borrowed
+JOIN Books b ON b.ISBN = bc.ISBN
 JOIN Authors a ON b.Author_ID = a.Author_ID
 JOIN Categories c ON b.Category_ID = c.Category_ID
-WHERE b.ISBN NOT IN (
-    SELECT DISTINCT ISBN 
-    FROM MemberTransactions
-);
+WHERE bc.Times_Borrowed = 0;
 
 -- Aggregate Query: Calculate borrowing statistics by category
 SELECT 
     c.Category_Name,
-    COUNT(DISTINCT mt.ISBN) as total_books_borrowed,
-    COUNT(DISTINCT mt.Member_ID) as unique_borrowers,
-    AVG(mt.Fine_Amount) as average_fine,
-    SUM(CASE WHEN mt.Status = 'Overdue' THEN 1 ELSE 0 END) as overdue_count
+    COALESCE(SUM(cc.Books_Borrowed), 0) as total_books_borrowed,
+    COALESCE(SUM(cc.Unique_Borrowers), 0) as unique_borrowers,
+    SUM(cc.Fines_Total) / NULLIF(SUM(cc.Loans), 0) as average_fine,
+    COALESCE(SUM(cc.Overdue_Count), 0) as overdue_count
 FROM Categories c
-JOIN Books b ON c.Category_ID = b.Category_ID
-LEFT JOIN MemberTransactions mt ON b.ISBN = mt.ISBN
-GROUP BY c.Category_Name
+LEFT JOIN CategoryCirculation cc ON cc.Category_ID = c.Category_ID
+GROUP BY c.Category_ID, c.Category_Name
 ORDER BY total_books_borrowed DESC;
 
 -- Complex Nested Query: Find members with overdue books and their fine details
@@ -783,23 +2054,12 @@ SELECT
     m.First_Name,
     m.Last_Name,
     m.Email,
-    COUNT(mt.Transaction_ID) as overdue_books,
-    SUM(
-        CASE 
-            WHEN mt.Status = 'Active' AND mt.Due_Date < CURDATE() 
-            THEN DATEDIFF(CURDATE(), mt.Due_Date) * 10 
-            ELSE mt.Fine_Amount 
-        END
-    ) as total_fines
-FROM Members m
-JOIN MemberTransactions mt ON m.Member_ID = mt.Member_ID
-WHERE mt.Status = 'Active' 
-AND mt.Due_Date < CURDATE()
-GROUP BY m.Member_ID, m.First_Name, m.Last_Name, m.Email
-HAVING total_fines > (
-    SELECT AVG(Fine_Amount) 
-    FROM MemberTransactions 
-    WHERE Fine_Amount > 0
+    s.Overdue_Count as overdue_books,
+    s.Outstanding_Fines as total_fines -- accrued by AccrueFines
+FROM MemberBorrowingSummary s
+JOIN Members m ON m.Member_ID = s.Member_ID
+WHERE s.Overdue_Count > 0
+AND s.Outstanding_Fines > (
+    SELECT SUM(Fines_Total) / NULLIF(SUM(Fined_Loans), 0)
+    FROM CategoryCirculation
 );
-
-
@@ -0,0 +1,359 @@
+"""Named SQL statements shared by appnew.py and insert.py.
+
+Every statement is declared once in QUERIES and run as a server-side
+prepared statement. The first run of a statement on a pooled connection
+prepares it, and the prepared cursor is kept for as long as that
+connection lives, so later runs send only the parameters. Stored
+procedures that answer with a result set go through call(). Every named
+statement is timed under its name in metrics. Results come back as tuples, dicts or, for the
+dataframe pages, a pandas DataFrame.
+"""
+from metrics import query_timer
+
+MEMBER_TRANSACTIONS_SELECT = """
+    SELECT
+        mt.Transaction_ID,
+        b.Title,
+        mt.ISBN,
+        mt.Transaction_Type,
+        mt.Transaction_Date,
+        mt.Due_Date,
+        mt.Return_Date,
+        mt.Fine_Amount,
+        mt.Status
+    FROM MemberTransactions mt
+    JOIN Books b ON mt.ISBN = b.ISBN
+"""
+
+# The same columns and alias over the archived history, so filters written for
+# one apply to the other; the two halves are combined with UNION ALL
+MEMBER_TRANSACTIONS_ARCHIVE_SELECT = MEMBER_TRANSACTIONS_SELECT.replace(
+    "FROM MemberTransactions mt", "FROM MemberTransactionsArchive mt"
+)
+
+MEMBERS_SELECT = """
+    SELECT
+        Member_ID,
+        Username,
+        First_Name,
+        Last_Name,
+        Email,
+        Status,
+        Created_At,
+        Last_Login
+    FROM Members
+"""
+
+QUERIES = {
+    # Logins
+    "admin_login": """
+        SELECT Admin_ID, Username, Role FROM Administrators
+        WHERE Username = %s AND Password = %s
+    """,
+    "member_login": """
+        SELECT Member_ID, Username, Status FROM Members
+        WHERE Username = %s AND Password = %s
+    """,
+
+    # Catalog
+    "books_fulltext_search": """
+        SELECT v.*
+        FROM Books b
+        JOIN BookListView v ON v.ISBN = b.ISBN
+        WHERE MATCH(b.Search_Text) AGAINST (%s IN BOOLEAN MODE)
+        ORDER BY MATCH(b.Search_Text) AGAINST (%s IN BOOLEAN MODE) DESC, v.Title
+        LIMIT %s
+    """,
+    "books_like_search": """
+        SELECT * FROM BookListView
+        WHERE Title LIKE %s
+        OR Author_Name LIKE %s
+        OR Category_Name LIKE %s
+        LIMIT %s
+    """,
+    "books_page": "SELECT * FROM BookListView",
+    "books_with_loan_status": """
+        SELECT
+            b.ISBN,
+            b.Title,
+            a.Author_Name,
+            c.Category_Name,
+            CASE
+                WHEN b.Available_Copies = 0 THEN 'Borrowed'
+                ELSE 'Available'
+            END as Status,
+            b.Available_Copies,
+            b.Total_Copies
+        FROM Books b
+        JOIN Authors a ON b.Author_ID = a.Author_ID
+        JOIN Categories c ON b.Category_ID = c.Category_ID
+    """,
+    "author_id_by_name": "SELECT Author_ID FROM Authors WHERE Author_Name = %s",
+    "author_insert": "INSERT INTO Authors (Author_Name) VALUES (%s)",
+    "category_id_by_name": "SELECT Category_ID FROM Categories WHERE Category_Name = %s",
+    "book_insert": """
+        INSERT INTO Books (ISBN, Title, Author_ID, Category_ID)
+        VALUES (%s, %s, %s, %s)
+    """,
+    "book_loan_check": """
+        SELECT b.Title,
+               EXISTS (
+                   SELECT 1 FROM MemberTransactions mt
+                   WHERE mt.ISBN = b.ISBN AND mt.Status IN ('Active', 'Overdue')
+               ) as is_borrowed
+        FROM Books b
+        WHERE b.ISBN = %s
+    """,
+
+    # Members
+    "username_taken": "SELECT COUNT(*) FROM Members WHERE Username = %s",
+    "email_taken": "SELECT COUNT(*) FROM Members WHERE Email = %s",
+    "member_insert": """
+        INSERT INTO Members
+        (Username, Password, First_Name, Last_Name, Email, Status)
+        VALUES (%s, %s, %s, %s, %s, 'Active')
+    """,
+    "members_page": MEMBERS_SELECT,
+    "members_with_active_borrows": """
+        SELECT
+            Member_ID,
+            Username,
+            First_Name,
+            Last_Name,
+            Email,
+            Status,
+            (SELECT COUNT(*) FROM MemberTransactions
+             WHERE Member_ID = m.Member_ID AND Status IN ('Active', 'Overdue')) as Active_Borrows
+        FROM Members m
+        ORDER BY Member_ID
+    """,
+    "member_loan_check": """
+        SELECT
+            CONCAT(First_Name, ' ', Last_Name) as full_name,
+            (SELECT COUNT(*) FROM MemberTransactions
+             WHERE Member_ID = m.Member_ID AND Status IN ('Active', 'Overdue')) as active_borrows
+        FROM Members m
+        WHERE Member_ID = %s
+    """,
+    "member_delete": "DELETE FROM Members WHERE Member_ID = %s",
+    # Typeahead: every branch is a range scan on its own index, merged and capped
+    "member_lookup": """
+        SELECT Member_ID, Username, First_Name, Last_Name, Status FROM (
+            (SELECT Member_ID, Username, First_Name, Last_Name, Status
+             FROM Members WHERE Member_ID = %s)
+            UNION
+            (SELECT Member_ID, Username, First_Name, Last_Name, Status
+             FROM Members WHERE Username LIKE %s ORDER BY Username LIMIT %s)
+            UNION
+            (SELECT Member_ID, Username, First_Name, Last_Name, Status
+             FROM Members WHERE First_Name LIKE %s ORDER BY First_Name, Last_Name LIMIT %s)
+            UNION
+            (SELECT Member_ID, Username, First_Name, Last_Name, Status
+             FROM Members WHERE Last_Name LIKE %s ORDER BY Last_Name LIMIT %s)
+        ) matches
+        ORDER BY Member_ID = %s DESC, Username
+        LIMIT %s
+    """,
+    "member_lookup_full_name": """
+        SELECT Member_ID, Username, First_Name, Last_Name, Status
+        FROM Members
+        WHERE First_Name = %s AND Last_Name LIKE %s
+        ORDER BY Last_Name, Username
+        LIMIT %s
+    """,
+
+    # Transactions
+    "member_open_transactions": MEMBER_TRANSACTIONS_SELECT + """
+        WHERE mt.Member_ID = %s AND mt.Status IN ('Active', 'Overdue')
+        ORDER BY mt.Transaction_Date DESC
+    """,
+    "member_transactions_page": MEMBER_TRANSACTIONS_SELECT,
+    "member_transactions_archive_page": MEMBER_TRANSACTIONS_ARCHIVE_SELECT,
+    "member_transaction_stats": """
+        SELECT
+            Currently_Borrowed AS Active_Borrows,
+            Total_Fines_Paid + Outstanding_Fines AS Total_Fines,
+            Overdue_Count AS Overdue_Books
+        FROM MemberBorrowingSummary
+        WHERE Member_ID = %s
+    """,
+
+    # Holds; positions are stored on each hold, so nothing counts the queue
+    "member_holds": """
+        SELECT
+            h.ISBN,
+            b.Title,
+            h.Status,
+            h.Queue_Position,
+            q.Waiting AS Queue_Length,
+            h.Placed_At,
+            h.Expires_At
+        FROM Holds h
+        JOIN Books b ON b.ISBN = h.ISBN
+        JOIN HoldQueues q ON q.ISBN = h.ISBN
+        WHERE h.Member_ID = %s AND h.Status IN ('Waiting', 'Ready')
+        ORDER BY h.Status = 'Ready' DESC, h.Placed_At
+    """,
+
+    # Analytics, read from the circulation rollups
+    "category_circulation": """
+        SELECT
+            c.Category_Name,
+            COALESCE(SUM(cc.Loans), 0) AS Loans,
+            COALESCE(SUM(cc.Books_Borrowed), 0) AS Books_Borrowed,
+            COALESCE(SUM(cc.Unique_Borrowers), 0) AS Unique_Borrowers,
+            COALESCE(SUM(cc.Open_Loans), 0) AS Open_Loans,
+            COALESCE(SUM(cc.Overdue_Count), 0) AS Overdue,
+            COALESCE(SUM(cc.Fines_Total), 0) AS Fines_Total,
+            SUM(cc.Fines_Total) / NULLIF(SUM(cc.Loans), 0) AS Average_Fine
+        FROM Categories c
+        LEFT JOIN CategoryCirculation cc ON cc.Category_ID = c.Category_ID
+        GROUP BY c.Category_ID, c.Category_Name
+        ORDER BY Loans DESC
+    """,
+    "daily_circulation": """
+        SELECT Circulation_Date, SUM(Borrows) AS Borrows, SUM(Returns) AS Returns,
+               SUM(Fines_Collected) AS Fines_Collected
+        FROM DailyCirculation
+        WHERE Circulation_Date >= CURRENT_DATE - INTERVAL %s DAY
+        GROUP BY Circulation_Date
+        ORDER BY Circulation_Date
+    """,
+    "most_borrowed_books": """
+        SELECT b.ISBN, b.Title, bc.Times_Borrowed, bc.Currently_Borrowed, bc.Fines_Total, bc.Last_Borrowed_At
+        FROM BookCirculation bc
+        JOIN Books b ON b.ISBN = bc.ISBN
+        ORDER BY bc.Times_Borrowed DESC, bc.ISBN DESC
+        LIMIT %s
+    """,
+    "never_borrowed_books": """
+        SELECT b.ISBN, b.Title, a.Author_Name, c.Category_Name
+        FROM BookCirculation bc
+        JOIN Books b ON b.ISBN = bc.ISBN
+        JOIN Authors a ON b.Author_ID = a.Author_ID
+        JOIN Categories c ON b.Category_ID = c.Category_ID
+        WHERE bc.Times_Borrowed = 0
+        ORDER BY bc.ISBN
+        LIMIT %s
+    """,
+    "never_borrowed_count": "SELECT COUNT(*) FROM BookCirculation WHERE Times_Borrowed = 0",
+    "members_with_overdue_books": """
+        SELECT m.Member_ID, m.Username, m.First_Name, m.Last_Name, m.Email,
+               s.Overdue_Count AS Overdue_Books, s.Outstanding_Fines
+        FROM MemberBorrowingSummary s
+        JOIN Members m ON m.Member_ID = s.Member_ID
+        WHERE s.Overdue_Count > 0
+        ORDER BY s.Outstanding_Fines DESC
+        LIMIT %s
+    """,
+
+    # Audit history for one book over [start, end), each a range scan on (ISBN, date)
+    "book_status_log": """
+        SELECT Changed_At, Old_Status, New_Status, Changed_By
+        FROM BookStatusLog
+        WHERE ISBN = %s AND Changed_At >= %s AND Changed_At < %s
+        ORDER BY Changed_At, Log_ID
+    """,
+    "book_admin_transactions": """
+        SELECT Transaction_Date, Transaction_Type, Admin_ID, Notes
+        FROM AdminTransactions
+        WHERE ISBN = %s AND Transaction_Date >= %s AND Transaction_Date < %s
+        ORDER BY Transaction_Date, Transaction_ID
+    """,
+    "book_audit_daily": """
+        SELECT Audit_Date, Status_Changes, Checked_Out, Returned, Admin_Checkouts, Admin_Returns
+        FROM BookAuditDaily
+        WHERE ISBN = %s AND Audit_Date >= %s AND Audit_Date < %s
+        ORDER BY Audit_Date
+    """,
+}
+
+
+def register(name, sql):
+    """Declare a generated statement (e.g. a keyset page variant) under name.
+
+    The first declaration wins, so callers that build the same text again
+    keep hitting the statement that is already prepared.
+    """
+    QUERIES.setdefault(name, sql)
+    return name
+
+
+def prepared_cursor(conn, name):
+    """Return the prepared cursor for a named statement on conn"""
+    cache = getattr(conn, "statement_cache", None)
+    if cache is None:
+        # A plain connection outside the pool: prepare for this call only
+        return conn.cursor(prepared=True)
+    cursor = cache.get(name)
+    if cursor is None:
+        cursor = cache[name] = conn.cursor(prepared=True)
+    return cursor
+
+
+def _run(conn, name, params):
+    cursor = prepared_cursor(conn, name)
+    # The cursor re-prepares whenever it sees a different string object, so always pass the declared one
+    cursor.execute(QUERIES[name], tuple(params))
+    return cursor
+
+
+def execute(conn, name, params=()):
+    """Run a named statement and return its cursor (for rowcount and lastrowid)"""
+    with query_timer(name) as timer:
+        cursor = _run(conn, name, params)
+        timer.rows = cursor.rowcount
+    return cursor
+
+
+def fetch_rows(conn, name, params=()):
+    """Column names and the raw row tuples, with no per-row conversion"""
+    with query_timer(name) as timer:
+        cursor = _run(conn, name, params)
+        rows = cursor.fetchall()
+        timer.rows = len(rows)
+    return cursor.column_names, rows
+
+
+def fetch_all(conn, name, params=(), dictionary=False):
+    columns, rows = fetch_rows(conn, name, params)
+    if dictionary:
+        return [dict(zip(columns, row)) for row in rows]
+    return rows
+
+
+def call(conn, procedure, params=()):
+    """Run a stored procedure and return the rows of every result set it selects.
+
+    Goes through callproc and stored_results, which every connector version
+    supports (execute(multi=True) is gone from 9.2). The caller times the call.
+    """
+    cursor = conn.cursor()
+    rows = []
+    try:
+        cursor.callproc(procedure, tuple(params))
+        for result in cursor.stored_results():
+            rows.extend(result.fetchall())
+    finally:
+        cursor.close()
+    return rows
+
+
+def to_frame(columns, rows):
+    """Build a pandas DataFrame straight from cursor rows.
+
+    pandas is only needed by the Streamlit pages (it ships with streamlit),
+    so the command-line tools never import it.
+    """
+    import pandas as pd
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def fetch_frame(conn, name, params=()):
+    return to_frame(*fetch_rows(conn, name, params))
+
+
+def fetch_one(conn, name, params=(), dictionary=False):
+    # Read every row so the prepared statement is free for its next run
+    rows = fetch_all(conn, name, params, dictionary)
+    return rows[0] if rows else None
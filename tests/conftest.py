@@ -0,0 +1,40 @@
+"""Let the unit tests import the database modules where mysql-connector is not installed.
+
+The tests never open a real connection; they only need mysql.connector's
+exception classes, so a minimal stand-in module is registered in their place.
+"""
+import sys
+import types
+
+try:
+    import mysql.connector  # noqa: F401
+except ImportError:
+    class Error(Exception):
+        def __init__(self, msg=None, errno=None):
+            super().__init__(msg)
+            self.msg = msg
+            self.errno = errno
+
+    class DatabaseError(Error):
+        pass
+
+    class IntegrityError(DatabaseError):
+        pass
+
+    class DataError(DatabaseError):
+        pass
+
+    def connect(**config):
+        raise Error("mysql-connector is not installed")
+
+    connector = types.ModuleType("mysql.connector")
+    connector.Error = Error
+    connector.DatabaseError = DatabaseError
+    connector.IntegrityError = IntegrityError
+    connector.DataError = DataError
+    connector.connect = connect
+    connector.STUB = True
+    mysql = types.ModuleType("mysql")
+    mysql.connector = connector
+    sys.modules["mysql"] = mysql
+    sys.modules["mysql.connector"] = connector
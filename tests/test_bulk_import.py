@@ -0,0 +1,120 @@
+import mysql.connector
+
+from bulk_import import check_member_rows, import_book_chunk, import_member_chunk
+
+
+class FakeCursor:
+    """Answers the importer's statements from the keys (ISBNs, usernames) the connection has saved"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        if sql.startswith("SELECT ISBN FROM Books"):
+            self.rows = [(isbn,) for isbn in params if isbn in self.conn.saved]
+        elif sql.startswith("SELECT Author_ID, Author_Name FROM Authors"):
+            self.rows = [(self.conn.authors.setdefault(name, len(self.conn.authors) + 1), name) for name in params]
+        elif sql.startswith("SELECT Username, Email FROM Members"):
+            self.rows = [(name, f"{name}@example.com") for name in params if name in self.conn.saved]
+        elif sql.startswith("SELECT Username, Member_ID FROM Members"):
+            self.rows = [(name, number) for number, name in enumerate(params, start=1) if name in self.conn.saved]
+        else:
+            raise AssertionError(f"unexpected statement: {sql}")
+
+    def executemany(self, sql, rows):
+        for row in rows:
+            if row[0] in self.conn.failing:
+                raise mysql.connector.DataError(f"Data too long for {row[0]}")
+        self.conn.pending.extend(row[0] for row in rows)
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, saved=(), failing=()):
+        self.saved = set(saved)
+        self.failing = set(failing)     # keys the database refuses
+        self.authors = {}
+        self.pending = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.saved.update(self.pending)
+        self.pending = []
+        self.commits += 1
+
+    def rollback(self):
+        self.pending = []
+
+
+CATEGORIES = {"mathematics": 1}
+
+
+def book(isbn, title="Calculus", author="James Stewart", category="Mathematics"):
+    return {"ISBN": isbn, "Title": title, "Author": author, "Category": category}
+
+
+def chunk(*books):
+    return list(enumerate(books, start=2))
+
+
+def test_chunk_is_inserted_in_one_transaction():
+    conn = FakeConnection()
+    rejects = []
+    inserted = import_book_chunk(conn, chunk(book("0306406152"), book("9780306406157")), CATEGORIES, {}, rejects)
+    assert (inserted, rejects, conn.commits) == (2, [], 1)
+    assert conn.saved == {"0306406152", "9780306406157"}
+
+
+def test_over_long_values_are_rejected_before_the_insert():
+    conn = FakeConnection()
+    rejects = []
+    books = chunk(book("0306406152", title="x" * 256), book("9780306406157", author="y" * 101),
+                  book("9780131103627"))
+    assert import_book_chunk(conn, books, CATEGORIES, {}, rejects) == 1
+    assert rejects == [(2, "0306406152", "Title longer than 255 characters"),
+                       (3, "9780306406157", "Author longer than 100 characters")]
+    assert conn.saved == {"9780131103627"}
+
+
+def test_a_row_the_database_refuses_only_rejects_that_row():
+    conn = FakeConnection(saved={"9780201633610"}, failing={"9780306406157"})
+    rejects = []
+    books = chunk(book("0306406152"), book("9780306406157"), book("9780201633610"), book("9780131103627"))
+    assert import_book_chunk(conn, books, CATEGORIES, {}, rejects) == 2
+    assert rejects == [(4, "9780201633610", "ISBN already in catalog"),
+                       (3, "9780306406157", "Insert failed: Data too long for 9780306406157")]
+    assert conn.saved == {"9780201633610", "0306406152", "9780131103627"}
+
+
+def member(username, last_name="Reader"):
+    return {"Username": username, "Password": "secret", "First_Name": "Avid",
+            "Last_Name": last_name, "Email": f"{username}@example.com"}
+
+
+def test_member_rows_are_checked_against_every_column_length():
+    rejects = []
+    rows = [(2, member("a" * 51), "hash"), (3, member("long", last_name="b" * 51), "hash"),
+            (4, member("fits"), "hash")]
+    assert [row[0] for row in check_member_rows(rows, set(), set(), rejects)] == [4]
+    assert rejects == [(2, "a" * 51, "Username longer than 50 characters"),
+                       (3, "long", "Last_Name longer than 50 characters")]
+
+
+def test_a_member_the_database_refuses_only_rejects_that_row():
+    conn = FakeConnection(failing={"bad"})
+    rejects = []
+    enrolled = []
+    rows = [(2, member("first"), "hash"), (3, member("bad"), "hash"), (4, member("last"), "hash")]
+    assert import_member_chunk(conn, rows, enrolled, rejects) == 2
+    assert rejects == [(3, "bad", "Insert failed: Data too long for bad")]
+    assert [row[:2] for row in enrolled] == [(2, "first"), (4, "last")]
@@ -0,0 +1,84 @@
+import time
+
+from cache import CatalogCache
+
+
+def book(isbn, title="Title"):
+    return {"ISBN": isbn, "Title": title}
+
+
+def test_get_returns_a_copy_and_counts_hits():
+    cache = CatalogCache(ttl=60, max_entries=10)
+    assert cache.get("") is None
+    cache.put("", [book("1")], cache.generation())
+    rows = cache.get("")
+    rows.append(book("2"))
+    assert cache.get("") == [book("1")]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+
+
+def test_entries_expire_after_ttl():
+    cache = CatalogCache(ttl=0.01, max_entries=10)
+    cache.put("calc", [book("1")], cache.generation())
+    time.sleep(0.02)
+    assert cache.get("calc") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_listing_is_evicted():
+    cache = CatalogCache(ttl=60, max_entries=2)
+    cache.put("a", [book("1")], cache.generation())
+    cache.put("b", [book("2")], cache.generation())
+    cache.get("a")
+    cache.put("c", [book("3")], cache.generation())
+    assert cache.get("b") is None
+    assert cache.get("a") == [book("1")]
+    assert cache.get("c") == [book("3")]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_isbn_drops_only_listings_showing_it():
+    cache = CatalogCache(ttl=60, max_entries=10)
+    cache.put("", [book("1"), book("2")], cache.generation())
+    cache.put("calc", [book("1")], cache.generation())
+    cache.put("physics", [book("2")], cache.generation())
+    cache.invalidate_isbn("1")
+    assert cache.get("") is None
+    assert cache.get("calc") is None
+    assert cache.get("physics") == [book("2")]
+
+
+def test_load_racing_a_write_is_not_cached():
+    cache = CatalogCache(ttl=60, max_entries=10)
+    generation = cache.generation()
+    cache.invalidate_isbn("1")
+    cache.put("", [book("1")], generation)
+    assert cache.get("") is None
+
+
+def test_new_book_drops_listings_it_would_appear_in():
+    cache = CatalogCache(ttl=60, max_entries=10)
+    for key in ("", "calculus", "calc stewart", "physics"):
+        cache.put(key, [book("1")], cache.generation())
+    cache.invalidate_new_book("Calculus", "James Stewart", "Mathematics")
+    assert cache.get("") is None
+    assert cache.get("calculus") is None
+    assert cache.get("calc stewart") is None
+    assert cache.get("physics") == [book("1")]
+
+
+def test_new_book_matching_only_the_indexed_words_drops_the_listing():
+    # "calculus ab" is searched as +calculus*; "ab" is too short for the index
+    cache = CatalogCache(ttl=60, max_entries=10)
+    for key in ("calculus ab", "ma", "ab"):
+        cache.put(key, [book("1")], cache.generation())
+    cache.invalidate_new_book("Calculus", "James Stewart", "Mathematics")
+    assert cache.get("calculus ab") is None
+    assert cache.get("ma") is None
+    assert cache.get("ab") == [book("1")]
+
+
+def test_key_ignores_case():
+    assert CatalogCache.make_key("Calculus") == CatalogCache.make_key("calculus")
+    assert CatalogCache.make_key(None) == ""
@@ -0,0 +1,40 @@
+"""Fail when a MemberTransactions hot query regresses to a full scan.
+
+Runs the bench.explain_check plans against the configured lib_mgmt database
+(db.DB_CONFIG), seeded with synthetic history that is rolled back afterwards.
+Skipped when no MySQL server is reachable.
+"""
+import random
+
+import mysql.connector
+import pytest
+
+from bench.explain_check import HOT_QUERIES, check_query, sample_params, seed_transactions
+from db import get_connection
+
+SEED_TRANSACTIONS = 20000
+
+
+@pytest.fixture(scope="module")
+def explain_conn():
+    try:
+        conn = get_connection()
+    except mysql.connector.Error as error:
+        pytest.skip(f"No local MySQL to EXPLAIN against: {error}")
+    try:
+        try:
+            seed_transactions(conn, SEED_TRANSACTIONS, random.Random(7))
+        except SystemExit as reason:
+            pytest.skip(str(reason))
+        yield conn, sample_params(conn)
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+@pytest.mark.parametrize("name, statement, param_names, tables, expected_key", HOT_QUERIES,
+                         ids=[query[0] for query in HOT_QUERIES])
+def test_hot_query_uses_an_index(explain_conn, name, statement, param_names, tables, expected_key):
+    conn, params = explain_conn
+    problems, _ = check_query(conn, name, statement, param_names, tables, None, params)
+    assert not problems, f"{name}: {'; '.join(problems)}"
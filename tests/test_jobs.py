@@ -0,0 +1,94 @@
+import datetime
+
+import mysql.connector
+
+import jobs
+from jobs import JobExecutor
+
+STARTED = datetime.datetime(2026, 10, 17, 9, 0, 0)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        self.conn.statements.append(" ".join(sql.split()))
+        if self.conn.fail:
+            raise mysql.connector.Error("Lost connection to MySQL server")
+        if sql.strip() == "SELECT NOW()":
+            self.rows = [(STARTED,)]
+        elif "FROM Jobs" in sql:
+            self.rows = self.conn.finished
+        else:
+            self.rowcount = 1
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Answers SELECT NOW() and the finished-jobs watch; fail makes every statement raise"""
+
+    def __init__(self, finished=(), fail=False):
+        self.finished = list(finished)
+        self.fail = fail
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_a_failing_finish_hook_does_not_stop_the_others(monkeypatch):
+    ran = []
+
+    def broken():
+        raise RuntimeError("cache gone")
+
+    monkeypatch.setattr(jobs, "FINISH_HOOKS", {"expire_holds": [broken, lambda: ran.append("cache")]})
+    finished = [(1, "expire_holds", STARTED + datetime.timedelta(seconds=5))]
+    conn = FakeConnection(finished)
+    monkeypatch.setattr(jobs, "get_connection", lambda: conn)
+    executor = JobExecutor()
+    assert executor.watch_finished() == 0   # the first look only notes the time
+    assert executor.watch_finished() == 1
+    assert ran == ["cache"]
+
+
+def test_bad_params_fail_only_that_job(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_TYPES", {"expire_holds": lambda ctx, **params: params})
+    monkeypatch.setattr(jobs, "get_connection", FakeConnection)
+    executor = JobExecutor()
+    status, message, _ = executor._execute(1, "token", "expire_holds", "{not json")
+    assert status == "Failed"
+    assert message.startswith("JSONDecodeError")
+    assert executor._execute(2, "token", "expire_holds", '{"batch_size": 10}') == ("Succeeded", None, {"batch_size": 10})
+
+
+def test_an_outcome_that_cannot_be_written_is_counted_as_lost(monkeypatch):
+    conn = FakeConnection(fail=True)
+    monkeypatch.setattr(jobs, "get_connection", lambda: conn)
+    executor = JobExecutor(poll_interval=0)
+    monkeypatch.setattr(executor, "claim", lambda: (1, "token", "expire_holds", None))
+    monkeypatch.setattr(executor, "_execute", lambda *claimed: ("Succeeded", None, {"expired": 3}))
+    assert executor.run_next()
+    assert len(conn.statements) == jobs.FINISH_ATTEMPTS
+    stats = executor.stats()
+    assert (stats["lost"], stats["succeeded"], stats["running"]) == (1, 0, 0)
@@ -0,0 +1,106 @@
+import time
+
+import mysql.connector
+import pytest
+
+from db import ConnectionPool, PoolTimeoutError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=()):
+        self.conn.statements.append(sql)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Stands in for a MySQL connection; an unhealthy one fails its ping"""
+
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.in_transaction = False
+        self.rolled_back = False
+        self.closed = False
+        self.statements = []
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+    def ping(self, reconnect=False):
+        if not self.healthy:
+            raise mysql.connector.Error("gone away")
+
+    def consume_results(self):
+        pass
+
+    def rollback(self):
+        self.rolled_back = True
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+
+def fake_pool(size=2, checkout_timeout=0.05, health_check_interval=30):
+    pool = ConnectionPool({}, size=size, checkout_timeout=checkout_timeout,
+                          health_check_interval=health_check_interval)
+    pool._connect = FakeConnection
+    return pool
+
+
+def test_released_connection_is_reused():
+    pool = fake_pool()
+    first = pool.acquire()
+    raw = first._conn
+    first.close()
+    second = pool.acquire()
+    assert second._conn is raw
+    metrics = pool.metrics()
+    assert (metrics["checkouts"], metrics["open"], metrics["in_use"]) == (2, 1, 1)
+
+
+def test_checkout_times_out_when_pool_is_exhausted():
+    pool = fake_pool(size=1, checkout_timeout=0.05)
+    held = pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert time.monotonic() - started >= 0.05
+    assert pool.metrics()["timeouts"] == 1
+    held.close()
+    pool.acquire().close()
+
+
+def test_release_rolls_back_an_open_transaction():
+    pool = fake_pool()
+    conn = pool.acquire()
+    raw = conn._conn
+    raw.in_transaction = True
+    conn.close()
+    assert raw.rolled_back
+
+
+def test_returned_wrapper_cannot_be_used():
+    pool = fake_pool()
+    conn = pool.acquire()
+    conn.close()
+    with pytest.raises(mysql.connector.Error):
+        conn.cursor()
+    conn.close()  # a second close is harmless
+    assert pool.metrics()["idle"] == 1
+
+
+def test_unhealthy_idle_connection_is_replaced():
+    pool = fake_pool(health_check_interval=0)
+    conn = pool.acquire()
+    stale = conn._conn
+    stale.healthy = False
+    conn.close()
+    fresh = pool.acquire()
+    assert fresh._conn is not stale
+    assert stale.closed
+    assert pool.metrics()["discarded"] == 1
@@ -0,0 +1,48 @@
+import queries
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeCursor:
+    """Records callproc and answers with the result sets the procedure would select"""
+
+    def __init__(self, result_sets):
+        self.result_sets = result_sets
+        self.called = None
+        self.closed = False
+
+    def callproc(self, procedure, args=()):
+        self.called = (procedure, args)
+
+    def stored_results(self):
+        return iter(FakeResult(rows) for rows in self.result_sets)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, *result_sets):
+        self.last_cursor = FakeCursor(result_sets)
+
+    def cursor(self):
+        return self.last_cursor
+
+
+def test_call_returns_the_rows_of_every_result_set():
+    conn = FakeConnection([("0306406152", "OK")], [("9780306406157", "UNAVAILABLE")])
+    rows = queries.call(conn, "BorrowBook", [7, '["0306406152", "9780306406157"]'])
+    assert rows == [("0306406152", "OK"), ("9780306406157", "UNAVAILABLE")]
+    assert conn.last_cursor.called == ("BorrowBook", (7, '["0306406152", "9780306406157"]'))
+    assert conn.last_cursor.closed
+
+
+def test_call_without_result_sets_returns_no_rows():
+    conn = FakeConnection()
+    assert queries.call(conn, "RebuildCirculationRollups") == []
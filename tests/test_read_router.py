@@ -0,0 +1,103 @@
+import time
+
+import mysql.connector
+
+from db import ReadRouter
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=()):
+        self.conn.statements.append(sql)
+
+    def fetchone(self):
+        return self.conn.status
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Stands in for a MySQL connection; status is what SHOW REPLICA STATUS returns"""
+
+    def __init__(self, pool=None, status=None):
+        self.pool = pool
+        self.status = status
+        self.closed = False
+        self.statements = []
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool:
+    """A replica or primary for ReadRouter: hands out connections reporting a fixed lag"""
+
+    def __init__(self, name, lag=0, fail_after=None):
+        self.name = name
+        self.lag = lag
+        self.fail_after = fail_after
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+        if self.fail_after is not None and self.acquired > self.fail_after:
+            raise mysql.connector.Error("too many connections")
+        status = None if self.lag == 0 else {"Seconds_Behind_Source": self.lag}
+        return FakeConnection(pool=self, status=status)
+
+
+def router(replicas, **options):
+    settings = {"max_lag_seconds": 5, "sticky_seconds": 0.05, "lag_check_interval": 0}
+    settings.update(options)
+    return ReadRouter(FakePool("primary"), replicas, **settings)
+
+
+def test_without_replicas_reads_go_to_the_primary():
+    reads = router([])
+    assert reads.acquire("catalog").pool.name == "primary"
+    assert reads.metrics()["primary_reads"] == 1
+
+
+def test_caught_up_replica_serves_reads():
+    reads = router([FakePool("replica")])
+    assert reads.acquire("catalog").pool.name == "replica"
+    assert reads.metrics()["replica_reads"] == 1
+
+
+def test_lagging_or_stopped_replicas_fall_back_to_the_primary():
+    reads = router([FakePool("behind", lag=30), FakePool("stopped")])
+    reads.replicas[1].acquire = lambda: FakeConnection(status={"Seconds_Behind_Source": None})
+    assert reads.acquire().pool.name == "primary"
+    metrics = reads.metrics()
+    assert metrics["lag_fallbacks"] == 1
+    assert metrics["replica0_lag_seconds"] == 30
+    assert metrics["replica1_lag_seconds"] == -1
+
+
+def test_reads_after_a_write_stick_to_the_primary_for_that_key():
+    reads = router([FakePool("replica")])
+    reads.note_write(("member", 1))
+    assert reads.acquire(("member", 1)).pool.name == "primary"
+    assert reads.acquire(("member", 2)).pool.name == "replica"
+    assert reads.metrics()["sticky_reads"] == 1
+    time.sleep(0.06)
+    assert reads.acquire(("member", 1)).pool.name == "replica"
+
+
+def test_stickiness_outlasts_replica_lag():
+    reads = router([FakePool("replica", lag=1)], sticky_seconds=0)
+    reads.note_write("catalog")
+    assert reads.acquire("catalog").pool.name == "primary"
+
+
+def test_replica_connection_error_falls_back_to_the_primary():
+    # The lag probe gets a connection; the read itself does not
+    reads = router([FakePool("replica", fail_after=1)])
+    assert reads.acquire().pool.name == "primary"
+    assert reads.metrics()["error_fallbacks"] == 1
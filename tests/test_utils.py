@@ -0,0 +1,20 @@
+import pytest
+
+from utils import validate_email, validate_isbn
+
+
+@pytest.mark.parametrize("isbn", ["0306406152", "9780306406157"])
+def test_isbn_of_ten_or_thirteen_digits_is_valid(isbn):
+    assert validate_isbn(isbn)
+
+
+@pytest.mark.parametrize("isbn", ["", "030640615", "03064061521", "978030640615", "97803064061570",
+                                  "030640615X", "978-0306406157", " 9780306406157"])
+def test_other_isbns_are_rejected(isbn):
+    assert not validate_isbn(isbn)
+
+
+def test_email():
+    assert validate_email("reader@example.com")
+    assert not validate_email("reader@example")
+    assert not validate_email("reader example.com")
@@ -0,0 +1,21 @@
+import hashlib
+import re
+
+FULLTEXT_MIN_TOKEN_SIZE = 3  # innodb_ft_min_token_size
+
+# Validation helpers shared by the Streamlit app and the command-line tools
+def hash_password(password):
+    """Hash password using SHA-256"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def validate_isbn(isbn):
+    """Validate ISBN format"""
+    return bool(re.match(r'^(\d{10}|\d{13})$', isbn))
+
+def validate_email(email):
+    """Validate email format"""
+    return bool(re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email))
+
+def fulltext_words(search_term):
+    """The words of a catalog search the FULLTEXT index can match; shorter ones are not indexed"""
+    return [word for word in re.findall(r'\w+', search_term) if len(word) >= FULLTEXT_MIN_TOKEN_SIZE]